@@ -10,6 +10,7 @@ from django.utils.translation import gettext_lazy as _
 from .models import (
     Account,
     AccountMapping,
+    AccountPeriodBalance,
     AccountType,
     AnalyticAccount,
     Asset,
@@ -535,6 +536,25 @@ class FiscalPeriodAdmin(admin.ModelAdmin):
     action_close.short_description = _('Clôturer les périodes sélectionnées')
 
 
+@admin.register(AccountPeriodBalance)
+class AccountPeriodBalanceAdmin(admin.ModelAdmin):
+    """Consultation des soldes par compte et par période (lecture seule)."""
+
+    list_display = ('account', 'period', 'debit', 'credit', 'updated_at')
+    list_filter = ('period__fiscal_year', 'period')
+    search_fields = ('account__code', 'account__name')
+    list_select_related = ('account', 'period')
+    ordering = ('period', 'account__code')
+
+    def has_add_permission(self, request):
+        """Les soldes sont maintenus par les écritures."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Les soldes sont maintenus par les écritures."""
+        return False
+
+
 @admin.register(AnalyticAccount)
 class AnalyticAccountAdmin(admin.ModelAdmin):
     """Configuration d'administration pour les comptes analytiques."""
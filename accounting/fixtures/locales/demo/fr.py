@@ -332,7 +332,7 @@ def load_demo_data():
                         ).first(),
                         'name': f'VE-DEMO-{i:03d}',
                         'narration': desc,
-                        'state': 'posted',
+                        'state': 'draft',
                         'created_by': admin_user,
                     },
                 )
@@ -358,5 +358,7 @@ def load_demo_data():
                         credit=tva,
                         name='TVA collectée 20%',
                     )
+                    # post() alimente les soldes par période (AccountPeriodBalance)
+                    entry.post()
 
     logger.info('Données de démonstration FR chargées')
@@ -329,7 +329,7 @@ def load_demo_data():
                         ).first(),
                         'name': f'VE-DEMO-{i:03d}',
                         'narration': desc,
-                        'state': 'posted',
+                        'state': 'draft',
                         'created_by': admin_user,
                     },
                 )
@@ -355,5 +355,7 @@ def load_demo_data():
                         credit=tva,
                         name='TVA collectée 18%',
                     )
+                    # post() alimente les soldes par période (AccountPeriodBalance)
+                    entry.post()
 
     logger.info('Données de démonstration OHADA chargées')
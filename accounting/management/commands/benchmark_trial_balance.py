@@ -0,0 +1,124 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ...models import (
+    Account,
+    AccountType,
+    FiscalPeriod,
+    FiscalYear,
+    Journal,
+    JournalEntry,
+    JournalEntryLine,
+)
+from ...services.balance_snapshot_service import BalanceSnapshotService
+from ...services.financial_report_service import FinancialReportService
+
+
+class _Rollback(Exception):
+    """Annule la transaction de benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure le nombre de requêtes et la latence de la balance des comptes '
+        'sur des données synthétiques (transaction annulée en fin de mesure)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--accounts',
+            type=int,
+            nargs='+',
+            default=[100, 1000, 3000],
+            help='Nombres de comptes à tester',
+        )
+        parser.add_argument(
+            '--lines-per-account',
+            type=int,
+            default=10,
+            help="Nombre de lignes d'écriture par compte",
+        )
+
+    def handle(self, *args, **options):
+        lines_per_account = options['lines_per_account']
+
+        self.stdout.write(
+            f'{"Comptes":>8} {"Lignes":>10} {"Requêtes":>9} {"Durée (ms)":>11}'
+        )
+        for nb_accounts in options['accounts']:
+            try:
+                with transaction.atomic():
+                    self._seed(nb_accounts, lines_per_account)
+
+                    with CaptureQueriesContext(connection) as ctx:
+                        start = time.perf_counter()
+                        FinancialReportService.generate_trial_balance(
+                            date=date(2099, 12, 31)
+                        )
+                        elapsed = (time.perf_counter() - start) * 1000
+
+                    self.stdout.write(
+                        f'{nb_accounts:>8} {nb_accounts * lines_per_account:>10} '
+                        f'{len(ctx.captured_queries):>9} {elapsed:>11.1f}'
+                    )
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _seed(self, nb_accounts, lines_per_account):
+        """Crée un plan comptable et des écritures validées synthétiques."""
+        user = User.objects.create(username='__benchmark_trial_balance__')
+        account_type = AccountType.objects.create(code='__BENCH', name='Benchmark')
+        fiscal_year = FiscalYear.objects.create(
+            name='Benchmark',
+            start_date=date(2099, 1, 1),
+            end_date=date(2099, 12, 31),
+            state='open',
+        )
+        period = FiscalPeriod.objects.create(
+            fiscal_year=fiscal_year,
+            name='Benchmark',
+            start_date=date(2099, 1, 1),
+            end_date=date(2099, 12, 31),
+            state='open',
+        )
+        journal = Journal.objects.create(code='__BCH', name='Benchmark', type='general')
+
+        accounts = Account.objects.bulk_create(
+            Account(code=f'9{i:07d}', name=f'Compte {i}', type_id=account_type)
+            for i in range(nb_accounts)
+        )
+        entries = JournalEntry.objects.bulk_create(
+            JournalEntry(
+                name=f'BENCH/{i:06d}',
+                journal_id=journal,
+                date=date(2099, 6, 1),
+                period_id=period,
+                state='posted',
+                created_by=user,
+            )
+            for i in range(lines_per_account)
+        )
+
+        amount = Decimal('100.00')
+        JournalEntryLine.objects.bulk_create(
+            (
+                JournalEntryLine(
+                    entry_id=entry,
+                    account_id=account,
+                    name='Benchmark',
+                    debit=amount if idx % 2 == 0 else 0,
+                    credit=0 if idx % 2 == 0 else amount,
+                )
+                for entry in entries
+                for idx, account in enumerate(accounts)
+            ),
+            batch_size=5000,
+        )
+        BalanceSnapshotService.rebuild(fiscal_year)
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import FiscalYear
+from ...services.balance_snapshot_service import BalanceSnapshotService
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruit les soldes par compte et par période depuis les écritures '
+        'validées, ou vérifie leur cohérence (--check)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fiscal-year',
+            type=int,
+            help="ID de l'exercice à traiter (tous par défaut)",
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Comparer les soldes aux écritures sans les modifier',
+        )
+
+    def handle(self, *args, **options):
+        fiscal_year = None
+        if options['fiscal_year']:
+            try:
+                fiscal_year = FiscalYear.objects.get(id=options['fiscal_year'])
+            except FiscalYear.DoesNotExist:
+                raise CommandError(f'Exercice {options["fiscal_year"]} introuvable')
+
+        if options['check']:
+            mismatches = BalanceSnapshotService.check_consistency(fiscal_year)
+            for m in mismatches:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'Compte {m["account_id"]} / période {m["period_id"]} : '
+                        f'attendu {m["expected_debit"]} / {m["expected_credit"]}, '
+                        f'matérialisé {m["snapshot_debit"]} / {m["snapshot_credit"]}'
+                    )
+                )
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} écart(s) détecté(s)')
+            self.stdout.write(self.style.SUCCESS('Soldes cohérents avec les écritures'))
+            return
+
+        count = BalanceSnapshotService.rebuild(fiscal_year)
+        self.stdout.write(
+            self.style.SUCCESS(f'{count} soldes par période reconstruits')
+        )
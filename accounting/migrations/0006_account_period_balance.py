@@ -0,0 +1,102 @@
+# Generated by Django 5.2 on 2026-10-17 02:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_account_period_balances(apps, schema_editor):
+    """Initialise les soldes par période depuis les écritures validées existantes."""
+    AccountPeriodBalance = apps.get_model('accounting', 'AccountPeriodBalance')
+    JournalEntryLine = apps.get_model('accounting', 'JournalEntryLine')
+
+    rows = (
+        JournalEntryLine.objects.filter(entry_id__state='posted')
+        .values('account_id', 'entry_id__period_id')
+        .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+        .order_by()
+    )
+    AccountPeriodBalance.objects.bulk_create(
+        (
+            AccountPeriodBalance(
+                account_id=row['account_id'],
+                period_id=row['entry_id__period_id'],
+                debit=row['debit_sum'] or 0,
+                credit=row['credit_sum'] or 0,
+            )
+            for row in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('accounting', '0005_add_employee_expense_payable_mapping'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPeriodBalance',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'debit',
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=18,
+                        verbose_name='Total débit',
+                    ),
+                ),
+                (
+                    'credit',
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=18,
+                        verbose_name='Total crédit',
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(auto_now=True, verbose_name='Modifié le'),
+                ),
+                (
+                    'account',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='period_balances',
+                        to='accounting.account',
+                        verbose_name='Compte',
+                    ),
+                ),
+                (
+                    'period',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='account_balances',
+                        to='accounting.fiscalperiod',
+                        verbose_name='Période fiscale',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Solde de compte par période',
+                'verbose_name_plural': 'Soldes de comptes par période',
+                'ordering': ['period', 'account'],
+                'unique_together': {('account', 'period')},
+            },
+        ),
+        migrations.RunPython(
+            populate_account_period_balances, migrations.RunPython.noop
+        ),
+    ]
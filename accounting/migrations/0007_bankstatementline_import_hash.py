@@ -0,0 +1,45 @@
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def populate_import_hashes(apps, schema_editor):
+    """Empreinte des lignes existantes (voir statement_line_hash)."""
+    BankStatementLine = apps.get_model('accounting', 'BankStatementLine')
+
+    batch = []
+    for line in BankStatementLine.objects.only('date', 'amount', 'ref').iterator(
+        chunk_size=1000
+    ):
+        raw = (
+            f'{line.date.isoformat()}|{line.amount.quantize(Decimal("0.01"))}'
+            f'|{line.ref.strip()}'
+        )
+        line.import_hash = hashlib.sha256(raw.encode()).hexdigest()
+        batch.append(line)
+        if len(batch) >= 1000:
+            BankStatementLine.objects.bulk_update(batch, ['import_hash'])
+            batch = []
+    if batch:
+        BankStatementLine.objects.bulk_update(batch, ['import_hash'])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('accounting', '0006_account_period_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankstatementline',
+            name='import_hash',
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=64,
+                verbose_name="Empreinte d'import",
+            ),
+        ),
+        migrations.RunPython(populate_import_hashes, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,7 @@ from datetime import timedelta
 from decimal import Decimal
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Sum
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -89,21 +89,16 @@ class Account(models.Model):
 
     def get_balance(self, start_date=None, end_date=None):
         """Calcule le solde du compte pour une période donnée."""
-        # Filtre de base: écritures validées
-        query = JournalEntryLine.objects.filter(
-            account_id=self, entry_id__state='posted'
-        )
-
-        # Filtrer par date
-        if start_date:
-            query = query.filter(entry_id__date__gte=start_date)
-        if end_date:
-            query = query.filter(entry_id__date__lte=end_date)
+        from .services.balance_snapshot_service import BalanceSnapshotService
 
-        # Calculer les totaux
-        debit_sum = query.aggregate(sum=Sum('debit'))['sum'] or Decimal('0.0')
-        credit_sum = query.aggregate(sum=Sum('credit'))['sum'] or Decimal('0.0')
+        totals = BalanceSnapshotService.get_totals(
+            start_date=start_date, end_date=end_date, account_ids=[self.id]
+        )
+        debit_sum, credit_sum = totals.get(self.id, (Decimal('0.0'), Decimal('0.0')))
+        return self.balance_from_totals(debit_sum, credit_sum)
 
+    def balance_from_totals(self, debit_sum, credit_sum):
+        """Solde signé selon le type de compte, à partir des sommes débit/crédit."""
         # Calculer le solde
         balance = debit_sum - credit_sum
 
@@ -346,12 +341,16 @@ class JournalEntry(models.Model):
 
     @property
     def total_debit(self):
-        """Total du débit de l'écriture."""
+        """Total du débit de l'écriture (annotation debit_sum si présente)."""
+        if hasattr(self, 'debit_sum'):
+            return self.debit_sum or Decimal('0.0')
         return self.lines.aggregate(total=Sum('debit'))['total'] or Decimal('0.0')
 
     @property
     def total_credit(self):
-        """Total du crédit de l'écriture."""
+        """Total du crédit de l'écriture (annotation credit_sum si présente)."""
+        if hasattr(self, 'credit_sum'):
+            return self.credit_sum or Decimal('0.0')
         return self.lines.aggregate(total=Sum('credit'))['total'] or Decimal('0.0')
 
     @property
@@ -360,20 +359,32 @@ class JournalEntry(models.Model):
         return self.total_debit == self.total_credit
 
     def post(self):
-        """Valide l'écriture comptable."""
-        if self.state != 'draft':
-            raise ValidationError(
-                _("Impossible de valider une écriture qui n'est pas en brouillon")
-            )
+        """
+        Valide l'écriture comptable.
+
+        L'écriture est verrouillée et son état relu sous le verrou : deux
+        validations concurrentes ne répercutent pas deux fois ses montants
+        sur les soldes par période.
+        """
+        from .services.balance_snapshot_service import BalanceSnapshotService
+
+        with transaction.atomic():
+            entry = JournalEntry.objects.select_for_update().get(pk=self.pk)
+            if entry.state != 'draft':
+                raise ValidationError(
+                    _("Impossible de valider une écriture qui n'est pas en brouillon")
+                )
 
-        if not self.is_balanced:
-            raise ValidationError(_("L'écriture n'est pas équilibrée"))
+            if not entry.is_balanced:
+                raise ValidationError(_("L'écriture n'est pas équilibrée"))
 
-        if not self.lines.exists():
-            raise ValidationError(_("L'écriture ne contient aucune ligne"))
+            if not entry.lines.exists():
+                raise ValidationError(_("L'écriture ne contient aucune ligne"))
 
-        self.state = 'posted'
-        self.save(update_fields=['state'])
+            entry.state = 'posted'
+            entry.save(update_fields=['state'])
+            BalanceSnapshotService.apply_entry(entry)
+        self.state = entry.state
 
         # Lettrage automatique si possible
         self.try_auto_reconcile()
@@ -381,20 +392,26 @@ class JournalEntry(models.Model):
         return True
 
     def cancel(self):
-        """Annule l'écriture comptable."""
-        if self.state != 'posted':
-            raise ValidationError(
-                _("Impossible d'annuler une écriture qui n'est pas validée")
-            )
+        """Annule l'écriture comptable (verrouillée, comme post())."""
+        from .services.balance_snapshot_service import BalanceSnapshotService
+
+        with transaction.atomic():
+            entry = JournalEntry.objects.select_for_update().get(pk=self.pk)
+            if entry.state != 'posted':
+                raise ValidationError(
+                    _("Impossible d'annuler une écriture qui n'est pas validée")
+                )
 
-        # Vérifier si l'écriture peut être annulée (pas déjà lettrée)
-        if self.lines.filter(is_reconciled=True).exists():
-            raise ValidationError(
-                _("Impossible d'annuler une écriture dont les lignes sont lettrées")
-            )
+            # Vérifier si l'écriture peut être annulée (pas déjà lettrée)
+            if entry.lines.filter(is_reconciled=True).exists():
+                raise ValidationError(
+                    _("Impossible d'annuler une écriture dont les lignes sont lettrées")
+                )
 
-        self.state = 'cancel'
-        self.save(update_fields=['state'])
+            entry.state = 'cancel'
+            entry.save(update_fields=['state'])
+            BalanceSnapshotService.apply_entry(entry, sign=-1)
+        self.state = entry.state
 
         return True
 
@@ -579,6 +596,45 @@ class JournalEntryLine(models.Model):
         return self.debit - self.credit
 
 
+class AccountPeriodBalance(models.Model):
+    """
+    Totaux débit/crédit des écritures validées, par compte et par période.
+
+    Maintenu à la validation et à l'annulation des écritures
+    (voir BalanceSnapshotService) ; reconstructible avec la commande
+    rebuild_account_balances.
+    """
+
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='period_balances',
+        verbose_name=_('Compte'),
+    )
+    period = models.ForeignKey(
+        FiscalPeriod,
+        on_delete=models.CASCADE,
+        related_name='account_balances',
+        verbose_name=_('Période fiscale'),
+    )
+    debit = models.DecimalField(
+        _('Total débit'), max_digits=18, decimal_places=2, default=0
+    )
+    credit = models.DecimalField(
+        _('Total crédit'), max_digits=18, decimal_places=2, default=0
+    )
+    updated_at = models.DateTimeField(_('Modifié le'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Solde de compte par période')
+        verbose_name_plural = _('Soldes de comptes par période')
+        ordering = ['period', 'account']
+        unique_together = [['account', 'period']]
+
+    def __str__(self):
+        return f'{self.account.code} - {self.period.name}'
+
+
 class Reconciliation(models.Model):
     """Lettrages des écritures."""
 
@@ -614,6 +670,10 @@ class Reconciliation(models.Model):
     @property
     def balance(self):
         """Solde du lettrage (devrait être proche de zéro)."""
+        if hasattr(self, 'debit_sum'):
+            return (self.debit_sum or Decimal('0.0')) - (
+                self.credit_sum or Decimal('0.0')
+            )
         debit = self.lines.aggregate(total=Sum('debit'))['total'] or Decimal('0.0')
         credit = self.lines.aggregate(total=Sum('credit'))['total'] or Decimal('0.0')
         return debit - credit
@@ -787,6 +847,10 @@ class BankStatementLine(models.Model):
     )
     amount = models.DecimalField(_('Montant'), max_digits=15, decimal_places=2)
     is_reconciled = models.BooleanField(_('Rapproché'), default=False)
+    # Empreinte (date, montant, référence) : dédoublonnage des imports
+    import_hash = models.CharField(
+        _("Empreinte d'import"), max_length=64, blank=True, db_index=True
+    )
 
     # Lien avec les lignes d'écritures
     journal_entry_line_ids = models.ManyToManyField(
@@ -808,6 +872,16 @@ class BankStatementLine(models.Model):
     def __str__(self):
         return f'{self.name} - {self.amount}'
 
+    def save(self, *args, **kwargs):
+        from .services.bank_statement_import import statement_line_hash
+
+        # Lignes saisies : dédoublonnées comme les lignes importées
+        self.import_hash = statement_line_hash(self.date, self.amount, self.ref)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'amount', 'ref'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'import_hash'}
+        super().save(*args, **kwargs)
+
 
 class AssetCategory(models.Model):
     """Catégories d'immobilisations."""
@@ -28,8 +28,34 @@ class AccountTypeSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'name', 'is_debit', 'sequence']
 
 
+def _account_balance(account, context):
+    """
+    Solde du compte : sommes annotées par la vue (debit_sum / credit_sum,
+    voir BalanceSnapshotService.annotate_totals), sinon calcul unitaire.
+    """
+    if hasattr(account, 'debit_sum'):
+        balance = account.balance_from_totals(account.debit_sum, account.credit_sum)
+        return float(balance)
+
+    # On peut récupérer les dates du contexte pour le calcul du solde
+    request = context.get('request', None)
+    start_date = None
+    end_date = None
+
+    if request:
+        start_date = request.query_params.get('start_date', None)
+        end_date = request.query_params.get('end_date', None)
+
+    # Utiliser la méthode du modèle pour calculer le solde
+    balance = account.get_balance(start_date=start_date, end_date=end_date)
+    return float(balance)
+
+
 class AccountSerializer(serializers.ModelSerializer):
-    """Serializer pour les comptes comptables."""
+    """
+    Serializer pour les comptes comptables.
+    Contexte with_balance=False : pas de champ balance (listes de sélection).
+    """
 
     type_name = serializers.SerializerMethodField()
     parent_code = serializers.SerializerMethodField()
@@ -55,6 +81,11 @@ class AccountSerializer(serializers.ModelSerializer):
             'balance',
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('with_balance', True):
+            self.fields.pop('balance')
+
     def get_type_name(self, obj):
         return obj.type_id.name if obj.type_id else None
 
@@ -65,18 +96,7 @@ class AccountSerializer(serializers.ModelSerializer):
         return obj.parent_id.name if obj.parent_id else None
 
     def get_balance(self, obj):
-        # On peut récupérer les dates du contexte pour le calcul du solde
-        request = self.context.get('request', None)
-        start_date = None
-        end_date = None
-
-        if request:
-            start_date = request.query_params.get('start_date', None)
-            end_date = request.query_params.get('end_date', None)
-
-        # Utiliser la méthode du modèle pour calculer le solde
-        balance = obj.get_balance(start_date=start_date, end_date=end_date)
-        return float(balance)
+        return _account_balance(obj, self.context)
 
 
 class AccountDetailSerializer(serializers.ModelSerializer):
@@ -111,6 +131,11 @@ class AccountDetailSerializer(serializers.ModelSerializer):
             'balance',
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('with_balance', True):
+            self.fields.pop('balance')
+
     def get_type_name(self, obj):
         return obj.type_id.name if obj.type_id else None
 
@@ -121,21 +146,12 @@ class AccountDetailSerializer(serializers.ModelSerializer):
         return obj.parent_id.name if obj.parent_id else None
 
     def get_children(self, obj):
-        return AccountSerializer(obj.children.all(), many=True).data
+        return AccountSerializer(
+            obj.children.all(), many=True, context=self.context
+        ).data
 
     def get_balance(self, obj):
-        # On peut récupérer les dates du contexte pour le calcul du solde
-        request = self.context.get('request', None)
-        start_date = None
-        end_date = None
-
-        if request:
-            start_date = request.query_params.get('start_date', None)
-            end_date = request.query_params.get('end_date', None)
-
-        # Utiliser la méthode du modèle pour calculer le solde
-        balance = obj.get_balance(start_date=start_date, end_date=end_date)
-        return float(balance)
+        return _account_balance(obj, self.context)
 
 
 class JournalSerializer(serializers.ModelSerializer):
@@ -379,6 +395,23 @@ class JournalEntryDetailSerializer(serializers.ModelSerializer):
             'is_balanced',
             'lines',
         ]
+        # L'état ne change que par post() / cancel(), qui tiennent à jour
+        # les soldes par période
+        read_only_fields = ['state']
+
+    def validate(self, attrs):
+        """Date et période d'une écriture validée ou annulée non modifiables."""
+        entry = self.instance
+        if entry is not None and entry.state != 'draft':
+            for field in ('date', 'period_id', 'journal_id'):
+                if field in attrs and attrs[field] != getattr(entry, field):
+                    raise serializers.ValidationError(
+                        {
+                            field: 'Seule une écriture en brouillon peut changer '
+                            'de date, de période ou de journal'
+                        }
+                    )
+        return attrs
 
     def get_journal_code(self, obj):
         return obj.journal_id.code if obj.journal_id else None
@@ -472,7 +505,8 @@ class FiscalYearSerializer(serializers.ModelSerializer):
         return obj.get_state_display()
 
     def get_periods_count(self, obj):
-        return obj.periods.count()
+        count = getattr(obj, 'periods_count', None)
+        return obj.periods.count() if count is None else count
 
 
 class FiscalPeriodSerializer(serializers.ModelSerializer):
@@ -540,7 +574,8 @@ class ReconciliationSerializer(serializers.ModelSerializer):
         )
 
     def get_lines_count(self, obj):
-        return obj.reconciled_lines.count()
+        count = getattr(obj, 'lines_count', None)
+        return obj.reconciled_lines.count() if count is None else count
 
     def get_balance(self, obj):
         return float(obj.balance)
@@ -617,7 +652,9 @@ class BankStatementLineSerializer(serializers.ModelSerializer):
         return obj.partner_id.name if obj.partner_id else None
 
     def get_journal_entry_lines_count(self, obj):
-        return obj.journal_entry_line_ids.count()
+        # Les identifiants sont déjà chargés (préchargés) pour le champ
+        # journal_entry_line_ids
+        return len(obj.journal_entry_line_ids.all())
 
 
 class BankStatementSerializer(serializers.ModelSerializer):
@@ -668,7 +705,8 @@ class BankStatementSerializer(serializers.ModelSerializer):
         )
 
     def get_lines_count(self, obj):
-        return obj.lines.count()
+        count = getattr(obj, 'lines_count', None)
+        return obj.lines.count() if count is None else count
 
     def get_difference(self, obj):
         return float(obj.difference)
@@ -776,7 +814,8 @@ class AnalyticAccountSerializer(serializers.ModelSerializer):
         return obj.parent_id.name if obj.parent_id else None
 
     def get_children_count(self, obj):
-        return obj.children.count()
+        count = getattr(obj, 'children_count', None)
+        return obj.children.count() if count is None else count
 
 
 class TaxSerializer(serializers.ModelSerializer):
@@ -879,6 +918,23 @@ class AssetDepreciationSerializer(serializers.ModelSerializer):
         return obj.move_id.name if obj.move_id else None
 
 
+def _net_book_value(asset):
+    """
+    Valeur nette comptable = valeur d'acquisition - amortissements cumulés
+    (annotation posted_depreciation_sum de la vue, sinon agrégat unitaire).
+    """
+    if hasattr(asset, 'posted_depreciation_sum'):
+        depreciation_sum = asset.posted_depreciation_sum or 0
+    else:
+        depreciation_sum = (
+            asset.depreciation_lines.filter(state='posted').aggregate(
+                sum=Sum('amount')
+            )['sum']
+            or 0
+        )
+    return float(asset.acquisition_value - depreciation_sum)
+
+
 class AssetSerializer(serializers.ModelSerializer):
     """Serializer pour les immobilisations."""
 
@@ -908,20 +964,14 @@ class AssetSerializer(serializers.ModelSerializer):
         return obj.category_id.name if obj.category_id else None
 
     def get_depreciation_count(self, obj):
-        return obj.depreciation_lines.count()
+        count = getattr(obj, 'depreciation_count', None)
+        return obj.depreciation_lines.count() if count is None else count
 
     def get_depreciation_value(self, obj):
         return float(obj.acquisition_value - obj.salvage_value)
 
     def get_net_book_value(self, obj):
-        # Valeur nette comptable = valeur d'acquisition - amortissements cumulés
-        depreciation_sum = (
-            obj.depreciation_lines.filter(state='posted').aggregate(sum=Sum('amount'))[
-                'sum'
-            ]
-            or 0
-        )
-        return float(obj.acquisition_value - depreciation_sum)
+        return _net_book_value(obj)
 
 
 class AssetDetailSerializer(serializers.ModelSerializer):
@@ -968,11 +1018,4 @@ class AssetDetailSerializer(serializers.ModelSerializer):
         return float(obj.acquisition_value - obj.salvage_value)
 
     def get_net_book_value(self, obj):
-        # Valeur nette comptable = valeur d'acquisition - amortissements cumulés
-        depreciation_sum = (
-            obj.depreciation_lines.filter(state='posted').aggregate(sum=Sum('amount'))[
-                'sum'
-            ]
-            or 0
-        )
-        return float(obj.acquisition_value - depreciation_sum)
+        return _net_book_value(obj)
@@ -0,0 +1,256 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+
+from ..models import AccountPeriodBalance, FiscalPeriod, JournalEntryLine
+
+
+class BalanceSnapshotService:
+    """
+    Gestion des soldes matérialisés par compte et par période fiscale.
+
+    Les rapports somment au plus une ligne AccountPeriodBalance par période
+    entièrement couverte, plus les lignes d'écritures des périodes partielles
+    aux bornes de l'intervalle demandé.
+    """
+
+    @staticmethod
+    def apply_entry(entry, sign=1):
+        """
+        Répercute une écriture sur les soldes de sa période.
+
+        Args:
+            entry (JournalEntry): Écriture validée (sign=1) ou annulée (sign=-1)
+            sign (int): 1 pour ajouter les montants, -1 pour les retirer
+        """
+        deltas = (
+            entry.lines.values('account_id')
+            .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+            .order_by('account_id')
+        )
+        deltas = [
+            (
+                row['account_id'],
+                (row['debit_sum'] or Decimal('0.0')) * sign,
+                (row['credit_sum'] or Decimal('0.0')) * sign,
+            )
+            for row in deltas
+        ]
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            # Créer les soldes manquants, puis incrémenter : les UPDATE
+            # verrouillent les lignes et sérialisent les validations concurrentes
+            AccountPeriodBalance.objects.bulk_create(
+                [
+                    AccountPeriodBalance(account_id=account_id, period=entry.period_id)
+                    for account_id, _debit, _credit in deltas
+                ],
+                ignore_conflicts=True,
+            )
+            for account_id, debit, credit in deltas:
+                AccountPeriodBalance.objects.filter(
+                    account_id=account_id, period=entry.period_id
+                ).update(debit=F('debit') + debit, credit=F('credit') + credit)
+
+    @staticmethod
+    def _raw_period_totals(fiscal_year=None):
+        """Totaux des lignes validées, groupés par (compte, période)."""
+        query = JournalEntryLine.objects.filter(entry_id__state='posted')
+        if fiscal_year:
+            query = query.filter(entry_id__period_id__fiscal_year=fiscal_year)
+
+        rows = (
+            query.values('account_id', 'entry_id__period_id')
+            .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+            .order_by()
+        )
+        return {
+            (row['account_id'], row['entry_id__period_id']): (
+                row['debit_sum'] or Decimal('0.0'),
+                row['credit_sum'] or Decimal('0.0'),
+            )
+            for row in rows
+        }
+
+    @staticmethod
+    def rebuild(fiscal_year=None):
+        """
+        Reconstruit les soldes depuis les lignes d'écritures.
+
+        Args:
+            fiscal_year (FiscalYear, optional): Limiter à un exercice
+
+        Returns:
+            int: Nombre de soldes créés
+        """
+        totals = BalanceSnapshotService._raw_period_totals(fiscal_year)
+
+        with transaction.atomic():
+            snapshots = AccountPeriodBalance.objects.all()
+            if fiscal_year:
+                snapshots = snapshots.filter(period__fiscal_year=fiscal_year)
+            snapshots.delete()
+
+            AccountPeriodBalance.objects.bulk_create(
+                (
+                    AccountPeriodBalance(
+                        account_id=account_id,
+                        period_id=period_id,
+                        debit=debit,
+                        credit=credit,
+                    )
+                    for (account_id, period_id), (debit, credit) in totals.items()
+                ),
+                batch_size=1000,
+            )
+
+        return len(totals)
+
+    @staticmethod
+    def check_consistency(fiscal_year=None):
+        """
+        Compare les soldes matérialisés aux lignes d'écritures.
+
+        Args:
+            fiscal_year (FiscalYear, optional): Limiter à un exercice
+
+        Returns:
+            list: Écarts détectés, un dict par couple (compte, période)
+        """
+        expected = BalanceSnapshotService._raw_period_totals(fiscal_year)
+
+        snapshots = AccountPeriodBalance.objects.all()
+        if fiscal_year:
+            snapshots = snapshots.filter(period__fiscal_year=fiscal_year)
+        actual = {
+            (account_id, period_id): (debit, credit)
+            for account_id, period_id, debit, credit in snapshots.values_list(
+                'account_id', 'period_id', 'debit', 'credit'
+            )
+        }
+
+        zero = (Decimal('0.0'), Decimal('0.0'))
+        mismatches = []
+        for account_id, period_id in sorted(expected.keys() | actual.keys()):
+            expected_debit, expected_credit = expected.get(
+                (account_id, period_id), zero
+            )
+            snapshot_debit, snapshot_credit = actual.get((account_id, period_id), zero)
+            if (expected_debit, expected_credit) != (snapshot_debit, snapshot_credit):
+                mismatches.append(
+                    {
+                        'account_id': account_id,
+                        'period_id': period_id,
+                        'expected_debit': expected_debit,
+                        'expected_credit': expected_credit,
+                        'snapshot_debit': snapshot_debit,
+                        'snapshot_credit': snapshot_credit,
+                    }
+                )
+
+        return mismatches
+
+    @staticmethod
+    def _sources(start_date=None, end_date=None):
+        """
+        Soldes matérialisés des périodes entièrement comprises dans
+        l'intervalle, et lignes validées des périodes partielles.
+        """
+        full_periods = FiscalPeriod.objects.all()
+        if start_date:
+            full_periods = full_periods.filter(start_date__gte=start_date)
+        if end_date:
+            full_periods = full_periods.filter(end_date__lte=end_date)
+        full_periods = full_periods.values('id')
+
+        snapshots = AccountPeriodBalance.objects.filter(period__in=full_periods)
+        lines = JournalEntryLine.objects.filter(entry_id__state='posted').exclude(
+            entry_id__period_id__in=full_periods
+        )
+        if start_date:
+            lines = lines.filter(entry_id__date__gte=start_date)
+        if end_date:
+            lines = lines.filter(entry_id__date__lte=end_date)
+        return snapshots, lines
+
+    @staticmethod
+    def get_totals(start_date=None, end_date=None, account_ids=None):
+        """
+        Sommes débit/crédit par compte sur un intervalle de dates.
+
+        Les périodes entièrement comprises dans l'intervalle sont lues depuis
+        les soldes matérialisés ; les périodes partielles (bornes de
+        l'intervalle) depuis les lignes d'écritures.
+
+        Returns:
+            dict: {account_id: (débit, crédit)} pour les comptes mouvementés
+        """
+        snapshots, lines = BalanceSnapshotService._sources(start_date, end_date)
+        if account_ids:
+            snapshots = snapshots.filter(account_id__in=account_ids)
+            lines = lines.filter(account_id__in=account_ids)
+
+        totals = {}
+        for query in (snapshots, lines):
+            rows = (
+                query.values('account_id')
+                .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+                .order_by()
+            )
+            for row in rows:
+                debit, credit = totals.get(
+                    row['account_id'], (Decimal('0.0'), Decimal('0.0'))
+                )
+                totals[row['account_id']] = (
+                    debit + (row['debit_sum'] or Decimal('0.0')),
+                    credit + (row['credit_sum'] or Decimal('0.0')),
+                )
+
+        return totals
+
+    @staticmethod
+    def annotate_totals(queryset, start_date=None, end_date=None):
+        """
+        Annote debit_sum et credit_sum sur un queryset de comptes.
+
+        Mêmes règles que get_totals, calculées dans la requête de la liste
+        (sous-requêtes corrélées) : aucune requête supplémentaire par compte.
+        """
+        snapshots, lines = BalanceSnapshotService._sources(start_date, end_date)
+        amount = DecimalField(max_digits=15, decimal_places=2)
+
+        def total(query, field):
+            return Coalesce(
+                Subquery(
+                    query.filter(account_id=OuterRef('pk'))
+                    .order_by()
+                    .values('account_id')
+                    .annotate(total=Sum(field))
+                    .values('total')[:1],
+                    output_field=amount,
+                ),
+                Value(Decimal('0.00')),
+                output_field=amount,
+            )
+
+        return queryset.annotate(
+            debit_sum=ExpressionWrapper(
+                total(snapshots, 'debit') + total(lines, 'debit'), output_field=amount
+            ),
+            credit_sum=ExpressionWrapper(
+                total(snapshots, 'credit') + total(lines, 'credit'),
+                output_field=amount,
+            ),
+        )
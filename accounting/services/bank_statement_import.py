@@ -0,0 +1,398 @@
+"""
+Import des relevés bancaires (CSV, OFX, PDF) en lots.
+
+Chaque format fournit un flux de transactions ({date, name, ref, amount}) :
+- CSV : lu ligne à ligne depuis le fichier envoyé ;
+- OFX : transactions de l'arbre OFX (ofxtools analyse le document entier) ;
+- PDF : PDFBankParser, page par page.
+
+Les transactions sont validées par lots de IMPORT_BATCH_SIZE ; chaque lot
+est dédoublonné en une requête contre les lignes déjà présentes dans le
+journal (empreinte date, montant, référence indexée :
+BankStatementLine.import_hash), inséré par bulk_create, et le solde final
+du relevé est recalculé dans la même transaction, relevé verrouillé. Un
+import interrompu (PartialImportError si des lots étaient déjà validés)
+peut être relancé : les lignes déjà importées sont reconnues comme
+doublons.
+
+Au-delà de BANK_IMPORT_SYNC_MAX_BYTES, un fichier OFX ou PDF est importé
+en tâche de fond (core.BackgroundJob).
+"""
+
+import csv
+import hashlib
+import io
+import logging
+import os
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F, Max, Sum
+
+from core.services.background_jobs import JobReporter, create_job, job_file_path
+
+from ..models import BankStatement, BankStatementLine
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = 'bank_statement_import'
+IMPORT_DIR = 'bank_imports'
+IMPORT_FORMATS = ('csv', 'ofx', 'pdf')
+
+# Formats importés en tâche de fond au-delà de BANK_IMPORT_SYNC_MAX_BYTES
+BACKGROUND_FORMATS = ('ofx', 'pdf')
+DEFAULT_SYNC_MAX_BYTES = 1024 * 1024
+
+IMPORT_BATCH_SIZE = 1000
+
+NAME_MAX_LENGTH = BankStatementLine._meta.get_field('name').max_length
+REF_MAX_LENGTH = BankStatementLine._meta.get_field('ref').max_length
+
+CENT = Decimal('0.01')
+
+
+class PartialImportError(Exception):
+    """
+    Import interrompu après la validation d'au moins un lot : les lignes
+    de ces lots restent dans le relevé (relancer l'import les ignore).
+    """
+
+    def __init__(self, result, error):
+        super().__init__(
+            f'Import interrompu après {result["lines_created"]} ligne(s) '
+            f"importée(s) : {error}. Relancez l'import : les lignes déjà "
+            f'importées seront ignorées.'
+        )
+        self.result = result
+        self.error = error
+
+
+def statement_line_hash(date, amount, ref):
+    """Empreinte (date, montant, référence) d'une ligne de relevé."""
+    # Date ISO (AAAA-MM-JJ), objet date ou chaîne
+    day = date.isoformat() if hasattr(date, 'isoformat') else str(date)
+    raw = f'{day}|{Decimal(amount).quantize(CENT)}|{ref.strip()}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# ── Lecture des formats ──────────────────────────────────────
+
+
+def read_csv(fileobj):
+    """
+    Transactions d'un CSV date (JJ/MM/AAAA), référence, libellé, montant.
+
+    Returns:
+        tuple: (flux de transactions, None pour une ligne mal formée ; {})
+    """
+
+    def rows():
+        text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+        try:
+            reader = csv.reader(text, delimiter=',')
+            next(reader, None)  # Ignorer l'en-tête
+            for row in reader:
+                try:
+                    date_str, ref, label, amount_str = row
+                    yield {
+                        'date': datetime.strptime(date_str, '%d/%m/%Y').date(),
+                        'name': label,
+                        'ref': ref,
+                        'amount': Decimal(amount_str.replace(',', '.')),
+                    }
+                except (ValueError, InvalidOperation):
+                    # Ligne mal formée : comptée, ignorée
+                    yield None
+        finally:
+            # Le fichier envoyé reste ouvert (fermé par Django)
+            text.detach()
+
+    return rows(), {}
+
+
+def read_ofx(fileobj):
+    """
+    Transactions d'un fichier OFX/QFX (référence = FITID).
+
+    ofxtools construit l'arbre du document entier : la liste des
+    transactions, déjà en mémoire, est renvoyée telle quelle (son nombre
+    sert à l'avancement de la tâche de fond).
+    """
+    from ofxtools.Parser import OFXTree
+
+    parser = OFXTree()
+    parser.parse(fileobj)
+    ofx = parser.convert()
+
+    rows = []
+    for stmt in ofx.statements:
+        for txn in stmt.transactions:
+            txn_date = txn.dtposted
+            if hasattr(txn_date, 'date'):
+                txn_date = txn_date.date()
+            rows.append(
+                {
+                    'date': txn_date,
+                    'name': txn.memo or txn.name or 'Transaction OFX',
+                    'ref': txn.fitid or '',
+                    'amount': txn.trnamt,
+                }
+            )
+    return rows, {}
+
+
+def read_pdf(fileobj):
+    """Transactions et soldes détectés d'un relevé PDF (PDFBankParser)."""
+    from .pdf_bank_parser import PDFBankParser
+
+    result = PDFBankParser.parse(fileobj)
+    return result['transactions'], {
+        'balance_start_detected': result['balance_start'],
+        'balance_end_detected': result['balance_end'],
+        'parser_used': result['parser_used'],
+        'confidence': result['confidence'],
+    }
+
+
+READERS = {
+    'csv': read_csv,
+    'ofx': read_ofx,
+    'pdf': read_pdf,
+}
+
+
+# ── Import ───────────────────────────────────────────────────
+
+
+def _validate(row):
+    """Transaction normalisée, None si elle est inutilisable."""
+    if row is None or not row.get('date'):
+        return None
+    try:
+        amount = Decimal(row['amount']).quantize(CENT)
+    except (TypeError, ValueError, InvalidOperation):
+        return None
+    ref = str(row.get('ref') or '').strip()[:REF_MAX_LENGTH]
+    return {
+        'date': row['date'],
+        'name': str(row.get('name') or '').strip()[:NAME_MAX_LENGTH],
+        'ref': ref,
+        'amount': amount,
+        'import_hash': statement_line_hash(row['date'], amount, ref),
+    }
+
+
+def import_statement_lines(statement, rows, reporter=None, batch_size=None):
+    """
+    Importe un flux de transactions dans un relevé en brouillon.
+
+    Une transaction est un doublon si une ligne de même empreinte existait
+    dans le journal du relevé avant l'import ; les répétitions à
+    l'intérieur du fichier importé sont conservées.
+
+    Args:
+        statement (BankStatement): relevé en brouillon
+        rows: itérable de {date, name, ref, amount} (None : ligne mal formée)
+        reporter (JobReporter, optional): avancement de la tâche de fond
+        batch_size (int, optional): transactions par lot
+
+    Returns:
+        dict: lines_created, duplicates_skipped, invalid_rows, balance_end
+
+    Raises:
+        ValueError: relevé qui n'est pas en brouillon
+        PartialImportError: erreur après la validation d'au moins un lot
+    """
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+
+    if statement.state != 'draft':
+        raise ValueError("Le relevé n'est pas en brouillon")
+
+    # Lignes antérieures à l'import : seules références de doublon
+    last_line_id = BankStatementLine.objects.aggregate(last=Max('id'))['last'] or 0
+
+    existing_lines = BankStatementLine.objects.filter(
+        statement_id__journal_id=statement.journal_id_id, id__lte=last_line_id
+    )
+    counts = {'lines_created': 0, 'duplicates_skipped': 0, 'invalid_rows': 0}
+
+    try:
+        _import_batches(
+            statement, iter(rows), existing_lines, counts, reporter, batch_size
+        )
+    except Exception as e:
+        if not counts['lines_created']:
+            raise
+        statement.refresh_from_db(fields=['balance_end'])
+        logger.warning(
+            f'Relevé {statement.pk} : import interrompu après '
+            f'{counts["lines_created"]} lignes : {e}'
+        )
+        raise PartialImportError(
+            {**counts, 'balance_end': statement.balance_end}, e
+        ) from e
+
+    statement.refresh_from_db(fields=['balance_end'])
+    logger.info(
+        f'Relevé {statement.pk} : {counts["lines_created"]} lignes importées, '
+        f'{counts["duplicates_skipped"]} doublons, {counts["invalid_rows"]} rejetées'
+    )
+    return {**counts, 'balance_end': statement.balance_end}
+
+
+def _import_batches(statement, rows, existing_lines, counts, reporter, batch_size):
+    """Valide les transactions lot par lot (compteurs mis à jour sur place)."""
+    while batch := list(islice(rows, batch_size)):
+        valid = [line for line in map(_validate, batch) if line]
+        counts['invalid_rows'] += len(batch) - len(valid)
+
+        duplicates = set(
+            existing_lines.filter(
+                import_hash__in={line['import_hash'] for line in valid}
+            ).values_list('import_hash', flat=True)
+        )
+        new_lines = [
+            BankStatementLine(statement_id=statement, **line)
+            for line in valid
+            if line['import_hash'] not in duplicates
+        ]
+        counts['duplicates_skipped'] += len(valid) - len(new_lines)
+
+        if new_lines:
+            with transaction.atomic():
+                # Relevé verrouillé : solde final recalculé depuis ses lignes
+                locked = BankStatement.objects.select_for_update().get(pk=statement.pk)
+                if locked.state != 'draft':
+                    raise ValueError("Le relevé n'est pas en brouillon")
+                BankStatementLine.objects.bulk_create(new_lines)
+                lines_total = locked.lines.aggregate(total=Sum('amount'))['total']
+                BankStatement.objects.filter(pk=statement.pk).update(
+                    balance_end=F('balance_start') + (lines_total or 0)
+                )
+            counts['lines_created'] += len(new_lines)
+
+        if reporter:
+            reporter.advance(len(batch))
+
+
+def import_statement_file(statement, fileobj, file_format, filename='', reporter=None):
+    """
+    Lit un fichier de relevé et en importe les transactions.
+
+    Pour un PDF, le solde initial détecté est repris si le relevé n'en a
+    pas, le solde final détecté devient le solde final réel, et le fichier
+    est conservé comme source du relevé.
+
+    Returns:
+        dict: compteurs de import_statement_lines, plus les informations
+        du lecteur (soldes détectés, analyseur...)
+    """
+    if statement.state != 'draft':
+        raise ValueError("Le relevé n'est pas en brouillon")
+
+    rows, info = READERS[file_format](fileobj)
+    if reporter and isinstance(rows, list):
+        reporter.start(len(rows), message='Import des transactions')
+
+    if file_format == 'pdf':
+        if info['balance_start_detected'] and statement.balance_start == 0:
+            statement.balance_start = info['balance_start_detected']
+            statement.save(update_fields=['balance_start'])
+        if info['balance_end_detected']:
+            statement.balance_end_real = info['balance_end_detected']
+            statement.save(update_fields=['balance_end_real'])
+
+    result = import_statement_lines(statement, rows, reporter=reporter)
+
+    # Sauvegarde du fichier PDF source (une seule fois)
+    if file_format == 'pdf' and not statement.source_pdf:
+        # update_fields : le solde final, mis à jour en base, n'est pas réécrit
+        fileobj.seek(0)
+        statement.source_pdf.save(filename or 'releve.pdf', File(fileobj), save=False)
+        statement.save(update_fields=['source_pdf'])
+    return {**info, **result}
+
+
+# ── Tâche de fond ────────────────────────────────────────────
+
+
+def runs_in_background(file_format, size):
+    """Vrai si le fichier est importé par une tâche de fond."""
+    return file_format in BACKGROUND_FORMATS and size > getattr(
+        settings, 'BANK_IMPORT_SYNC_MAX_BYTES', DEFAULT_SYNC_MAX_BYTES
+    )
+
+
+def start_import_job(statement, upload, file_format, user=None):
+    """
+    Enregistre le fichier envoyé et planifie son import.
+
+    Returns:
+        BackgroundJob
+    """
+    from ..tasks import import_bank_statement
+
+    with transaction.atomic():
+        job = create_job(
+            JOB_TYPE,
+            user=user,
+            message=f'Import du relevé {statement.name} ({file_format.upper()})',
+        )
+        absolute_path, relative_path = job_file_path(
+            IMPORT_DIR, f'{job.pk}_{os.path.basename(upload.name)}'
+        )
+        with open(absolute_path, 'wb') as fh:
+            for chunk in upload.chunks():
+                fh.write(chunk)
+        job.result = {
+            'statement': statement.pk,
+            'format': file_format,
+            'filename': upload.name,
+            'upload': relative_path,
+        }
+        job.save(update_fields=['result'])
+
+        # Les workers ne doivent voir la tâche qu'une fois enregistrée
+        transaction.on_commit(lambda: import_bank_statement.delay(job.pk))
+    return job
+
+
+def run_import_job(job):
+    """Importe le fichier d'une tâche planifiée par start_import_job."""
+    reporter = JobReporter(job)
+    reporter.start(0, message='Lecture du fichier')
+    params = job.result
+    statement = BankStatement.objects.get(pk=params['statement'])
+    absolute_path = os.path.join(settings.MEDIA_ROOT, params.pop('upload'))
+
+    try:
+        with open(absolute_path, 'rb') as fh:
+            result = import_statement_file(
+                statement,
+                fh,
+                params['format'],
+                filename=params['filename'],
+                reporter=reporter,
+            )
+    except PartialImportError as e:
+        # Lignes déjà importées : compteurs conservés avec l'échec
+        job.result = {**params, **_json_result(e.result)}
+        job.save(update_fields=['result'])
+        raise
+    finally:
+        os.remove(absolute_path)
+
+    reporter.finish(result={**params, **_json_result(result)})
+    return result
+
+
+def _json_result(result):
+    """Résultat sérialisable en JSON (montants en chaînes)."""
+    return {
+        key: str(value) if isinstance(value, Decimal) else value
+        for key, value in result.items()
+    }
@@ -760,22 +760,30 @@ class ImportExportService:
         }
 
     @staticmethod
-    def export_ledger_to_excel(ledger_data):
+    def export_ledger_to_excel(ledger_data, output=None):
         """
-        Exporte les données du grand livre au format Excel.
+        Exporte le grand livre au format Excel, en flux.
+
+        Le classeur est écrit en mode « constant_memory » : chaque ligne est
+        vidée sur disque dès qu'elle est écrite.
 
         Args:
-            ledger_data (dict): Données du grand livre
+            ledger_data (dict): Dates et sections du grand livre, telles que
+                produites par FinancialReportService.iter_general_ledger
+            output (file, optional): Fichier de destination. Par défaut, le
+                contenu est retourné en bytes.
 
         Returns:
-            bytes: Contenu Excel
+            bytes | None: Contenu Excel si aucun fichier n'est fourni
         """
         if not xlsxwriter:
             raise ValueError(_("Le module xlsxwriter n'est pas installé"))
 
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output)
-        worksheet = workbook.add_worksheet(_('Grand Livre'))
+        to_bytes = output is None
+        if to_bytes:
+            output = io.BytesIO()
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        worksheet = workbook.add_worksheet(str(_('Grand Livre')))
 
         # Formats
         header_format = workbook.add_format(
@@ -785,11 +793,20 @@ class ImportExportService:
         number_format = workbook.add_format({'num_format': '#,##0.00'})
         bold_format = workbook.add_format({'bold': True})
 
+        # Largeur des colonnes
+        worksheet.set_column(0, 0, 12)  # Date
+        worksheet.set_column(1, 1, 10)  # Journal
+        worksheet.set_column(2, 2, 15)  # Pièce
+        worksheet.set_column(3, 3, 15)  # Référence
+        worksheet.set_column(4, 4, 20)  # Partenaire
+        worksheet.set_column(5, 5, 30)  # Libellé
+        worksheet.set_column(6, 8, 15)  # Débit/Crédit/Solde
+
         # Titre
-        worksheet.merge_range('A1:I1', _('Grand Livre'), bold_format)
+        worksheet.merge_range('A1:I1', str(_('Grand Livre')), bold_format)
         worksheet.merge_range(
             'A2:I2',
-            _('Période du {} au {}').format(
+            str(_('Période du {} au {}')).format(
                 ledger_data['start_date'].strftime('%d/%m/%Y'),
                 ledger_data['end_date'].strftime('%d/%m/%Y'),
             ),
@@ -811,9 +828,7 @@ class ImportExportService:
 
         row = 3
 
-        for account_data in ledger_data['ledger']:
-            account = account_data['account']
-
+        for account, initial_balance, lines in ledger_data['ledger']:
             # Titre du compte
             worksheet.merge_range(
                 f'A{row}:I{row}', f'{account["code"]} - {account["name"]}', bold_format
@@ -821,17 +836,20 @@ class ImportExportService:
             row += 1
 
             # Solde initial
-            worksheet.merge_range(f'A{row}:F{row}', _('Solde initial'), bold_format)
-            worksheet.write(row - 1, 8, account_data['initial_balance'], number_format)
+            worksheet.merge_range(
+                f'A{row}:F{row}', str(_('Solde initial')), bold_format
+            )
+            worksheet.write_number(row - 1, 8, float(initial_balance), number_format)
             row += 1
 
             # En-têtes des colonnes
             for col, header in enumerate(headers):
-                worksheet.write(row - 1, col, header, header_format)
+                worksheet.write(row - 1, col, str(header), header_format)
             row += 1
 
             # Lignes du compte
-            for entry in account_data['entries']:
+            final_balance = initial_balance
+            for entry in lines:
                 worksheet.write_datetime(
                     row - 1,
                     0,
@@ -843,28 +861,97 @@ class ImportExportService:
                 worksheet.write(row - 1, 3, entry['reference'])
                 worksheet.write(row - 1, 4, entry['partner'])
                 worksheet.write(row - 1, 5, entry['label'])
-                worksheet.write_number(row - 1, 6, entry['debit'], number_format)
-                worksheet.write_number(row - 1, 7, entry['credit'], number_format)
-                worksheet.write_number(row - 1, 8, entry['balance'], number_format)
+                worksheet.write_number(row - 1, 6, float(entry['debit']), number_format)
+                worksheet.write_number(
+                    row - 1, 7, float(entry['credit']), number_format
+                )
+                worksheet.write_number(
+                    row - 1, 8, float(entry['balance']), number_format
+                )
+                final_balance = entry['balance']
                 row += 1
 
             # Solde final
-            worksheet.merge_range(f'A{row}:F{row}', _('Solde final'), bold_format)
-            worksheet.write(row - 1, 8, account_data['final_balance'], number_format)
+            worksheet.merge_range(f'A{row}:F{row}', str(_('Solde final')), bold_format)
+            worksheet.write_number(row - 1, 8, float(final_balance), number_format)
             row += 2
 
-        # Largeur des colonnes
-        worksheet.set_column(0, 0, 12)  # Date
-        worksheet.set_column(1, 1, 10)  # Journal
-        worksheet.set_column(2, 2, 15)  # Pièce
-        worksheet.set_column(3, 3, 15)  # Référence
-        worksheet.set_column(4, 4, 20)  # Partenaire
-        worksheet.set_column(5, 5, 30)  # Libellé
-        worksheet.set_column(6, 8, 15)  # Débit/Crédit/Solde
-
         workbook.close()
-        output.seek(0)
-        return output.getvalue()
+        if to_bytes:
+            output.seek(0)
+            return output.getvalue()
+        return None
+
+    @staticmethod
+    def export_ledger_to_csv(ledger_data):
+        """
+        Exporte le grand livre au format CSV, ligne par ligne.
+
+        Args:
+            ledger_data (dict): Dates et sections du grand livre, telles que
+                produites par FinancialReportService.iter_general_ledger
+
+        Yields:
+            str: Lignes CSV, à transmettre à une StreamingHttpResponse
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+
+        def flush():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return value
+
+        writer.writerow(
+            [
+                _('Compte'),
+                _('Date'),
+                _('Journal'),
+                _('Pièce'),
+                _('Référence'),
+                _('Partenaire'),
+                _('Libellé'),
+                _('Débit'),
+                _('Crédit'),
+                _('Solde'),
+            ]
+        )
+        yield flush()
+
+        for account, initial_balance, lines in ledger_data['ledger']:
+            writer.writerow(
+                [
+                    account['code'],
+                    '',
+                    '',
+                    '',
+                    '',
+                    '',
+                    _('Solde initial'),
+                    '',
+                    '',
+                    str(initial_balance),
+                ]
+            )
+            yield flush()
+
+            for entry in lines:
+                writer.writerow(
+                    [
+                        account['code'],
+                        entry['date'].strftime('%d/%m/%Y'),
+                        entry['journal'],
+                        entry['entry'],
+                        entry['reference'],
+                        entry['partner'],
+                        entry['label'],
+                        str(entry['debit']),
+                        str(entry['credit']),
+                        str(entry['balance']),
+                    ]
+                )
+                yield flush()
 
     @staticmethod
     def export_ledger_to_pdf(ledger_data):
@@ -1,40 +1,78 @@
 from datetime import date, timedelta
 from decimal import Decimal
 
-from django.db.models import Sum
+from django.db.models import F, RowRange, Sum, Window
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.translation import gettext_lazy as _
 
 from ..models import Account, FiscalPeriod, JournalEntryLine
+from .balance_snapshot_service import BalanceSnapshotService
+
+
+class PrefixBalanceTrie:
+    """
+    Arbre des préfixes de codes de comptes.
+
+    Chaque nœud cumule les soldes des comptes dont le code commence par le
+    préfixe correspondant : le total d'un préfixe se lit en O(len(préfixe)).
+    """
+
+    def __init__(self):
+        self._root = {'total': Decimal('0.0'), 'children': {}}
+
+    def add(self, code, amount):
+        """Ajoute le solde d'un compte à tous les préfixes de son code."""
+        node = self._root
+        node['total'] += amount
+        for char in code:
+            node = node['children'].setdefault(
+                char, {'total': Decimal('0.0'), 'children': {}}
+            )
+            node['total'] += amount
+
+    def total(self, prefix):
+        """Somme des soldes des comptes commençant par prefix."""
+        node = self._root
+        for char in prefix:
+            node = node['children'].get(char)
+            if node is None:
+                return Decimal('0.0')
+        return node['total']
 
 
 class FinancialReportService:
     """Service de génération des états financiers."""
 
+    @staticmethod
+    def _posted_lines(start_date=None, end_date=None):
+        """Lignes d'écritures validées, filtrées sur la date de l'écriture."""
+        query = JournalEntryLine.objects.filter(entry_id__state='posted')
+        if start_date:
+            query = query.filter(entry_id__date__gte=start_date)
+        if end_date:
+            query = query.filter(entry_id__date__lte=end_date)
+        return query
+
     @staticmethod
     def get_account_balance(account_id, start_date=None, end_date=None, sign=1):
         """Calcule le solde d'un compte pour une période donnée."""
 
         # Récupérer le compte
         try:
-            account = Account.objects.get(id=account_id)
+            account = Account.objects.select_related('type_id').get(id=account_id)
         except Account.DoesNotExist:
             return Decimal('0.0')
 
-        # Filtre de base: écritures validées
-        query = JournalEntryLine.objects.filter(
-            account_id=account, entry_id__state='posted'
+        totals = FinancialReportService.get_account_totals(
+            start_date=start_date, end_date=end_date, account_ids=[account.id]
         )
+        return FinancialReportService._signed_balance(account, totals, sign)
 
-        # Filtrer par date
-        if start_date:
-            query = query.filter(entry_id__date__gte=start_date)
-        if end_date:
-            query = query.filter(entry_id__date__lte=end_date)
-
-        # Calculer les totaux
-        debit_sum = query.aggregate(sum=Sum('debit'))['sum'] or Decimal('0.0')
-        credit_sum = query.aggregate(sum=Sum('credit'))['sum'] or Decimal('0.0')
+    @staticmethod
+    def _signed_balance(account, totals, sign=1):
+        """Solde d'un compte selon sa nature, à partir des totaux groupés."""
+        debit_sum, credit_sum = totals.get(account.id, (Decimal('0.0'), Decimal('0.0')))
 
         # Calculer le solde
         balance = debit_sum - credit_sum
@@ -47,73 +85,229 @@ class FinancialReportService:
         return balance * sign
 
     @staticmethod
-    def generate_general_ledger(start_date=None, end_date=None, account_ids=None):
-        """Génère le grand livre pour une période et un ensemble de comptes."""
+    def get_account_totals(start_date=None, end_date=None, account_ids=None):
+        """
+        Sommes débit/crédit par compte, depuis les soldes par période.
+
+        Returns:
+            dict: {account_id: (débit, crédit)} pour les comptes mouvementés
+        """
+        return BalanceSnapshotService.get_totals(
+            start_date=start_date, end_date=end_date, account_ids=account_ids
+        )
+
+    @staticmethod
+    def get_account_balances(start_date=None, end_date=None, active_only=False):
+        """
+        Soldes signés (selon la nature du compte) de tous les comptes mouvementés.
+
+        Returns:
+            tuple: (liste de (Account, solde) triée par code, PrefixBalanceTrie)
+        """
+        totals = FinancialReportService.get_account_totals(
+            start_date=start_date, end_date=end_date
+        )
 
-        # Si pas de dates spécifiées, utiliser l'année en cours
+        accounts = Account.objects.select_related('type_id').order_by('code')
+        if active_only:
+            accounts = accounts.filter(is_active=True)
+
+        balances = []
+        trie = PrefixBalanceTrie()
+        for account in accounts:
+            if account.id not in totals:
+                continue
+            balance = FinancialReportService._signed_balance(account, totals)
+            balances.append((account, balance))
+            trie.add(account.code, balance)
+
+        return balances, trie
+
+    @staticmethod
+    def get_prefix_balances(
+        prefixes, start_date=None, end_date=None, active_only=False
+    ):
+        """
+        Soldes cumulés par préfixe de code de compte.
+
+        Tous les préfixes sont résolus à partir d'une seule lecture groupée des
+        soldes, quel que soit leur nombre.
+
+        Args:
+            prefixes (iterable): Préfixes de codes (ex: ['711', '611', '6'])
+
+        Returns:
+            dict: {préfixe: solde}
+        """
+        _balances, trie = FinancialReportService.get_account_balances(
+            start_date=start_date, end_date=end_date, active_only=active_only
+        )
+        return {prefix: trie.total(prefix) for prefix in prefixes}
+
+    @staticmethod
+    def _account_info(account):
+        """Description d'un compte dans les états financiers."""
+        return {
+            'id': account.id,
+            'code': account.code,
+            'name': account.name,
+            'type': account.type_id.name if account.type_id else '',
+        }
+
+    @staticmethod
+    def resolve_ledger_dates(start_date=None, end_date=None):
+        """Normalise les dates du grand livre (année en cours par défaut)."""
         if not start_date or not end_date:
             now = timezone.now().date()
-            start_date = date(now.year, 1, 1)
-            end_date = date(now.year, 12, 31)
-
-        # Si pas de comptes spécifiés, utiliser tous les comptes
-        if not account_ids:
-            accounts = Account.objects.filter(is_active=True).order_by('code')
-        else:
-            accounts = Account.objects.filter(
-                id__in=account_ids, is_active=True
-            ).order_by('code')
-
-        # Récupérer les écritures pour chaque compte
-        ledger = []
+            return date(now.year, 1, 1), date(now.year, 12, 31)
+
+        if isinstance(start_date, str):
+            start_date = parse_date(start_date)
+        if isinstance(end_date, str):
+            end_date = parse_date(end_date)
+        return start_date, end_date
+
+    @staticmethod
+    def iter_general_ledger(start_date, end_date, account_ids=None, chunk_size=2000):
+        """
+        Grand livre en flux, compte par compte.
+
+        Les soldes d'ouverture de tous les comptes sont calculés en une requête
+        groupée, et le solde cumulé de chaque ligne par une fonction de fenêtre
+        SQL. Les lignes sont lues via un curseur serveur : la mémoire consommée
+        ne dépend pas du volume d'écritures.
+
+        Yields:
+            tuple: (compte, solde initial, générateur des lignes du compte).
+            Le générateur de lignes doit être consommé avant de passer au
+            compte suivant ; il est vidé automatiquement sinon.
+        """
+        accounts = (
+            Account.objects.filter(is_active=True)
+            .select_related('type_id')
+            .order_by('code')
+        )
+        if account_ids:
+            accounts = accounts.filter(id__in=account_ids)
+
+        opening = FinancialReportService.get_account_totals(
+            end_date=start_date - timedelta(days=1), account_ids=account_ids
+        )
+
+        lines = FinancialReportService._posted_lines(start_date, end_date).filter(
+            account_id__is_active=True
+        )
+        if account_ids:
+            lines = lines.filter(account_id__in=account_ids)
+
+        rows = (
+            lines.annotate(
+                running_balance=Window(
+                    expression=Sum(F('debit') - F('credit')),
+                    partition_by=[F('account_id')],
+                    order_by=[
+                        F('entry_id__date').asc(),
+                        F('entry_id').asc(),
+                        F('id').asc(),
+                    ],
+                    frame=RowRange(start=None, end=0),
+                )
+            )
+            .values_list(
+                'account_id',
+                'entry_id__date',
+                'entry_id__journal_id__code',
+                'entry_id__name',
+                'entry_id__ref',
+                'partner_id__name',
+                'name',
+                'debit',
+                'credit',
+                'running_balance',
+            )
+            # Ordre de la fenêtre : clé de l'écriture, pas JournalEntry.Meta.ordering
+            .order_by('account_id__code', 'entry_id__date', 'entry_id_id', 'id')
+            .iterator(chunk_size=chunk_size)
+        )
+
+        # Ligne en attente de lecture, partagée avec le générateur de lignes
+        cursor = {'row': next(rows, None)}
+
+        def account_lines(account_id, initial_balance):
+            while cursor['row'] is not None and cursor['row'][0] == account_id:
+                row = cursor['row']
+                yield {
+                    'date': row[1],
+                    'journal': row[2],
+                    'entry': row[3],
+                    'reference': row[4],
+                    'partner': row[5] or '',
+                    'label': row[6],
+                    'debit': row[7],
+                    'credit': row[8],
+                    'balance': initial_balance + (row[9] or Decimal('0.0')),
+                }
+                cursor['row'] = next(rows, None)
+
         for account in accounts:
-            # Solde initial
-            initial_balance = FinancialReportService.get_account_balance(
-                account.id, end_date=start_date - timedelta(days=1)
+            debit_sum, credit_sum = opening.get(
+                account.id, (Decimal('0.0'), Decimal('0.0'))
+            )
+            initial_balance = debit_sum - credit_sum
+            has_lines = cursor['row'] is not None and cursor['row'][0] == account.id
+
+            if initial_balance == 0 and not has_lines:
+                continue
+
+            entries = account_lines(account.id, initial_balance)
+            yield (
+                FinancialReportService._account_info(account),
+                initial_balance,
+                entries,
             )
 
-            # Écritures de la période
-            lines = JournalEntryLine.objects.filter(
-                account_id=account,
-                entry_id__date__gte=start_date,
-                entry_id__date__lte=end_date,
-                entry_id__state='posted',
-            ).order_by('entry_id__date', 'entry_id__id')
+            # Vider les lignes non consommées avant de passer au compte suivant
+            for _line in entries:
+                pass
+
+    @staticmethod
+    def generate_general_ledger(start_date=None, end_date=None, account_ids=None):
+        """Génère le grand livre pour une période et un ensemble de comptes."""
+
+        start_date, end_date = FinancialReportService.resolve_ledger_dates(
+            start_date, end_date
+        )
 
-            # Calculer le solde cumulé
+        ledger = []
+        for (
+            account,
+            initial_balance,
+            lines,
+        ) in FinancialReportService.iter_general_ledger(
+            start_date, end_date, account_ids=account_ids
+        ):
             cumulative_balance = initial_balance
             entries = []
 
             for line in lines:
-                cumulative_balance += line.debit - line.credit
+                cumulative_balance = line['balance']
                 entries.append(
                     {
-                        'date': line.entry_id.date,
-                        'journal': line.entry_id.journal_id.code,
-                        'entry': line.entry_id.name,
-                        'reference': line.entry_id.ref,
-                        'partner': line.partner_id.name if line.partner_id else '',
-                        'label': line.name,
-                        'debit': float(line.debit),
-                        'credit': float(line.credit),
-                        'balance': float(cumulative_balance),
+                        **line,
+                        'debit': float(line['debit']),
+                        'credit': float(line['credit']),
+                        'balance': float(line['balance']),
                     }
                 )
 
-            if initial_balance != 0 or entries:
-                ledger.append(
-                    {
-                        'account': {
-                            'id': account.id,
-                            'code': account.code,
-                            'name': account.name,
-                            'type': account.type_id.name if account.type_id else '',
-                        },
-                        'initial_balance': float(initial_balance),
-                        'entries': entries,
-                        'final_balance': float(cumulative_balance),
-                    }
-                )
+            ledger.append(
+                {
+                    'account': account,
+                    'initial_balance': float(initial_balance),
+                    'entries': entries,
+                    'final_balance': float(cumulative_balance),
+                }
+            )
 
         return {'start_date': start_date, 'end_date': end_date, 'ledger': ledger}
 
@@ -131,20 +325,20 @@ class FinancialReportService:
             else:
                 date = timezone.now().date()
 
-        # Récupérer tous les comptes actifs
-        accounts = Account.objects.filter(is_active=True).order_by('code')
+        # Sommes débit/crédit de tous les comptes, depuis les soldes par période
+        totals = FinancialReportService.get_account_totals(end_date=date)
+        accounts = (
+            Account.objects.filter(is_active=True)
+            .select_related('type_id')
+            .order_by('code')
+        )
 
         # Calculer les soldes
         balance = []
         for account in accounts:
-            # Solde débiteur et créditeur
-            debit_sum = JournalEntryLine.objects.filter(
-                account_id=account, entry_id__date__lte=date, entry_id__state='posted'
-            ).aggregate(sum=Sum('debit'))['sum'] or Decimal('0.0')
-
-            credit_sum = JournalEntryLine.objects.filter(
-                account_id=account, entry_id__date__lte=date, entry_id__state='posted'
-            ).aggregate(sum=Sum('credit'))['sum'] or Decimal('0.0')
+            if account.id not in totals:
+                continue
+            debit_sum, credit_sum = totals[account.id]
 
             # Solde
             balance_amount = debit_sum - credit_sum
@@ -160,12 +354,7 @@ class FinancialReportService:
             if debit_sum > 0 or credit_sum > 0:
                 balance.append(
                     {
-                        'account': {
-                            'id': account.id,
-                            'code': account.code,
-                            'name': account.name,
-                            'type': account.type_id.name if account.type_id else '',
-                        },
+                        'account': FinancialReportService._account_info(account),
                         'debit_sum': float(debit_sum),
                         'credit_sum': float(credit_sum),
                         'debit_balance': float(debit_balance),
@@ -202,52 +391,31 @@ class FinancialReportService:
             else:
                 date = timezone.now().date()
 
-        # Récupérer les comptes de bilan (classes 1, 2, 3, 4 et 5)
-        asset_accounts = Account.objects.filter(code__regex=r'^[235].*', is_active=True)
-        liability_accounts = Account.objects.filter(
-            code__regex=r'^[14].*', is_active=True
+        # Soldes des comptes de bilan (classes 1, 2, 3, 4 et 5)
+        balances, trie = FinancialReportService.get_account_balances(
+            end_date=date, active_only=True
         )
 
-        # Calculer les soldes
-        assets = []
-        for account in asset_accounts:
-            balance = FinancialReportService.get_account_balance(
-                account.id, end_date=date
-            )
-            if balance != 0:
-                assets.append(
-                    {
-                        'account': {
-                            'id': account.id,
-                            'code': account.code,
-                            'name': account.name,
-                            'type': account.type_id.name if account.type_id else '',
-                        },
-                        'balance': float(balance),
-                    }
-                )
-
-        liabilities = []
-        for account in liability_accounts:
-            balance = FinancialReportService.get_account_balance(
-                account.id, end_date=date
-            )
-            if balance != 0:
-                liabilities.append(
-                    {
-                        'account': {
-                            'id': account.id,
-                            'code': account.code,
-                            'name': account.name,
-                            'type': account.type_id.name if account.type_id else '',
-                        },
-                        'balance': float(balance),
-                    }
-                )
+        assets = [
+            {
+                'account': FinancialReportService._account_info(account),
+                'balance': float(balance),
+            }
+            for account, balance in balances
+            if account.code.startswith(('2', '3', '5')) and balance != 0
+        ]
+        liabilities = [
+            {
+                'account': FinancialReportService._account_info(account),
+                'balance': float(balance),
+            }
+            for account, balance in balances
+            if account.code.startswith(('1', '4')) and balance != 0
+        ]
 
         # Calcul des totaux
-        total_assets = sum(item['balance'] for item in assets)
-        total_liabilities = sum(item['balance'] for item in liabilities)
+        total_assets = float(sum(trie.total(prefix) for prefix in '235'))
+        total_liabilities = float(sum(trie.total(prefix) for prefix in '14'))
 
         return {
             'date': date,
@@ -279,53 +447,32 @@ class FinancialReportService:
                 start_date = date(now.year, 1, 1)
                 end_date = date(now.year, 12, 31)
 
-        # Récupérer les comptes de charges et produits (classes 6 et 7)
-        expense_accounts = Account.objects.filter(code__regex=r'^6.*', is_active=True)
-        income_accounts = Account.objects.filter(code__regex=r'^7.*', is_active=True)
-
-        # Calculer les soldes
-        expenses = []
-        for account in expense_accounts:
-            balance = FinancialReportService.get_account_balance(
-                account.id, start_date=start_date, end_date=end_date
-            )
-            if balance != 0:
-                expenses.append(
-                    {
-                        'account': {
-                            'id': account.id,
-                            'code': account.code,
-                            'name': account.name,
-                            'type': account.type_id.name if account.type_id else '',
-                        },
-                        'balance': float(balance),
-                    }
-                )
+        # Soldes des comptes de charges et produits (classes 6 et 7)
+        balances, trie = FinancialReportService.get_account_balances(
+            start_date=start_date, end_date=end_date, active_only=True
+        )
 
-        incomes = []
-        for account in income_accounts:
-            balance = FinancialReportService.get_account_balance(
-                account.id,
-                start_date=start_date,
-                end_date=end_date,
-                sign=-1,  # Les produits sont créditeurs, on inverse le signe
-            )
-            if balance != 0:
-                incomes.append(
-                    {
-                        'account': {
-                            'id': account.id,
-                            'code': account.code,
-                            'name': account.name,
-                            'type': account.type_id.name if account.type_id else '',
-                        },
-                        'balance': float(balance),
-                    }
-                )
+        expenses = [
+            {
+                'account': FinancialReportService._account_info(account),
+                'balance': float(balance),
+            }
+            for account, balance in balances
+            if account.code.startswith('6') and balance != 0
+        ]
+        # Les produits sont créditeurs, on inverse le signe
+        incomes = [
+            {
+                'account': FinancialReportService._account_info(account),
+                'balance': float(-balance),
+            }
+            for account, balance in balances
+            if account.code.startswith('7') and balance != 0
+        ]
 
         # Calcul des totaux
-        total_expenses = sum(item['balance'] for item in expenses)
-        total_incomes = sum(item['balance'] for item in incomes)
+        total_expenses = float(trie.total('6'))
+        total_incomes = float(-trie.total('7'))
 
         return {
             'start_date': start_date,
@@ -349,9 +496,13 @@ class FinancialReportService:
         # Comptes de TVA
         vat_collected_accounts = Account.objects.filter(
             code__regex=r'^4455.*', is_active=True
-        )
+        ).select_related('type_id')
         vat_deductible_accounts = Account.objects.filter(
             code__regex=r'^3455.*', is_active=True
+        ).select_related('type_id')
+
+        totals = FinancialReportService.get_account_totals(
+            start_date=period.start_date, end_date=period.end_date
         )
 
         # TVA collectée
@@ -359,10 +510,9 @@ class FinancialReportService:
         vat_collected_total = Decimal('0.0')
 
         for account in vat_collected_accounts:
-            balance = FinancialReportService.get_account_balance(
-                account.id,
-                start_date=period.start_date,
-                end_date=period.end_date,
+            balance = FinancialReportService._signed_balance(
+                account,
+                totals,
                 sign=-1,  # Les comptes de TVA collectée sont créditeurs, on inverse le signe
             )
             if balance != 0:
@@ -383,9 +533,7 @@ class FinancialReportService:
         vat_deductible_total = Decimal('0.0')
 
         for account in vat_deductible_accounts:
-            balance = FinancialReportService.get_account_balance(
-                account.id, start_date=period.start_date, end_date=period.end_date
-            )
+            balance = FinancialReportService._signed_balance(account, totals)
             if balance != 0:
                 vat_deductible_details.append(
                     {
@@ -325,31 +325,53 @@ class PDFBankParser:
 
     @staticmethod
     def parse(pdf_file) -> dict:
-        if isinstance(pdf_file, bytes):
-            raw = pdf_file
-        else:
-            raw = pdf_file.read()
-            if hasattr(pdf_file, 'seek'):
-                pdf_file.seek(0)
+        """
+        Extrait les transactions et les soldes du relevé.
+
+        Le PDF est lu page par page : le texte d'une page est analysé puis
+        libéré (pas de concaténation du texte de tout le document). Les
+        transactions du texte libre ne sont retenues que si aucun tableau
+        structuré n'a été trouvé dans le document.
 
+        Args:
+            pdf_file: contenu (bytes) ou fichier binaire positionnable
+        """
         import pdfplumber
 
-        full_text = ''
-        transactions = []
+        source = BytesIO(pdf_file) if isinstance(pdf_file, bytes) else pdf_file
+        if hasattr(source, 'seek'):
+            source.seek(0)
+
+        table_transactions = []
+        text_transactions = []
+        has_text = False
+        b_start = b_end = None
 
         try:
-            with pdfplumber.open(BytesIO(raw)) as pdf:
-                # Tentative 1 : tableaux structurés
-                transactions = _extract_from_tables(pdf.pages)
-                # Extraction texte pour soldes + fallback
+            with pdfplumber.open(source) as pdf:
                 for page in pdf.pages:
-                    full_text += (page.extract_text() or '') + '\n'
+                    # Tentative 1 : tableaux structurés
+                    table_transactions.extend(_extract_from_tables([page]))
+                    # Texte de la page pour soldes + fallback
+                    text = page.extract_text() or ''
+                    if text.strip():
+                        has_text = True
+                        if not table_transactions:
+                            text_transactions.extend(_extract_from_text(text))
+                        page_start, page_end = _detect_balances(text)
+                        b_start = page_start or b_start
+                        b_end = page_end or b_end
+                    page.close()
         except Exception as e:
             raise ValueError(f'Impossible de lire le PDF : {e}')
+        finally:
+            if hasattr(pdf_file, 'seek'):
+                pdf_file.seek(0)
 
         # Tentative 2 : texte libre si aucun tableau
-        if not transactions and full_text.strip():
-            transactions = _extract_from_text(full_text)
+        transactions = table_transactions
+        if not transactions and has_text:
+            transactions = text_transactions
 
         if not transactions:
             raise ValueError(
@@ -357,7 +379,6 @@ class PDFBankParser:
                 'Le PDF est peut-être scanné (image) — un outil OCR serait nécessaire.'
             )
 
-        b_start, b_end = _detect_balances(full_text)
         confidence = 'high' if len(transactions) >= 3 else 'medium'
 
         return {
@@ -1,11 +1,13 @@
 """Service de rapprochement bancaire automatique."""
 
+from bisect import bisect_left, bisect_right
 from datetime import timedelta
 from decimal import Decimal
 
+from django.db import transaction
 from django.db.models import Q
 
-from accounting.models import JournalEntryLine
+from accounting.models import BankStatementLine, JournalEntryLine
 
 
 class BankReconciliationService:
@@ -72,8 +74,10 @@ class BankReconciliationService:
             # Décaissement → on cherche des crédits sur le compte banque
             filters &= Q(credit__gt=0)
 
-        return JournalEntryLine.objects.filter(filters).select_related(
-            'entry_id', 'account_id', 'partner_id'
+        return (
+            JournalEntryLine.objects.filter(filters)
+            .exclude(statement_lines__is_reconciled=True)
+            .select_related('entry_id', 'account_id', 'partner_id')
         )
 
     def score_match(self, statement_line, entry_line):
@@ -111,9 +115,9 @@ class BankReconciliationService:
 
         # 3. Score partenaire (15 pts)
         if (
-            statement_line.partner_id
-            and entry_line.partner_id
-            and statement_line.partner_id == entry_line.partner_id
+            statement_line.partner_id_id
+            and entry_line.partner_id_id
+            and statement_line.partner_id_id == entry_line.partner_id_id
         ):
             score += 15
 
@@ -187,20 +191,242 @@ class BankReconciliationService:
     def auto_reconcile(self, statement):
         """
         Rapprochement automatique : rapproche les lignes avec un score >= seuil.
+
+        Les candidates de tout le relevé sont chargées en une requête et
+        indexées par sens, date et montant. Les conflits (une ligne d'écriture
+        convoitée par plusieurs lignes de relevé) sont résolus globalement en
+        maximisant le score total, puis les rapprochements sont écrits en masse.
         Retourne le nombre de lignes rapprochées.
         """
         account_ids = self.get_bank_account_ids(statement)
-        unreconciled = statement.lines.filter(is_reconciled=False)
-
-        reconciled_count = 0
-        for line in unreconciled:
-            suggestions = self.get_suggestions(line, account_ids, max_results=1)
-            if suggestions and suggestions[0]['score'] >= self.AUTO_RECONCILE_THRESHOLD:
-                best = suggestions[0]
-                try:
-                    self.reconcile_line(line, [best['entry_line_id']])
-                    reconciled_count += 1
-                except Exception:
-                    continue
-
-        return reconciled_count
+        lines = list(statement.lines.filter(is_reconciled=False))
+        if not lines:
+            return 0
+
+        candidates = self.get_bulk_candidate_entry_lines(lines, account_ids)
+        index = self._index_candidates(candidates)
+
+        scores = {}
+        for line in lines:
+            for entry_line in self._lookup_candidates(index, line):
+                score = self.score_match(line, entry_line)
+                if score >= self.AUTO_RECONCILE_THRESHOLD:
+                    scores[(line.id, entry_line.id)] = score
+
+        matches = self._assign(scores)
+        self._bulk_reconcile(matches)
+
+        return len(matches)
+
+    def get_bulk_candidate_entry_lines(self, statement_lines, account_ids=None):
+        """
+        Charge en une requête les candidates de plusieurs lignes de relevé :
+        lignes non lettrées, non déjà rapprochées, sur un compte bancaire, dans
+        la plage de dates du relevé élargie de la tolérance.
+        """
+        tolerance = timedelta(days=self.DATE_TOLERANCE_DAYS)
+        date_min = min(line.date for line in statement_lines) - tolerance
+        date_max = max(line.date for line in statement_lines) + tolerance
+
+        filters = Q(
+            is_reconciled=False,
+            entry_id__state='posted',
+            entry_id__date__gte=date_min,
+            entry_id__date__lte=date_max,
+        ) & (Q(debit__gt=0) | Q(credit__gt=0))
+
+        if account_ids:
+            filters &= Q(account_id__in=account_ids)
+
+        return (
+            JournalEntryLine.objects.filter(filters)
+            .exclude(statement_lines__is_reconciled=True)
+            .select_related('entry_id')
+        )
+
+    def _amount_tolerance_pct(self):
+        """
+        Écart de montant maximal (en %) compatible avec le seuil automatique.
+
+        Hors montant, score_match attribue au plus 50 points : sous 90, un
+        écart ≤ 1 % (40 pts) est nécessaire, sous 70 un écart ≤ 5 % (20 pts).
+        """
+        if self.AUTO_RECONCILE_THRESHOLD > 70:
+            return Decimal('1')
+        if self.AUTO_RECONCILE_THRESHOLD > 50:
+            return Decimal('5')
+        return None
+
+    def _index_candidates(self, candidates):
+        """Indexe les candidates par (sens, date), triées par montant."""
+        buckets = {}
+        for entry_line in candidates:
+            amount = entry_line.debit if entry_line.debit > 0 else entry_line.credit
+            for direction, value in (
+                ('debit', entry_line.debit),
+                ('credit', entry_line.credit),
+            ):
+                if value > 0:
+                    buckets.setdefault(
+                        (direction, entry_line.entry_id.date), []
+                    ).append((amount, entry_line.id, entry_line))
+
+        index = {}
+        for key, items in buckets.items():
+            items.sort(key=lambda item: (item[0], item[1]))
+            index[key] = ([item[0] for item in items], [item[2] for item in items])
+        return index
+
+    def _lookup_candidates(self, index, statement_line):
+        """Candidates d'une ligne de relevé dans la fenêtre de date et de montant."""
+        direction = 'debit' if statement_line.amount >= 0 else 'credit'
+        amount = abs(statement_line.amount)
+
+        pct = self._amount_tolerance_pct()
+        if pct is not None:
+            delta = max(amount, Decimal('0.01')) * pct / 100
+            low, high = amount - delta, amount + delta
+
+        for offset in range(-self.DATE_TOLERANCE_DAYS, self.DATE_TOLERANCE_DAYS + 1):
+            bucket = index.get(
+                (direction, statement_line.date + timedelta(days=offset))
+            )
+            if not bucket:
+                continue
+            amounts, entry_lines = bucket
+            if pct is None:
+                yield from entry_lines
+            else:
+                yield from entry_lines[
+                    bisect_left(amounts, low) : bisect_right(amounts, high)
+                ]
+
+    def _assign(self, scores):
+        """
+        Affectation optimale lignes de relevé → lignes d'écritures.
+
+        Le graphe des couples éligibles est découpé en composantes connexes,
+        chacune résolue par l'algorithme hongrois (score total maximal, une
+        ligne d'écriture au plus par ligne de relevé et inversement).
+
+        Args:
+            scores (dict): {(statement_line_id, entry_line_id): score}
+
+        Returns:
+            dict: {statement_line_id: entry_line_id}
+        """
+        # Composantes connexes (union-find sur les deux ensembles de sommets)
+        parent = {}
+
+        def find(node):
+            while parent.setdefault(node, node) != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for statement_line_id, entry_line_id in scores:
+            parent[find(('s', statement_line_id))] = find(('e', entry_line_id))
+
+        components = {}
+        for statement_line_id, entry_line_id in scores:
+            components.setdefault(find(('s', statement_line_id)), []).append(
+                (statement_line_id, entry_line_id)
+            )
+
+        matches = {}
+        for edges in components.values():
+            rows = sorted({edge[0] for edge in edges})
+            cols = sorted({edge[1] for edge in edges})
+
+            # L'algorithme requiert au moins autant de colonnes que de lignes :
+            # les colonnes fictives représentent l'absence de rapprochement
+            width = max(len(rows), len(cols))
+            col_index = {col: j for j, col in enumerate(cols)}
+            cost = [[0] * width for _row in rows]
+            for i, row in enumerate(rows):
+                for col in cols:
+                    score = scores.get((row, col))
+                    if score:
+                        cost[i][col_index[col]] = -score
+
+            for i, j in _hungarian(cost).items():
+                if j < len(cols) and cost[i][j] < 0:
+                    matches[rows[i]] = cols[j]
+
+        return matches
+
+    def _bulk_reconcile(self, matches):
+        """Enregistre en masse les rapprochements {statement_line_id: entry_line_id}."""
+        if not matches:
+            return
+
+        through = BankStatementLine.journal_entry_line_ids.through
+        with transaction.atomic():
+            through.objects.filter(bankstatementline_id__in=matches.keys()).delete()
+            through.objects.bulk_create(
+                [
+                    through(
+                        bankstatementline_id=statement_line_id,
+                        journalentryline_id=entry_line_id,
+                    )
+                    for statement_line_id, entry_line_id in matches.items()
+                ]
+            )
+            BankStatementLine.objects.filter(id__in=matches.keys()).update(
+                is_reconciled=True
+            )
+
+
+def _hungarian(cost):
+    """
+    Algorithme hongrois (Kuhn-Munkres) de coût minimal, en O(n² m).
+
+    Args:
+        cost (list): Matrice n × m avec n <= m
+
+    Returns:
+        dict: {ligne: colonne} pour chaque ligne de la matrice
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [float('inf')] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = float('inf')
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    current = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                    if current < minv[j]:
+                        minv[j] = current
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if not j0:
+                break
+
+    return {p[j] - 1: j - 1 for j in range(1, m + 1) if p[j]}
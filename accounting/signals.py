@@ -1,14 +1,29 @@
 """
-Signaux comptables — DÉSACTIVÉ v3.12.1
+Signaux comptables.
 
-Les anciens signal handlers (post_save sur Invoice/Payment) utilisaient
-des comptes hardcodés inexistants (411000, 701000, etc.) et vérifiaient
-des champs state qui n'existent pas sur les modèles Sales.
+Les anciens signal handlers (post_save sur Invoice/Payment) ont été
+désactivés en v3.12.1 : ils utilisaient des comptes hardcodés inexistants
+(411000, 701000, etc.) et vérifiaient des champs state qui n'existent pas
+sur les modèles Sales.
 
 L'intégration comptable est désormais gérée directement dans les views :
   - sales/views.py : _generate_invoice_entry() et _generate_payment_entry()
   - purchasing/views.py : hooks dans validate() et perform_create()
   - accounting/services/journal_entry_service.py : résolution dynamique des comptes
 
-Ce fichier est conservé vide pour éviter les erreurs d'import.
+Seul subsiste ici le maintien des soldes par période (AccountPeriodBalance)
+lors de la suppression d'une écriture validée.
 """
+
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import JournalEntry
+from .services.balance_snapshot_service import BalanceSnapshotService
+
+
+@receiver(pre_delete, sender=JournalEntry)
+def on_journal_entry_deleted(sender, instance, **kwargs):
+    """Retire des soldes par période les montants d'une écriture validée supprimée."""
+    if instance.state == 'posted':
+        BalanceSnapshotService.apply_entry(instance, sign=-1)
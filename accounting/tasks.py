@@ -0,0 +1,26 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='accounting.tasks.import_bank_statement')
+def import_bank_statement(job_id):
+    """
+    Import d'un relevé bancaire en tâche de fond
+    (voir accounting/services/bank_statement_import.py).
+    """
+    from core.models import BackgroundJob
+    from core.services.background_jobs import JobReporter
+
+    from .services.bank_statement_import import run_import_job
+
+    job = BackgroundJob.objects.get(pk=job_id)
+    try:
+        result = run_import_job(job)
+    except Exception as e:
+        logger.exception(f'[RELEVÉ] Import {job_id} échoué : {e}')
+        JobReporter(job).fail(e)
+        return {'status': 'error', 'error': str(e)}
+    return {'status': 'success', 'lines_created': result['lines_created']}
@@ -0,0 +1,646 @@
+import io
+import random
+from datetime import date
+from decimal import Decimal
+from itertools import permutations
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+
+from accounting.models import (
+    Account,
+    AccountPeriodBalance,
+    AccountType,
+    BankStatement,
+    BankStatementLine,
+    FiscalYear,
+    Journal,
+    JournalEntry,
+    JournalEntryLine,
+)
+from accounting.serializers import JournalEntryDetailSerializer
+from accounting.services.balance_snapshot_service import BalanceSnapshotService
+from accounting.services.bank_statement_import import (
+    PartialImportError,
+    import_statement_file,
+    import_statement_lines,
+    read_csv,
+)
+from accounting.services.financial_report_service import FinancialReportService
+from accounting.services.reconciliation_service import (
+    BankReconciliationService,
+    _hungarian,
+)
+from crm.models import Company
+
+ACCOUNT_CODES = ['6111', '6112', '6121', '6211', '7111', '7112', '7121', '7211']
+
+PREFIXES = ['6', '61', '611', '6111', '7', '71', '711', '7111', '8']
+
+
+@pytest.fixture
+def ledger():
+    """
+    Exercice 2025 (périodes mensuelles), comptes de charges (6) et de
+    produits (7), journal des opérations diverses.
+    """
+    fiscal_year = FiscalYear.objects.create(
+        name='2025', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31)
+    )
+    fiscal_year.create_periods()
+    expense = AccountType.objects.create(name='Charges', code='EXP', is_debit=True)
+    income = AccountType.objects.create(name='Produits', code='INC', is_debit=False)
+    return SimpleNamespace(
+        user=User.objects.create(username='comptable'),
+        periods=list(fiscal_year.periods.order_by('start_date')),
+        accounts=[
+            Account.objects.create(
+                code=code, name=code, type_id=expense if code[0] == '6' else income
+            )
+            for code in ACCOUNT_CODES
+        ],
+        journal=Journal.objects.create(
+            code='OD', name='Opérations diverses', type='general'
+        ),
+    )
+
+
+def post_entry(ledger, entry_date, debit_account, credit_account, amount):
+    """Écriture équilibrée à deux lignes, validée par JournalEntry.post()."""
+    entry = JournalEntry.objects.create(
+        name=f'OD/{JournalEntry.objects.count() + 1}',
+        journal_id=ledger.journal,
+        date=entry_date,
+        period_id=next(
+            period
+            for period in ledger.periods
+            if period.start_date <= entry_date <= period.end_date
+        ),
+        created_by=ledger.user,
+    )
+    JournalEntryLine.objects.bulk_create(
+        [
+            JournalEntryLine(
+                entry_id=entry, account_id=debit_account, name='D', debit=amount
+            ),
+            JournalEntryLine(
+                entry_id=entry, account_id=credit_account, name='C', credit=amount
+            ),
+        ]
+    )
+    entry.post()
+    return entry
+
+
+def post_random_entries(ledger, nb_entries, rng, months=3):
+    for _ in range(nb_entries):
+        period = rng.choice(ledger.periods[:months])
+        debit_account, credit_account = rng.sample(ledger.accounts, 2)
+        post_entry(
+            ledger,
+            period.start_date.replace(day=rng.randint(1, 28)),
+            debit_account,
+            credit_account,
+            Decimal(rng.randint(100, 100000)) / 100,
+        )
+
+
+@pytest.fixture
+def posted_entries(ledger):
+    """
+    Écritures validées de janvier à mars 2025 : selon l'intervalle demandé,
+    une période est lue depuis les lignes (période partielle) ou depuis les
+    soldes matérialisés.
+    """
+    post_random_entries(ledger, 40, random.Random(4))
+    return ledger
+
+
+def line_totals(start_date=None, end_date=None):
+    """Débit/crédit par compte agrégés directement sur les lignes validées."""
+    lines = JournalEntryLine.objects.filter(entry_id__state='posted')
+    if start_date:
+        lines = lines.filter(entry_id__date__gte=start_date)
+    if end_date:
+        lines = lines.filter(entry_id__date__lte=end_date)
+    return {
+        row['account_id']: (row['debit_sum'], row['credit_sum'])
+        for row in lines.values('account_id')
+        .annotate(debit_sum=Sum('debit'), credit_sum=Sum('credit'))
+        .order_by()
+    }
+
+
+def expected_prefix_balances(prefixes, start_date, end_date):
+    """Soldes par préfixe recalculés ligne à ligne."""
+    balances = dict.fromkeys(prefixes, Decimal('0.0'))
+    lines = JournalEntryLine.objects.filter(
+        entry_id__state='posted',
+        entry_id__date__gte=start_date,
+        entry_id__date__lte=end_date,
+    ).select_related('account_id__type_id')
+    for line in lines:
+        balance = line.debit - line.credit
+        if not line.account_id.type_id.is_debit:
+            balance = -balance
+        for prefix in prefixes:
+            if line.account_id.code.startswith(prefix):
+                balances[prefix] += balance
+    return balances
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('prefixes', [PREFIXES[:2], PREFIXES])
+def test_prefix_balances_query_count(
+    posted_entries, prefixes, django_assert_num_queries
+):
+    start_date, end_date = date(2025, 1, 15), date(2025, 3, 31)
+
+    # Soldes matérialisés, lignes des périodes partielles, comptes : trois
+    # requêtes quel que soit le nombre de préfixes
+    with django_assert_num_queries(3):
+        balances = FinancialReportService.get_prefix_balances(
+            prefixes, start_date=start_date, end_date=end_date
+        )
+
+    assert balances == expected_prefix_balances(prefixes, start_date, end_date)
+
+
+@pytest.mark.django_db
+def test_trial_balance_matches_line_totals(posted_entries, django_assert_num_queries):
+    trial_date = date(2025, 2, 15)
+
+    # Janvier depuis les soldes matérialisés, février depuis les lignes
+    with django_assert_num_queries(3):
+        result = FinancialReportService.generate_trial_balance(date=trial_date)
+
+    expected = line_totals(end_date=trial_date)
+    assert {
+        item['account']['id']: (item['debit_sum'], item['credit_sum'])
+        for item in result['balance']
+    } == {
+        account_id: (float(debit), float(credit))
+        for account_id, (debit, credit) in expected.items()
+    }
+    for item in result['balance']:
+        assert item['debit_balance'] - item['credit_balance'] == pytest.approx(
+            item['debit_sum'] - item['credit_sum']
+        )
+
+    # Le nombre de requêtes ne dépend pas du volume d'écritures
+    post_random_entries(posted_entries, 40, random.Random(8))
+    with django_assert_num_queries(3):
+        FinancialReportService.generate_trial_balance(date=trial_date)
+
+
+@pytest.mark.django_db
+def test_general_ledger_running_balances(posted_entries, django_assert_num_queries):
+    start_date, end_date = date(2025, 2, 1), date(2025, 3, 31)
+
+    # Comptes, soldes d'ouverture (soldes matérialisés et lignes), lignes
+    with django_assert_num_queries(4):
+        ledger = FinancialReportService.generate_general_ledger(start_date, end_date)
+
+    opening = line_totals(end_date=date(2025, 1, 31))
+    lines = (
+        JournalEntryLine.objects.filter(
+            entry_id__state='posted',
+            entry_id__date__gte=start_date,
+            entry_id__date__lte=end_date,
+        )
+        .order_by('entry_id__date', 'entry_id_id', 'id')
+        .values_list('account_id', 'debit', 'credit')
+    )
+    assert [item['account']['code'] for item in ledger['ledger']] == sorted(
+        account.code for account in posted_entries.accounts
+    )
+    for item in ledger['ledger']:
+        account_id = item['account']['id']
+        debit, credit = opening.get(account_id, (Decimal('0'), Decimal('0')))
+        balance = debit - credit
+        assert item['initial_balance'] == float(balance)
+
+        expected = []
+        for line_account_id, debit, credit in lines:
+            if line_account_id == account_id:
+                balance += debit - credit
+                expected.append(float(balance))
+        assert [entry['balance'] for entry in item['entries']] == expected
+        assert item['final_balance'] == float(balance)
+
+
+BALANCE_RANGES = [
+    {},
+    {'end_date': '2025-02-15'},
+    {'start_date': '2025-01-15', 'end_date': '2025-03-31'},
+]
+
+
+@pytest.fixture
+def accounts_client(client, posted_entries):
+    """Client superutilisateur ; les comptes de charges sous un compte « 61 »."""
+    expense = posted_entries.accounts[0].type_id
+    parent = Account.objects.create(code='61', name='61', type_id=expense)
+    Account.objects.filter(code__startswith='61').exclude(pk=parent.pk).update(
+        parent_id=parent
+    )
+    client.force_login(User.objects.create_superuser('expert'))
+    return client
+
+
+def expected_balances(params):
+    return {
+        account.id: float(
+            account.get_balance(
+                start_date=params.get('start_date'), end_date=params.get('end_date')
+            )
+        )
+        for account in Account.objects.all()
+    }
+
+
+def get_counting_queries(client, url, params):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, params)
+    assert response.status_code == 200
+    return response.json(), len(context.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', BALANCE_RANGES)
+def test_account_list_balances_match_get_balance(accounts_client, params):
+    expected = expected_balances(params)
+    url = '/api/accounting/accounts/'
+
+    data, queries = get_counting_queries(accounts_client, url, params)
+
+    assert {item['id']: item['balance'] for item in data['results']} == expected
+
+    # Le nombre de requêtes ne dépend pas du nombre de comptes listés
+    income = Account.objects.get(code='7111').type_id
+    for i in range(10):
+        Account.objects.create(code=f'708{i}', name=f'708{i}', type_id=income)
+    _data, more_queries = get_counting_queries(accounts_client, url, params)
+    assert more_queries == queries
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', BALANCE_RANGES)
+def test_chart_of_accounts_balances_match_get_balance(accounts_client, params):
+    expected = expected_balances(params)
+    url = '/api/accounting/accounts/chart_of_accounts/'
+
+    data, queries = get_counting_queries(accounts_client, url, params)
+
+    balances = {}
+    for root in data:
+        balances[root['id']] = root['balance']
+        balances.update((child['id'], child['balance']) for child in root['children'])
+    assert balances == expected
+    assert [child['code'] for child in data[0]['children']] == [
+        '6111',
+        '6112',
+        '6121',
+    ]
+
+    # Comptes racines et enfants supplémentaires : mêmes requêtes
+    parent = Account.objects.get(code='61')
+    for i in range(5):
+        Account.objects.create(
+            code=f'618{i}', name=f'618{i}', type_id=parent.type_id, parent_id=parent
+        )
+        Account.objects.create(code=f'9{i}', name=f'9{i}', type_id=parent.type_id)
+    _data, more_queries = get_counting_queries(accounts_client, url, params)
+    assert more_queries == queries
+
+
+@pytest.mark.django_db
+def test_account_retrieve_annotates_children_balances(accounts_client):
+    parent = Account.objects.get(code='61')
+    params = {'end_date': '2025-02-15'}
+    expected = expected_balances(params)
+
+    data, _queries = get_counting_queries(
+        accounts_client, f'/api/accounting/accounts/{parent.pk}/', params
+    )
+
+    assert data['balance'] == expected[parent.pk]
+    assert {child['id']: child['balance'] for child in data['children']} == {
+        account.id: expected[account.id] for account in parent.children.all()
+    }
+
+
+@pytest.mark.django_db
+def test_account_list_without_balance(accounts_client):
+    data, _queries = get_counting_queries(
+        accounts_client, '/api/accounting/accounts/', {'with_balance': 'false'}
+    )
+
+    assert len(data['results']) == Account.objects.count()
+    assert all('balance' not in item for item in data['results'])
+    assert data['results'][0]['code'] == '61'
+
+
+@pytest.mark.django_db
+def test_snapshots_follow_posts_and_cancels_across_periods(ledger):
+    rng = random.Random(11)
+    # Écritures de fin janvier et de février, dont une partie annulée
+    entries = [
+        post_entry(
+            ledger,
+            rng.choice(
+                [
+                    date(2025, 1, 20),
+                    date(2025, 1, 31),
+                    date(2025, 2, 1),
+                    date(2025, 2, 28),
+                ]
+            ),
+            *rng.sample(ledger.accounts, 2),
+            Decimal(rng.randint(100, 100000)) / 100,
+        )
+        for _ in range(30)
+    ]
+    for entry in entries[::3]:
+        entry.cancel()
+
+    # Janvier partiel (lignes), février complet (soldes matérialisés)
+    for start_date, end_date in [
+        (date(2025, 1, 15), date(2025, 2, 28)),
+        (None, date(2025, 1, 31)),
+        (date(2025, 2, 1), None),
+    ]:
+        # Un compte dont toutes les écritures sont annulées garde un solde nul
+        totals = BalanceSnapshotService.get_totals(start_date, end_date)
+        assert {
+            account_id: amounts
+            for account_id, amounts in totals.items()
+            if any(amounts)
+        } == line_totals(start_date, end_date)
+    assert BalanceSnapshotService.check_consistency() == []
+
+
+@pytest.mark.django_db
+def test_entry_is_posted_and_cancelled_once(ledger):
+    debit_account, credit_account = ledger.accounts[:2]
+    entry = post_entry(
+        ledger, date(2025, 1, 10), debit_account, credit_account, Decimal('100')
+    )
+    # Instance périmée (lue avant la validation) : l'état est relu sous verrou
+    stale = JournalEntry.objects.get(pk=entry.pk)
+    stale.state = 'draft'
+    with pytest.raises(ValidationError):
+        stale.post()
+
+    entry.cancel()
+    stale.state = 'posted'
+    with pytest.raises(ValidationError):
+        stale.cancel()
+
+    assert BalanceSnapshotService.check_consistency() == []
+    assert AccountPeriodBalance.objects.get(account=debit_account).debit == 0
+
+
+@pytest.mark.django_db
+def test_rebuild_repairs_snapshots(posted_entries):
+    snapshot = AccountPeriodBalance.objects.first()
+    snapshot.debit += 1
+    snapshot.save()
+
+    assert [
+        (mismatch['account_id'], mismatch['period_id'])
+        for mismatch in BalanceSnapshotService.check_consistency()
+    ] == [(snapshot.account_id, snapshot.period_id)]
+
+    assert BalanceSnapshotService.rebuild() == AccountPeriodBalance.objects.count()
+    assert BalanceSnapshotService.check_consistency() == []
+    assert BalanceSnapshotService.get_totals() == line_totals()
+
+
+@pytest.mark.django_db
+def test_posted_entry_keeps_its_state_date_and_period(posted_entries):
+    entry = JournalEntry.objects.filter(state='posted').first()
+    other_period = next(
+        period for period in posted_entries.periods if period != entry.period_id
+    )
+
+    serializer = JournalEntryDetailSerializer(
+        entry, data={'state': 'draft', 'ref': 'modifiée'}, partial=True
+    )
+    assert serializer.is_valid(), serializer.errors
+    serializer.save()
+    entry.refresh_from_db()
+    assert (entry.state, entry.ref) == ('posted', 'modifiée')
+
+    for data in (
+        {'date': other_period.start_date.isoformat()},
+        {'period_id': other_period.pk},
+    ):
+        serializer = JournalEntryDetailSerializer(entry, data=data, partial=True)
+        assert not serializer.is_valid()
+    assert BalanceSnapshotService.check_consistency() == []
+
+
+@pytest.fixture
+def bank(ledger):
+    """Compte 5121 de la banque, journal BQ et relevé en brouillon."""
+    cash = AccountType.objects.create(name='Trésorerie', code='CSH', is_debit=True)
+    account = Account.objects.create(code='5121', name='Banque', type_id=cash)
+    journal = Journal.objects.create(
+        code='BQ',
+        name='Banque',
+        type='bank',
+        default_debit_account_id=account,
+        default_credit_account_id=account,
+    )
+    statement = BankStatement.objects.create(
+        journal_id=journal,
+        name='Relevé janvier',
+        date=date(2025, 1, 31),
+        balance_start=Decimal('0'),
+        balance_end=Decimal('0'),
+        created_by=ledger.user,
+    )
+    return SimpleNamespace(
+        account=account,
+        journal=journal,
+        statement=statement,
+        partner=Company.objects.create(name='Client'),
+    )
+
+
+def bank_entry_line(ledger, bank, entry_date, amount, ref):
+    """Encaissement validé : ligne au débit du compte de banque."""
+    entry = post_entry(
+        ledger, entry_date, bank.account, ledger.accounts[4], Decimal(amount)
+    )
+    entry.lines.update(ref=ref, partner_id=bank.partner)
+    return entry.lines.get(account_id=bank.account)
+
+
+def statement_line(bank, line_date, amount, ref):
+    return BankStatementLine.objects.create(
+        statement_id=bank.statement,
+        date=line_date,
+        name=ref,
+        ref=ref,
+        partner_id=bank.partner,
+        amount=Decimal(amount),
+    )
+
+
+@pytest.mark.django_db
+def test_auto_reconcile_maximises_total_score(ledger, bank):
+    # L1 préfère E1 (100) mais accepte E2 (90) ; L2 n'accepte que E1 (90) :
+    # un choix glouton ne rapprocherait que L1
+    e1 = bank_entry_line(ledger, bank, date(2025, 1, 10), '100', 'ABC')
+    e2 = bank_entry_line(ledger, bank, date(2025, 1, 11), '100', 'ABCD')
+    l1 = statement_line(bank, date(2025, 1, 10), '100', 'ABC')
+    l2 = statement_line(bank, date(2025, 1, 9), '100', 'ABCDE')
+    # Sans candidate : montant différent
+    l3 = statement_line(bank, date(2025, 1, 10), '250', 'ABC')
+
+    assert BankReconciliationService().auto_reconcile(bank.statement) == 2
+
+    assert list(l1.journal_entry_line_ids.all()) == [e2]
+    assert list(l2.journal_entry_line_ids.all()) == [e1]
+    l3.refresh_from_db()
+    assert not l3.is_reconciled
+
+    # Les lignes d'écritures rapprochées ne sont plus proposées
+    l4 = statement_line(bank, date(2025, 1, 10), '100', 'ABC')
+    assert BankReconciliationService().auto_reconcile(bank.statement) == 0
+    assert not l4.journal_entry_line_ids.exists()
+
+
+@pytest.mark.django_db
+def test_auto_reconcile_query_count_does_not_grow_with_lines(ledger, bank):
+    def reconcile_queries(nb_lines, day):
+        for i in range(nb_lines):
+            entry_date = date(2025, 1, day)
+            bank_entry_line(ledger, bank, entry_date, f'{100 + i}', f'REF{day}-{i}')
+            statement_line(bank, entry_date, f'{100 + i}', f'REF{day}-{i}')
+        with CaptureQueriesContext(connection) as queries:
+            assert (
+                BankReconciliationService().auto_reconcile(bank.statement) == nb_lines
+            )
+        return len(queries)
+
+    assert reconcile_queries(2, 5) == reconcile_queries(20, 20)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_hungarian_finds_minimal_cost(seed):
+    rng = random.Random(seed)
+    rows = rng.randint(1, 4)
+    cols = rng.randint(rows, 5)
+    cost = [[-rng.choice([0, 90, 95, 100]) for _ in range(cols)] for _ in range(rows)]
+
+    assignment = _hungarian(cost)
+
+    assert sorted(assignment) == list(range(rows))
+    assert len(set(assignment.values())) == rows
+    assert sum(cost[i][j] for i, j in assignment.items()) == min(
+        sum(cost[i][j] for i, j in enumerate(columns))
+        for columns in permutations(range(cols), rows)
+    )
+
+
+def statement_csv(rows, tail=b''):
+    """CSV de relevé (date, référence, libellé, montant) en octets."""
+    lines = ['date,ref,label,amount'] + [
+        f'{row_date:%d/%m/%Y},{ref},Opération {ref},{amount}'
+        for row_date, ref, amount in rows
+    ]
+    return io.BytesIO('\n'.join(lines).encode() + b'\n' + tail)
+
+
+def statement_balance(statement):
+    return statement.balance_start + sum(
+        statement.lines.values_list('amount', flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_statement_import_skips_duplicates_and_keeps_balance(bank):
+    statement = bank.statement
+    BankStatement.objects.filter(pk=statement.pk).update(
+        balance_start=Decimal('100.00')
+    )
+    statement.refresh_from_db()
+    statement_line(bank, date(2025, 1, 2), '50.00', 'MANUEL')
+    rows = [
+        (date(2025, 1, 3), 'VIR1', '120.50'),
+        (date(2025, 1, 4), 'CHQ1', '-40.25'),
+        # Répétition dans le fichier : conservée
+        (date(2025, 1, 4), 'CHQ1', '-40.25'),
+        (date(2025, 1, 5), 'PRLV1', '-10.00'),
+    ]
+    data = statement_csv(rows, tail=b'32/01/2025,X,Ligne invalide,1\n')
+
+    result = import_statement_file(statement, data, 'csv')
+
+    statement.refresh_from_db()
+    assert (
+        result['lines_created'],
+        result['duplicates_skipped'],
+        result['invalid_rows'],
+    ) == (4, 0, 1)
+    assert result['balance_end'] == statement.balance_end == Decimal('180.00')
+    assert statement.balance_end == statement_balance(statement)
+
+    # Relance du même fichier : tout est doublon, solde inchangé
+    result = import_statement_file(statement, statement_csv(rows), 'csv')
+    statement.refresh_from_db()
+    assert (result['lines_created'], result['duplicates_skipped']) == (0, 4)
+    assert statement.lines.count() == 5
+    assert statement.balance_end == Decimal('180.00')
+
+    # Même journal, autre relevé : les lignes déjà importées sont ignorées
+    february = BankStatement.objects.create(
+        journal_id=bank.journal,
+        name='Relevé février',
+        date=date(2025, 2, 28),
+        balance_start=Decimal('180.00'),
+        balance_end=Decimal('0'),
+        created_by=statement.created_by,
+    )
+    result = import_statement_file(
+        february,
+        statement_csv(rows[:1] + [(date(2025, 2, 3), 'VIR2', '30.00')]),
+        'csv',
+    )
+    assert (result['lines_created'], result['duplicates_skipped']) == (1, 1)
+    assert result['balance_end'] == Decimal('210.00')
+
+
+@pytest.mark.django_db
+def test_interrupted_statement_import_reports_partial_result(bank):
+    statement = bank.statement
+    rows = [(date(2025, 1, 1 + i % 28), f'VIR{i:04d}', f'{i}.01') for i in range(800)]
+    # Octet non UTF-8 après le premier bloc lu : les premiers lots sont validés
+    data = statement_csv(rows, tail=b'31/01/2025,BAD,\xff\xfe,1\n')
+
+    with pytest.raises(PartialImportError) as excinfo:
+        import_statement_lines(statement, read_csv(data)[0], batch_size=100)
+
+    created = excinfo.value.result['lines_created']
+    statement.refresh_from_db()
+    assert 0 < created < len(rows)
+    assert isinstance(excinfo.value.error, UnicodeDecodeError)
+    assert statement.lines.count() == created
+    assert excinfo.value.result['balance_end'] == statement.balance_end
+    assert statement.balance_end == statement_balance(statement)
+
+    # Relance avec le fichier corrigé : seules les lignes manquantes sont créées
+    result = import_statement_file(statement, statement_csv(rows), 'csv')
+    statement.refresh_from_db()
+    assert result['lines_created'] == len(rows) - created
+    assert result['duplicates_skipped'] == created
+    assert statement.balance_end == statement_balance(statement)
+    assert statement.balance_end == sum(Decimal(amount) for *_, amount in rows)
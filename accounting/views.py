@@ -1,8 +1,9 @@
+import tempfile
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from django.db.models import Q, Sum
-from django.http import HttpResponse
+from django.db.models import Count, Prefetch, Q, Sum
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
@@ -51,6 +52,7 @@ from .serializers import (
     ReconciliationSerializer,
     TaxSerializer,
 )
+from .services.balance_snapshot_service import BalanceSnapshotService
 from .services.export_service import ImportExportService
 from .services.financial_report_service import FinancialReportService
 
@@ -96,6 +98,39 @@ class AccountViewSet(viewsets.ModelViewSet):
             return AccountDetailSerializer
         return AccountSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['with_balance'] = self._with_balance()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            queryset = self._with_balances(queryset)
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'children', queryset=self._with_balances(Account.objects.all())
+                )
+            )
+        return queryset
+
+    def _with_balance(self):
+        """?with_balance=false : listes de sélection, sans calcul de solde."""
+        value = self.request.query_params.get('with_balance', 'true')
+        return value.lower() not in ('false', '0', 'no')
+
+    def _with_balances(self, queryset):
+        """Type et parent chargés, soldes annotés selon start_date / end_date."""
+        queryset = queryset.select_related('type_id', 'parent_id')
+        if not self._with_balance():
+            return queryset
+        return BalanceSnapshotService.annotate_totals(
+            queryset,
+            start_date=self.request.query_params.get('start_date', None),
+            end_date=self.request.query_params.get('end_date', None),
+        )
+
     @action(detail=True)
     def balance(self, request, pk=None):
         """Retourne le solde du compte."""
@@ -115,22 +150,44 @@ class AccountViewSet(viewsets.ModelViewSet):
     def chart_of_accounts(self, request):
         """Retourne le plan comptable structuré."""
         # Récupérer tous les comptes racines (sans parent)
-        root_accounts = Account.objects.filter(
-            parent_id__isnull=True, is_active=True
+        root_accounts = self._with_balances(
+            Account.objects.filter(parent_id__isnull=True, is_active=True)
         ).order_by('code')
+        root_accounts = root_accounts.prefetch_related(
+            Prefetch(
+                'children',
+                queryset=self._with_balances(Account.objects.all()).order_by('code'),
+            )
+        )
 
         # Sérialiser les comptes racines avec leurs enfants
         serializer = AccountDetailSerializer(
-            root_accounts, many=True, context={'request': request}
+            root_accounts, many=True, context=self.get_serializer_context()
         )
 
         return Response(serializer.data)
 
 
+def _entry_lines_prefetch(lookup):
+    """Lignes d'écritures avec les relations lues par JournalEntryLineSerializer."""
+    return Prefetch(
+        lookup,
+        queryset=JournalEntryLine.objects.select_related(
+            'account_id',
+            'partner_id',
+            'currency_id',
+            'analytic_account_id',
+            'tax_line_id',
+        ),
+    )
+
+
 class JournalViewSet(viewsets.ModelViewSet):
     """API pour les journaux comptables."""
 
-    queryset = Journal.objects.all()
+    queryset = Journal.objects.select_related(
+        'default_debit_account_id', 'default_credit_account_id'
+    ).all()
     serializer_class = JournalSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -171,7 +228,9 @@ class JournalViewSet(viewsets.ModelViewSet):
 class JournalEntryViewSet(viewsets.ModelViewSet):
     """API pour les écritures comptables."""
 
-    queryset = JournalEntry.objects.all()
+    queryset = JournalEntry.objects.select_related(
+        'journal_id', 'period_id', 'created_by'
+    ).all()
     serializer_class = JournalEntrySerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -204,6 +263,13 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
         if end_date:
             queryset = queryset.filter(date__lte=end_date)
 
+        if self.action in ('list', 'retrieve'):
+            # Totaux débit / crédit en une requête (voir JournalEntry.total_debit)
+            queryset = queryset.annotate(
+                debit_sum=Sum('lines__debit'), credit_sum=Sum('lines__credit')
+            )
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(_entry_lines_prefetch('lines'))
         return queryset
 
     @action(detail=True, methods=['post'])
@@ -306,7 +372,7 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
 class FiscalYearViewSet(viewsets.ModelViewSet):
     """API pour les exercices fiscaux."""
 
-    queryset = FiscalYear.objects.all()
+    queryset = FiscalYear.objects.annotate(periods_count=Count('periods'))
     serializer_class = FiscalYearSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -390,7 +456,7 @@ class FiscalYearViewSet(viewsets.ModelViewSet):
 class FiscalPeriodViewSet(viewsets.ModelViewSet):
     """API pour les périodes fiscales."""
 
-    queryset = FiscalPeriod.objects.all()
+    queryset = FiscalPeriod.objects.select_related('fiscal_year').all()
     serializer_class = FiscalPeriodSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -447,7 +513,7 @@ class FiscalPeriodViewSet(viewsets.ModelViewSet):
 class ReconciliationViewSet(viewsets.ModelViewSet):
     """API pour les lettrages comptables."""
 
-    queryset = Reconciliation.objects.all()
+    queryset = Reconciliation.objects.select_related('account_id', 'created_by').all()
     serializer_class = ReconciliationSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -466,6 +532,21 @@ class ReconciliationViewSet(viewsets.ModelViewSet):
             return ReconciliationDetailSerializer
         return ReconciliationSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.annotate(
+                lines_count=Count('reconciled_lines'),
+                debit_sum=Sum('reconciled_lines__debit'),
+                credit_sum=Sum('reconciled_lines__credit'),
+            )
+        elif self.action == 'retrieve':
+            queryset = queryset.annotate(
+                debit_sum=Sum('reconciled_lines__debit'),
+                credit_sum=Sum('reconciled_lines__credit'),
+            ).prefetch_related(_entry_lines_prefetch('reconciled_lines'))
+        return queryset
+
     def perform_create(self, serializer):
         """Personnalisation de la création d'un lettrage."""
         # Enregistrer l'utilisateur qui crée le lettrage
@@ -568,7 +649,7 @@ class ReconciliationViewSet(viewsets.ModelViewSet):
 class BankStatementViewSet(viewsets.ModelViewSet):
     """API pour les relevés bancaires."""
 
-    queryset = BankStatement.objects.all()
+    queryset = BankStatement.objects.select_related('journal_id', 'created_by').all()
     serializer_class = BankStatementSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -587,6 +668,21 @@ class BankStatementViewSet(viewsets.ModelViewSet):
             return BankStatementDetailSerializer
         return BankStatementSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.annotate(lines_count=Count('lines'))
+        elif self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'lines',
+                    queryset=BankStatementLine.objects.select_related(
+                        'partner_id'
+                    ).prefetch_related('journal_entry_line_ids'),
+                )
+            )
+        return queryset
+
     def perform_create(self, serializer):
         """Personnalisation de la création d'un relevé bancaire."""
         # Enregistrer l'utilisateur qui crée le relevé
@@ -608,9 +704,24 @@ class BankStatementViewSet(viewsets.ModelViewSet):
 
         return Response({'success': True, 'message': _('Relevé confirmé avec succès')})
 
-    @action(detail=True, methods=['post'])
-    def import_from_csv(self, request, pk=None):
-        """Importe un relevé bancaire depuis un fichier CSV."""
+    def _import_statement_file(self, request, file_format):
+        """
+        Import commun CSV / OFX / PDF (voir bank_statement_import).
+
+        Un fichier OFX ou PDF volumineux est importé en tâche de fond :
+        réponse 202 avec la tâche à suivre sur /api/core/jobs/<id>/.
+        Un import interrompu après des lots déjà validés renvoie
+        success=False, partial=True et les compteurs de ces lots.
+        """
+        from core.serializers import BackgroundJobSerializer
+
+        from .services.bank_statement_import import (
+            PartialImportError,
+            import_statement_file,
+            runs_in_background,
+            start_import_job,
+        )
+
         statement = self.get_object()
 
         if statement.state != 'draft':
@@ -619,268 +730,91 @@ class BankStatementViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Récupérer le fichier
-        csv_file = request.FILES.get('file')
-        if not csv_file:
+        upload = request.FILES.get('file')
+        if not upload:
             return Response(
                 {'success': False, 'message': _('Aucun fichier fourni')},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Traiter le fichier
-        try:
-            # Lire les lignes du CSV et les ajouter au relevé
-            import csv
-            from io import StringIO
-
-            # Décoder le fichier
-            content = csv_file.read().decode('utf-8')
-
-            # Analyser le CSV
-            csv_data = csv.reader(StringIO(content), delimiter=',')
-            next(csv_data)  # Ignorer l'en-tête
-
-            # Créer les lignes
-            lines_created = 0
-            for row in csv_data:
-                try:
-                    date_str, ref, label, amount_str = row
-                    date = datetime.strptime(date_str, '%d/%m/%Y').date()
-                    amount = Decimal(amount_str.replace(',', '.'))
-
-                    BankStatementLine.objects.create(
-                        statement_id=statement,
-                        date=date,
-                        ref=ref,
-                        name=label,
-                        amount=amount,
-                    )
-                    lines_created += 1
-                except Exception:
-                    # Ignorer les lignes mal formées
-                    continue
-
-            # Calculer le solde final
-            if lines_created > 0:
-                statement.balance_end = statement.balance_start + sum(
-                    line.amount for line in statement.lines.all()
-                )
-                statement.save(update_fields=['balance_end'])
-
-            return Response(
-                {
-                    'success': True,
-                    'message': _('{} lignes importées').format(lines_created),
-                }
-            )
-        except Exception as e:
-            return Response(
-                {'success': False, 'message': str(e)},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-    @action(detail=True, methods=['post'])
-    def import_from_ofx(self, request, pk=None):
-        """Importe un relevé bancaire depuis un fichier OFX/QFX."""
-        statement = self.get_object()
-
-        if statement.state != 'draft':
+        if file_format == 'pdf' and not upload.name.lower().endswith('.pdf'):
             return Response(
-                {
-                    'success': False,
-                    'message': 'Le relevé doit être en brouillon pour importer',
-                },
+                {'success': False, 'message': 'Le fichier doit être au format PDF'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        ofx_file = request.FILES.get('file')
-        if not ofx_file:
+        if runs_in_background(file_format, upload.size):
+            job = start_import_job(statement, upload, file_format, user=request.user)
             return Response(
-                {'success': False, 'message': 'Aucun fichier fourni'},
-                status=status.HTTP_400_BAD_REQUEST,
+                BackgroundJobSerializer(job, context={'request': request}).data,
+                status=status.HTTP_202_ACCEPTED,
             )
 
         try:
-            from io import BytesIO
-
-            from ofxtools.Parser import OFXTree
-
-            raw = ofx_file.read()
-            parser = OFXTree()
-            parser.parse(BytesIO(raw))
-            ofx = parser.convert()
-
-            lines_created = 0
-            duplicates_skipped = 0
-
-            for stmt in ofx.statements:
-                for txn in stmt.transactions:
-                    # Dédoublonnage par fitid (identifiant unique OFX)
-                    if (
-                        txn.fitid
-                        and BankStatementLine.objects.filter(
-                            statement_id=statement,
-                            ref=txn.fitid,
-                        ).exists()
-                    ):
-                        duplicates_skipped += 1
-                        continue
-
-                    txn_date = txn.dtposted
-                    if hasattr(txn_date, 'date'):
-                        txn_date = txn_date.date()
-
-                    BankStatementLine.objects.create(
-                        statement_id=statement,
-                        date=txn_date,
-                        name=txn.memo or txn.name or 'Transaction OFX',
-                        ref=txn.fitid or '',
-                        amount=txn.trnamt,
-                    )
-                    lines_created += 1
-
-            # Recalculer le solde final
-            if lines_created > 0:
-                total = sum(line.amount for line in statement.lines.all())
-                statement.balance_end = statement.balance_start + total
-                statement.save(update_fields=['balance_end'])
-
-            msg = f'{lines_created} lignes importées'
-            if duplicates_skipped:
-                msg += f', {duplicates_skipped} doublons ignorés'
-
+            result = import_statement_file(
+                statement, upload, file_format, filename=upload.name
+            )
+        except PartialImportError as e:
+            # Lots déjà validés : le relevé a changé, le client doit le savoir
             return Response(
                 {
-                    'success': True,
-                    'message': msg,
-                    'lines_created': lines_created,
-                    'duplicates_skipped': duplicates_skipped,
+                    'success': False,
+                    'partial': True,
+                    'message': str(e),
+                    **e.result,
                 }
             )
-
-        except Exception as e:
+        except ValueError as e:
             return Response(
-                {'success': False, 'message': f'Erreur import OFX: {str(e)}'},
+                {'success': False, 'message': str(e)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-    @action(detail=True, methods=['post'])
-    def import_from_pdf(self, request, pk=None):
-        """Importe un relevé bancaire depuis un fichier PDF."""
-        statement = self.get_object()
-
-        if statement.state != 'draft':
+        except Exception as e:
             return Response(
                 {
                     'success': False,
-                    'message': 'Le relevé doit être en brouillon pour importer',
+                    'message': f'Erreur import {file_format.upper()}: {str(e)}',
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        pdf_file = request.FILES.get('file')
-        if not pdf_file:
-            return Response(
-                {'success': False, 'message': 'Aucun fichier fourni'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        msg = _('{} lignes importées').format(result['lines_created'])
+        if result['duplicates_skipped']:
+            msg += f', {result["duplicates_skipped"]} doublons ignorés'
 
-        if not pdf_file.name.lower().endswith('.pdf'):
-            return Response(
-                {'success': False, 'message': 'Le fichier doit être au format PDF'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        try:
-            from io import BytesIO
-
-            from django.core.files.base import ContentFile
-
-            from accounting.services.pdf_bank_parser import PDFBankParser
-
-            raw_bytes = pdf_file.read()
-            result = PDFBankParser.parse(BytesIO(raw_bytes))
-            transactions = result['transactions']
-
-            if not transactions:
-                return Response(
-                    {'success': False, 'message': 'Aucune transaction extraite du PDF'},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            lines_created = 0
-            duplicates_skipped = 0
-
-            for txn in transactions:
-                if (
-                    txn.get('ref')
-                    and BankStatementLine.objects.filter(
-                        statement_id=statement, ref=txn['ref']
-                    ).exists()
-                ):
-                    duplicates_skipped += 1
-                    continue
-
-                BankStatementLine.objects.create(
-                    statement_id=statement,
-                    date=txn['date'],
-                    name=txn['name'],
-                    ref=txn['ref'],
-                    amount=txn['amount'],
-                )
-                lines_created += 1
-
-            # Recalcul du solde final
-            if lines_created > 0:
-                total = sum(line.amount for line in statement.lines.all())
-                statement.balance_end = statement.balance_start + total
-                statement.save(update_fields=['balance_end'])
-
-            # Soldes détectés dans le PDF
-            if result.get('balance_start') and statement.balance_start == 0:
-                statement.balance_start = result['balance_start']
-                statement.save(update_fields=['balance_start'])
-            if result.get('balance_end'):
-                statement.balance_end_real = result['balance_end']
-                statement.save(update_fields=['balance_end_real'])
-
-            # Sauvegarde du fichier PDF source (une seule fois)
-            if not statement.source_pdf:
-                statement.source_pdf.save(
-                    pdf_file.name, ContentFile(raw_bytes), save=True
-                )
-
-            msg = f'{lines_created} lignes importées'
-            if duplicates_skipped:
-                msg += f', {duplicates_skipped} doublons ignorés'
-
-            return Response(
+        data = {
+            'success': True,
+            'message': msg,
+            'lines_created': result['lines_created'],
+            'duplicates_skipped': result['duplicates_skipped'],
+            'invalid_rows': result['invalid_rows'],
+            'balance_end': result['balance_end'],
+        }
+        if file_format == 'pdf':
+            data.update(
                 {
-                    'success': True,
-                    'message': msg,
-                    'lines_created': lines_created,
-                    'duplicates_skipped': duplicates_skipped,
-                    'balance_start_detected': float(result['balance_start'])
-                    if result.get('balance_start')
-                    else None,
-                    'balance_end_detected': float(result['balance_end'])
-                    if result.get('balance_end')
-                    else None,
-                    'parser_used': result.get('parser_used', 'unknown'),
-                    'confidence': result.get('confidence', 'unknown'),
+                    key: float(result[key]) if result[key] else None
+                    for key in ('balance_start_detected', 'balance_end_detected')
                 }
             )
+            data['parser_used'] = result['parser_used']
+            data['confidence'] = result['confidence']
+        return Response(data)
 
-        except ValueError as e:
-            return Response(
-                {'success': False, 'message': str(e)},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        except Exception as e:
-            return Response(
-                {'success': False, 'message': f'Erreur import PDF: {str(e)}'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+    @action(detail=True, methods=['post'])
+    def import_from_csv(self, request, pk=None):
+        """Importe un relevé bancaire depuis un fichier CSV."""
+        return self._import_statement_file(request, 'csv')
+
+    @action(detail=True, methods=['post'])
+    def import_from_ofx(self, request, pk=None):
+        """Importe un relevé bancaire depuis un fichier OFX/QFX."""
+        return self._import_statement_file(request, 'ofx')
+
+    @action(detail=True, methods=['post'])
+    def import_from_pdf(self, request, pk=None):
+        """Importe un relevé bancaire depuis un fichier PDF."""
+        return self._import_statement_file(request, 'pdf')
 
     @action(detail=True, methods=['post'])
     def auto_reconcile(self, request, pk=None):
@@ -1040,7 +974,9 @@ class BankStatementViewSet(viewsets.ModelViewSet):
 class AnalyticAccountViewSet(viewsets.ModelViewSet):
     """API pour les comptes analytiques."""
 
-    queryset = AnalyticAccount.objects.all()
+    queryset = AnalyticAccount.objects.select_related('parent_id').annotate(
+        children_count=Count('children')
+    )
     serializer_class = AnalyticAccountSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -1058,7 +994,7 @@ class AnalyticAccountViewSet(viewsets.ModelViewSet):
 class TaxViewSet(viewsets.ModelViewSet):
     """API pour les taxes."""
 
-    queryset = Tax.objects.all()
+    queryset = Tax.objects.select_related('account_id').all()
     serializer_class = TaxSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -1076,7 +1012,9 @@ class TaxViewSet(viewsets.ModelViewSet):
 class AssetCategoryViewSet(viewsets.ModelViewSet):
     """API pour les catégories d'immobilisations."""
 
-    queryset = AssetCategory.objects.all()
+    queryset = AssetCategory.objects.select_related(
+        'account_asset_id', 'account_depreciation_id', 'account_expense_id'
+    ).all()
     serializer_class = AssetCategorySerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -1094,7 +1032,7 @@ class AssetCategoryViewSet(viewsets.ModelViewSet):
 class AssetViewSet(viewsets.ModelViewSet):
     """API pour les immobilisations."""
 
-    queryset = Asset.objects.all()
+    queryset = Asset.objects.select_related('category_id', 'acquisition_move_id').all()
     serializer_class = AssetSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -1113,6 +1051,26 @@ class AssetViewSet(viewsets.ModelViewSet):
             return AssetDetailSerializer
         return AssetSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # Nombre de dotations et cumul comptabilisé (valeur nette comptable)
+            queryset = queryset.annotate(
+                depreciation_count=Count('depreciation_lines'),
+                posted_depreciation_sum=Sum(
+                    'depreciation_lines__amount',
+                    filter=Q(depreciation_lines__state='posted'),
+                ),
+            )
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'depreciation_lines',
+                    queryset=AssetDepreciation.objects.select_related('move_id'),
+                )
+            )
+        return queryset
+
     @action(detail=True, methods=['post'])
     def compute_depreciation(self, request, pk=None):
         """Calcule le tableau d'amortissement d'une immobilisation."""
@@ -1243,7 +1201,7 @@ class AssetViewSet(viewsets.ModelViewSet):
 class AssetDepreciationViewSet(viewsets.ModelViewSet):
     """ViewSet pour les dotations aux amortissements."""
 
-    queryset = AssetDepreciation.objects.all().order_by('date')
+    queryset = AssetDepreciation.objects.select_related('move_id').order_by('date')
     serializer_class = AssetDepreciationSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'accounting'
@@ -1277,38 +1235,18 @@ def dashboard_view(request):
     )
     end_date = request.query_params.get('end_date', today.isoformat())
 
-    # Comptes importants
-    bank_balance = Decimal(0)
-    customer_balance = Decimal(0)
-    supplier_balance = Decimal(0)
-    vat_balance = Decimal(0)
-
+    # Comptes importants, résolus en une seule lecture des soldes
+    balances = FinancialReportService.get_prefix_balances(
+        ['514', '411', '401', '4455', '4456', '3455'], end_date=end_date
+    )
     # Banque: compte 514xxx
-    bank_accounts = Account.objects.filter(code__startswith='514')
-    for account in bank_accounts:
-        bank_balance += account.get_balance(end_date=end_date)
-
+    bank_balance = balances['514']
     # Clients: compte 411xxx
-    customer_accounts = Account.objects.filter(code__startswith='411')
-    for account in customer_accounts:
-        customer_balance += account.get_balance(end_date=end_date)
-
+    customer_balance = balances['411']
     # Fournisseurs: compte 401xxx
-    supplier_accounts = Account.objects.filter(code__startswith='401')
-    for account in supplier_accounts:
-        supplier_balance += account.get_balance(end_date=end_date)
-
-    # TVA: comptes 4455xx (TVA à décaisser) et 4456xx (TVA à payer)
-    vat_collected_accounts = Account.objects.filter(
-        Q(code__startswith='4455') | Q(code__startswith='4456')
-    )
-    for account in vat_collected_accounts:
-        vat_balance += account.get_balance(end_date=end_date)
-
-    # TVA: comptes 4455xx (TVA déductible)
-    vat_deductible_accounts = Account.objects.filter(code__startswith='3455')
-    for account in vat_deductible_accounts:
-        vat_balance -= account.get_balance(end_date=end_date)
+    supplier_balance = balances['401']
+    # TVA: comptes 4455xx / 4456xx (TVA collectée) moins 3455xx (TVA déductible)
+    vat_balance = balances['4455'] + balances['4456'] - balances['3455']
 
     # Statistiques mensuelles
     month_stats = []
@@ -1321,20 +1259,13 @@ def dashboard_view(request):
             day=1
         ) - timedelta(days=1)
 
+        month_balances = FinancialReportService.get_prefix_balances(
+            ['6', '7'], start_date=current_month, end_date=month_end
+        )
         # Revenus: comptes 7xxxx
-        income = Decimal(0)
-        income_accounts = Account.objects.filter(code__regex=r'^7.*')
-        for account in income_accounts:
-            income -= account.get_balance(
-                start_date=current_month,
-                end_date=month_end,
-            )
-
+        income = -month_balances['7']
         # Dépenses: comptes 6xxxx
-        expense = Decimal(0)
-        expense_accounts = Account.objects.filter(code__regex=r'^6.*')
-        for account in expense_accounts:
-            expense += account.get_balance(start_date=current_month, end_date=month_end)
+        expense = month_balances['6']
 
         month_stats.append(
             {
@@ -1438,33 +1369,54 @@ def general_ledger_export(request):
     # Format d'export
     export_format = request.query_params.get('format', 'excel')
 
-    # Générer le grand livre
     try:
-        ledger_data = FinancialReportService.generate_general_ledger(
-            start_date=start_date, end_date=end_date, account_ids=[account_id]
+        start_date, end_date = FinancialReportService.resolve_ledger_dates(
+            start_date, end_date
         )
 
-        # Exporter les données
-        if export_format == 'excel':
-            export_data = ImportExportService.export_ledger_to_excel(ledger_data)
+        if export_format == 'pdf':
+            # WeasyPrint met en page le document complet en mémoire
+            ledger_data = FinancialReportService.generate_general_ledger(
+                start_date=start_date, end_date=end_date, account_ids=[account_id]
+            )
+            export_data = ImportExportService.export_ledger_to_pdf(ledger_data)
 
             # Créer la réponse
-            response = HttpResponse(
-                export_data,
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            )
+            response = HttpResponse(export_data, content_type='application/pdf')
             response['Content-Disposition'] = (
-                f'attachment; filename="grand_livre_{account_id}.xlsx"'
+                f'attachment; filename="grand_livre_{account_id}.pdf"'
             )
 
             return response
-        elif export_format == 'pdf':
-            export_data = ImportExportService.export_ledger_to_pdf(ledger_data)
 
-            # Créer la réponse
-            response = HttpResponse(export_data, content_type='application/pdf')
+        # Grand livre en flux pour les formats tabulaires
+        ledger_data = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'ledger': FinancialReportService.iter_general_ledger(
+                start_date, end_date, account_ids=[account_id]
+            ),
+        }
+
+        if export_format == 'excel':
+            # Le classeur est écrit sur disque puis transmis par blocs
+            export_file = tempfile.TemporaryFile()
+            ImportExportService.export_ledger_to_excel(ledger_data, output=export_file)
+            export_file.seek(0)
+
+            return FileResponse(
+                export_file,
+                as_attachment=True,
+                filename=f'grand_livre_{account_id}.xlsx',
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        elif export_format == 'csv':
+            response = StreamingHttpResponse(
+                ImportExportService.export_ledger_to_csv(ledger_data),
+                content_type='text/csv; charset=utf-8',
+            )
             response['Content-Disposition'] = (
-                f'attachment; filename="grand_livre_{account_id}.pdf"'
+                f'attachment; filename="grand_livre_{account_id}.csv"'
             )
 
             return response
@@ -1796,12 +1748,14 @@ def esg_report(request):
     except Exception:
         accounting_pack = 'MA'
 
-    def account_balance(prefix, sd=start_date, ed=end_date):
+    # Tous les préfixes de l'ESG sont résolus en une seule lecture des soldes
+    _balances, trie = FinancialReportService.get_account_balances(
+        start_date=start_date, end_date=end_date
+    )
+
+    def account_balance(prefix):
         """Somme des soldes des comptes commençant par prefix."""
-        total = Decimal('0')
-        for acct in Account.objects.filter(code__startswith=prefix):
-            total += acct.get_balance(start_date=sd, end_date=ed)
-        return total
+        return trie.total(prefix)
 
     # Calcul ESG selon PCGE marocain
     # I. Tableau de formation des résultats (TFR)
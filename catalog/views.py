@@ -12,7 +12,7 @@ from .serializers import ProductCategorySerializer, ProductSerializer
 class ProductViewSet(viewsets.ModelViewSet):
     """API pour les produits."""
 
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related('currency', 'category').all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'sales'
@@ -32,6 +32,11 @@ app.conf.beat_schedule = {
         'task': 'core.tasks.backup_database',
         'schedule': crontab(hour=2, minute=0),
     },
+    # Purge du cache des PDF
+    'cleanup-pdf-cache-daily': {
+        'task': 'core.tasks.cleanup_pdf_cache',
+        'schedule': crontab(hour=2, minute=30),
+    },
     # Vérification expiration contrats RH (v3.17.0)
     'check-contract-expirations-daily': {
         'task': 'hr.tasks.check_contract_expirations',
@@ -130,6 +130,7 @@ SIMPLE_JWT = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -259,6 +260,68 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# =========================
+# Cache partagé (Redis)
+# =========================
+# Partagé par tous les workers gunicorn et Celery : les numéros de version
+# des caches dérivés (permissions, paramètres de paie...) y sont incrémentés
+# une fois pour tous les processus (voir core.services.cache_version).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_URL', default='redis://localhost:6379/1'),
+        'KEY_PREFIX': 'cleo',
+    }
+}
+
+# Taille des lots du calcul asynchrone des bulletins de paie
+PAYROLL_CALCULATION_CHUNK_SIZE = config(
+    'PAYROLL_CALCULATION_CHUNK_SIZE', default=200, cast=int
+)
+# Un calcul sans activité depuis ce délai (secondes) est considéré comme
+# interrompu (worker arrêté) et n'empêche plus d'en lancer un nouveau
+PAYROLL_CALCULATION_STALE_AFTER = config(
+    'PAYROLL_CALCULATION_STALE_AFTER', default=1800, cast=int
+)
+# Taille des lots de l'export PDF des bulletins d'un lancement
+PAYROLL_EXPORT_CHUNK_SIZE = config('PAYROLL_EXPORT_CHUNK_SIZE', default=100, cast=int)
+# Au-delà de ce nombre de lignes, un inventaire est validé en tâche de fond
+INVENTORY_VALIDATION_SYNC_LINES = config(
+    'INVENTORY_VALIDATION_SYNC_LINES', default=2000, cast=int
+)
+# Au-delà de cette taille (octets), un relevé OFX ou PDF est importé en tâche de fond
+BANK_IMPORT_SYNC_MAX_BYTES = config(
+    'BANK_IMPORT_SYNC_MAX_BYTES', default=1024 * 1024, cast=int
+)
+
+# Journal d'activité : 'sync' (écriture immédiate, durable, par défaut),
+# 'buffered' (file en mémoire, écriture par lots) ou 'celery' (lots écrits
+# par un worker). En 'buffered' / 'celery', les entrées en attente sont
+# écrites à l'arrêt normal du processus, mais perdues s'il est tué
+# (SIGKILL, OOM) : au plus ACTIVITY_LOG_FLUSH_INTERVAL secondes d'activité.
+ACTIVITY_LOG_MODE = config('ACTIVITY_LOG_MODE', default='sync')
+# Taille de lot déclenchant une écriture, délai maximal avant écriture (s)
+ACTIVITY_LOG_BUFFER_SIZE = config('ACTIVITY_LOG_BUFFER_SIZE', default=100, cast=int)
+ACTIVITY_LOG_FLUSH_INTERVAL = config(
+    'ACTIVITY_LOG_FLUSH_INTERVAL', default=2.0, cast=float
+)
+# Au-delà, les entrées sont écrites immédiatement (pas de perte)
+ACTIVITY_LOG_MAX_QUEUE = config('ACTIVITY_LOG_MAX_QUEUE', default=10000, cast=int)
+
+# Budget de requêtes SQL par vue : en-têtes X-Query-*, agrégats sur
+# /api/core/query-budget/ et avertissement au-delà du budget
+QUERY_BUDGET_ENABLED = config('QUERY_BUDGET_ENABLED', default=DEBUG, cast=bool)
+# Nombre maximal de requêtes par vue/action ('InvoiceViewSet.list': 12, ...)
+QUERY_BUDGET_DEFAULT = config('QUERY_BUDGET_DEFAULT', default=20, cast=int)
+QUERY_BUDGETS = {}
+# Une même requête répétée autant de fois signale un N+1
+QUERY_BUDGET_MAX_REPEAT = config('QUERY_BUDGET_MAX_REPEAT', default=5, cast=int)
+
+# Rendu PDF : cache disque des PDF (MEDIA_ROOT/pdf_cache) et purge des
+# entrées inutilisées
+PDF_CACHE_ENABLED = config('PDF_CACHE_ENABLED', default=True, cast=bool)
+PDF_CACHE_RETENTION_DAYS = config('PDF_CACHE_RETENTION_DAYS', default=30, cast=int)
+
 # =========================
 # Logging
 # =========================
@@ -1,3 +1,5 @@
+from decouple import config
+
 from .base import *
 
 DEBUG = True
@@ -5,3 +7,6 @@ ALLOWED_HOSTS = ['*']
 
 # En dev, CORS permissif (optionnel)
 CORS_ALLOW_ALL_ORIGINS = True
+
+# Mesure des requêtes SQL par vue (en-têtes X-Query-*)
+QUERY_BUDGET_ENABLED = config('QUERY_BUDGET_ENABLED', default=True, cast=bool)
@@ -0,0 +1,24 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def _fast_password_hasher(settings):
+    """Hachage rapide : les employés créés dans les tests reçoivent un compte."""
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@pytest.fixture(autouse=True)
+def _local_cache(settings):
+    """
+    Cache en mémoire pour les tests : un seul processus, pas de Redis requis.
+
+    Vidé à chaque test pour que les numéros de version et les caches dérivés
+    ne fuient pas d'un test à l'autre.
+    """
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+    cache.clear()
+    yield
+    cache.clear()
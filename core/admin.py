@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import CoreSettings, Currency, EmailSettings
+from .models import BackgroundJob, CoreSettings, Currency, EmailSettings
 
 
 @admin.register(Currency)
@@ -82,3 +82,19 @@ class EmailSettingsAdmin(admin.ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'job_type',
+        'status',
+        'progress_current',
+        'progress_total',
+        'created_by',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = ('job_type', 'status')
+    readonly_fields = [field.name for field in BackgroundJob._meta.fields]
@@ -15,3 +15,8 @@ class CoreConfig(AppConfig):
             import core.signals  # noqa: F401
         except ImportError:
             pass
+
+        # Index de recherche globale (modèles des autres applications)
+        from core.search_signals import connect_search_signals
+
+        connect_search_signals()
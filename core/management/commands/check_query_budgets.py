@@ -0,0 +1,184 @@
+"""
+Management command: check_query_budgets
+Vérifie le budget de requêtes SQL des viewsets enregistrés dans les
+routeurs DRF (actions list et retrieve), sur les données de la base
+courante. Toutes les écritures sont annulées en fin de commande.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.viewsets import ViewSetMixin
+
+
+class _Rollback(Exception):
+    pass
+
+
+def router_list_routes(resolver=None, namespace=''):
+    """
+    Routes 'list' des viewsets de routeur : [(nom d'URL, classe du viewset)].
+    """
+    resolver = resolver or get_resolver()
+    routes = []
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            child_namespace = namespace
+            if pattern.namespace:
+                child_namespace = f'{namespace}{pattern.namespace}:'
+            routes.extend(router_list_routes(pattern, child_namespace))
+            continue
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        view_class = getattr(pattern.callback, 'cls', None)
+        actions = getattr(pattern.callback, 'actions', None) or {}
+        if (
+            view_class is not None
+            and issubclass(view_class, ViewSetMixin)
+            and actions.get('get') == 'list'
+            and 'format' not in pattern.pattern.regex.groupindex
+        ):
+            routes.append((f'{namespace}{pattern.name}', view_class))
+    return routes
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure les requêtes SQL des actions list et retrieve de chaque '
+        'viewset de routeur et échoue au-delà de QUERY_BUDGETS / '
+        'QUERY_BUDGET_DEFAULT ou si une même requête est répétée '
+        'QUERY_BUDGET_MAX_REPEAT fois (N+1). Les listes doivent contenir '
+        'au moins QUERY_BUDGET_MAX_REPEAT lignes pour révéler un N+1.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--app',
+            action='append',
+            default=[],
+            help='Limiter aux viewsets de cette application (répétable)',
+        )
+        parser.add_argument(
+            '--username',
+            help='Utilisateur des requêtes (par défaut, superutilisateur temporaire)',
+        )
+        parser.add_argument(
+            '--no-retrieve',
+            action='store_true',
+            help='Ne mesurer que les actions list',
+        )
+
+    def handle(self, *args, **options):
+        routes = [
+            (url_name, view_class)
+            for url_name, view_class in router_list_routes()
+            if not options['app']
+            or view_class.__module__.split('.')[0] in options['app']
+        ]
+        if not routes:
+            raise CommandError('Aucun viewset de routeur trouvé.')
+
+        self.stdout.write(
+            f'{"Vue":<48} {"Lignes":>6} {"Requêtes":>8} {"Budget":>6} '
+            f'{"Répét.":>6} {"Temps (ms)":>10}'
+        )
+        failures = []
+        with override_settings(
+            QUERY_BUDGET_ENABLED=True,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        ):
+            try:
+                with transaction.atomic():
+                    client = Client(raise_request_exception=False)
+                    client.force_login(self._get_user(options['username']))
+                    for url_name, view_class in routes:
+                        failures.extend(
+                            self._check_viewset(
+                                client, url_name, view_class, options['no_retrieve']
+                            )
+                        )
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        if failures:
+            raise CommandError(
+                f'{len(failures)} vue(s) hors budget :\n' + '\n'.join(failures)
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'{len(routes)} viewsets dans leur budget.')
+        )
+
+    @staticmethod
+    def _get_user(username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Utilisateur introuvable : {username}')
+        return User.objects.create_superuser(username='__query_budget__')
+
+    def _check_viewset(self, client, url_name, view_class, no_retrieve):
+        failures = []
+        url = reverse(url_name)
+        response = client.get(url)
+        rows = self._rows(response)
+        failure = self._report(url, response, len(rows))
+        if failure:
+            failures.append(failure)
+
+        lookup_field = view_class.lookup_field
+        # Clé primaire sérialisée sous le nom 'id'
+        row_key = 'id' if lookup_field == 'pk' else lookup_field
+        if no_retrieve or not rows or row_key not in rows[0]:
+            return failures
+
+        lookup_url_kwarg = view_class.lookup_url_kwarg or lookup_field
+        detail_url = reverse(
+            url_name[: -len('-list')] + '-detail',
+            kwargs={lookup_url_kwarg: rows[0][row_key]},
+        )
+        failure = self._report(detail_url, client.get(detail_url), 1)
+        if failure:
+            failures.append(failure)
+        return failures
+
+    @staticmethod
+    def _rows(response):
+        if response.status_code != 200:
+            return []
+        data = response.json()
+        if isinstance(data, dict):
+            data = data.get('results', [])
+        return [row for row in data if isinstance(row, dict)]
+
+    def _report(self, url, response, nb_rows):
+        if 'X-Query-Count' not in response:
+            self.stdout.write(
+                self.style.WARNING(f'{url:<48} HTTP {response.status_code}')
+            )
+            return None
+
+        count = int(response['X-Query-Count'])
+        budget = int(response['X-Query-Budget'])
+        max_repeat = int(response['X-Query-Max-Repeat'])
+        name = response.wsgi_request._query_budget_endpoint
+        line = (
+            f'{name:<48} {nb_rows:>6} {count:>8} {budget:>6} '
+            f'{max_repeat:>6} {response["X-DB-Time-Ms"]:>10}'
+        )
+
+        if response.status_code != 200:
+            self.stdout.write(
+                self.style.WARNING(f'{line}  HTTP {response.status_code}')
+            )
+            return None
+        if count > budget or max_repeat >= settings.QUERY_BUDGET_MAX_REPEAT:
+            self.stdout.write(self.style.ERROR(line))
+            return f'  {name} ({url}) : {count} requêtes, répétition max {max_repeat}'
+        self.stdout.write(line)
+        return None
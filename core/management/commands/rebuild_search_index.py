@@ -0,0 +1,48 @@
+"""
+Management command: rebuild_search_index
+Reconstruit l'index de la recherche globale (table SearchEntry), par
+exemple après une importation en masse qui n'émet pas de signaux.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import SearchEntry
+from core.services.search_index import SEARCHABLE_MODELS, SearchIndex
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de la recherche globale"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--module',
+            action='append',
+            default=[],
+            choices=sorted({searchable.module for searchable in SEARCHABLE_MODELS}),
+            help='Limiter à ce module (répétable)',
+        )
+        parser.add_argument(
+            '--if-empty',
+            action='store_true',
+            help="Ne reconstruire que si l'index est vide (démarrage du conteneur)",
+        )
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and SearchEntry.objects.exists():
+            self.stdout.write('Index de recherche déjà alimenté.')
+            return
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            counts = SearchIndex.rebuild(options['module'] or None)
+        for model_label, count in counts.items():
+            self.stdout.write(f'{model_label:<32} {count:>8}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{sum(counts.values())} entrées indexées en '
+                f'{time.perf_counter() - start:.1f} s.'
+            )
+        )
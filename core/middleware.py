@@ -0,0 +1,83 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .services.query_budget import QueryBudgetStats, QueryRecorder, get_budget
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """
+    Mesure les requêtes SQL de chaque vue (nombre, doublons, temps en base).
+
+    Actif si QUERY_BUDGET_ENABLED (par défaut en DEBUG). Les mesures sont
+    renvoyées dans les en-têtes X-Query-* de la réponse, agrégées par
+    vue/action (voir QueryBudgetStats, GET /api/core/query-budget/) et un
+    avertissement est journalisé au-delà du budget ou en cas de N+1.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        endpoint = getattr(request, '_query_budget_endpoint', None)
+        if endpoint is None:
+            return response
+
+        summary = recorder.summary()
+        budget = get_budget(endpoint)
+        over_budget = QueryBudgetStats.record(endpoint, summary, budget)
+
+        response['X-Query-Count'] = summary['count']
+        response['X-Query-Duplicates'] = summary['duplicates']
+        response['X-Query-Max-Repeat'] = summary['max_repeat']
+        response['X-Query-Budget'] = budget
+        response['X-DB-Time-Ms'] = summary['db_time_ms']
+
+        if over_budget or summary['max_repeat'] >= settings.QUERY_BUDGET_MAX_REPEAT:
+            logger.warning(
+                '%s %s : %s requêtes (budget %s), requête la plus répétée %s fois : %s',
+                endpoint,
+                request.path,
+                summary['count'],
+                budget,
+                summary['max_repeat'],
+                summary['top_duplicates'][0][0] if summary['top_duplicates'] else '',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            request._query_budget_endpoint = endpoint_name(request, view_func)
+        return None
+
+
+def endpoint_name(request, view_func):
+    """
+    Nom stable d'une vue : 'InvoiceViewSet.list', 'GlobalSearchView.get',
+    ou le nom de la fonction pour les vues simples.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(
+        view_func, 'view_class', None
+    )
+    if view_class is None:
+        return getattr(view_func, '__name__', 'unknown')
+
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        # ViewSet : méthode HTTP -> action du routeur (list, retrieve, ...)
+        return f'{view_class.__name__}.{actions.get(method, method)}'
+    return f'{view_class.__name__}.{method}'
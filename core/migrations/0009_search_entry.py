@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-17 04:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    """Index GIN trigrammes (pg_trgm) pour les recherches par sous-chaîne."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS core_searchentry_search_text_trgm '
+        'ON core_searchentry USING gin (search_text gin_trgm_ops);'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS core_searchentry_search_text_trgm;')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0008_contact_optional_currency_on_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'object_id',
+                    models.PositiveBigIntegerField(verbose_name="ID de l'objet"),
+                ),
+                ('module', models.CharField(max_length=30, verbose_name='Module')),
+                (
+                    'entity_type',
+                    models.CharField(max_length=50, verbose_name="Type d'entité"),
+                ),
+                ('label', models.CharField(max_length=255, verbose_name='Libellé')),
+                (
+                    'description',
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name='Description'
+                    ),
+                ),
+                ('url', models.CharField(max_length=255, verbose_name='URL')),
+                (
+                    'search_text',
+                    models.TextField(
+                        help_text='Mots normalisés : minuscules, sans accents ni ponctuation',
+                        verbose_name='Texte indexé',
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(auto_now=True, verbose_name='Modifié le'),
+                ),
+                (
+                    'content_type',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='contenttypes.contenttype',
+                        verbose_name="Type d'objet",
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Entrée de recherche',
+                'verbose_name_plural': 'Entrées de recherche',
+                'indexes': [
+                    models.Index(
+                        fields=['module'], name='core_search_module_b43fdb_idx'
+                    )
+                ],
+                'unique_together': {('content_type', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2 on 2026-10-17 04:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('core', '0009_search_entry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('job_type', models.CharField(max_length=50, verbose_name='Type')),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('pending', 'En attente'),
+                            ('running', 'En cours'),
+                            ('done', 'Terminée'),
+                            ('failed', 'Échouée'),
+                        ],
+                        default='pending',
+                        max_length=20,
+                        verbose_name='État',
+                    ),
+                ),
+                (
+                    'progress_current',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Éléments traités'
+                    ),
+                ),
+                (
+                    'progress_total',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Éléments à traiter'
+                    ),
+                ),
+                (
+                    'message',
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name='Message'
+                    ),
+                ),
+                (
+                    'result',
+                    models.JSONField(blank=True, default=dict, verbose_name='Résultat'),
+                ),
+                (
+                    'file_path',
+                    models.CharField(
+                        blank=True,
+                        help_text='Chemin relatif à MEDIA_ROOT',
+                        max_length=500,
+                        verbose_name='Fichier produit',
+                    ),
+                ),
+                (
+                    'created_at',
+                    models.DateTimeField(auto_now_add=True, verbose_name='Créée le'),
+                ),
+                (
+                    'started_at',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='Démarrée le'
+                    ),
+                ),
+                (
+                    'finished_at',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='Terminée le'
+                    ),
+                ),
+                (
+                    'created_by',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='background_jobs',
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name='Demandée par',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Tâche de fond',
+                'verbose_name_plural': 'Tâches de fond',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from decimal import ROUND_HALF_UP, Decimal
 
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -313,3 +314,88 @@ class CompanySetup(models.Model):
             if label and value:
                 ids.append({'label': label, 'value': value})
         return ids
+
+
+class SearchEntry(models.Model):
+    """
+    Entrée de l'index de recherche globale : une par objet indexé
+    (voir core/services/search_index.py).
+    """
+
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, verbose_name=_("Type d'objet")
+    )
+    object_id = models.PositiveBigIntegerField(_("ID de l'objet"))
+    module = models.CharField(_('Module'), max_length=30)
+    entity_type = models.CharField(_("Type d'entité"), max_length=50)
+    label = models.CharField(_('Libellé'), max_length=255)
+    description = models.CharField(_('Description'), max_length=255, blank=True)
+    url = models.CharField(_('URL'), max_length=255)
+    search_text = models.TextField(
+        _('Texte indexé'),
+        help_text=_('Mots normalisés : minuscules, sans accents ni ponctuation'),
+    )
+    updated_at = models.DateTimeField(_('Modifié le'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Entrée de recherche')
+        verbose_name_plural = _('Entrées de recherche')
+        unique_together = [['content_type', 'object_id']]
+        indexes = [models.Index(fields=['module'])]
+
+    def __str__(self):
+        return f'{self.entity_type} — {self.label}'
+
+
+class BackgroundJob(models.Model):
+    """
+    Tâche de fond suivie par l'interface (export, génération en lot...) :
+    état, avancement et fichier produit (voir core/services/background_jobs.py).
+    """
+
+    STATUSES = [
+        ('pending', _('En attente')),
+        ('running', _('En cours')),
+        ('done', _('Terminée')),
+        ('failed', _('Échouée')),
+    ]
+
+    job_type = models.CharField(_('Type'), max_length=50)
+    status = models.CharField(
+        _('État'), max_length=20, choices=STATUSES, default='pending'
+    )
+    progress_current = models.PositiveIntegerField(_('Éléments traités'), default=0)
+    progress_total = models.PositiveIntegerField(_('Éléments à traiter'), default=0)
+    message = models.CharField(_('Message'), max_length=255, blank=True)
+    result = models.JSONField(_('Résultat'), default=dict, blank=True)
+    file_path = models.CharField(
+        _('Fichier produit'),
+        max_length=500,
+        blank=True,
+        help_text=_('Chemin relatif à MEDIA_ROOT'),
+    )
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs',
+        verbose_name=_('Demandée par'),
+    )
+    created_at = models.DateTimeField(_('Créée le'), auto_now_add=True)
+    started_at = models.DateTimeField(_('Démarrée le'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('Terminée le'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Tâche de fond')
+        verbose_name_plural = _('Tâches de fond')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.job_type} #{self.pk} ({self.get_status_display()})'
+
+    @property
+    def progress_percent(self):
+        if not self.progress_total:
+            return 100 if self.status == 'done' else 0
+        return min(100, round(self.progress_current * 100 / self.progress_total))
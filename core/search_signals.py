@@ -0,0 +1,39 @@
+"""
+Mise à jour de l'index de recherche globale.
+
+Connecté dans CoreConfig.ready() (connect_search_signals) : les receivers
+sont branchés sur chaque modèle de SEARCHABLE_MODELS, dont les applications
+sont chargées après core. Les écritures en masse (update(), bulk_create)
+n'émettent pas de signaux : reconstruire alors l'index avec
+rebuild_search_index.
+"""
+
+from django.db.models.signals import post_delete, post_save
+
+from .services.search_index import SEARCHABLE_MODELS, SearchIndex
+
+
+def index_searchable_object(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Objet recherchable créé ou modifié."""
+    if raw:
+        return
+    SearchIndex.index_object(instance, update_fields=update_fields)
+
+
+def remove_searchable_object(sender, instance, **kwargs):
+    """Objet recherchable supprimé."""
+    SearchIndex.remove_object(instance)
+
+
+def connect_search_signals():
+    for searchable in SEARCHABLE_MODELS:
+        post_save.connect(
+            index_searchable_object,
+            sender=searchable.model,
+            dispatch_uid=f'search_index_save_{searchable.model_label}',
+        )
+        post_delete.connect(
+            remove_searchable_object,
+            sender=searchable.model,
+            dispatch_uid=f'search_index_delete_{searchable.model_label}',
+        )
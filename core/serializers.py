@@ -1,6 +1,13 @@
+from django.urls import reverse
 from rest_framework import serializers
 
-from .models import CompanySetup, CoreSettings, Currency, EmailSettings
+from .models import (
+    BackgroundJob,
+    CompanySetup,
+    CoreSettings,
+    Currency,
+    EmailSettings,
+)
 
 
 class CurrencySerializer(serializers.ModelSerializer):
@@ -219,3 +226,37 @@ class CompanyInfoSerializer(serializers.ModelSerializer):
     def get_currency_symbol(self, obj):
         default = Currency.objects.filter(is_default=True).first()
         return default.symbol if default else ''
+
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    """État d'une tâche de fond, avec le lien de téléchargement une fois terminée."""
+
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    progress_percent = serializers.IntegerField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            'id',
+            'job_type',
+            'status',
+            'status_display',
+            'progress_current',
+            'progress_total',
+            'progress_percent',
+            'message',
+            'result',
+            'download_url',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != 'done' or not obj.file_path:
+            return None
+        url = reverse('core:background-job-download', kwargs={'pk': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -1,5 +1,20 @@
+from .cache_version import bump_cache_version, get_cache_version
 from .company_service import get_company_context
 from .numbering_service import generate_document_number
+from .pdf_renderer import PDFDocument, PDFRenderer
+from .query_budget import QueryBudgetStats, QueryRecorder
+from .search_index import SearchIndex
 from .tax_service import get_default_tax_rate
 
-__all__ = ['get_company_context', 'get_default_tax_rate', 'generate_document_number']
+__all__ = [
+    'bump_cache_version',
+    'get_cache_version',
+    'get_company_context',
+    'get_default_tax_rate',
+    'generate_document_number',
+    'PDFDocument',
+    'PDFRenderer',
+    'QueryBudgetStats',
+    'QueryRecorder',
+    'SearchIndex',
+]
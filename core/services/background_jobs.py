@@ -0,0 +1,122 @@
+# core/services/background_jobs.py
+"""
+Suivi des tâches de fond (modèle BackgroundJob).
+
+Une vue crée la tâche (create_job) et la confie à Celery ; la tâche Celery
+rend compte de son avancement par un JobReporter. Les mises à jour sont
+des UPDATE ciblés, espacés d'au moins PROGRESS_INTERVAL secondes, pour ne
+pas ralentir le traitement. Les fichiers produits sont écrits sous
+MEDIA_ROOT/<dossier> et téléchargés par BackgroundJobDownloadView.
+"""
+
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# Délai minimal entre deux écritures de l'avancement (secondes)
+PROGRESS_INTERVAL = 1.0
+
+
+def create_job(job_type, user=None, message=''):
+    """Crée une tâche en attente."""
+    return BackgroundJob.objects.create(
+        job_type=job_type,
+        created_by=user if user and user.is_authenticated else None,
+        message=message,
+    )
+
+
+def job_file_path(directory, filename):
+    """
+    Chemin absolu d'un fichier produit par une tâche (dossier créé au besoin)
+    et chemin relatif à MEDIA_ROOT, à enregistrer dans job.file_path.
+    """
+    relative_path = os.path.join(directory, filename)
+    absolute_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+    return absolute_path, relative_path
+
+
+def cleanup_job_files(job_type, days):
+    """
+    Supprime les fichiers des tâches de ce type terminées depuis plus de
+    `days` jours.
+
+    Returns:
+        int: nombre de fichiers supprimés
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    removed = 0
+    jobs = BackgroundJob.objects.filter(
+        job_type=job_type, finished_at__lt=cutoff
+    ).exclude(file_path='')
+    for job in jobs:
+        absolute_path = os.path.join(settings.MEDIA_ROOT, job.file_path)
+        try:
+            if os.path.exists(absolute_path):
+                os.remove(absolute_path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f'[JOBS] Impossible de supprimer {absolute_path} : {e}')
+            continue
+        job.file_path = ''
+        job.save(update_fields=['file_path'])
+    return removed
+
+
+class JobReporter:
+    """Avancement d'une tâche de fond, écrit en base par UPDATE ciblés."""
+
+    def __init__(self, job):
+        self.job = job
+        self._last_write = 0.0
+
+    def _update(self, **fields):
+        for name, value in fields.items():
+            setattr(self.job, name, value)
+        BackgroundJob.objects.filter(pk=self.job.pk).update(**fields)
+        self._last_write = time.monotonic()
+
+    def start(self, total, message=''):
+        self._update(
+            status='running',
+            progress_current=0,
+            progress_total=total,
+            message=message,
+            started_at=timezone.now(),
+        )
+
+    def advance(self, count=1, message=None):
+        """Ajoute `count` éléments traités (écriture espacée)."""
+        self.job.progress_current += count
+        if message is not None:
+            self.job.message = message
+        if time.monotonic() - self._last_write >= PROGRESS_INTERVAL:
+            self._update(
+                progress_current=self.job.progress_current, message=self.job.message
+            )
+
+    def finish(self, result=None, file_path='', message=''):
+        self._update(
+            status='done',
+            progress_current=max(self.job.progress_current, self.job.progress_total),
+            result=result or {},
+            file_path=file_path,
+            message=message,
+            finished_at=timezone.now(),
+        )
+
+    def fail(self, error):
+        self._update(
+            status='failed',
+            message=str(error)[:255],
+            finished_at=timezone.now(),
+        )
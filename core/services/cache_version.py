@@ -0,0 +1,46 @@
+"""
+Numeros de version partages via le cache Django.
+
+Un cache derive (instantane de parametres, matrice de permissions...) est
+indexe par un numero de version stocke dans le cache : l'incrementer
+invalide d'un coup toutes les copies, dans tous les processus.
+
+Le cache doit donc etre partage par tous les processus (CACHES Redis,
+voir settings/base.py) : avec un cache local (LocMemCache), l'increment
+ne serait vu que par le processus qui l'effectue.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def get_cache_version(key):
+    """Version courante, initialisee si le cache l'a perdue."""
+    version = cache.get(key)
+    if version is None:
+        # Horodatage : une cle evincee ne revient jamais a une version deja vue
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_cache_version(key):
+    """
+    Incremente la version.
+
+    Dans une transaction, la version est incrementee une seconde fois apres
+    validation : un processus qui aurait recharge l'ancien etat entre-temps
+    est ainsi invalide.
+    """
+    _bump(key)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(key))
@@ -1,19 +1,82 @@
 """
 Service centralisé pour récupérer le contexte entreprise.
 Utilisé par tous les générateurs PDF et services email.
+
+Le contexte est gardé en mémoire par chaque processus (gunicorn, Celery)
+tant que le numéro de version stocké dans le cache partagé (Redis) ne
+change pas ; il est incrémenté à chaque enregistrement ou suppression de
+CompanySetup ou d'une devise (voir core/signals.py).
 """
 
+import base64
+import copy
 import logging
+import os
+
+from django.db import transaction
+
+from .cache_version import bump_cache_version, get_cache_version
 
 logger = logging.getLogger(__name__)
 
+VERSION_KEY = 'company_context_version'
+
+LOGO_MIME_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'svg': 'image/svg+xml',
+}
+
+# (version, contexte) du processus courant
+_local = None
+
 
 def get_company_context():
     """
     Retourne le contexte entreprise pour les templates PDF/email.
     Lit CompanySetup + devise par défaut.
     Retourne un fallback si le setup n'est pas encore fait.
+
+    Chaque appel reçoit sa propre copie du contexte mémorisé. Dans une
+    transaction, un contexte rechargé n'est pas mémorisé (il peut refléter
+    des écritures non validées).
     """
+    global _local
+
+    version = get_cache_version(VERSION_KEY)
+    local = _local
+    if local is None or local[0] != version:
+        context = _load_company_context()
+        if not transaction.get_connection().in_atomic_block:
+            _local = (version, context)
+    else:
+        context = local[1]
+    return copy.deepcopy(context)
+
+
+def invalidate_company_context():
+    """Incrémente la version partagée (voir bump_cache_version)."""
+    bump_cache_version(VERSION_KEY)
+
+
+def _logo_data_uri(setup):
+    """Logo encodé en data URI (images embarquées dans les PDF), None sinon."""
+    if not setup.logo:
+        return None
+    try:
+        logo_path = setup.logo.path
+        with open(logo_path, 'rb') as fh:
+            data = base64.b64encode(fh.read()).decode('utf-8')
+    except (OSError, ValueError) as e:
+        logger.warning(f'Logo entreprise illisible : {e}')
+        return None
+    ext = os.path.splitext(logo_path)[1].lower().lstrip('.')
+    return f'data:{LOGO_MIME_TYPES.get(ext, "image/png")};base64,{data}'
+
+
+def _load_company_context():
     from core.models import CompanySetup, Currency
 
     setup = CompanySetup.objects.first()
@@ -23,7 +86,15 @@ def get_company_context():
         logger.warning(
             'CompanySetup non configuré — utilisation des valeurs par défaut'
         )
-        return _get_fallback_context()
+        context = _get_fallback_context()
+        # Pays, logo et devise restent utilisables avant la fin du setup
+        if setup:
+            context['country_code'] = setup.country_code or ''
+            context['logo_data_uri'] = _logo_data_uri(setup)
+        if default_currency:
+            context['currency_code'] = default_currency.code
+            context['currency_symbol'] = default_currency.symbol
+        return context
 
     # Construire la liste des identifiants légaux
     legal_ids = []
@@ -63,6 +134,8 @@ def get_company_context():
         'legal_ids': legal_ids,
         'logo_url': setup.logo.url if setup.logo else None,
         'logo_path': setup.logo.path if setup.logo else None,
+        'logo_data_uri': _logo_data_uri(setup),
+        'country_code': setup.country_code or '',
         'currency_code': default_currency.code if default_currency else '',
         'currency_symbol': default_currency.symbol if default_currency else '',
         'bank_name': setup.bank_name or '',
@@ -89,6 +162,8 @@ def _get_fallback_context():
         'legal_ids': [],
         'logo_url': None,
         'logo_path': None,
+        'logo_data_uri': None,
+        'country_code': '',
         'currency_code': '',
         'currency_symbol': '',
         'bank_name': '',
@@ -0,0 +1,221 @@
+# core/services/pdf_renderer.py
+"""
+Rendu PDF partagé (WeasyPrint) des documents de vente, de paie et RH.
+
+- Les feuilles de style (CSS) et la configuration des polices sont
+  construites une seule fois par processus ; le contexte entreprise est
+  mémorisé par get_company_context().
+- render_batch() rend N documents à la suite, en partageant ces
+  ressources ; les lots sont répartis entre workers Celery par les
+  appelants (tâches par lot).
+- Chaque PDF est mis en cache sur disque sous l'empreinte SHA-256 de son
+  HTML et de ses feuilles de style : un document inchangé n'est pas
+  reconverti. Les valeurs « volatiles » (date de génération) n'entrent pas
+  dans l'empreinte : un PDF repris du cache porte la date de son premier
+  rendu, pas celle de la demande.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import render_to_string
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = 'pdf_cache'
+
+# Jeux de feuilles de style : (règle @page, fichiers statiques)
+PDF_STYLESHEETS = {
+    'default': ('', []),
+    'sales': ('@page { size: A4; margin: 1cm }', ['sales/css/pdf_styles.css']),
+    'a4_1cm': ('@page { size: A4; margin: 1cm; }', []),
+    'a4_2cm': ('@page { size: A4; margin: 2cm; }', []),
+}
+
+# Document à rendre. Les clés de `volatile` (date de génération...) sont
+# exclues de l'empreinte : elles seules ne justifient pas un nouveau rendu.
+# Un PDF repris du cache affiche donc les valeurs volatiles de son premier
+# rendu ; une valeur qui doit refléter la demande ne doit pas être volatile.
+PDFDocument = namedtuple(
+    'PDFDocument',
+    ['template_name', 'context', 'stylesheet', 'volatile'],
+    defaults=('default', ()),
+)
+
+
+def _static_path(path):
+    """Chemin d'un fichier statique (STATIC_ROOT, sinon les finders)."""
+    candidate = os.path.join(settings.STATIC_ROOT, path)
+    if os.path.exists(candidate):
+        return candidate
+    return finders.find(path)
+
+
+class PDFRenderer:
+    """Conversion HTML → PDF avec feuilles de style et cache partagés."""
+
+    # Par processus : {nom: (empreinte, [CSS])} et configuration des polices
+    _stylesheets = {}
+    _font_config = None
+
+    @classmethod
+    def font_config(cls):
+        if cls._font_config is None:
+            from weasyprint.text.fonts import FontConfiguration
+
+            cls._font_config = FontConfiguration()
+        return cls._font_config
+
+    @classmethod
+    def stylesheets(cls, name):
+        """
+        Feuilles de style analysées d'un jeu de PDF_STYLESHEETS.
+
+        Returns:
+            tuple: (empreinte des sources CSS, [CSS])
+        """
+        if name in cls._stylesheets:
+            return cls._stylesheets[name]
+
+        from weasyprint import CSS
+
+        page_rule, files = PDF_STYLESHEETS[name]
+        sources = [page_rule] if page_rule else []
+        for path in files:
+            absolute_path = _static_path(path)
+            if not absolute_path:
+                logger.warning(f'[PDF] Feuille de style introuvable : {path}')
+                continue
+            with open(absolute_path, encoding='utf-8') as fh:
+                sources.append(fh.read())
+
+        font_config = cls.font_config()
+        parsed = [CSS(string=source, font_config=font_config) for source in sources]
+        digest = hashlib.sha256('\0'.join(sources).encode()).hexdigest()
+        cls._stylesheets[name] = (digest, parsed)
+        return cls._stylesheets[name]
+
+    # ── Cache des PDF ─────────────────────────────────────────
+
+    @classmethod
+    def content_hash(cls, html, stylesheet='default'):
+        digest, _parsed = cls.stylesheets(stylesheet)
+        return hashlib.sha256(f'{digest}\0{html}'.encode()).hexdigest()
+
+    @staticmethod
+    def _cache_path(key):
+        return os.path.join(settings.MEDIA_ROOT, PDF_CACHE_DIR, key[:2], f'{key}.pdf')
+
+    @classmethod
+    def cached_pdf(cls, key):
+        """PDF en cache pour cette empreinte, None sinon."""
+        if not getattr(settings, 'PDF_CACHE_ENABLED', True):
+            return None
+        path = cls._cache_path(key)
+        try:
+            with open(path, 'rb') as fh:
+                pdf = fh.read()
+        except FileNotFoundError:
+            return None
+        # Date d'accès : la purge ne supprime que les entrées inutilisées
+        os.utime(path)
+        return pdf
+
+    @classmethod
+    def store_pdf(cls, key, pdf):
+        if not getattr(settings, 'PDF_CACHE_ENABLED', True):
+            return
+        path = cls._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as fh:
+            fh.write(pdf)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def cleanup_cache(days):
+        """
+        Supprime les PDF en cache inutilisés depuis plus de `days` jours.
+
+        Returns:
+            int: nombre de fichiers supprimés
+        """
+        cache_dir = os.path.join(settings.MEDIA_ROOT, PDF_CACHE_DIR)
+        cutoff = time.time() - days * 86400
+        removed = 0
+        for root, _dirs, files in os.walk(cache_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError as e:
+                    logger.warning(f'[PDF] Impossible de supprimer {path} : {e}')
+        return removed
+
+    # ── Rendu ─────────────────────────────────────────────────
+
+    @classmethod
+    def write_pdf(cls, html, stylesheet='default'):
+        """Convertit le HTML en PDF, sans cache."""
+        from weasyprint import HTML
+
+        _digest, parsed = cls.stylesheets(stylesheet)
+        return HTML(string=html).write_pdf(
+            stylesheets=parsed, font_config=cls.font_config()
+        )
+
+    @classmethod
+    def _prepare(cls, document):
+        """
+        Rend le gabarit du document et consulte le cache.
+
+        Returns:
+            tuple: (empreinte, HTML, PDF en cache ou None)
+        """
+        template_name, context, stylesheet, volatile = document
+        stable_context = {k: v for k, v in context.items() if k not in volatile}
+        html = render_to_string(template_name, stable_context)
+        key = cls.content_hash(html, stylesheet)
+        pdf = cls.cached_pdf(key)
+        if pdf is None and volatile:
+            html = render_to_string(template_name, context)
+        return key, html, pdf
+
+    @classmethod
+    def render(cls, template_name, context, stylesheet='default', volatile=()):
+        """
+        PDF d'un document (bytes), repris du cache s'il est inchangé.
+
+        Seules les clés `volatile` du contexte peuvent différer entre deux
+        rendus d'un même PDF en cache : le PDF renvoyé garde celles du
+        premier rendu (date de génération d'origine).
+        """
+        document = PDFDocument(template_name, context, stylesheet, volatile)
+        key, html, pdf = cls._prepare(document)
+        if pdf is None:
+            pdf = cls.write_pdf(html, stylesheet)
+            cls.store_pdf(key, pdf)
+        return pdf
+
+    @classmethod
+    def render_batch(cls, documents):
+        """
+        Rend une série de documents (PDFDocument) dans le processus courant,
+        les documents inchangés étant repris du cache.
+
+        Yields:
+            bytes: PDF de chaque document, dans l'ordre de `documents`
+        """
+        for document in documents:
+            key, html, pdf = cls._prepare(document)
+            if pdf is None:
+                pdf = cls.write_pdf(html, document.stylesheet)
+                cls.store_pdf(key, pdf)
+            yield pdf
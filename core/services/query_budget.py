@@ -0,0 +1,150 @@
+"""
+Budget de requêtes SQL par vue.
+
+QueryRecorder s'installe comme execute_wrapper sur les connexions le temps
+d'une requête HTTP : il compte les requêtes, mesure le temps passé en base
+et regroupe les requêtes par empreinte (SQL normalisé, paramètres et
+listes IN retirés). Une même empreinte exécutée de nombreuses fois dans
+une requête est la signature d'un N+1.
+
+QueryBudgetStats agrège ces mesures par vue/action (ex.
+'InvoiceViewSet.list') pour le processus courant.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|[-\d.]+|\'[^\']*\')\s*,?)+\)', re.I)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL normalisé : valeurs littérales et listes IN remplacées par '?'."""
+    sql = _IN_LIST.sub('IN (?)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def get_budget(endpoint):
+    """Nombre maximal de requêtes admis pour une vue/action."""
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(endpoint, settings.QUERY_BUDGET_DEFAULT)
+
+
+class QueryRecorder:
+    """execute_wrapper enregistrant les requêtes d'une requête HTTP."""
+
+    def __init__(self):
+        self.statements = []
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.statements.append(sql)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def summary(self, top=5):
+        """
+        Mesures de la requête.
+
+        Returns:
+            dict: count, db_time_ms, duplicates (requêtes exécutées en plus
+                de la première occurrence de leur empreinte), max_repeat et
+                top_duplicates [(empreinte, occurrences)]
+        """
+        # Les mêmes chaînes SQL reviennent : normalisation une fois par chaîne
+        fingerprints = {}
+        counter = Counter()
+        for sql in self.statements:
+            key = fingerprints.get(sql)
+            if key is None:
+                key = fingerprints[sql] = fingerprint(sql)
+            counter[key] += 1
+
+        repeated = [(key, n) for key, n in counter.most_common(top) if n > 1]
+        return {
+            'count': len(self.statements),
+            'db_time_ms': round(self.db_time * 1000, 2),
+            'duplicates': len(self.statements) - len(counter),
+            'max_repeat': repeated[0][1] if repeated else 1 if counter else 0,
+            'top_duplicates': repeated,
+        }
+
+
+class QueryBudgetStats:
+    """Agrégats par vue/action pour le processus courant."""
+
+    _lock = threading.Lock()
+    _endpoints = {}
+
+    @classmethod
+    def record(cls, endpoint, summary, budget):
+        over_budget = summary['count'] > budget
+        with cls._lock:
+            stats = cls._endpoints.get(endpoint)
+            if stats is None:
+                stats = cls._endpoints[endpoint] = {
+                    'requests': 0,
+                    'queries': 0,
+                    'max_queries': 0,
+                    'db_time_ms': 0.0,
+                    'max_repeat': 0,
+                    'over_budget': 0,
+                    'top_duplicates': [],
+                }
+            stats['requests'] += 1
+            stats['queries'] += summary['count']
+            stats['db_time_ms'] += summary['db_time_ms']
+            stats['max_queries'] = max(stats['max_queries'], summary['count'])
+            if summary['max_repeat'] > stats['max_repeat']:
+                stats['max_repeat'] = summary['max_repeat']
+                stats['top_duplicates'] = summary['top_duplicates']
+            if over_budget:
+                stats['over_budget'] += 1
+        return over_budget
+
+    @classmethod
+    def snapshot(cls):
+        """Agrégats par vue, les plus coûteuses en requêtes d'abord."""
+        with cls._lock:
+            endpoints = {
+                endpoint: dict(stats) for endpoint, stats in cls._endpoints.items()
+            }
+
+        rows = []
+        for endpoint, stats in endpoints.items():
+            requests = stats['requests']
+            rows.append(
+                {
+                    'endpoint': endpoint,
+                    'budget': get_budget(endpoint),
+                    'requests': requests,
+                    'avg_queries': round(stats['queries'] / requests, 1),
+                    'max_queries': stats['max_queries'],
+                    'avg_db_time_ms': round(stats['db_time_ms'] / requests, 2),
+                    'max_repeat': stats['max_repeat'],
+                    'over_budget': stats['over_budget'],
+                    'top_duplicates': stats['top_duplicates'],
+                }
+            )
+        rows.sort(key=lambda row: row['max_queries'], reverse=True)
+        return rows
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._endpoints.clear()
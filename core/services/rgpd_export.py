@@ -0,0 +1,466 @@
+# core/services/rgpd_export.py
+"""
+Export RGPD (droit à la portabilité) : archive ZIP de toutes les données
+de l'entreprise, un fichier JSON Lines (une ligne JSON par enregistrement)
+par table.
+
+L'archive est écrite sur disque au fil de l'eau : chaque table est lue par
+lots (values_list + iterator) et écrite ligne à ligne dans son entrée ZIP,
+sans jamais charger une table entière en mémoire. L'export tourne dans une
+tâche Celery (core.tasks.export_rgpd_data) qui rend compte de son
+avancement sur un BackgroundJob.
+"""
+
+import json
+import logging
+import os
+import zipfile
+from datetime import datetime
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .background_jobs import JobReporter, cleanup_job_files, job_file_path
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = 'rgpd_export'
+EXPORT_DIR = 'exports'
+
+# Conservation des archives (jours)
+EXPORT_RETENTION_DAYS = 7
+
+# Lignes lues par requête
+EXPORT_CHUNK_SIZE = 2000
+
+# (fichier dans l'archive, modèle, champs exportés)
+EXPORT_TABLES = [
+    # ── Core ─────────────────────────────────────────────
+    (
+        'core/currencies.jsonl',
+        'core.Currency',
+        [
+            'id',
+            'code',
+            'name',
+            'symbol',
+            'is_default',
+            'exchange_rate',
+            'decimal_places',
+            'symbol_position',
+        ],
+    ),
+    (
+        'core/company_setup.jsonl',
+        'core.CompanySetup',
+        [
+            'id',
+            'company_name',
+            'country_code',
+            'accounting_pack',
+            'address_line1',
+            'city',
+            'postal_code',
+            'country',
+            'phone',
+            'email',
+            'website',
+            'bank_name',
+            'bank_account',
+        ],
+    ),
+    # ── CRM ──────────────────────────────────────────────
+    (
+        'crm/contacts.jsonl',
+        'crm.Contact',
+        [
+            'id',
+            'first_name',
+            'last_name',
+            'email',
+            'phone',
+            'mobile',
+            'title',
+            'company_id',
+            'created_at',
+        ],
+    ),
+    (
+        'crm/companies.jsonl',
+        'crm.Company',
+        [
+            'id',
+            'name',
+            'email',
+            'phone',
+            'website',
+            'industry_id',
+            'city',
+            'country',
+            'created_at',
+        ],
+    ),
+    (
+        'crm/opportunities.jsonl',
+        'crm.Opportunity',
+        [
+            'id',
+            'name',
+            'company_id',
+            'stage_id',
+            'amount',
+            'probability',
+            'expected_close_date',
+            'created_at',
+        ],
+    ),
+    (
+        'crm/activities.jsonl',
+        'crm.Activity',
+        [
+            'id',
+            'activity_type_id',
+            'subject',
+            'description',
+            'start_date',
+            'created_at',
+        ],
+    ),
+    # ── Ventes ───────────────────────────────────────────
+    (
+        'sales/products.jsonl',
+        'catalog.Product',
+        [
+            'id',
+            'reference',
+            'name',
+            'product_type',
+            'unit_price',
+            'tax_rate',
+            'stock_alert_threshold',
+            'is_active',
+        ],
+    ),
+    (
+        'sales/quotes.jsonl',
+        'sales.Quote',
+        [
+            'id',
+            'number',
+            'company_id',
+            'status',
+            'subtotal',
+            'total',
+            'date',
+            'expiration_date',
+            'created_at',
+        ],
+    ),
+    (
+        'sales/orders.jsonl',
+        'sales.Order',
+        [
+            'id',
+            'number',
+            'company_id',
+            'status',
+            'subtotal',
+            'total',
+            'date',
+            'created_at',
+        ],
+    ),
+    (
+        'sales/invoices.jsonl',
+        'sales.Invoice',
+        [
+            'id',
+            'number',
+            'type',
+            'company_id',
+            'payment_status',
+            'subtotal',
+            'total',
+            'amount_due',
+            'date',
+            'due_date',
+            'created_at',
+        ],
+    ),
+    (
+        'sales/payments.jsonl',
+        'sales.Payment',
+        ['id', 'invoice_id', 'amount', 'method', 'date', 'reference'],
+    ),
+    # ── Achats ───────────────────────────────────────────
+    (
+        'purchasing/suppliers.jsonl',
+        'purchasing.Supplier',
+        [
+            'id',
+            'name',
+            'email',
+            'phone',
+            'address',
+            'tax_id',
+            'is_active',
+            'created_at',
+        ],
+    ),
+    (
+        'purchasing/purchase_orders.jsonl',
+        'purchasing.PurchaseOrder',
+        [
+            'id',
+            'number',
+            'supplier_id',
+            'state',
+            'subtotal',
+            'total',
+            'date',
+            'expected_delivery_date',
+            'created_at',
+        ],
+    ),
+    (
+        'purchasing/supplier_invoices.jsonl',
+        'purchasing.SupplierInvoice',
+        [
+            'id',
+            'number',
+            'supplier_id',
+            'state',
+            'subtotal',
+            'total',
+            'date',
+            'due_date',
+            'created_at',
+        ],
+    ),
+    # ── Stocks ───────────────────────────────────────────
+    (
+        'inventory/warehouses.jsonl',
+        'inventory.Warehouse',
+        ['id', 'name', 'code', 'address', 'is_active'],
+    ),
+    (
+        'inventory/stock_levels.jsonl',
+        'inventory.StockLevel',
+        [
+            'id',
+            'product_id',
+            'warehouse_id',
+            'quantity_on_hand',
+            'quantity_reserved',
+            'last_updated',
+        ],
+    ),
+    (
+        'inventory/stock_movements.jsonl',
+        'inventory.StockMove',
+        [
+            'id',
+            'product_id',
+            'warehouse_id',
+            'move_type',
+            'quantity',
+            'reference',
+            'date',
+            'created_at',
+        ],
+    ),
+    # ── RH ───────────────────────────────────────────────
+    (
+        'hr/departments.jsonl',
+        'hr.Department',
+        ['id', 'name', 'code', 'created_at'],
+    ),
+    (
+        'hr/positions.jsonl',
+        'hr.JobTitle',
+        ['id', 'name', 'department_id', 'created_at'],
+    ),
+    (
+        'hr/employees.jsonl',
+        'hr.Employee',
+        [
+            'id',
+            'employee_id',
+            'first_name',
+            'last_name',
+            'email',
+            'phone',
+            'hire_date',
+            'is_active',
+            'created_at',
+        ],
+    ),
+    # ── Paie ─────────────────────────────────────────────
+    (
+        'payroll/payslips.jsonl',
+        'payroll.PaySlip',
+        [
+            'id',
+            'number',
+            'payroll_run_id',
+            'employee_id',
+            'gross_salary',
+            'net_salary',
+            'status',
+            'created_at',
+        ],
+    ),
+    # ── Comptabilité ─────────────────────────────────────
+    (
+        'accounting/accounts.jsonl',
+        'accounting.Account',
+        ['id', 'code', 'name', 'type_id', 'is_active'],
+    ),
+    (
+        'accounting/journals.jsonl',
+        'accounting.Journal',
+        ['id', 'code', 'name', 'type'],
+    ),
+    (
+        'accounting/journal_entries.jsonl',
+        'accounting.JournalEntry',
+        ['id', 'name', 'journal_id', 'date', 'ref', 'narration', 'state', 'created_at'],
+    ),
+    # ── Recrutement ──────────────────────────────────────
+    (
+        'recruitment/job_offers.jsonl',
+        'recruitment.JobOpening',
+        [
+            'id',
+            'reference',
+            'title',
+            'status',
+            'location',
+            'contract_type',
+            'opening_date',
+            'created_at',
+        ],
+    ),
+    (
+        'recruitment/applications.jsonl',
+        'recruitment.Application',
+        [
+            'id',
+            'job_opening_id',
+            'candidate_id',
+            'status',
+            'application_date',
+            'created_at',
+        ],
+    ),
+    # ── Utilisateurs ─────────────────────────────────────
+    (
+        'users/users.jsonl',
+        'auth.User',
+        [
+            'id',
+            'username',
+            'email',
+            'first_name',
+            'last_name',
+            'is_active',
+            'is_staff',
+            'date_joined',
+            'last_login',
+        ],
+    ),
+    # ── Notifications ────────────────────────────────────
+    (
+        'notifications/notifications.jsonl',
+        'notifications.Notification',
+        ['id', 'level', 'title', 'message', 'module', 'is_read', 'created_at'],
+    ),
+]
+
+
+def _export_tables():
+    """[(fichier, queryset, champs)] des tables des applications installées."""
+    tables = []
+    for filename, model_label, fields in EXPORT_TABLES:
+        try:
+            model = apps.get_model(model_label)
+        except LookupError:
+            continue
+        tables.append((filename, model._default_manager.order_by('pk'), fields))
+    return tables
+
+
+def write_table(zf, filename, queryset, fields, reporter=None):
+    """
+    Écrit une table dans l'archive, une ligne JSON par enregistrement.
+
+    Returns:
+        int: nombre de lignes écrites
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    count = 0
+    lines = []
+    with zf.open(filename, 'w', force_zip64=True) as fh:
+        rows = queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for row in rows:
+            lines.append(encoder.encode(dict(zip(fields, row))))
+            if len(lines) >= EXPORT_CHUNK_SIZE:
+                fh.write(('\n'.join(lines) + '\n').encode())
+                count += len(lines)
+                if reporter:
+                    reporter.advance(len(lines), message=filename)
+                lines = []
+        if lines:
+            fh.write(('\n'.join(lines) + '\n').encode())
+            count += len(lines)
+            if reporter:
+                reporter.advance(len(lines), message=filename)
+    return count
+
+
+def run_export(job):
+    """
+    Produit l'archive de la tâche et l'enregistre dans job.file_path.
+
+    Returns:
+        dict: {fichier: nombre de lignes}
+    """
+    reporter = JobReporter(job)
+    tables = _export_tables()
+    reporter.start(sum(queryset.count() for _name, queryset, _fields in tables))
+
+    cleanup_job_files(JOB_TYPE, EXPORT_RETENTION_DAYS)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    absolute_path, relative_path = job_file_path(
+        EXPORT_DIR, f'cleo_export_{timestamp}_{job.pk}.zip'
+    )
+
+    counts = {}
+    try:
+        with zipfile.ZipFile(absolute_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for filename, queryset, fields in tables:
+                counts[filename] = write_table(zf, filename, queryset, fields, reporter)
+
+            # ── Métadonnées ──────────────────────────────────────
+            meta = {
+                'export_date': datetime.now().isoformat(),
+                'platform': 'Cleo ERP',
+                'version': settings.VERSION,
+                'export_type': 'RGPD — Portabilité des données (Art. 20)',
+                'format': 'JSON Lines (un enregistrement JSON par ligne)',
+                'requested_by': job.created_by.username if job.created_by else '',
+                'tables': counts,
+            }
+            zf.writestr('metadata.json', json.dumps(meta, indent=2, ensure_ascii=False))
+    except Exception:
+        if os.path.exists(absolute_path):
+            os.remove(absolute_path)
+        raise
+
+    reporter.finish(
+        result={'tables': counts, 'rows': sum(counts.values())},
+        file_path=relative_path,
+    )
+    logger.info('[RGPD] Export %s terminé : %s lignes', job.pk, sum(counts.values()))
+    return counts
@@ -0,0 +1,429 @@
+# core/services/search_index.py
+"""
+Index de la recherche globale (table SearchEntry).
+
+Chaque objet recherchable (entreprises, contacts, produits, documents de
+vente et d'achat, employés, entrepôts, comptes...) y a une entrée : module,
+type, libellé, URL et texte normalisé (minuscules, sans accents ni
+ponctuation). L'index est tenu à jour par les signaux post_save /
+post_delete (core/search_signals.py) et reconstruit par la commande
+rebuild_search_index (lancée par entrypoint.sh tant que l'index est vide).
+
+La recherche est une seule requête sur SearchEntry, filtrée sur les
+modules autorisés. Sous PostgreSQL, les sous-chaînes sont résolues par
+l'index GIN pg_trgm et classées par similarité de trigrammes ; ailleurs
+(SQLite), le classement est calculé en Python sur les entrées trouvées.
+"""
+
+import re
+import unicodedata
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from ..models import SearchEntry
+
+# Taille des lots d'indexation
+INDEX_BATCH_SIZE = 1000
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_text(*values):
+    """Texte en minuscules, sans accents ni ponctuation, mots séparés par un espace."""
+    text = ' '.join(str(value) for value in values if value)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(_NON_WORD.split(text.lower())).strip()
+
+
+def trigrams(text):
+    """Trigrammes des mots du texte, calculés comme pg_trgm."""
+    result = set()
+    for word in text.split():
+        padded = f'  {word} '
+        result.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class SearchableModel:
+    """
+    Description d'un modèle indexé.
+
+    Args:
+        model: 'app_label.ModelName'
+        module: module de permission ('crm', 'sales'...)
+        entity_type: type affiché ('Entreprise', 'Facture'...)
+        fields: champs du modèle lus par search_values / label / description
+            (un enregistrement avec update_fields qui n'en touche aucun ne
+            réindexe pas)
+        search_values: obj -> valeurs indexées
+        label, description, url: obj -> texte affiché
+        select_related: relations lues par les fonctions ci-dessus
+        depends_on: {'app_label.ModelName': lookup} — réindexer les objets
+            liés quand l'entrée de ce modèle change (nom d'une entreprise
+            repris par ses devis...)
+    """
+
+    def __init__(
+        self,
+        model,
+        module,
+        entity_type,
+        fields,
+        search_values,
+        label,
+        url,
+        description=None,
+        select_related=(),
+        depends_on=None,
+    ):
+        self.model_label = model
+        self.module = module
+        self.entity_type = entity_type
+        self.fields = set(fields)
+        self.search_values = search_values
+        self.label = label
+        self.description = description
+        self.url = url
+        self.select_related = select_related
+        self.depends_on = depends_on or {}
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def queryset(self):
+        return self.model._default_manager.select_related(*self.select_related)
+
+    def build_entry(self, obj, content_type):
+        return SearchEntry(
+            content_type=content_type,
+            object_id=obj.pk,
+            module=self.module,
+            entity_type=self.entity_type,
+            label=str(self.label(obj))[:255],
+            description=str(self.description(obj) or '')[:255]
+            if self.description
+            else '',
+            url=self.url(obj)[:255],
+            search_text=normalize_text(*self.search_values(obj)),
+        )
+
+
+def _company_name(obj):
+    return obj.company.name if obj.company else ''
+
+
+SEARCHABLE_MODELS = [
+    SearchableModel(
+        'crm.Company',
+        'crm',
+        'Entreprise',
+        fields=('name', 'email', 'phone'),
+        search_values=lambda obj: (obj.name, obj.email, obj.phone),
+        label=lambda obj: obj.name,
+        url=lambda obj: f'/crm/companies/{obj.pk}',
+    ),
+    SearchableModel(
+        'crm.Contact',
+        'crm',
+        'Contact',
+        fields=('first_name', 'last_name', 'email', 'company'),
+        search_values=lambda obj: (obj.first_name, obj.last_name, obj.email),
+        label=lambda obj: f'{obj.first_name} {obj.last_name}',
+        description=_company_name,
+        url=lambda obj: f'/crm/contacts/{obj.pk}',
+        select_related=('company',),
+        depends_on={'crm.Company': 'company'},
+    ),
+    SearchableModel(
+        'crm.Opportunity',
+        'crm',
+        'Opportunité',
+        fields=('name', 'company'),
+        search_values=lambda obj: (obj.name,),
+        label=lambda obj: obj.name,
+        description=_company_name,
+        url=lambda obj: f'/crm/opportunities/{obj.pk}',
+        select_related=('company',),
+        depends_on={'crm.Company': 'company'},
+    ),
+    SearchableModel(
+        'catalog.Product',
+        'sales',
+        'Produit',
+        fields=('name', 'reference'),
+        search_values=lambda obj: (obj.name, obj.reference),
+        label=lambda obj: f'{obj.reference} — {obj.name}',
+        url=lambda obj: f'/sales/products/{obj.pk}',
+    ),
+    *(
+        SearchableModel(
+            model,
+            'sales',
+            entity_type,
+            fields=('number', 'company'),
+            search_values=lambda obj: (obj.number, _company_name(obj)),
+            label=lambda obj: obj.number,
+            description=_company_name,
+            url=lambda obj, path=path: f'/sales/{path}/{obj.pk}',
+            select_related=('company',),
+            depends_on={'crm.Company': 'company'},
+        )
+        for model, entity_type, path in (
+            ('sales.Quote', 'Devis', 'quotes'),
+            ('sales.Order', 'Commande', 'orders'),
+            ('sales.Invoice', 'Facture', 'invoices'),
+        )
+    ),
+    SearchableModel(
+        'purchasing.Supplier',
+        'purchasing',
+        'Fournisseur',
+        fields=('name', 'code', 'email'),
+        search_values=lambda obj: (obj.name, obj.code, obj.email),
+        label=lambda obj: f'{obj.code} — {obj.name}',
+        url=lambda obj: f'/purchasing/suppliers/{obj.pk}',
+    ),
+    SearchableModel(
+        'purchasing.PurchaseOrder',
+        'purchasing',
+        'Bon de commande',
+        fields=('number', 'supplier'),
+        search_values=lambda obj: (obj.number, obj.supplier.name),
+        label=lambda obj: obj.number,
+        description=lambda obj: obj.supplier.name,
+        url=lambda obj: f'/purchasing/orders/{obj.pk}',
+        select_related=('supplier',),
+        depends_on={'purchasing.Supplier': 'supplier'},
+    ),
+    SearchableModel(
+        'purchasing.SupplierInvoice',
+        'purchasing',
+        'Facture fournisseur',
+        fields=('number', 'supplier', 'supplier_reference'),
+        search_values=lambda obj: (
+            obj.number,
+            obj.supplier.name,
+            obj.supplier_reference,
+        ),
+        label=lambda obj: obj.number,
+        description=lambda obj: obj.supplier.name,
+        url=lambda obj: f'/purchasing/invoices/{obj.pk}',
+        select_related=('supplier',),
+        depends_on={'purchasing.Supplier': 'supplier'},
+    ),
+    SearchableModel(
+        'hr.Employee',
+        'hr',
+        'Employé',
+        fields=('first_name', 'last_name', 'employee_id'),
+        search_values=lambda obj: (obj.first_name, obj.last_name, obj.employee_id),
+        label=lambda obj: f'{obj.first_name} {obj.last_name}',
+        description=lambda obj: obj.employee_id,
+        url=lambda obj: f'/hr/employees/{obj.pk}',
+    ),
+    SearchableModel(
+        'inventory.Warehouse',
+        'inventory',
+        'Entrepôt',
+        fields=('name', 'code'),
+        search_values=lambda obj: (obj.name, obj.code),
+        label=lambda obj: f'{obj.code} — {obj.name}',
+        url=lambda obj: '/inventory/warehouses',
+    ),
+    SearchableModel(
+        'accounting.Account',
+        'accounting',
+        'Compte',
+        fields=('code', 'name'),
+        search_values=lambda obj: (obj.code, obj.name),
+        label=lambda obj: f'{obj.code} — {obj.name}',
+        url=lambda obj: f'/accounting/accounts/{obj.pk}',
+    ),
+    SearchableModel(
+        'accounting.Journal',
+        'accounting',
+        'Journal',
+        fields=('code', 'name'),
+        search_values=lambda obj: (obj.code, obj.name),
+        label=lambda obj: f'{obj.code} — {obj.name}',
+        url=lambda obj: f'/accounting/journals/{obj.pk}',
+    ),
+]
+
+
+class SearchIndex:
+    """Mise à jour de l'index et recherche."""
+
+    @staticmethod
+    def searchable_model(model):
+        """SearchableModel du modèle, None s'il n'est pas indexé."""
+        label = model._meta.label
+        for searchable in SEARCHABLE_MODELS:
+            if searchable.model_label == label:
+                return searchable
+        return None
+
+    @staticmethod
+    def index_queryset(searchable, queryset=None):
+        """
+        Indexe (crée ou met à jour) les objets du queryset par lots.
+
+        Returns:
+            int: nombre d'objets indexés
+        """
+        if queryset is None:
+            queryset = searchable.queryset()
+        content_type = ContentType.objects.get_for_model(searchable.model)
+        count = 0
+        batch = []
+        for obj in queryset.iterator(chunk_size=INDEX_BATCH_SIZE):
+            batch.append(searchable.build_entry(obj, content_type))
+            if len(batch) >= INDEX_BATCH_SIZE:
+                count += SearchIndex._write(batch)
+                batch = []
+        if batch:
+            count += SearchIndex._write(batch)
+        return count
+
+    @staticmethod
+    def _write(entries):
+        SearchEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['content_type', 'object_id'],
+            update_fields=[
+                'module',
+                'entity_type',
+                'label',
+                'description',
+                'url',
+                'search_text',
+            ],
+        )
+        return len(entries)
+
+    @staticmethod
+    def index_object(instance, update_fields=None):
+        """
+        Indexe un objet puis, si son entrée a changé, les objets qui en
+        reprennent le texte (depends_on).
+
+        Returns:
+            bool: True si l'entrée a été créée ou modifiée
+        """
+        searchable = SearchIndex.searchable_model(type(instance))
+        if searchable is None:
+            return False
+        if update_fields is not None and not searchable.fields & set(update_fields):
+            return False
+
+        content_type = ContentType.objects.get_for_model(searchable.model)
+        entry = searchable.build_entry(instance, content_type)
+        current = (
+            SearchEntry.objects.filter(content_type=content_type, object_id=instance.pk)
+            .values_list('label', 'description', 'url', 'search_text')
+            .first()
+        )
+        if current == (entry.label, entry.description, entry.url, entry.search_text):
+            return False
+
+        SearchIndex._write([entry])
+        for dependent in SEARCHABLE_MODELS:
+            lookup = dependent.depends_on.get(searchable.model_label)
+            if lookup:
+                SearchIndex.index_queryset(
+                    dependent, dependent.queryset().filter(**{lookup: instance.pk})
+                )
+        return True
+
+    @staticmethod
+    def remove_object(instance):
+        SearchEntry.objects.filter(
+            content_type=ContentType.objects.get_for_model(type(instance)),
+            object_id=instance.pk,
+        ).delete()
+
+    @staticmethod
+    def rebuild(modules=None):
+        """
+        Reconstruit l'index (tous les modules, ou ceux de la liste).
+
+        Returns:
+            dict: {'app_label.ModelName': nombre d'entrées}
+        """
+        counts = {}
+        for searchable in SEARCHABLE_MODELS:
+            if modules and searchable.module not in modules:
+                continue
+            SearchEntry.objects.filter(
+                content_type=ContentType.objects.get_for_model(searchable.model)
+            ).delete()
+            counts[searchable.model_label] = SearchIndex.index_queryset(searchable)
+        return counts
+
+    @staticmethod
+    def search(query, modules=None, per_type=5, limit=20):
+        """
+        Entrées correspondant à tous les mots de la requête, classées par
+        pertinence, au plus per_type par type d'entité.
+
+        Args:
+            query: texte saisi
+            modules: modules autorisés (None = tous)
+            per_type: nombre max de résultats par type d'entité
+            limit: nombre max de résultats
+
+        Returns:
+            tuple: (entrées retenues, nombre total après plafonnement par type)
+        """
+        normalized = normalize_text(query)
+        words = normalized.split()
+        if not words:
+            return [], 0
+
+        queryset = SearchEntry.objects.all()
+        if modules is not None:
+            queryset = queryset.filter(module__in=modules)
+        for word in words:
+            queryset = queryset.filter(search_text__contains=word)
+
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import TrigramWordSimilarity
+
+            queryset = (
+                queryset.annotate(rank=TrigramWordSimilarity(normalized, 'search_text'))
+                .annotate(
+                    position=Window(
+                        RowNumber(),
+                        partition_by=[F('entity_type')],
+                        order_by=[F('rank').desc(), F('label').asc()],
+                    )
+                )
+                .filter(position__lte=per_type)
+                .order_by('-rank', 'label')
+            )
+            entries = list(queryset)
+            return entries[:limit], len(entries)
+
+        query_trigrams = trigrams(normalized)
+        ranked = []
+        for entry in queryset:
+            entry.rank = len(query_trigrams & trigrams(entry.search_text)) / len(
+                query_trigrams
+            )
+            ranked.append(entry)
+        ranked.sort(key=lambda entry: (-entry.rank, entry.label))
+
+        by_type = {}
+        entries = []
+        for entry in ranked:
+            by_type[entry.entity_type] = by_type.get(entry.entity_type, 0) + 1
+            if by_type[entry.entity_type] <= per_type:
+                entries.append(entry)
+        return entries[:limit], len(entries)
@@ -0,0 +1,21 @@
+"""
+Invalidation du contexte entreprise mémorisé (get_company_context).
+
+Importé dans CoreConfig.ready() : toute modification du paramétrage de
+l'entreprise ou d'une devise invalide le contexte de tous les processus.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CompanySetup, Currency
+from .services.company_service import invalidate_company_context
+
+
+@receiver(post_save, sender=CompanySetup)
+@receiver(post_delete, sender=CompanySetup)
+@receiver(post_save, sender=Currency)
+@receiver(post_delete, sender=Currency)
+def invalidate_company_context_cache(sender, **kwargs):
+    """Paramétrage ou devise modifié."""
+    invalidate_company_context()
@@ -122,3 +122,30 @@ def _cleanup_old_backups(days=30):
 def backup_database_manual():
     """Alias pour déclenchement manuel depuis l'API."""
     return backup_database()
+
+
+@shared_task(name='core.tasks.export_rgpd_data')
+def export_rgpd_data(job_id):
+    """Export RGPD en tâche de fond (voir core/services/rgpd_export.py)."""
+    from core.models import BackgroundJob
+    from core.services.background_jobs import JobReporter
+    from core.services.rgpd_export import run_export
+
+    job = BackgroundJob.objects.select_related('created_by').get(pk=job_id)
+    try:
+        counts = run_export(job)
+    except Exception as e:
+        logger.exception(f'[RGPD] Export {job_id} échoué : {e}')
+        JobReporter(job).fail(e)
+        return {'status': 'error', 'error': str(e)}
+    return {'status': 'success', 'rows': sum(counts.values())}
+
+
+@shared_task(name='core.tasks.cleanup_pdf_cache')
+def cleanup_pdf_cache():
+    """Purge des PDF en cache inutilisés (voir core/services/pdf_renderer.py)."""
+    from core.services.pdf_renderer import PDFRenderer
+
+    removed = PDFRenderer.cleanup_cache(settings.PDF_CACHE_RETENTION_DAYS)
+    logger.info(f'[PDF] {removed} PDF supprimés du cache')
+    return {'status': 'success', 'removed': removed}
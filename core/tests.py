@@ -0,0 +1,271 @@
+import io
+import json
+import os
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from core.management.commands.check_query_budgets import router_list_routes
+from core.models import BackgroundJob
+from core.services import rgpd_export
+from core.services.search_index import SearchIndex, normalize_text
+from core.tasks import export_rgpd_data
+
+ROUTES = router_list_routes()
+
+# Lignes par liste : assez pour qu'un N+1 dépasse QUERY_BUDGET_MAX_REPEAT
+ROWS = 6
+
+
+@pytest.fixture
+def budget_client(client, settings):
+    """Client superutilisateur, mesure des requêtes active, listes remplies."""
+    from catalog.models import Product
+    from core.models import Currency
+    from crm.models import Company, Contact
+    from hr.models import Department, Employee, JobTitle
+    from inventory.models import StockLevel, Warehouse
+
+    settings.QUERY_BUDGET_ENABLED = True
+
+    currency = Currency.objects.create(
+        code='XOF', name='Franc CFA', symbol='F', is_default=True
+    )
+    department = Department.objects.create(name='Technique')
+    job_title = JobTitle.objects.create(name='Développeur', department=department)
+    for i in range(ROWS):
+        company = Company.objects.create(name=f'Entreprise {i}')
+        Contact.objects.create(
+            first_name=f'Contact{i}',
+            last_name='Test',
+            company=company,
+            email=f'contact{i}@example.com',
+        )
+        Employee.objects.create(
+            first_name=f'Employe{i}',
+            last_name='Test',
+            email=f'employe{i}@example.com',
+            employee_id=f'EMP{i:03d}',
+            hire_date=date(2020, 1, 1),
+            department=department,
+            job_title=job_title,
+        )
+        User.objects.create_user(f'utilisateur{i}')
+        product = Product.objects.create(
+            name=f'Produit {i}',
+            reference=f'PRD{i:03d}',
+            unit_price=Decimal('100'),
+            currency=currency,
+            product_type='stockable',
+        )
+        warehouse = Warehouse.objects.create(name=f'Entrepôt {i}', code=f'WH{i}')
+        StockLevel.objects.create(
+            product=product, warehouse=warehouse, quantity_on_hand=Decimal('5')
+        )
+
+    client.force_login(User.objects.create_superuser('__query_budget__'))
+    return client
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'url_name', [url_name for url_name, _view_class in ROUTES], ids=str
+)
+def test_list_within_query_budget(budget_client, settings, url_name):
+    response = budget_client.get(reverse(url_name))
+
+    assert response.status_code == 200
+    endpoint = response.wsgi_request._query_budget_endpoint
+    assert int(response['X-Query-Count']) <= int(response['X-Query-Budget']), endpoint
+    # Une même requête répétée par ligne signale un N+1
+    assert int(response['X-Query-Max-Repeat']) < settings.QUERY_BUDGET_MAX_REPEAT, (
+        endpoint
+    )
+
+
+def test_render_batch_converts_each_distinct_document_once(
+    settings, tmp_path, monkeypatch
+):
+    from core.services.pdf_renderer import PDFDocument, PDFRenderer
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.PDF_CACHE_ENABLED = True
+    write_pdf = PDFRenderer.write_pdf
+    conversions = []
+
+    def counting_write_pdf(html, stylesheet='default'):
+        conversions.append(html)
+        return write_pdf(html, stylesheet)
+
+    monkeypatch.setattr(PDFRenderer, 'write_pdf', counting_write_pdf)
+    documents = [
+        PDFDocument(
+            'hr/pdf/work_certificate.html',
+            {'employee': {'full_name': name}},
+            'a4_2cm',
+            (),
+        )
+        for name in ('Alice', 'Bruno', 'Alice')
+    ]
+
+    pdfs = list(PDFRenderer.render_batch(documents))
+
+    assert len(pdfs) == 3
+    assert all(pdf.startswith(b'%PDF') for pdf in pdfs)
+    assert pdfs[0] == pdfs[2]
+    # Le second « Alice » et tout le second lot sont repris du cache
+    assert len(conversions) == 2
+    assert list(PDFRenderer.render_batch(documents)) == pdfs
+    assert len(conversions) == 2
+
+
+def test_normalize_text_folds_case_accents_and_punctuation():
+    assert normalize_text('Société Générale, S.A.', None, 'ÉTÉ-2025') == (
+        'societe generale s a ete 2025'
+    )
+    assert normalize_text('  ', '') == ''
+
+
+@pytest.mark.django_db
+def test_search_matches_every_word_without_accents():
+    from crm.models import Company
+
+    Company.objects.create(name='Société Générale du Sénégal')
+    Company.objects.create(name='Générale des Eaux')
+
+    entries, total = SearchIndex.search('SOCIETE générale')
+    assert total == 1
+    assert [entry.label for entry in entries] == ['Société Générale du Sénégal']
+    assert entries[0].url.startswith('/crm/companies/')
+
+    assert SearchIndex.search('generale')[1] == 2
+    assert SearchIndex.search('?!') == ([], 0)
+
+
+@pytest.mark.django_db
+def test_search_caps_results_per_type_and_filters_modules():
+    from crm.models import Company
+    from inventory.models import Warehouse
+
+    for i in range(7):
+        Company.objects.create(name=f'Atlas {i}')
+    Warehouse.objects.create(name='Atlas Casablanca', code='ATL')
+
+    entries, total = SearchIndex.search('atlas', per_type=5)
+    by_type = [entry.entity_type for entry in entries]
+    assert total == 6
+    assert by_type.count('Entreprise') == 5
+    assert by_type.count('Entrepôt') == 1
+
+    entries, total = SearchIndex.search('atlas', modules=['inventory'])
+    assert [entry.label for entry in entries] == ['ATL — Atlas Casablanca']
+    assert SearchIndex.search('atlas', modules=[]) == ([], 0)
+
+
+@pytest.mark.django_db
+def test_company_rename_reindexes_dependent_entries():
+    from core.models import SearchEntry
+    from crm.models import Company, Contact
+
+    company = Company.objects.create(name='Ancien Nom')
+    contact = Contact.objects.create(
+        first_name='Awa', last_name='Diop', company=company, email='awa@example.com'
+    )
+
+    def contact_entry():
+        return SearchEntry.objects.get(object_id=contact.pk, entity_type='Contact')
+
+    assert contact_entry().description == 'Ancien Nom'
+
+    company.name = 'Nouveau Nom'
+    company.save()
+    assert contact_entry().description == 'Nouveau Nom'
+    assert SearchIndex.search('nouveau')[0][0].label == 'Nouveau Nom'
+    assert SearchIndex.search('ancien') == ([], 0)
+
+    # Champ non indexé : ni l'entreprise ni ses dépendants ne sont réindexés
+    assert not SearchIndex.index_object(company, update_fields=['website'])
+
+
+@pytest.fixture
+def export_admin(client, settings, tmp_path, monkeypatch):
+    """Administrateur connecté ; archives dans un MEDIA_ROOT temporaire."""
+    from crm.models import Company
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    # Lots de 2 lignes : plusieurs écritures par table
+    monkeypatch.setattr(rgpd_export, 'EXPORT_CHUNK_SIZE', 2)
+    for i in range(5):
+        Company.objects.create(name=f'Entreprise {i}')
+    client.force_login(User.objects.create_superuser('dpo'))
+    return client
+
+
+@pytest.mark.django_db
+def test_rgpd_export_runs_as_a_background_job(export_admin, monkeypatch):
+    queued = []
+    monkeypatch.setattr(export_rgpd_data, 'delay', queued.append)
+
+    response = export_admin.post(reverse('core:rgpd-export'))
+
+    assert response.status_code == 202
+    job = BackgroundJob.objects.get(pk=response.json()['id'])
+    assert (job.job_type, job.status) == (rgpd_export.JOB_TYPE, 'pending')
+    assert response.json()['download_url'] is None
+    assert queued == [job.pk]
+
+    # Le worker produit l'archive, téléchargeable une fois la tâche terminée
+    assert export_rgpd_data(job.pk)['status'] == 'success'
+    detail = export_admin.get(
+        reverse('core:background-job-detail', kwargs={'pk': job.pk})
+    ).json()
+    assert detail['status'] == 'done'
+    assert detail['progress_percent'] == 100
+    assert detail['result']['tables']['crm/companies.jsonl'] == 5
+
+    response = export_admin.get(detail['download_url'])
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+    companies = archive.read('crm/companies.jsonl').decode().splitlines()
+    assert [json.loads(line)['name'] for line in companies] == [
+        f'Entreprise {i}' for i in range(5)
+    ]
+    assert archive.read('users/users.jsonl').decode().count('\n') == 1
+    metadata = json.loads(archive.read('metadata.json'))
+    assert metadata['requested_by'] == 'dpo'
+    assert metadata['tables'] == detail['result']['tables']
+
+
+@pytest.mark.django_db
+def test_rgpd_export_is_reserved_to_admins(client):
+    client.force_login(User.objects.create_user('commercial'))
+
+    assert client.post(reverse('core:rgpd-export')).status_code == 403
+    assert not BackgroundJob.objects.exists()
+
+
+@pytest.mark.django_db
+def test_failed_rgpd_export_leaves_no_archive(export_admin, tmp_path, monkeypatch):
+    job = BackgroundJob.objects.create(job_type=rgpd_export.JOB_TYPE)
+    write_table = rgpd_export.write_table
+
+    def failing_write_table(zf, filename, *args, **kwargs):
+        if filename == 'crm/companies.jsonl':
+            raise OSError('Disque plein')
+        return write_table(zf, filename, *args, **kwargs)
+
+    monkeypatch.setattr(rgpd_export, 'write_table', failing_write_table)
+
+    assert export_rgpd_data(job.pk)['status'] == 'error'
+
+    job.refresh_from_db()
+    assert (job.status, job.message, job.file_path) == ('failed', 'Disque plein', '')
+    assert os.listdir(tmp_path / rgpd_export.EXPORT_DIR) == []
+    response = export_admin.get(
+        reverse('core:background-job-download', kwargs={'pk': job.pk})
+    )
+    assert response.status_code == 404
@@ -29,6 +29,7 @@ urlpatterns = [
         name='email-test',
     ),
     path('system-info/', views.SystemInfoView.as_view(), name='system-info'),
+    path('query-budget/', views.QueryBudgetView.as_view(), name='query-budget'),
     # ── Recherche globale (v3.5.0) ────────────────────────────────────
     path('search/', views.GlobalSearchView.as_view(), name='global-search'),
     # ── Backup (v3.8.0) ──────────────────────────────────────────────
@@ -40,4 +41,15 @@ urlpatterns = [
     ),
     # ── Export RGPD (v3.9.0) ─────────────────────────────────────────
     path('export/', views.ExportRGPDView.as_view(), name='rgpd-export'),
+    # ── Tâches de fond ───────────────────────────────────────────────
+    path(
+        'jobs/<int:pk>/',
+        views.BackgroundJobDetailView.as_view(),
+        name='background-job-detail',
+    ),
+    path(
+        'jobs/<int:pk>/download/',
+        views.BackgroundJobDownloadView.as_view(),
+        name='background-job-download',
+    ),
 ]
@@ -1,16 +1,11 @@
 import importlib
-import json
 import logging
 import os
 import shutil
-import zipfile
-from datetime import datetime
-from io import BytesIO
 
 from django.conf import settings as django_settings
 from django.core.mail import EmailMessage, get_connection
 from django.db import transaction
-from django.db.models import Q
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -19,10 +14,17 @@ from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from users.permissions import HasModulePermission
+from users.permissions import HasModulePermission, ModulePermissionMatrix
 
-from .models import CompanySetup, CoreSettings, Currency, EmailSettings
+from .models import (
+    BackgroundJob,
+    CompanySetup,
+    CoreSettings,
+    Currency,
+    EmailSettings,
+)
 from .serializers import (
+    BackgroundJobSerializer,
     CompanyInfoSerializer,
     CompanySetupSerializer,
     CoreSettingsSerializer,
@@ -31,6 +33,8 @@ from .serializers import (
     LocalePackInfoSerializer,
     SetupStatusSerializer,
 )
+from .services.query_budget import QueryBudgetStats
+from .services.search_index import SearchIndex
 
 logger = logging.getLogger(__name__)
 
@@ -619,6 +623,32 @@ class SystemInfoView(APIView):
         return Response(data)
 
 
+class QueryBudgetView(APIView):
+    """
+    GET /api/core/query-budget/ — Requêtes SQL par vue/action (admin) :
+    moyenne, maximum, temps en base, requête la plus répétée (N+1).
+    DELETE remet les compteurs à zéro. Mesures propres au processus
+    courant, disponibles si QUERY_BUDGET_ENABLED.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {
+                'enabled': django_settings.QUERY_BUDGET_ENABLED,
+                'default_budget': django_settings.QUERY_BUDGET_DEFAULT,
+                'max_repeat': django_settings.QUERY_BUDGET_MAX_REPEAT,
+                'pid': os.getpid(),
+                'endpoints': QueryBudgetStats.snapshot(),
+            }
+        )
+
+    def delete(self, request):
+        QueryBudgetStats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # ── Localization Packs — Setup API ───────────────────────────────────
 
 
@@ -1440,268 +1470,25 @@ class CompanyInfoView(APIView):
 class GlobalSearchView(APIView):
     """
     GET /api/core/search/?q=renault&limit=20
-    Recherche multi-modules avec résultats groupés.
+    Recherche multi-modules dans l'index de recherche (SearchEntry), en une
+    requête classée par pertinence.
     Respecte les permissions de l'utilisateur.
     """
 
     permission_classes = [IsAuthenticated]
 
-    # Nombre max de résultats par module
+    # Nombre max de résultats par type d'entité
     PER_MODULE = 5
 
     def _get_user_modules(self, user):
         """Retourne les modules accessibles par l'utilisateur."""
         if user.is_superuser:
             return None  # None = tous les modules
-        accessible = set()
-        for group in user.groups.all():
-            try:
-                role = group.role
-                for mp in role.module_permissions.all():
-                    if mp.access_level != 'no_access':
-                        accessible.add(mp.module)
-            except Exception:
-                continue
-        return accessible
-
-    def _search_crm(self, q, limit):
-        from crm.models import Company, Contact, Opportunity
-
-        results = []
-
-        for obj in Company.objects.filter(
-            Q(name__icontains=q) | Q(email__icontains=q) | Q(phone__icontains=q)
-        )[:limit]:
-            results.append(
-                {
-                    'module': 'crm',
-                    'type': 'Entreprise',
-                    'id': obj.id,
-                    'label': obj.name,
-                    'url': f'/crm/companies/{obj.id}',
-                }
-            )
-
-        for obj in Contact.objects.filter(
-            Q(first_name__icontains=q)
-            | Q(last_name__icontains=q)
-            | Q(email__icontains=q)
-        ).select_related('company')[:limit]:
-            results.append(
-                {
-                    'module': 'crm',
-                    'type': 'Contact',
-                    'id': obj.id,
-                    'label': f'{obj.first_name} {obj.last_name}',
-                    'description': obj.company.name if obj.company else '',
-                    'url': f'/crm/contacts/{obj.id}',
-                }
-            )
-
-        for obj in Opportunity.objects.filter(Q(name__icontains=q)).select_related(
-            'company'
-        )[:limit]:
-            results.append(
-                {
-                    'module': 'crm',
-                    'type': 'Opportunité',
-                    'id': obj.id,
-                    'label': obj.name,
-                    'description': obj.company.name if obj.company else '',
-                    'url': f'/crm/opportunities/{obj.id}',
-                }
-            )
-
-        return results
-
-    def _search_sales(self, q, limit):
-        from catalog.models import Product
-        from sales.models import Invoice, Order, Quote
-
-        results = []
-
-        for obj in Product.objects.filter(
-            Q(name__icontains=q) | Q(reference__icontains=q)
-        )[:limit]:
-            results.append(
-                {
-                    'module': 'sales',
-                    'type': 'Produit',
-                    'id': obj.id,
-                    'label': f'{obj.reference} — {obj.name}',
-                    'url': f'/sales/products/{obj.id}',
-                }
-            )
-
-        for obj in Quote.objects.filter(
-            Q(number__icontains=q) | Q(company__name__icontains=q)
-        ).select_related('company')[:limit]:
-            results.append(
-                {
-                    'module': 'sales',
-                    'type': 'Devis',
-                    'id': obj.id,
-                    'label': obj.number,
-                    'description': obj.company.name if obj.company else '',
-                    'url': f'/sales/quotes/{obj.id}',
-                }
-            )
-
-        for obj in Order.objects.filter(
-            Q(number__icontains=q) | Q(company__name__icontains=q)
-        ).select_related('company')[:limit]:
-            results.append(
-                {
-                    'module': 'sales',
-                    'type': 'Commande',
-                    'id': obj.id,
-                    'label': obj.number,
-                    'description': obj.company.name if obj.company else '',
-                    'url': f'/sales/orders/{obj.id}',
-                }
-            )
-
-        for obj in Invoice.objects.filter(
-            Q(number__icontains=q) | Q(company__name__icontains=q)
-        ).select_related('company')[:limit]:
-            results.append(
-                {
-                    'module': 'sales',
-                    'type': 'Facture',
-                    'id': obj.id,
-                    'label': obj.number,
-                    'description': obj.company.name if obj.company else '',
-                    'url': f'/sales/invoices/{obj.id}',
-                }
-            )
-
-        return results
-
-    def _search_purchasing(self, q, limit):
-        from purchasing.models import PurchaseOrder, Supplier, SupplierInvoice
-
-        results = []
-
-        for obj in Supplier.objects.filter(
-            Q(name__icontains=q) | Q(code__icontains=q) | Q(email__icontains=q)
-        )[:limit]:
-            results.append(
-                {
-                    'module': 'purchasing',
-                    'type': 'Fournisseur',
-                    'id': obj.id,
-                    'label': f'{obj.code} — {obj.name}',
-                    'url': f'/purchasing/suppliers/{obj.id}',
-                }
-            )
-
-        for obj in PurchaseOrder.objects.filter(
-            Q(number__icontains=q) | Q(supplier__name__icontains=q)
-        ).select_related('supplier')[:limit]:
-            results.append(
-                {
-                    'module': 'purchasing',
-                    'type': 'Bon de commande',
-                    'id': obj.id,
-                    'label': obj.number,
-                    'description': obj.supplier.name,
-                    'url': f'/purchasing/orders/{obj.id}',
-                }
-            )
-
-        for obj in SupplierInvoice.objects.filter(
-            Q(number__icontains=q)
-            | Q(supplier__name__icontains=q)
-            | Q(supplier_reference__icontains=q)
-        ).select_related('supplier')[:limit]:
-            results.append(
-                {
-                    'module': 'purchasing',
-                    'type': 'Facture fournisseur',
-                    'id': obj.id,
-                    'label': obj.number,
-                    'description': obj.supplier.name,
-                    'url': f'/purchasing/invoices/{obj.id}',
-                }
-            )
-
-        return results
-
-    def _search_hr(self, q, limit):
-        from hr.models import Employee
-
-        results = []
-
-        for obj in Employee.objects.filter(
-            Q(first_name__icontains=q)
-            | Q(last_name__icontains=q)
-            | Q(employee_id__icontains=q)
-        )[:limit]:
-            results.append(
-                {
-                    'module': 'hr',
-                    'type': 'Employé',
-                    'id': obj.id,
-                    'label': f'{obj.first_name} {obj.last_name}',
-                    'description': obj.employee_id,
-                    'url': f'/hr/employees/{obj.id}',
-                }
-            )
-
-        return results
-
-    def _search_inventory(self, q, limit):
-        from inventory.models import Warehouse
-
-        results = []
-
-        for obj in Warehouse.objects.filter(
-            Q(name__icontains=q) | Q(code__icontains=q)
-        )[:limit]:
-            results.append(
-                {
-                    'module': 'inventory',
-                    'type': 'Entrepôt',
-                    'id': obj.id,
-                    'label': f'{obj.code} — {obj.name}',
-                    'url': '/inventory/warehouses',
-                }
-            )
-
-        return results
-
-    def _search_accounting(self, q, limit):
-        from accounting.models import Account, Journal
-
-        results = []
-
-        for obj in Account.objects.filter(Q(code__icontains=q) | Q(name__icontains=q))[
-            :limit
-        ]:
-            results.append(
-                {
-                    'module': 'accounting',
-                    'type': 'Compte',
-                    'id': obj.id,
-                    'label': f'{obj.code} — {obj.name}',
-                    'url': f'/accounting/accounts/{obj.id}',
-                }
-            )
-
-        for obj in Journal.objects.filter(Q(code__icontains=q) | Q(name__icontains=q))[
-            :limit
-        ]:
-            results.append(
-                {
-                    'module': 'accounting',
-                    'type': 'Journal',
-                    'id': obj.id,
-                    'label': f'{obj.code} — {obj.name}',
-                    'url': f'/accounting/journals/{obj.id}',
-                }
-            )
-
-        return results
+        return {
+            module
+            for module, level in ModulePermissionMatrix.for_user(user).items()
+            if level > 0
+        }
 
     def get(self, request):
         q = request.query_params.get('q', '').strip()
@@ -1709,36 +1496,27 @@ class GlobalSearchView(APIView):
             return Response({'results': [], 'query': q, 'total': 0})
 
         limit = min(int(request.query_params.get('limit', 20)), 50)
-        per_module = self.PER_MODULE
-        user_modules = self._get_user_modules(request.user)
-
-        search_map = {
-            'crm': self._search_crm,
-            'sales': self._search_sales,
-            'purchasing': self._search_purchasing,
-            'hr': self._search_hr,
-            'inventory': self._search_inventory,
-            'accounting': self._search_accounting,
-        }
-
-        all_results = []
-        for module_key, search_fn in search_map.items():
-            # Vérifier les permissions
-            if user_modules is not None and module_key not in user_modules:
-                continue
-            try:
-                results = search_fn(q, per_module)
-                all_results.extend(results)
-            except Exception:
-                continue
+        entries, total = SearchIndex.search(
+            q,
+            modules=self._get_user_modules(request.user),
+            per_type=self.PER_MODULE,
+            limit=limit,
+        )
 
-        return Response(
-            {
-                'results': all_results[:limit],
-                'query': q,
-                'total': len(all_results),
+        results = []
+        for entry in entries:
+            result = {
+                'module': entry.module,
+                'type': entry.entity_type,
+                'id': entry.object_id,
+                'label': entry.label,
+                'url': entry.url,
             }
-        )
+            if entry.description:
+                result['description'] = entry.description
+            results.append(result)
+
+        return Response({'results': results, 'query': q, 'total': total})
 
 
 # ── Backup (v3.8.0) ──────────────────────────────────────────────────
@@ -1836,567 +1614,72 @@ class BackupDownloadView(APIView):
 class ExportRGPDView(APIView):
     """
     POST /api/core/export/
-    Génère une archive ZIP contenant toutes les données de l'entreprise
-    au format JSON (un fichier par module).
+    Lance la génération d'une archive ZIP contenant toutes les données de
+    l'entreprise (un fichier JSON Lines par table) en tâche de fond.
+    Réponse 202 avec la tâche : suivre l'avancement sur
+    /api/core/jobs/<id>/, puis télécharger l'archive via son download_url.
     Réservé aux administrateurs (obligation RGPD — droit à la portabilité).
     """
 
     permission_classes = [IsAdminUser]
 
     def post(self, request):
-        buffer = BytesIO()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-            # ── Core ─────────────────────────────────────────────
-            from core.models import CompanySetup, Currency
-
-            zf.writestr(
-                'core/currencies.json',
-                self._serialize(
-                    Currency.objects.all(),
-                    [
-                        'id',
-                        'code',
-                        'name',
-                        'symbol',
-                        'is_default',
-                        'exchange_rate',
-                        'decimal_places',
-                        'symbol_position',
-                    ],
-                ),
-            )
-            zf.writestr(
-                'core/company_setup.json',
-                self._serialize(
-                    CompanySetup.objects.all(),
-                    [
-                        'id',
-                        'company_name',
-                        'country_code',
-                        'accounting_pack',
-                        'address_line1',
-                        'city',
-                        'postal_code',
-                        'country',
-                        'phone',
-                        'email',
-                        'website',
-                        'bank_name',
-                        'bank_account',
-                    ],
-                ),
-            )
-
-            # ── CRM ──────────────────────────────────────────────
-            try:
-                from crm.models import Activity, Contact, CRMCompany, Opportunity
-
-                zf.writestr(
-                    'crm/contacts.json',
-                    self._serialize(
-                        Contact.objects.all(),
-                        [
-                            'id',
-                            'first_name',
-                            'last_name',
-                            'email',
-                            'phone',
-                            'mobile',
-                            'job_title',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'crm/companies.json',
-                    self._serialize(
-                        CRMCompany.objects.all(),
-                        [
-                            'id',
-                            'name',
-                            'email',
-                            'phone',
-                            'website',
-                            'industry',
-                            'city',
-                            'country',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'crm/opportunities.json',
-                    self._serialize(
-                        Opportunity.objects.all(),
-                        [
-                            'id',
-                            'name',
-                            'stage',
-                            'amount',
-                            'probability',
-                            'expected_close_date',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'crm/activities.json',
-                    self._serialize(
-                        Activity.objects.all(),
-                        [
-                            'id',
-                            'activity_type',
-                            'subject',
-                            'description',
-                            'date',
-                            'created_at',
-                        ],
-                    ),
-                )
-            except ImportError:
-                pass
+        from core.services.background_jobs import create_job
+        from core.services.rgpd_export import JOB_TYPE
+        from core.tasks import export_rgpd_data
 
-            # ── Ventes ───────────────────────────────────────────
-            try:
-                from sales.models import (
-                    Invoice,
-                    Order,
-                    Payment,
-                    Product,
-                    Quote,
-                )
-
-                zf.writestr(
-                    'sales/products.json',
-                    self._serialize(
-                        Product.objects.all(),
-                        [
-                            'id',
-                            'reference',
-                            'name',
-                            'product_type',
-                            'sale_price',
-                            'cost_price',
-                            'tax_rate',
-                            'stock_alert_threshold',
-                            'is_active',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'sales/quotes.json',
-                    self._serialize(
-                        Quote.objects.all(),
-                        [
-                            'id',
-                            'number',
-                            'state',
-                            'total_ht',
-                            'total_ttc',
-                            'date',
-                            'validity_date',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'sales/orders.json',
-                    self._serialize(
-                        Order.objects.all(),
-                        [
-                            'id',
-                            'number',
-                            'state',
-                            'total_ht',
-                            'total_ttc',
-                            'date',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'sales/invoices.json',
-                    self._serialize(
-                        Invoice.objects.all(),
-                        [
-                            'id',
-                            'number',
-                            'state',
-                            'payment_status',
-                            'total_ht',
-                            'total_ttc',
-                            'amount_due',
-                            'date',
-                            'due_date',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'sales/payments.json',
-                    self._serialize(
-                        Payment.objects.all(),
-                        [
-                            'id',
-                            'amount',
-                            'payment_method',
-                            'payment_date',
-                            'reference',
-                            'created_at',
-                        ],
-                    ),
-                )
-            except ImportError:
-                pass
+        job = create_job(JOB_TYPE, user=request.user)
+        export_rgpd_data.delay(job.pk)
+        return Response(
+            BackgroundJobSerializer(job, context={'request': request}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
 
-            # ── Achats ───────────────────────────────────────────
-            try:
-                from purchasing.models import (
-                    PurchaseOrder,
-                    Supplier,
-                    SupplierInvoice,
-                )
 
-                zf.writestr(
-                    'purchasing/suppliers.json',
-                    self._serialize(
-                        Supplier.objects.all(),
-                        [
-                            'id',
-                            'name',
-                            'email',
-                            'phone',
-                            'address',
-                            'city',
-                            'country',
-                            'tax_id',
-                            'is_active',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'purchasing/purchase_orders.json',
-                    self._serialize(
-                        PurchaseOrder.objects.all(),
-                        [
-                            'id',
-                            'number',
-                            'state',
-                            'total_ht',
-                            'total_ttc',
-                            'date',
-                            'expected_delivery_date',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'purchasing/supplier_invoices.json',
-                    self._serialize(
-                        SupplierInvoice.objects.all(),
-                        [
-                            'id',
-                            'number',
-                            'state',
-                            'total_ht',
-                            'total_ttc',
-                            'date',
-                            'due_date',
-                            'created_at',
-                        ],
-                    ),
-                )
-            except ImportError:
-                pass
+class BackgroundJobDetailView(APIView):
+    """GET /api/core/jobs/<id>/ → État et avancement d'une tâche de fond."""
 
-            # ── Stocks ───────────────────────────────────────────
-            try:
-                from inventory.models import (
-                    StockLevel,
-                    StockMovement,
-                    Warehouse,
-                )
+    permission_classes = [IsAuthenticated]
 
-                zf.writestr(
-                    'inventory/warehouses.json',
-                    self._serialize(
-                        Warehouse.objects.all(),
-                        [
-                            'id',
-                            'name',
-                            'code',
-                            'address',
-                            'is_active',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'inventory/stock_levels.json',
-                    self._serialize(
-                        StockLevel.objects.all(),
-                        [
-                            'id',
-                            'quantity_on_hand',
-                            'quantity_reserved',
-                            'updated_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'inventory/stock_movements.json',
-                    self._serialize(
-                        StockMovement.objects.all(),
-                        [
-                            'id',
-                            'movement_type',
-                            'quantity',
-                            'reference',
-                            'date',
-                            'created_at',
-                        ],
-                    ),
-                )
-            except ImportError:
-                pass
+    def get(self, request, pk):
+        job = _get_user_job(request, pk)
+        if job is None:
+            return Response(
+                {'error': 'Tâche non trouvée'}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(BackgroundJobSerializer(job, context={'request': request}).data)
 
-            # ── RH ───────────────────────────────────────────────
-            try:
-                from hr.models import Department, Employee, Position
-
-                zf.writestr(
-                    'hr/departments.json',
-                    self._serialize(
-                        Department.objects.all(),
-                        [
-                            'id',
-                            'name',
-                            'code',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'hr/positions.json',
-                    self._serialize(
-                        Position.objects.all(),
-                        [
-                            'id',
-                            'title',
-                            'department_id',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'hr/employees.json',
-                    self._serialize(
-                        Employee.objects.all(),
-                        [
-                            'id',
-                            'employee_id',
-                            'first_name',
-                            'last_name',
-                            'email',
-                            'phone',
-                            'hire_date',
-                            'status',
-                            'created_at',
-                        ],
-                    ),
-                )
-            except ImportError:
-                pass
 
-            # ── Paie ─────────────────────────────────────────────
-            try:
-                from payroll.models import Payslip
-
-                zf.writestr(
-                    'payroll/payslips.json',
-                    self._serialize(
-                        Payslip.objects.all(),
-                        [
-                            'id',
-                            'period',
-                            'gross_salary',
-                            'net_salary',
-                            'total_deductions',
-                            'state',
-                            'created_at',
-                        ],
-                    ),
-                )
-            except ImportError:
-                pass
+class BackgroundJobDownloadView(APIView):
+    """GET /api/core/jobs/<id>/download/ → Fichier produit par une tâche terminée."""
 
-            # ── Comptabilité ─────────────────────────────────────
-            try:
-                from accounting.models import Account, Journal, JournalEntry
-
-                zf.writestr(
-                    'accounting/accounts.json',
-                    self._serialize(
-                        Account.objects.all(),
-                        [
-                            'id',
-                            'code',
-                            'name',
-                            'account_type',
-                            'is_active',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'accounting/journals.json',
-                    self._serialize(
-                        Journal.objects.all(),
-                        [
-                            'id',
-                            'code',
-                            'name',
-                            'journal_type',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'accounting/journal_entries.json',
-                    self._serialize(
-                        JournalEntry.objects.all(),
-                        [
-                            'id',
-                            'number',
-                            'date',
-                            'description',
-                            'total_debit',
-                            'total_credit',
-                            'state',
-                            'created_at',
-                        ],
-                    ),
-                )
-            except ImportError:
-                pass
+    permission_classes = [IsAuthenticated]
 
-            # ── Recrutement ──────────────────────────────────────
-            try:
-                from recruitment.models import Application, JobOffer
-
-                zf.writestr(
-                    'recruitment/job_offers.json',
-                    self._serialize(
-                        JobOffer.objects.all(),
-                        [
-                            'id',
-                            'title',
-                            'status',
-                            'location',
-                            'contract_type',
-                            'published_date',
-                            'created_at',
-                        ],
-                    ),
-                )
-                zf.writestr(
-                    'recruitment/applications.json',
-                    self._serialize(
-                        Application.objects.all(),
-                        [
-                            'id',
-                            'candidate_name',
-                            'candidate_email',
-                            'status',
-                            'applied_date',
-                            'created_at',
-                        ],
-                    ),
-                )
-            except ImportError:
-                pass
-
-            # ── Utilisateurs ─────────────────────────────────────
-            from django.contrib.auth.models import User
-
-            zf.writestr(
-                'users/users.json',
-                self._serialize(
-                    User.objects.all(),
-                    [
-                        'id',
-                        'username',
-                        'email',
-                        'first_name',
-                        'last_name',
-                        'is_active',
-                        'is_staff',
-                        'date_joined',
-                        'last_login',
-                    ],
-                ),
+    def get(self, request, pk):
+        job = _get_user_job(request, pk)
+        if job is None or job.status != 'done' or not job.file_path:
+            return Response(
+                {'error': 'Fichier non trouvé'}, status=status.HTTP_404_NOT_FOUND
             )
 
-            # ── Notifications ────────────────────────────────────
-            try:
-                from notifications.models import Notification
-
-                zf.writestr(
-                    'notifications/notifications.json',
-                    self._serialize(
-                        Notification.objects.all(),
-                        [
-                            'id',
-                            'level',
-                            'title',
-                            'message',
-                            'module',
-                            'is_read',
-                            'created_at',
-                        ],
-                    ),
-                )
-            except ImportError:
-                pass
-
-            # ── Métadonnées ──────────────────────────────────────
-            meta = {
-                'export_date': datetime.now().isoformat(),
-                'platform': 'Cleo ERP',
-                'version': django_settings.VERSION,
-                'export_type': 'RGPD — Portabilité des données (Art. 20)',
-                'requested_by': request.user.username,
-            }
-            zf.writestr('metadata.json', json.dumps(meta, indent=2, default=str))
-
-        buffer.seek(0)
+        filepath = os.path.join(django_settings.MEDIA_ROOT, job.file_path)
+        if not os.path.exists(filepath):
+            return Response(
+                {'error': 'Fichier non trouvé'}, status=status.HTTP_404_NOT_FOUND
+            )
 
         from django.http import FileResponse
 
-        response = FileResponse(
-            buffer,
-            content_type='application/zip',
-        )
-        response['Content-Disposition'] = (
-            f'attachment; filename="cleo_export_{timestamp}.zip"'
+        return FileResponse(
+            open(filepath, 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(filepath),
         )
-        return response
 
-    def _serialize(self, queryset, fields):
-        """Sérialise un queryset en JSON avec les champs spécifiés."""
-        data = []
-        for obj in queryset:
-            row = {}
-            for field in fields:
-                value = getattr(obj, field, None)
-                if hasattr(value, 'isoformat'):
-                    value = value.isoformat()
-                elif hasattr(value, '__str__') and not isinstance(
-                    value, (str, int, float, bool, type(None))
-                ):
-                    value = str(value)
-                row[field] = value
-            data.append(row)
-        return json.dumps(data, indent=2, ensure_ascii=False, default=str)
+
+def _get_user_job(request, pk):
+    """Tâche de l'utilisateur (toutes les tâches pour le staff), None sinon."""
+    jobs = BackgroundJob.objects.all()
+    if not request.user.is_staff:
+        jobs = jobs.filter(created_by=request.user)
+    return jobs.filter(pk=pk).first()
@@ -71,10 +71,13 @@ class CompanyListSerializer(serializers.ModelSerializer):
         ]
 
     def get_contact_count(self, obj):
-        return obj.contacts.count()
+        # Annoté par CompanyViewSet.get_queryset, sinon une requête
+        count = getattr(obj, 'contact_count', None)
+        return obj.contacts.count() if count is None else count
 
     def get_opportunity_count(self, obj):
-        return obj.opportunities.count()
+        count = getattr(obj, 'opportunity_count', None)
+        return obj.opportunities.count() if count is None else count
 
 
 class CompanyDetailSerializer(serializers.ModelSerializer):
@@ -1,4 +1,4 @@
-from django.db.models import Count, Q, Sum
+from django.db.models import Count, Prefetch, Q, Sum
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status, viewsets
@@ -38,6 +38,22 @@ from .serializers import (
     TagSerializer,
 )
 
+# Relations lues par les serializers de liste (company_name, stage_name...)
+CONTACT_LIST_RELATED = ('company', 'assigned_to')
+OPPORTUNITY_LIST_RELATED = ('company', 'stage', 'currency', 'assigned_to')
+ACTIVITY_LIST_RELATED = ('activity_type', 'company', 'opportunity', 'assigned_to')
+
+
+def _activity_list(queryset):
+    return queryset.select_related(*ACTIVITY_LIST_RELATED).prefetch_related('contacts')
+
+
+def _contacts_prefetch():
+    # Contacts imbriqués (ContactListSerializer) des vues de détail
+    return Prefetch(
+        'contacts', queryset=Contact.objects.select_related(*CONTACT_LIST_RELATED)
+    )
+
 
 @api_view(['GET'])
 def dashboard_view(request):
@@ -86,7 +102,9 @@ class IndustryViewSet(viewsets.ModelViewSet):
 
 
 class CompanyViewSet(viewsets.ModelViewSet):
-    queryset = Company.objects.all()
+    queryset = Company.objects.select_related(
+        'industry', 'assigned_to', 'created_by'
+    ).all()
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'crm'
     filter_backends = [
@@ -99,6 +117,18 @@ class CompanyViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at', 'updated_at', 'score']
     ordering = ['-created_at']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # contact_count / opportunity_count sans requête par ligne
+            queryset = queryset.annotate(
+                contact_count=Count('contacts', distinct=True),
+                opportunity_count=Count('opportunities', distinct=True),
+            )
+        else:
+            queryset = queryset.prefetch_related('tags')
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'list':
             return CompanyListSerializer
@@ -110,21 +140,21 @@ class CompanyViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def contacts(self, request, pk=None):
         company = self.get_object()
-        contacts = company.contacts.all()
+        contacts = company.contacts.select_related(*CONTACT_LIST_RELATED)
         serializer = ContactListSerializer(contacts, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def opportunities(self, request, pk=None):
         company = self.get_object()
-        opportunities = company.opportunities.all()
+        opportunities = company.opportunities.select_related(*OPPORTUNITY_LIST_RELATED)
         serializer = OpportunityListSerializer(opportunities, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def activities(self, request, pk=None):
         company = self.get_object()
-        activities = company.activities.all()
+        activities = _activity_list(company.activities.all())
         serializer = ActivityListSerializer(activities, many=True)
         return Response(serializer.data)
 
@@ -144,7 +174,9 @@ class CompanyViewSet(viewsets.ModelViewSet):
 
 
 class ContactViewSet(viewsets.ModelViewSet):
-    queryset = Contact.objects.all()
+    queryset = Contact.objects.select_related(
+        'company__industry', 'assigned_to', 'created_by'
+    ).prefetch_related('tags')
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'crm'
     filter_backends = [
@@ -168,14 +200,14 @@ class ContactViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def opportunities(self, request, pk=None):
         contact = self.get_object()
-        opportunities = contact.opportunities.all()
+        opportunities = contact.opportunities.select_related(*OPPORTUNITY_LIST_RELATED)
         serializer = OpportunityListSerializer(opportunities, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def activities(self, request, pk=None):
         contact = self.get_object()
-        activities = contact.activities.all()
+        activities = _activity_list(contact.activities.all())
         serializer = ActivityListSerializer(activities, many=True)
         return Response(serializer.data)
 
@@ -216,7 +248,9 @@ class ActivityTypeViewSet(viewsets.ModelViewSet):
 
 
 class OpportunityViewSet(viewsets.ModelViewSet):
-    queryset = Opportunity.objects.all()
+    queryset = Opportunity.objects.select_related(
+        'company__industry', 'stage', 'currency', 'assigned_to', 'created_by'
+    ).all()
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'crm'
     filter_backends = [
@@ -235,6 +269,12 @@ class OpportunityViewSet(viewsets.ModelViewSet):
     ]
     ordering = ['-created_at']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            queryset = queryset.prefetch_related(_contacts_prefetch(), 'tags')
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'list':
             return OpportunityListSerializer
@@ -246,14 +286,16 @@ class OpportunityViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def activities(self, request, pk=None):
         opportunity = self.get_object()
-        activities = opportunity.activities.all()
+        activities = _activity_list(opportunity.activities.all())
         serializer = ActivityListSerializer(activities, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def stage_history(self, request, pk=None):
         opportunity = self.get_object()
-        history = opportunity.stage_history.all()
+        history = opportunity.stage_history.select_related(
+            'opportunity', 'from_stage', 'to_stage', 'changed_by'
+        )
         serializer = StageHistorySerializer(history, many=True)
         return Response(serializer.data)
 
@@ -342,7 +384,9 @@ class OpportunityViewSet(viewsets.ModelViewSet):
 
 
 class ActivityViewSet(viewsets.ModelViewSet):
-    queryset = Activity.objects.all()
+    queryset = Activity.objects.select_related(
+        *ACTIVITY_LIST_RELATED, 'created_by'
+    ).all()
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'crm'
     filter_backends = [
@@ -355,6 +399,12 @@ class ActivityViewSet(viewsets.ModelViewSet):
     ordering_fields = ['start_date', 'created_at', 'status']
     ordering = ['-start_date']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return queryset.prefetch_related('contacts')
+        return queryset.prefetch_related(_contacts_prefetch())
+
     def get_serializer_class(self):
         if self.action == 'list':
             return ActivityListSerializer
@@ -384,9 +434,11 @@ class ActivityViewSet(viewsets.ModelViewSet):
     def upcoming(self, request):
         """Get upcoming activities."""
         now = timezone.now()
-        activities = Activity.objects.filter(
-            status='planned', start_date__gte=now
-        ).order_by('start_date')[:10]
+        activities = (
+            _activity_list(Activity.objects)
+            .filter(status='planned', start_date__gte=now)
+            .order_by('start_date')[:10]
+        )
 
         serializer = ActivityListSerializer(activities, many=True)
         return Response(serializer.data)
@@ -395,9 +447,11 @@ class ActivityViewSet(viewsets.ModelViewSet):
     def overdue(self, request):
         """Get overdue activities."""
         now = timezone.now()
-        activities = Activity.objects.filter(
-            status='planned', start_date__lt=now
-        ).order_by('start_date')
+        activities = (
+            _activity_list(Activity.objects)
+            .filter(status='planned', start_date__lt=now)
+            .order_by('start_date')
+        )
 
         serializer = ActivityListSerializer(activities, many=True)
         return Response(serializer.data)
@@ -408,9 +462,11 @@ class ActivityViewSet(viewsets.ModelViewSet):
         today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
         today_end = today_start + timezone.timedelta(days=1)
 
-        activities = Activity.objects.filter(
-            start_date__gte=today_start, start_date__lt=today_end
-        ).order_by('start_date')
+        activities = (
+            _activity_list(Activity.objects)
+            .filter(start_date__gte=today_start, start_date__lt=today_end)
+            .order_by('start_date')
+        )
 
         serializer = ActivityListSerializer(activities, many=True)
         return Response(serializer.data)
@@ -441,7 +497,15 @@ class ActivityViewSet(viewsets.ModelViewSet):
 
 
 class StageHistoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = StageHistory.objects.all()
+    queryset = StageHistory.objects.select_related(
+        'opportunity__company',
+        'opportunity__stage',
+        'opportunity__currency',
+        'opportunity__assigned_to',
+        'from_stage',
+        'to_stage',
+        'changed_by',
+    ).all()
     serializer_class = StageHistorySerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'crm'
@@ -515,15 +579,21 @@ class DashboardViewSet(viewsets.ViewSet):
 
         # Recent items
         recent_leads = ContactListSerializer(
-            Contact.objects.order_by('-created_at')[:5], many=True
+            Contact.objects.select_related(*CONTACT_LIST_RELATED).order_by(
+                '-created_at'
+            )[:5],
+            many=True,
         ).data
 
         recent_opportunities = OpportunityListSerializer(
-            Opportunity.objects.order_by('-created_at')[:5], many=True
+            Opportunity.objects.select_related(*OPPORTUNITY_LIST_RELATED).order_by(
+                '-created_at'
+            )[:5],
+            many=True,
         ).data
 
         recent_activities = ActivityListSerializer(
-            Activity.objects.order_by('-created_at')[:5], many=True
+            _activity_list(Activity.objects).order_by('-created_at')[:5], many=True
         ).data
 
         return Response(
@@ -29,6 +29,12 @@ echo "[OK] PostgreSQL est prêt."
 echo "[MIGRATE] Application des migrations..."
 python manage.py migrate --noinput
 
+# ── Index de recherche globale ───────────────────────────────
+# Alimenté par les signaux ; construit ici une fois pour les données
+# antérieures à la table SearchEntry
+echo "[SEARCH] Construction de l'index de recherche si nécessaire..."
+python manage.py rebuild_search_index --if-empty
+
 # ── Fichiers statiques ───────────────────────────────────────
 echo "[STATIC] Collecte des fichiers statiques Django..."
 python manage.py collectstatic --noinput
@@ -25,17 +25,42 @@ const InventoryDetail = () => {
 
   useEffect(() => { fetchData(); }, [id]);
 
+  // Un gros inventaire est validé en tâche de fond : suivre la tâche
+  const pollValidationJob = async (jobId) => {
+    try {
+      const res = await axios.get(`/api/core/jobs/${jobId}/`);
+      const job = res.data;
+      if (job.status === 'pending' || job.status === 'running') {
+        setTimeout(() => pollValidationJob(jobId), 2000);
+        return;
+      }
+      if (job.status === 'done') {
+        message.success('Inventaire validé avec succès');
+      } else {
+        message.error(job.message || 'Erreur lors de la validation');
+      }
+      fetchData();
+    } catch (err) {
+      handleApiError(err, null, 'Erreur lors du suivi de la validation');
+    }
+    setValidating(false);
+  };
+
   const handleValidate = async () => {
     setValidating(true);
     try {
-      await axios.post(`/api/inventory/inventories/${id}/validate/`);
+      const res = await axios.post(`/api/inventory/inventories/${id}/validate/`);
+      if (res.status === 202) {
+        message.info("Validation de l'inventaire en cours...");
+        pollValidationJob(res.data.id);
+        return;
+      }
       message.success('Inventaire validé avec succès');
       fetchData();
     } catch (err) {
       handleApiError(err, null, 'Erreur lors de la validation');
-    } finally {
-      setValidating(false);
     }
+    setValidating(false);
   };
 
   if (loading) return <Spin size="large" style={{ display: 'block', margin: '100px auto' }} />;
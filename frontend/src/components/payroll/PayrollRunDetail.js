@@ -195,11 +195,36 @@ const PayrollRunDetail = () => {
     }
   };
 
+  const pollCalculationJob = async (jobId) => {
+    try {
+      const response = await axios.get(
+        `/api/payroll/payroll-runs/${id}/calculation_status/`,
+        { params: { job_id: jobId } }
+      );
+      const job = response.data;
+      if (job.status === 'pending' || job.status === 'running') {
+        setTimeout(() => pollCalculationJob(jobId), 2000);
+        return;
+      }
+      const { calculated_count: calculatedCount, error_count: errorCount } = job.result;
+      if (job.status === 'done' && errorCount === 0) {
+        message.success(`${calculatedCount} bulletins calculés avec succès`);
+      } else {
+        message.warning(
+          `${calculatedCount} bulletins calculés, ${errorCount} en erreur`
+        );
+      }
+      fetchData();
+    } catch (error) {
+      handleApiError(error, null, 'Erreur lors du suivi du calcul des bulletins.');
+    }
+  };
+
   const handleCalculatePayslips = async () => {
     try {
-      await axios.post(`/api/payroll/payroll-runs/${id}/calculate_payslips/`);
+      const response = await axios.post(`/api/payroll/payroll-runs/${id}/calculate_payslips/`);
       message.success('Calcul des bulletins lancé avec succès');
-      fetchData();
+      pollCalculationJob(response.data.job_id);
     } catch (error) {
       handleApiError(error, null, 'Erreur lors du calcul des bulletins.');
     }
@@ -597,23 +597,51 @@ const SystemTab = () => {
     }
   };
 
+  const downloadExportRGPD = async (jobId) => {
+    const res = await axios.get(`/api/core/jobs/${jobId}/download/`, {
+      responseType: 'blob',
+    });
+    const url = window.URL.createObjectURL(new Blob([res.data], { type: 'application/zip' }));
+    const link = document.createElement('a');
+    link.href = url;
+    const now = new Date().toISOString().slice(0, 10);
+    link.setAttribute('download', `cleo_export_rgpd_${now}.zip`);
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    window.URL.revokeObjectURL(url);
+  };
+
+  // L'export est une tâche de fond : suivre son état puis télécharger l'archive
+  const pollExportRGPD = async (jobId) => {
+    try {
+      const res = await axios.get(`/api/core/jobs/${jobId}/`);
+      const job = res.data;
+      if (job.status === 'pending' || job.status === 'running') {
+        setTimeout(() => pollExportRGPD(jobId), 2000);
+        return;
+      }
+      if (job.status === 'done') {
+        await downloadExportRGPD(jobId);
+        message.success({ content: 'Export RGPD téléchargé avec succès', key: 'export', duration: 3 });
+      } else {
+        message.error({ content: job.message || "Erreur lors de l'export RGPD", key: 'export' });
+      }
+      setExporting(false);
+    } catch (err) {
+      message.error({ content: "Erreur lors de l'export RGPD", key: 'export' });
+      setExporting(false);
+    }
+  };
+
   const handleExportRGPD = async () => {
     setExporting(true);
     try {
-      const res = await axios.post('/api/core/export/', {}, { responseType: 'blob' });
-      const url = window.URL.createObjectURL(new Blob([res.data], { type: 'application/zip' }));
-      const link = document.createElement('a');
-      link.href = url;
-      const now = new Date().toISOString().slice(0, 10);
-      link.setAttribute('download', `cleo_export_rgpd_${now}.zip`);
-      document.body.appendChild(link);
-      link.click();
-      link.remove();
-      window.URL.revokeObjectURL(url);
-      message.success('Export RGPD téléchargé avec succès');
+      const res = await axios.post('/api/core/export/');
+      message.loading({ content: 'Export RGPD en cours...', key: 'export', duration: 0 });
+      pollExportRGPD(res.data.id);
     } catch (err) {
       message.error("Erreur lors de l'export RGPD");
-    } finally {
       setExporting(false);
     }
   };
@@ -7,4 +7,5 @@ class HrConfig(AppConfig):
     verbose_name = 'Ressources Humaines'
 
     def ready(self):
+        import hr.calendar_signals  # noqa: F401
         import hr.signals  # noqa: F401
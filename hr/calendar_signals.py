@@ -0,0 +1,19 @@
+"""
+Invalidation du calendrier des jours ouvrés.
+
+Connecté dans HrConfig.ready() : toute modification d'un jour férié
+invalide les calendriers mémorisés (WorkingDayCalendar).
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import PublicHoliday
+from .services.working_calendar import WorkingDayCalendar
+
+
+@receiver(post_save, sender=PublicHoliday)
+@receiver(post_delete, sender=PublicHoliday)
+def invalidate_working_calendar(sender, **kwargs):
+    """Jour férié modifié."""
+    WorkingDayCalendar.invalidate()
@@ -0,0 +1,134 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from hr.models import Department, Employee, JobTitle, LeaveAllocation, LeaveType
+from hr.services.leave_accrual import (
+    LeaveAccrualService,
+    accrual_parameters,
+    monthly_accrual,
+)
+
+# Mois crédité par le benchmark (aucune exécution réelle à cette date)
+BENCH_DATE = date(2099, 6, 1)
+
+
+class _Rollback(Exception):
+    """Annule la transaction de benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare l'acquisition mensuelle des congés ligne à ligne (get_or_create "
+        '+ save par employé) et par lots (LeaveAccrualService) sur des données '
+        'synthétiques (transaction annulée en fin de mesure)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            nargs='+',
+            default=[10000],
+            help="Nombres d'employés à tester",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"Employés":>9} {"Mode":>9} {"Soldes":>8} {"Requêtes":>9} '
+            f'{"Durée (ms)":>11}'
+        )
+        for nb_employees in options['employees']:
+            for mode, accrue in (
+                ('unitaire', self._accrue_row_by_row),
+                ('lot', self._accrue_set_based),
+            ):
+                try:
+                    with transaction.atomic():
+                        self._seed(nb_employees)
+
+                        # Compteur sans journal : connection.queries est plafonné
+                        queries = [0]
+
+                        def count_query(execute, sql, params, many, context):
+                            queries[0] += 1
+                            return execute(sql, params, many, context)
+
+                        with connection.execute_wrapper(count_query):
+                            start = time.perf_counter()
+                            updated = accrue()
+                            elapsed = (time.perf_counter() - start) * 1000
+
+                        self.stdout.write(
+                            f'{nb_employees:>9} {mode:>9} {updated:>8} '
+                            f'{queries[0]:>9} {elapsed:>11.1f}'
+                        )
+                        raise _Rollback
+                except _Rollback:
+                    pass
+
+    def _accrue_row_by_row(self):
+        """Algorithme précédent : un get_or_create et un save par solde."""
+        params = accrual_parameters()
+        monthly_types = list(
+            LeaveType.objects.filter(accrual_method='monthly', is_active=True)
+        )
+        updated = 0
+        for employee in Employee.objects.filter(
+            is_active=True, hire_date__isnull=False, hire_date__lte=BENCH_DATE
+        ):
+            accrual = monthly_accrual(employee.hire_date, BENCH_DATE, params)
+            for leave_type in monthly_types:
+                allocation, _created = LeaveAllocation.objects.get_or_create(
+                    employee=employee, leave_type=leave_type, year=BENCH_DATE.year
+                )
+                allocation.total_days = (allocation.total_days + accrual).quantize(
+                    Decimal('0.1')
+                )
+                allocation.save(update_fields=['total_days'])
+                updated += 1
+        return updated
+
+    def _accrue_set_based(self):
+        run = LeaveAccrualService.accrue_month(BENCH_DATE)
+        return run.allocations_count if run else 0
+
+    def _seed(self, nb_employees):
+        """Employés d'anciennetés variées, la moitié avec un solde existant."""
+        department = Department.objects.create(name='__benchmark_leave__')
+        job_title = JobTitle.objects.create(name='Benchmark', department=department)
+        leave_type = LeaveType.objects.create(
+            code='__BENCH_ANNUAL', name='Benchmark', accrual_method='monthly'
+        )
+
+        # bulk_create : pas de signal post_save
+        employees = Employee.objects.bulk_create(
+            (
+                Employee(
+                    first_name=f'Employé {i}',
+                    last_name='Benchmark',
+                    email=f'benchmark{i}@benchmark.invalid',
+                    employee_id=f'BENCH{i:06d}',
+                    hire_date=BENCH_DATE - timedelta(days=30 + (i * 7) % 7300),
+                    job_title=job_title,
+                    department=department,
+                )
+                for i in range(nb_employees)
+            ),
+            batch_size=1000,
+        )
+        LeaveAllocation.objects.bulk_create(
+            (
+                LeaveAllocation(
+                    employee=employee,
+                    leave_type=leave_type,
+                    year=BENCH_DATE.year,
+                    total_days=Decimal('5.0'),
+                )
+                for employee in employees[::2]
+            ),
+            batch_size=1000,
+        )
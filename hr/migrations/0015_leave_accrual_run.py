@@ -0,0 +1,71 @@
+# Generated by Django 5.2 on 2026-10-17 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('hr', '0014_register_reminder_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveAccrualRun',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'kind',
+                    models.CharField(
+                        choices=[
+                            ('monthly', 'Acquisition mensuelle'),
+                            ('carry_over', 'Report annuel'),
+                        ],
+                        max_length=20,
+                        verbose_name='Type',
+                    ),
+                ),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Année')),
+                (
+                    'month',
+                    models.PositiveSmallIntegerField(default=0, verbose_name='Mois'),
+                ),
+                (
+                    'employees_count',
+                    models.PositiveIntegerField(default=0, verbose_name='Employés'),
+                ),
+                (
+                    'allocations_count',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Soldes mis à jour'
+                    ),
+                ),
+                (
+                    'total_days',
+                    models.DecimalField(
+                        decimal_places=1,
+                        default=0,
+                        max_digits=12,
+                        verbose_name='Jours crédités',
+                    ),
+                ),
+                (
+                    'executed_at',
+                    models.DateTimeField(auto_now_add=True, verbose_name='Exécuté le'),
+                ),
+            ],
+            options={
+                'verbose_name': "Exécution d'acquisition de congés",
+                'verbose_name_plural': "Exécutions d'acquisition de congés",
+                'ordering': ['-year', '-month', 'kind'],
+                'unique_together': {('kind', 'year', 'month')},
+            },
+        ),
+    ]
@@ -194,7 +194,11 @@ class Employee(models.Model):
 
     @property
     def is_manager(self):
-        return self.subordinates.exists() or self.job_title.is_management
+        # has_subordinates : annoté par les vues de liste (employee_list_queryset)
+        has_subordinates = getattr(self, 'has_subordinates', None)
+        if has_subordinates is None:
+            has_subordinates = self.subordinates.exists()
+        return has_subordinates or self.job_title.is_management
 
 
 class Availability(models.Model):
@@ -643,6 +647,11 @@ class TrainingPlan(models.Model):
         """Calcule le coût total des formations dans ce plan."""
         from django.db.models import Sum
 
+        if 'training_items' in getattr(self, '_prefetched_objects_cache', {}):
+            return sum(
+                (item.training_course.cost or 0 for item in self.training_items.all()),
+                0,
+            )
         return (
             self.training_items.aggregate(total=Sum('training_course__cost'))['total']
             or 0
@@ -1042,6 +1051,43 @@ class LeaveAllocation(models.Model):
         return self.total_days + self.carried_days - self.used_days - self.pending_days
 
 
+class LeaveAccrualRun(models.Model):
+    """
+    Journal des acquisitions de congés (hr/services/leave_accrual.py).
+
+    Une ligne par exécution, enregistrée dans la même transaction que les
+    soldes : l'unicité (type, année, mois) empêche de créditer deux fois
+    le même mois ou de reporter deux fois la même année.
+    """
+
+    KIND_CHOICES = [
+        ('monthly', _('Acquisition mensuelle')),
+        ('carry_over', _('Report annuel')),
+    ]
+
+    kind = models.CharField(_('Type'), max_length=20, choices=KIND_CHOICES)
+    year = models.PositiveSmallIntegerField(_('Année'))
+    # 0 pour le report annuel
+    month = models.PositiveSmallIntegerField(_('Mois'), default=0)
+    employees_count = models.PositiveIntegerField(_('Employés'), default=0)
+    allocations_count = models.PositiveIntegerField(_('Soldes mis à jour'), default=0)
+    total_days = models.DecimalField(
+        _('Jours crédités'), max_digits=12, decimal_places=1, default=0
+    )
+    executed_at = models.DateTimeField(_('Exécuté le'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Exécution d'acquisition de congés")
+        verbose_name_plural = _("Exécutions d'acquisition de congés")
+        unique_together = [['kind', 'year', 'month']]
+        ordering = ['-year', '-month', 'kind']
+
+    def __str__(self):
+        if self.kind == 'monthly':
+            return f'{self.get_kind_display()} {self.year}-{self.month:02d}'
+        return f'{self.get_kind_display()} {self.year}'
+
+
 class LeaveRequest(models.Model):
     """Demande de congé avec workflow manager → RH."""
 
@@ -1202,6 +1248,8 @@ class ExpenseReport(models.Model):
     def total_amount(self):
         from django.db.models import Sum
 
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            return sum((item.amount for item in self.items.all()), Decimal('0'))
         return self.items.aggregate(total=Sum('amount'))['total'] or Decimal('0')
 
 
@@ -69,7 +69,9 @@ class DepartmentSerializer(serializers.ModelSerializer):
         return obj.parent.name if obj.parent else None
 
     def get_employee_count(self, obj):
-        return obj.employees.count()
+        # Annoté par DepartmentViewSet, sinon une requête
+        count = getattr(obj, 'employee_count', None)
+        return obj.employees.count() if count is None else count
 
 
 class JobTitleSerializer(serializers.ModelSerializer):
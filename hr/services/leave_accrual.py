@@ -0,0 +1,252 @@
+# hr/services/leave_accrual.py
+"""
+Acquisition mensuelle et report annuel des congés, traités par lots.
+
+Chaque exécution :
+- lit les employés concernés en une requête et calcule leurs droits
+  (ancienneté) en un seul passage ;
+- écrit tous les soldes par bulk_create(update_conflicts=True) dans une
+  seule transaction ;
+- enregistre une ligne LeaveAccrualRun dans cette même transaction.
+  L'unicité (type, année, mois) garantit qu'un mois n'est crédité qu'une
+  fois, même si la tâche est rejouée ou le cache vidé.
+"""
+
+import logging
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import IntegrityError, transaction
+
+from ..models import Employee, LeaveAccrualRun, LeaveAllocation, LeaveType
+from .leave_parameter_resolver import LeaveParameterResolver
+
+logger = logging.getLogger(__name__)
+
+ALLOCATION_BATCH_SIZE = 1000
+
+ZERO = Decimal('0')
+
+# Paramètres de l'acquisition mensuelle (PayrollParameter) et leurs défauts
+ACCRUAL_PARAMETERS = {
+    'LEAVE_ANNUAL_DAYS': Decimal('18'),
+    'LEAVE_SENIORITY_THRESHOLD_1': Decimal('5'),
+    'LEAVE_SENIORITY_BONUS_1': Decimal('0'),
+    'LEAVE_SENIORITY_THRESHOLD_2': Decimal('10'),
+    'LEAVE_SENIORITY_BONUS_2': Decimal('0'),
+}
+
+
+class AccrualAlreadyRun(Exception):
+    """L'exécution figure déjà au journal LeaveAccrualRun."""
+
+
+def accrual_parameters():
+    """Paramètres d'acquisition, lus en une requête (défaut si absent)."""
+    from payroll.models import PayrollParameter
+
+    values = dict(
+        PayrollParameter.objects.filter(
+            code__in=ACCRUAL_PARAMETERS, is_active=True
+        ).values_list('code', 'value')
+    )
+    params = {}
+    for code, default in ACCRUAL_PARAMETERS.items():
+        if code not in values:
+            logger.warning(
+                f'accrue_monthly_leave: paramètre {code} absent, défaut={default}'
+            )
+        params[code] = values.get(code, default)
+    return params
+
+
+def monthly_accrual(hire_date, today, params):
+    """
+    Jours acquis ce mois : droit annuel (bonus d'ancienneté compris) / 12,
+    arrondi au 0.5.
+    """
+    years_of_service = Decimal(str((today - hire_date).days / 365.25)).quantize(
+        Decimal('0.01')
+    )
+
+    seniority_bonus = ZERO
+    if years_of_service >= params['LEAVE_SENIORITY_THRESHOLD_2']:
+        seniority_bonus = params['LEAVE_SENIORITY_BONUS_2']
+    elif years_of_service >= params['LEAVE_SENIORITY_THRESHOLD_1']:
+        seniority_bonus = params['LEAVE_SENIORITY_BONUS_1']
+
+    effective_annual = params['LEAVE_ANNUAL_DAYS'] + seniority_bonus
+    return (effective_annual / Decimal('12')).quantize(
+        Decimal('0.5'), rounding=ROUND_HALF_UP
+    )
+
+
+def _record_run(kind, year, month=0):
+    """Inscrit l'exécution au journal (AccrualAlreadyRun si déjà présente)."""
+    try:
+        with transaction.atomic():
+            return LeaveAccrualRun.objects.create(kind=kind, year=year, month=month)
+    except IntegrityError:
+        raise AccrualAlreadyRun(f'{kind} {year}-{month:02d}')
+
+
+def _upsert_allocations(allocations, update_fields):
+    LeaveAllocation.objects.bulk_create(
+        allocations,
+        batch_size=ALLOCATION_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['employee', 'leave_type', 'year'],
+        update_fields=update_fields,
+    )
+
+
+class LeaveAccrualService:
+    """Acquisition mensuelle et report annuel des congés."""
+
+    @staticmethod
+    def accrue_month(today=None):
+        """
+        Crédite le mois de `today` sur les types de congés à acquisition
+        mensuelle, pour tous les employés actifs embauchés.
+
+        Returns:
+            LeaveAccrualRun, None s'il n'y a aucun type à acquisition mensuelle
+
+        Raises:
+            AccrualAlreadyRun: le mois a déjà été crédité
+        """
+        today = today or date.today()
+        year = today.year
+
+        type_ids = list(
+            LeaveType.objects.filter(
+                accrual_method='monthly', is_active=True
+            ).values_list('pk', flat=True)
+        )
+        if not type_ids:
+            logger.warning(
+                'accrue_monthly_leave: aucun LeaveType avec accrual_method=monthly'
+            )
+            return None
+
+        with transaction.atomic():
+            run = _record_run('monthly', year, today.month)
+
+            params = accrual_parameters()
+            accruals = {
+                employee_id: monthly_accrual(hire_date, today, params)
+                for employee_id, hire_date in Employee.objects.filter(
+                    is_active=True,
+                    hire_date__isnull=False,
+                    hire_date__lte=today,
+                ).values_list('pk', 'hire_date')
+            }
+
+            # Soldes existants verrouillés : le cumul est calculé ici
+            existing = {
+                (employee_id, leave_type_id): total_days
+                for employee_id, leave_type_id, total_days in (
+                    LeaveAllocation.objects.select_for_update()
+                    .filter(year=year, leave_type_id__in=type_ids)
+                    .values_list('employee_id', 'leave_type_id', 'total_days')
+                )
+            }
+
+            allocations = [
+                LeaveAllocation(
+                    employee_id=employee_id,
+                    leave_type_id=leave_type_id,
+                    year=year,
+                    total_days=(
+                        existing.get((employee_id, leave_type_id), ZERO) + accrual
+                    ).quantize(Decimal('0.1')),
+                )
+                for employee_id, accrual in accruals.items()
+                for leave_type_id in type_ids
+            ]
+            _upsert_allocations(allocations, ['total_days'])
+
+            run.employees_count = len(accruals)
+            run.allocations_count = len(allocations)
+            run.total_days = sum(accruals.values(), ZERO) * len(type_ids)
+            run.save(
+                update_fields=['employees_count', 'allocations_count', 'total_days']
+            )
+
+        logger.info(
+            f'accrue_monthly_leave: {run.allocations_count} allocations mises à jour '
+            f'pour {year}-{today.month:02d}'
+        )
+        return run
+
+    @staticmethod
+    def carry_over(today=None):
+        """
+        Reporte sur l'année de `today` le solde non consommé de l'année
+        précédente (congés annuels, plafonné par LEAVE_MAX_CARRY_DAYS).
+
+        Returns:
+            LeaveAccrualRun, None si le type ANNUAL n'existe pas
+
+        Raises:
+            AccrualAlreadyRun: le report de l'année a déjà été fait
+        """
+        today = today or date.today()
+        year = today.year
+
+        annual_type = LeaveType.objects.filter(code='ANNUAL', is_active=True).first()
+        if not annual_type:
+            logger.warning(
+                'carry_over_annual_leave: LeaveType ANNUAL introuvable — skip.'
+            )
+            return None
+
+        max_carry = LeaveParameterResolver.get_optional(
+            'LEAVE_MAX_CARRY_DAYS', Decimal('0')
+        )
+
+        with transaction.atomic():
+            run = _record_run('carry_over', year)
+
+            allocations = []
+            if max_carry > 0:
+                for (
+                    employee_id,
+                    total,
+                    carried,
+                    used,
+                    pending,
+                ) in LeaveAllocation.objects.filter(
+                    leave_type=annual_type, year=year - 1
+                ).values_list(
+                    'employee_id',
+                    'total_days',
+                    'carried_days',
+                    'used_days',
+                    'pending_days',
+                ):
+                    carry = min(total + carried - used - pending, max_carry)
+                    if carry <= 0:
+                        continue
+                    allocations.append(
+                        LeaveAllocation(
+                            employee_id=employee_id,
+                            leave_type=annual_type,
+                            year=year,
+                            carried_days=carry.quantize(Decimal('0.1')),
+                        )
+                    )
+                _upsert_allocations(allocations, ['carried_days'])
+
+            run.employees_count = len(allocations)
+            run.allocations_count = len(allocations)
+            run.total_days = sum((a.carried_days for a in allocations), ZERO)
+            run.save(
+                update_fields=['employees_count', 'allocations_count', 'total_days']
+            )
+
+        logger.info(
+            f'carry_over_annual_leave: {run.allocations_count} allocations mises a jour '
+            f'pour {year}.'
+        )
+        return run
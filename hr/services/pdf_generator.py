@@ -1,13 +1,9 @@
 import os
-import tempfile
 
 from django.conf import settings
-from django.template.loader import render_to_string
 from django.utils import timezone
-from weasyprint import CSS, HTML
-from weasyprint.text.fonts import FontConfiguration
 
-from core.services import get_company_context
+from core.services import PDFRenderer, get_company_context
 
 
 class PDFGenerator:
@@ -42,27 +38,10 @@ class PDFGenerator:
             'generated_date': timezone.now().date(),
         }
 
-        # Rendre le HTML à partir du template
-        html_string = render_to_string('hr/pdf/mission_order.html', context)
-
-        # Configurer les polices
-        font_config = FontConfiguration()
-
-        # Générer le PDF avec WeasyPrint
-        html = HTML(string=html_string)
-        css = CSS(string='@page { size: A4; margin: 1cm; }')
-
-        # Écrire le PDF dans un fichier temporaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            html.write_pdf(tmp.name, stylesheets=[css], font_config=font_config)
-
-            # Copier vers le fichier final
-            with open(pdf_path, 'wb') as f:
-                tmp.seek(0)
-                f.write(tmp.read())
-
-        # Supprimer le fichier temporaire
-        os.unlink(tmp.name)
+        # Générer le PDF (feuilles de style et polices partagées)
+        pdf = PDFRenderer.render('hr/pdf/mission_order.html', context, 'a4_1cm')
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf)
 
         # Retourner le chemin relatif pour stockage dans la BDD
         return os.path.join('hr', 'pdf', filename)
@@ -83,18 +62,10 @@ class PDFGenerator:
             'generated_date': timezone.now().date(),
         }
 
-        html_string = render_to_string('hr/pdf/work_certificate.html', context)
-        font_config = FontConfiguration()
-        html = HTML(string=html_string)
-        css = CSS(string='@page { size: A4; margin: 2cm; }')
+        pdf = PDFRenderer.render('hr/pdf/work_certificate.html', context, 'a4_2cm')
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            html.write_pdf(tmp.name, stylesheets=[css], font_config=font_config)
-            with open(pdf_path, 'wb') as f:
-                tmp.seek(0)
-                f.write(tmp.read())
-
-        os.unlink(tmp.name)
         return os.path.join('hr', 'pdf', filename)
 
     @staticmethod
@@ -107,30 +78,20 @@ class PDFGenerator:
         pdf_path = os.path.join(pdf_dir, filename)
 
         # Devise par défaut
-        from core.models import Currency
-
-        currency = Currency.objects.filter(is_default=True).first()
-        currency_code = currency.code if currency else 'MAD'
+        company = get_company_context()
+        currency_code = company['currency_code'] or 'MAD'
 
         context = {
             'report': expense_report,
             'employee': expense_report.employee,
             'items': expense_report.items.select_related('category').order_by('date'),
-            'company': get_company_context(),
+            'company': company,
             'currency_code': currency_code,
             'generated_date': timezone.now().date(),
         }
 
-        html_string = render_to_string('hr/pdf/expense_report.html', context)
-        font_config = FontConfiguration()
-        html = HTML(string=html_string)
-        css = CSS(string='@page { size: A4; margin: 2cm; }')
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            html.write_pdf(tmp.name, stylesheets=[css], font_config=font_config)
-            with open(pdf_path, 'wb') as f:
-                tmp.seek(0)
-                f.write(tmp.read())
+        pdf = PDFRenderer.render('hr/pdf/expense_report.html', context, 'a4_2cm')
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf)
 
-        os.unlink(tmp.name)
         return os.path.join('hr', 'pdf', filename)
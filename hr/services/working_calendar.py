@@ -0,0 +1,158 @@
+# hr/services/working_calendar.py
+"""
+Calendrier des jours ouvrés (lundi-vendredi hors jours fériés).
+
+Les jours fériés (PublicHoliday) sont lus une fois par calendrier ; les
+jours récurrents sont résolus une fois par année. Chaque année est
+stockée sous forme de sommes cumulées (array de 366/367 entiers) : le
+nombre de jours ouvrés d'une période s'obtient par deux lectures, quelle
+que soit sa longueur.
+
+Chaque processus (gunicorn, Celery) garde ses calendriers en mémoire tant
+que le numéro de version stocké dans le cache partagé (Redis) ne change
+pas ; il est incrémenté à chaque enregistrement ou suppression d'un jour
+férié (voir hr/calendar_signals.py).
+"""
+
+import calendar
+from array import array
+from datetime import date
+from itertools import accumulate
+
+from django.db import transaction
+
+from core.services.cache_version import bump_cache_version, get_cache_version
+
+VERSION_KEY = 'working_calendar_version'
+
+# Jours ouvrés : lundi (0) à vendredi (4)
+WORKING_WEEKDAYS = frozenset(range(5))
+
+
+class WorkingDayCalendar:
+    """Jours ouvrés d'un pack de localisation, par année civile."""
+
+    # Calendriers du processus courant ({pack: calendrier}), valables pour
+    # _local_version
+    _local_version = None
+    _local = {}
+
+    def __init__(self, holidays):
+        """
+        Args:
+            holidays: [(date, is_recurring)] jours fériés du calendrier
+        """
+        self._fixed = {}
+        self._recurring = set()
+        for holiday_date, is_recurring in holidays:
+            if is_recurring:
+                self._recurring.add((holiday_date.month, holiday_date.day))
+            else:
+                self._fixed.setdefault(holiday_date.year, set()).add(holiday_date)
+        # {année: sommes cumulées}, construites à la demande
+        self._years = {}
+
+    @classmethod
+    def for_pack(cls, pack=None):
+        """
+        Calendrier à jour de la version partagée.
+
+        Args:
+            pack: code du pack (PublicHoliday.country_code) ; seuls ses jours
+                fériés et les jours universels sont retenus. None : tous les
+                jours fériés en base (comportement de l'instance).
+
+        Dans une transaction, un calendrier rechargé peut refléter des
+        écritures non validées : il sert à l'appel mais n'est pas mémorisé.
+        """
+        version = get_cache_version(VERSION_KEY)
+        if cls._local_version != version:
+            cls._local = {}
+            cls._local_version = version
+
+        working_calendar = cls._local.get(pack)
+        if working_calendar is None:
+            working_calendar = cls._load(pack)
+            if not transaction.get_connection().in_atomic_block:
+                cls._local[pack] = working_calendar
+        return working_calendar
+
+    @classmethod
+    def _load(cls, pack):
+        from ..models import PublicHoliday
+
+        holidays = PublicHoliday.objects.all()
+        if pack is not None:
+            holidays = holidays.filter(country_code__in=[pack, ''])
+        return cls(holidays.values_list('date', 'is_recurring'))
+
+    @classmethod
+    def invalidate(cls):
+        """Incrémente la version partagée (voir bump_cache_version)."""
+        bump_cache_version(VERSION_KEY)
+
+    def _year(self, year):
+        """
+        Sommes cumulées de l'année : l'entrée i est le nombre de jours
+        ouvrés parmi les i premiers jours de l'année.
+        """
+        prefix = self._years.get(year)
+        if prefix is not None:
+            return prefix
+
+        first_ordinal = date(year, 1, 1).toordinal()
+        nb_days = 366 if calendar.isleap(year) else 365
+
+        holidays = {d.toordinal() for d in self._fixed.get(year, ())}
+        for month, day in self._recurring:
+            # Un 29 février récurrent n'existe que les années bissextiles
+            if month != 2 or day != 29 or nb_days == 366:
+                holidays.add(date(year, month, day).toordinal())
+
+        # Le 1er janvier de l'an 1 (ordinal 1) est un lundi
+        bitmap = bytes(
+            (ordinal - 1) % 7 in WORKING_WEEKDAYS and ordinal not in holidays
+            for ordinal in range(first_ordinal, first_ordinal + nb_days)
+        )
+        prefix = array('H', accumulate(bitmap, initial=0))
+        self._years[year] = prefix
+        return prefix
+
+    def _until(self, day):
+        """Jours ouvrés du 1er janvier de son année jusqu'à `day` inclus."""
+        return self._year(day.year)[day.timetuple().tm_yday]
+
+    def is_working_day(self, day):
+        prefix = self._year(day.year)
+        index = day.timetuple().tm_yday
+        return prefix[index] != prefix[index - 1]
+
+    def working_days(self, start, end):
+        """
+        Nombre de jours ouvrés entre deux dates incluses (0 si start > end).
+        """
+        if start > end:
+            return 0
+
+        start_index = start.timetuple().tm_yday - 1
+        if start.year == end.year:
+            return self._until(end) - self._year(start.year)[start_index]
+
+        first_year = self._year(start.year)
+        count = first_year[-1] - first_year[start_index]
+        for year in range(start.year + 1, end.year):
+            count += self._year(year)[-1]
+        return count + self._until(end)
+
+    def working_days_many(self, ranges):
+        """
+        Jours ouvrés d'une série de périodes.
+
+        Args:
+            ranges: itérable de (start, end)
+
+        Returns:
+            list[int]: un nombre par période, dans l'ordre de `ranges`
+        """
+        working_days = self.working_days
+        return [working_days(start, end) for start, end in ranges]
@@ -125,118 +125,31 @@ def accrue_monthly_leave():
     Acquisition mensuelle des congés payés annuels (type accrual_method='monthly').
     Exécutée le 1er de chaque mois à 02h00 UTC.
 
-    Algorithme pack-indépendant :
+    Algorithme pack-indépendant (hr/services/leave_accrual.py) :
     - Lit LEAVE_ANNUAL_DAYS + LEAVE_SENIORITY_* depuis PayrollParameter (code unique)
     - Calcule les jours acquis ce mois selon ancienneté de l'employé
-    - Crée ou met à jour LeaveAllocation pour l'année en cours
+    - Crée ou met à jour les LeaveAllocation de l'année en cours, en une transaction
     - Zéro hardcoding : toutes les valeurs viennent des fixtures de pack
 
-    Idempotent : si la tâche est rejouée le même mois, elle ne double pas les crédits
-    (contrôlé par le champ `accrued_this_run` via un flag en cache Redis).
+    Idempotent : le journal LeaveAccrualRun (unique par mois) empêche de
+    créditer deux fois le même mois.
     """
-    from datetime import date
-    from decimal import ROUND_HALF_UP, Decimal
-
-    from django.core.cache import cache
-
-    from payroll.models import PayrollParameter
-
-    from .models import Employee, LeaveAllocation, LeaveType
+    from .services.leave_accrual import AccrualAlreadyRun, LeaveAccrualService
 
     today = date.today()
-    year = today.year
-    month = today.month
-
-    # Clé d'idempotence : une seule exécution par mois
-    idempotency_key = f'accrue_monthly_leave_{year}_{month:02d}'
-    if cache.get(idempotency_key):
+    try:
+        run = LeaveAccrualService.accrue_month(today)
+    except AccrualAlreadyRun:
         logger.info(
-            f'accrue_monthly_leave: déjà exécutée pour {year}-{month:02d}, skip.'
+            f'accrue_monthly_leave: déjà exécutée pour {today.year}-{today.month:02d}, skip.'
         )
         return {'skipped': True, 'reason': 'already_run_this_month'}
 
-    # Lire les paramètres depuis PayrollParameter (pack-indépendant)
-    def get_param(code, default=Decimal('0')):
-        try:
-            return PayrollParameter.objects.get(code=code, is_active=True).value
-        except PayrollParameter.DoesNotExist:
-            logger.warning(
-                f'accrue_monthly_leave: paramètre {code} absent, défaut={default}'
-            )
-            return default
-
-    annual_days = get_param('LEAVE_ANNUAL_DAYS', Decimal('18'))
-    threshold_1 = get_param('LEAVE_SENIORITY_THRESHOLD_1', Decimal('5'))
-    bonus_1 = get_param('LEAVE_SENIORITY_BONUS_1', Decimal('0'))
-    threshold_2 = get_param('LEAVE_SENIORITY_THRESHOLD_2', Decimal('10'))
-    bonus_2 = get_param('LEAVE_SENIORITY_BONUS_2', Decimal('0'))
-
-    # Types de congés à acquisition mensuelle
-    monthly_types = LeaveType.objects.filter(accrual_method='monthly', is_active=True)
-    if not monthly_types.exists():
-        logger.warning(
-            'accrue_monthly_leave: aucun LeaveType avec accrual_method=monthly'
-        )
-        return {'allocations_updated': 0}
-
-    employees = Employee.objects.filter(
-        is_active=True,
-        hire_date__isnull=False,
-        hire_date__lte=today,
-    )
-
-    allocations_updated = 0
-
-    for emp in employees:
-        # Calcul ancienneté en années
-        years_of_service = Decimal(str((today - emp.hire_date).days / 365.25)).quantize(
-            Decimal('0.01')
-        )
-
-        # Bonus ancienneté pack-indépendant
-        seniority_bonus = Decimal('0')
-        if years_of_service >= threshold_2:
-            seniority_bonus = bonus_2
-        elif years_of_service >= threshold_1:
-            seniority_bonus = bonus_1
-
-        effective_annual = annual_days + seniority_bonus
-
-        # Jours acquis ce mois = annual / 12, arrondi au 0.5 supérieur
-        monthly_accrual = (effective_annual / Decimal('12')).quantize(
-            Decimal('0.5'), rounding=ROUND_HALF_UP
-        )
-
-        for leave_type in monthly_types:
-            alloc, created = LeaveAllocation.objects.get_or_create(
-                employee=emp,
-                leave_type=leave_type,
-                year=year,
-                defaults={
-                    'total_days': Decimal('0'),
-                    'used_days': Decimal('0'),
-                    'pending_days': Decimal('0'),
-                    'carried_days': Decimal('0'),
-                },
-            )
-            alloc.total_days = (alloc.total_days + monthly_accrual).quantize(
-                Decimal('0.1')
-            )
-            alloc.save(update_fields=['total_days'])
-            allocations_updated += 1
-
-    # Marquer comme exécutée pour ce mois (TTL jusqu'au 2 du mois suivant)
-    import calendar
-
-    days_in_month = calendar.monthrange(year, month)[1]
-    ttl_seconds = (days_in_month - today.day + 2) * 86400
-    cache.set(idempotency_key, True, ttl_seconds)
-
-    logger.info(
-        f'accrue_monthly_leave: {allocations_updated} allocations mises à jour '
-        f'pour {year}-{month:02d}'
-    )
-    return {'allocations_updated': allocations_updated, 'year': year, 'month': month}
+    return {
+        'allocations_updated': run.allocations_count if run else 0,
+        'year': today.year,
+        'month': today.month,
+    }
 
 
 @shared_task(name='hr.tasks.carry_over_annual_leave')
@@ -244,66 +157,22 @@ def carry_over_annual_leave():
     """
     Reporte les soldes de conges annuels non consommes au 1er janvier.
     Pack-independant : le plafond est lu depuis PayrollParameter (LEAVE_MAX_CARRY_DAYS).
-    Idempotent : cache Redis TTL 367 jours.
+    Idempotent : journal LeaveAccrualRun (unique par annee).
     """
-    from decimal import Decimal
-
-    from django.core.cache import cache
-
-    from .models import LeaveAllocation, LeaveType
-    from .services.leave_parameter_resolver import LeaveParameterResolver
+    from .services.leave_accrual import AccrualAlreadyRun, LeaveAccrualService
 
     today = date.today()
-    year = today.year
-    cache_key = f'carry_over_done_{year}'
-
-    if cache.get(cache_key):
-        logger.info(f'carry_over_annual_leave: report {year} deja effectue — skip.')
+    try:
+        run = LeaveAccrualService.carry_over(today)
+    except AccrualAlreadyRun:
+        logger.info(
+            f'carry_over_annual_leave: report {today.year} deja effectue — skip.'
+        )
         return {'skipped': True, 'reason': 'already_run_this_year'}
 
-    max_carry = LeaveParameterResolver.get_optional(
-        'LEAVE_MAX_CARRY_DAYS', Decimal('0')
-    )
-
-    annual_type = LeaveType.objects.filter(code='ANNUAL', is_active=True).first()
-    if not annual_type:
-        logger.warning('carry_over_annual_leave: LeaveType ANNUAL introuvable — skip.')
+    if run is None:
         return {'skipped': True, 'reason': 'no_annual_leave_type'}
-
-    prev_year_allocs = LeaveAllocation.objects.filter(
-        leave_type=annual_type,
-        year=year - 1,
-    ).select_related('employee')
-
-    count = 0
-    for prev_alloc in prev_year_allocs:
-        remaining = prev_alloc.remaining_days
-        carry = min(remaining, max_carry) if max_carry > 0 else Decimal('0')
-
-        if carry <= 0:
-            continue
-
-        current_alloc, _ = LeaveAllocation.objects.get_or_create(
-            employee=prev_alloc.employee,
-            leave_type=annual_type,
-            year=year,
-            defaults={
-                'total_days': Decimal('0'),
-                'used_days': Decimal('0'),
-                'pending_days': Decimal('0'),
-                'carried_days': Decimal('0'),
-            },
-        )
-        current_alloc.carried_days = carry.quantize(Decimal('0.1'))
-        current_alloc.save(update_fields=['carried_days'])
-        count += 1
-
-    # Idempotence : TTL jusqu'au 2 janvier de l'annee suivante
-    cache.set(cache_key, True, timeout=60 * 60 * 24 * 367)
-    logger.info(
-        f'carry_over_annual_leave: {count} allocations mises a jour pour {year}.'
-    )
-    return {'allocations_updated': count, 'year': year}
+    return {'allocations_updated': run.allocations_count, 'year': today.year}
 
 
 @shared_task(name='hr.tasks.remind_pending_approvals')
@@ -1 +1,72 @@
-# Create your tests here.
+from datetime import date
+
+import pytest
+
+from hr.models import (
+    Department,
+    Employee,
+    JobTitle,
+    LeaveAccrualRun,
+    LeaveAllocation,
+    LeaveType,
+    PublicHoliday,
+)
+from hr.services.leave_accrual import AccrualAlreadyRun, LeaveAccrualService
+from hr.services.working_calendar import WorkingDayCalendar
+
+
+@pytest.mark.django_db(transaction=True)
+def test_working_calendar_follows_public_holiday_changes():
+    # Mai 2025 : 22 jours ouvrés du lundi au vendredi
+    may = (date(2025, 5, 1), date(2025, 5, 31))
+    assert WorkingDayCalendar.for_pack().working_days(*may) == 22
+    # Calendrier mémorisé hors transaction
+    assert WorkingDayCalendar.for_pack() is WorkingDayCalendar.for_pack()
+
+    holiday = PublicHoliday.objects.create(
+        name='Fête du travail', date=date(2025, 5, 1), is_recurring=True
+    )
+    assert WorkingDayCalendar.for_pack().working_days(*may) == 21
+    assert (
+        WorkingDayCalendar.for_pack().working_days(date(2026, 4, 27), date(2026, 5, 3))
+        == 4
+    )
+
+    holiday.delete()
+    assert WorkingDayCalendar.for_pack().working_days(*may) == 22
+
+
+@pytest.mark.django_db
+def test_monthly_accrual_runs_once_per_month():
+    LeaveType.objects.create(name='Congé annuel', code='ANNUAL')
+    department = Department.objects.create(name='Technique')
+    job_title = JobTitle.objects.create(name='Développeur', department=department)
+    for i, hire_date in enumerate([date(2010, 6, 1), date(2024, 9, 1)]):
+        Employee.objects.create(
+            first_name=f'Employe{i}',
+            last_name='Test',
+            email=f'employe{i}@example.com',
+            employee_id=f'EMP{i:03d}',
+            hire_date=hire_date,
+            department=department,
+            job_title=job_title,
+        )
+
+    today = date(2025, 3, 31)
+    run = LeaveAccrualService.accrue_month(today)
+    assert run.allocations_count == 2
+    allocations = dict(LeaveAllocation.objects.values_list('employee_id', 'total_days'))
+    assert all(allocations.values())
+
+    # Tâche rejouée : le mois n'est pas crédité une seconde fois
+    with pytest.raises(AccrualAlreadyRun):
+        LeaveAccrualService.accrue_month(today)
+    assert (
+        dict(LeaveAllocation.objects.values_list('employee_id', 'total_days'))
+        == allocations
+    )
+    assert LeaveAccrualRun.objects.count() == 1
+
+    # Le mois suivant est crédité normalement
+    LeaveAccrualService.accrue_month(date(2025, 4, 30))
+    assert LeaveAccrualRun.objects.count() == 2
@@ -1,7 +1,7 @@
 # hr/views.py
 import os
 
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Exists, OuterRef, Prefetch, Q
 from django.http import FileResponse
 from django.utils import timezone
 from django_filters import rest_framework as django_filters
@@ -72,6 +72,36 @@ from .serializers import (
 )
 from .services.workflow_notification_service import WorkflowNotificationService
 
+# Relations lues par EmployeeListSerializer (department_name, manager_name...)
+EMPLOYEE_LIST_RELATED = ('department', 'job_title', 'manager', 'contract_type')
+
+
+def employee_list_queryset(queryset=None):
+    """
+    Employés prêts pour EmployeeListSerializer : relations jointes et
+    has_subordinates annoté (Employee.is_manager sans requête par ligne).
+    """
+    if queryset is None:
+        queryset = Employee.objects.all()
+    return queryset.select_related(*EMPLOYEE_LIST_RELATED).annotate(
+        has_subordinates=Exists(Employee.objects.filter(manager=OuterRef('pk')))
+    )
+
+
+def training_plan_queryset(queryset=None):
+    """Plans prêts pour TrainingPlanSerializer (employé, lignes, formations)."""
+    if queryset is None:
+        queryset = TrainingPlan.objects.all()
+    return queryset.prefetch_related(
+        Prefetch('employee', queryset=employee_list_queryset()),
+        Prefetch(
+            'training_items',
+            queryset=TrainingPlanItem.objects.select_related(
+                'training_course'
+            ).prefetch_related('training_course__training_skills__skill'),
+        ),
+    )
+
 
 # Filtres personnalisés
 class EmployeeFilter(django_filters.FilterSet):
@@ -128,7 +158,9 @@ class TrainingPlanFilter(django_filters.FilterSet):
 class DepartmentViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     """API pour les départements."""
 
-    queryset = Department.objects.all()
+    queryset = Department.objects.select_related('parent').annotate(
+        employee_count=Count('employees')
+    )
     serializer_class = DepartmentSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'hr'
@@ -142,7 +174,7 @@ class DepartmentViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     def employees(self, request, pk=None):
         """Récupérer tous les employés d'un département."""
         department = self.get_object()
-        employees = Employee.objects.filter(department=department)
+        employees = employee_list_queryset().filter(department=department)
         serializer = EmployeeListSerializer(employees, many=True)
         return Response(serializer.data)
 
@@ -150,7 +182,9 @@ class DepartmentViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     def job_titles(self, request, pk=None):
         """Récupérer tous les postes d'un département."""
         department = self.get_object()
-        job_titles = JobTitle.objects.filter(department=department)
+        job_titles = JobTitle.objects.filter(department=department).select_related(
+            'department'
+        )
         serializer = JobTitleSerializer(job_titles, many=True)
         return Response(serializer.data)
 
@@ -158,7 +192,7 @@ class DepartmentViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 class JobTitleViewSet(viewsets.ModelViewSet):
     """API pour les postes."""
 
-    queryset = JobTitle.objects.all()
+    queryset = JobTitle.objects.select_related('department').all()
     serializer_class = JobTitleSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'hr'
@@ -176,7 +210,7 @@ class JobTitleViewSet(viewsets.ModelViewSet):
     def employees(self, request, pk=None):
         """Récupérer tous les employés ayant ce poste."""
         job_title = self.get_object()
-        employees = Employee.objects.filter(job_title=job_title)
+        employees = employee_list_queryset().filter(job_title=job_title)
         serializer = EmployeeListSerializer(employees, many=True)
         return Response(serializer.data)
 
@@ -219,6 +253,15 @@ class EmployeeViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
         'subordinates',
     ]
 
+    def get_queryset(self):
+        queryset = employee_list_queryset(super().get_queryset())
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                'skills__skill',
+                Prefetch('subordinates', queryset=employee_list_queryset()),
+            )
+        return queryset
+
     def get_serializer_class(self):
         if self.action in ('retrieve', 'create', 'update', 'partial_update'):
             return EmployeeDetailSerializer
@@ -228,7 +271,7 @@ class EmployeeViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     def skills(self, request, pk=None):
         """Récupérer toutes les compétences d'un employé."""
         employee = self.get_object()
-        skills = EmployeeSkill.objects.filter(employee=employee)
+        skills = EmployeeSkill.objects.filter(employee=employee).select_related('skill')
         serializer = EmployeeSkillSerializer(skills, many=True)
         return Response(serializer.data)
 
@@ -236,7 +279,9 @@ class EmployeeViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     def missions(self, request, pk=None):
         """Récupérer toutes les missions d'un employé."""
         employee = self.get_object()
-        missions = Mission.objects.filter(employee=employee)
+        missions = Mission.objects.filter(employee=employee).select_related(
+            'employee', 'requested_by'
+        )
         serializer = MissionSerializer(missions, many=True)
         return Response(serializer.data)
 
@@ -244,7 +289,7 @@ class EmployeeViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     def training_plans(self, request, pk=None):
         """Récupérer tous les plans de formation d'un employé."""
         employee = self.get_object()
-        plans = TrainingPlan.objects.filter(employee=employee)
+        plans = training_plan_queryset().filter(employee=employee)
         serializer = TrainingPlanSerializer(plans, many=True)
         return Response(serializer.data)
 
@@ -252,7 +297,9 @@ class EmployeeViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     def availabilities(self, request, pk=None):
         """Récupérer toutes les mises en disponibilité d'un employé."""
         employee = self.get_object()
-        availabilities = Availability.objects.filter(employee=employee)
+        availabilities = Availability.objects.filter(employee=employee).select_related(
+            'employee', 'requested_by'
+        )
         serializer = AvailabilitySerializer(availabilities, many=True)
         return Response(serializer.data)
 
@@ -260,7 +307,7 @@ class EmployeeViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     def subordinates(self, request, pk=None):
         """Récupérer tous les subordonnés directs d'un employé."""
         employee = self.get_object()
-        subordinates = Employee.objects.filter(manager=employee)
+        subordinates = employee_list_queryset().filter(manager=employee)
         serializer = EmployeeListSerializer(subordinates, many=True)
         return Response(serializer.data)
 
@@ -330,7 +377,7 @@ class EmployeeViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 class MissionViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     """API pour les missions."""
 
-    queryset = Mission.objects.all()
+    queryset = Mission.objects.select_related('employee', 'requested_by').all()
     serializer_class = MissionSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'hr'
@@ -564,7 +611,7 @@ class MissionViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 class AvailabilityViewSet(viewsets.ModelViewSet):
     """API pour les mises en disponibilité."""
 
-    queryset = Availability.objects.all()
+    queryset = Availability.objects.select_related('employee', 'requested_by').all()
     serializer_class = AvailabilitySerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'hr'
@@ -752,7 +799,7 @@ class SkillViewSet(viewsets.ModelViewSet):
 class TrainingCourseViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     """API pour les formations."""
 
-    queryset = TrainingCourse.objects.all()
+    queryset = TrainingCourse.objects.prefetch_related('training_skills__skill')
     serializer_class = TrainingCourseSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'hr'
@@ -833,7 +880,7 @@ class TrainingPlanViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        qs = TrainingPlan.objects.select_related('employee')
+        qs = training_plan_queryset()
         try:
             emp = Employee.objects.get(user=user)
             if emp.is_hr or user.is_superuser:
@@ -1056,7 +1103,9 @@ class TrainingPlanViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 class TrainingPlanItemViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     """API pour les éléments des plans de formation."""
 
-    queryset = TrainingPlanItem.objects.all()
+    queryset = TrainingPlanItem.objects.select_related(
+        'training_course'
+    ).prefetch_related('training_course__training_skills__skill')
     serializer_class = TrainingPlanItemSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'hr'
@@ -1212,7 +1261,9 @@ class AnnouncementViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
         except Employee.DoesNotExist:
             pass
 
-        return qs
+        return qs.select_related('author').prefetch_related(
+            'target_departments', 'target_employees'
+        )
 
     def perform_create(self, serializer):
         try:
@@ -1225,7 +1276,7 @@ class AnnouncementViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 class WorkCertificateRequestViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     """API pour les demandes d attestation de travail."""
 
-    queryset = WorkCertificateRequest.objects.all()
+    queryset = WorkCertificateRequest.objects.select_related('employee').all()
     serializer_class = WorkCertificateRequestSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'hr'
@@ -1242,10 +1293,10 @@ class WorkCertificateRequestViewSet(SelfServicePermissionMixin, viewsets.ModelVi
         try:
             employee = Employee.objects.get(user=self.request.user)
             if employee.is_hr:
-                return WorkCertificateRequest.objects.all()
-            return WorkCertificateRequest.objects.filter(employee=employee)
+                return super().get_queryset()
+            return super().get_queryset().filter(employee=employee)
         except Employee.DoesNotExist:
-            return WorkCertificateRequest.objects.all()
+            return super().get_queryset()
 
     def perform_create(self, serializer):
         try:
@@ -1331,7 +1382,7 @@ class WorkCertificateRequestViewSet(SelfServicePermissionMixin, viewsets.ModelVi
 class ComplaintViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     """API pour les doleances."""
 
-    queryset = Complaint.objects.all()
+    queryset = Complaint.objects.select_related('employee', 'assigned_to').all()
     serializer_class = ComplaintSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'hr'
@@ -1346,15 +1397,16 @@ class ComplaintViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = super().get_queryset()
         if user.is_superuser:
-            return Complaint.objects.all()
+            return queryset
         try:
             emp = Employee.objects.get(user=user)
             if emp.is_hr:
-                return Complaint.objects.all()
-            return Complaint.objects.filter(employee=emp)
+                return queryset
+            return queryset.filter(employee=emp)
         except Employee.DoesNotExist:
-            return Complaint.objects.all()
+            return queryset
 
     def perform_create(self, serializer):
         try:
@@ -1394,7 +1446,9 @@ class RewardTypeViewSet(viewsets.ModelViewSet):
 class RewardViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     """API pour les recompenses."""
 
-    queryset = Reward.objects.all()
+    queryset = Reward.objects.select_related(
+        'employee', 'reward_type', 'awarded_by'
+    ).all()
     serializer_class = RewardSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'hr'
@@ -1402,8 +1456,8 @@ class RewardViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.action == 'board':
-            return Reward.objects.filter(is_public=True)
-        return Reward.objects.all()
+            return super().get_queryset().filter(is_public=True)
+        return super().get_queryset()
 
     def perform_create(self, serializer):
         try:
@@ -1818,7 +1872,12 @@ class ExpenseCategoryViewSet(viewsets.ReadOnlyModelViewSet):
 class ExpenseReportViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
     """Notes de frais avec workflow Manager → Finance."""
 
-    queryset = ExpenseReport.objects.select_related('employee')
+    queryset = ExpenseReport.objects.select_related('employee').prefetch_related(
+        Prefetch(
+            'items',
+            queryset=ExpenseItem.objects.select_related('category', 'currency'),
+        )
+    )
     serializer_class = ExpenseReportSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
@@ -1841,7 +1900,7 @@ class ExpenseReportViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        qs = ExpenseReport.objects.select_related('employee')
+        qs = super().get_queryset()
         try:
             emp = Employee.objects.get(user=user)
             if not (user.is_superuser or emp.is_hr):
@@ -0,0 +1,174 @@
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from catalog.models import Product
+from core.models import Currency
+from inventory.models import StockLevel, StockMove, Warehouse
+from inventory.services.stock_service import post_stock_moves
+
+BENCHMARK_CODE = '__BENCH_STOCK'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure le débit de sorties de stock de factures postées en parallèle, '
+        'mouvement par mouvement (signal post_save) puis en lot '
+        '(post_stock_moves). Les données créées sont supprimées en fin de mesure.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Nombre de facturations simultanées',
+        )
+        parser.add_argument(
+            '--invoices',
+            type=int,
+            default=50,
+            help='Nombre de factures par thread',
+        )
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=30,
+            help='Nombre de lignes par facture',
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=200,
+            help='Nombre de produits (partagés entre les threads)',
+        )
+
+    def handle(self, *args, **options):
+        # XXX : code ISO 4217 réservé aux tests
+        currency, currency_created = Currency.objects.get_or_create(
+            code='XXX', defaults={'name': 'Benchmark'}
+        )
+        warehouse = Warehouse.objects.create(code=BENCHMARK_CODE, name='Benchmark')
+        products = Product.objects.bulk_create(
+            Product(
+                name=f'Produit {i}',
+                reference=f'{BENCHMARK_CODE}{i:05d}',
+                unit_price=Decimal('10.00'),
+                currency=currency,
+            )
+            for i in range(options['products'])
+        )
+        product_ids = [product.pk for product in products]
+
+        self.stdout.write(
+            f'{"Mode":>9} {"Threads":>8} {"Mouvements":>11} {"Erreurs":>8} '
+            f'{"Durée (s)":>10} {"Mouvements/s":>13}'
+        )
+        try:
+            for mode in ('unitaire', 'lot'):
+                moves, errors, elapsed = self._run(
+                    mode, warehouse, product_ids, options
+                )
+                self.stdout.write(
+                    f'{mode:>9} {options["threads"]:>8} {moves:>11} {errors:>8} '
+                    f'{elapsed:>10.2f} {moves / elapsed:>13.0f}'
+                )
+                self._check_levels(warehouse)
+                StockMove.objects.filter(warehouse=warehouse).delete()
+                StockLevel.objects.filter(warehouse=warehouse).delete()
+        finally:
+            # Suppression en cascade des mouvements et niveaux de stock
+            warehouse.delete()
+            Product.objects.filter(pk__in=product_ids).delete()
+            if currency_created:
+                currency.delete()
+
+    def _run(self, mode, warehouse, product_ids, options):
+        results = []
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            moves = errors = 0
+            try:
+                for _ in range(options['invoices']):
+                    lines = [
+                        (rng.choice(product_ids), Decimal(rng.randint(1, 5)))
+                        for _ in range(options['lines'])
+                    ]
+                    try:
+                        self._post_invoice(mode, warehouse, lines)
+                        moves += len(lines)
+                    except DatabaseError:
+                        # Interblocage ou verrou expiré : facture abandonnée
+                        errors += 1
+            finally:
+                close_old_connections()
+                connection.close()
+            with lock:
+                results.append((moves, errors))
+
+        threads = [
+            threading.Thread(target=worker, args=(seed,))
+            for seed in range(options['threads'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        return (
+            sum(moves for moves, _errors in results),
+            sum(errors for _moves, errors in results),
+            elapsed,
+        )
+
+    @staticmethod
+    def _post_invoice(mode, warehouse, lines):
+        now = timezone.now()
+        moves = [
+            StockMove(
+                product_id=product_id,
+                warehouse=warehouse,
+                move_type='OUT',
+                quantity=quantity,
+                reference=BENCHMARK_CODE,
+                date=now,
+            )
+            for product_id, quantity in lines
+        ]
+        with transaction.atomic():
+            if mode == 'lot':
+                post_stock_moves(moves)
+            else:
+                for move in moves:
+                    move.save()
+
+    def _check_levels(self, warehouse):
+        """Vérifie que les niveaux de stock correspondent aux mouvements."""
+        posted = {}
+        for product_id, quantity in StockMove.objects.filter(
+            warehouse=warehouse
+        ).values_list('product_id', 'quantity'):
+            posted[product_id] = posted.get(product_id, Decimal('0')) - quantity
+        levels = dict(
+            StockLevel.objects.filter(warehouse=warehouse).values_list(
+                'product_id', 'quantity_on_hand'
+            )
+        )
+        mismatches = sum(
+            1
+            for product_id, quantity in posted.items()
+            if levels.get(product_id) != quantity
+        )
+        if mismatches:
+            self.stdout.write(
+                self.style.ERROR(f'{mismatches} niveau(x) de stock incohérent(s)')
+            )
@@ -98,6 +98,20 @@ class StockLevelSerializer(serializers.ModelSerializer):
         return False
 
 
+class ProductStockAlertSerializer(serializers.Serializer):
+    """Produit sous son seuil d'alerte, tous entrepôts confondus."""
+
+    product = serializers.IntegerField(source='id')
+    product_reference = serializers.CharField(source='reference')
+    product_name = serializers.CharField(source='name')
+    stock_alert_threshold = serializers.DecimalField(max_digits=15, decimal_places=3)
+    total_available = serializers.DecimalField(max_digits=15, decimal_places=3)
+    shortage = serializers.SerializerMethodField()
+
+    def get_shortage(self, obj):
+        return str(obj['stock_alert_threshold'] - obj['total_available'])
+
+
 class StockInventoryLineSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_reference = serializers.CharField(
@@ -128,13 +142,17 @@ class StockInventorySerializer(serializers.ModelSerializer):
     validated_by_name = serializers.CharField(
         source='validated_by.get_full_name', read_only=True, default=None
     )
-    lines_count = serializers.IntegerField(source='lines.count', read_only=True)
+    lines_count = serializers.SerializerMethodField()
 
     class Meta:
         model = StockInventory
         fields = '__all__'
         read_only_fields = ['validated_by', 'validated_at']
 
+    def get_lines_count(self, obj):
+        count = getattr(obj, 'lines_count', None)
+        return obj.lines.count() if count is None else count
+
 
 class StockInventoryDetailSerializer(StockInventorySerializer):
     lines = StockInventoryLineSerializer(many=True, read_only=True)
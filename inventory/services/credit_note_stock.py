@@ -8,49 +8,48 @@ import logging
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 
-from inventory.models import StockMove, Warehouse
+from inventory.models import StockMove
+from inventory.services.stock_service import get_default_warehouse, post_stock_moves
 
 logger = logging.getLogger(__name__)
 
 
-def _get_default_warehouse():
-    """Recupere l'entrepot par defaut ou le premier actif."""
-    wh = Warehouse.objects.filter(is_default=True).first()
-    if not wh:
-        wh = Warehouse.objects.filter(is_active=True).first()
-    return wh
-
-
-def create_return_stock_move(
-    product,
-    quantity,
+def create_return_stock_moves(
+    items_with_return,
     reference,
     move_type='RETURN_IN',
     source_object=None,
-    unit_cost=None,
     user=None,
     notes='',
 ):
     """
-    Cree un StockMove de retour (RETURN_IN pour avoir client, RETURN_OUT pour avoir fournisseur).
+    Cree en lot les StockMove de retour d'un avoir (RETURN_IN pour avoir
+    client, RETURN_OUT pour avoir fournisseur).
     Ne traite que les produits stockables.
-    """
-    if not product:
-        return None
 
-    if getattr(product, 'product_type', 'stockable') != 'stockable':
-        logger.info('Produit %s non stockable — retour stock ignore', product.reference)
-        return None
-
-    if quantity <= 0:
-        return None
+    Args:
+        items_with_return: [{'product', 'quantity', 'unit_cost'}]
+    """
+    items = []
+    for item_data in items_with_return:
+        product = item_data['product']
+        if not product or item_data['quantity'] <= 0:
+            continue
+        if getattr(product, 'product_type', 'stockable') != 'stockable':
+            logger.info(
+                'Produit %s non stockable — retour stock ignore', product.reference
+            )
+            continue
+        items.append(item_data)
+    if not items:
+        return []
 
-    warehouse = _get_default_warehouse()
+    warehouse = get_default_warehouse()
     if not warehouse:
         logger.warning(
             'Aucun entrepot trouve — retour stock non genere pour %s', reference
         )
-        return None
+        return []
 
     # Preparer les champs GenericFK
     ct = None
@@ -60,85 +59,104 @@ def create_return_stock_move(
         obj_id = source_object.pk
 
     # Eviter les doublons
+    existing = set()
     if ct and obj_id:
-        existing = StockMove.objects.filter(
-            content_type=ct,
-            object_id=obj_id,
-            product=product,
-            move_type=move_type,
-        ).exists()
-        if existing:
+        existing = set(
+            StockMove.objects.filter(
+                content_type=ct,
+                object_id=obj_id,
+                product__in=[item_data['product'] for item_data in items],
+                move_type=move_type,
+            ).values_list('product_id', flat=True)
+        )
+        for product_id in existing:
             logger.info(
-                'StockMove %s deja existant pour %s (ct=%s, obj_id=%s)',
+                'StockMove %s deja existant pour le produit %s (ct=%s, obj_id=%s)',
                 move_type,
-                product.reference,
+                product_id,
                 ct,
                 obj_id,
             )
-            return None
 
-    move = StockMove.objects.create(
-        product=product,
-        warehouse=warehouse,
-        move_type=move_type,
-        quantity=quantity,
-        unit_cost=unit_cost,
-        reference=reference,
-        content_type=ct,
-        object_id=obj_id,
-        date=timezone.now(),
-        notes=notes or f'Retour stock — {reference}',
-        created_by=user,
+    now = timezone.now()
+    moves = post_stock_moves(
+        StockMove(
+            product=item_data['product'],
+            warehouse=warehouse,
+            move_type=move_type,
+            quantity=item_data['quantity'],
+            unit_cost=item_data.get('unit_cost'),
+            reference=reference,
+            content_type=ct,
+            object_id=obj_id,
+            date=now,
+            notes=notes or f'Retour stock — {reference}',
+            created_by=user,
+        )
+        for item_data in items
+        if item_data['product'].pk not in existing
     )
 
-    logger.info(
-        'StockMove %s cree : produit=%s, qte=%s, ref=%s',
-        move_type,
-        product.reference,
-        quantity,
+    for move in moves:
+        logger.info(
+            'StockMove %s cree : produit=%s, qte=%s, ref=%s',
+            move_type,
+            move.product.reference,
+            move.quantity,
+            reference,
+        )
+
+    return moves
+
+
+def create_return_stock_move(
+    product,
+    quantity,
+    reference,
+    move_type='RETURN_IN',
+    source_object=None,
+    unit_cost=None,
+    user=None,
+    notes='',
+):
+    """
+    Cree un StockMove de retour (RETURN_IN pour avoir client, RETURN_OUT pour avoir fournisseur).
+    Ne traite que les produits stockables.
+    """
+    moves = create_return_stock_moves(
+        [{'product': product, 'quantity': quantity, 'unit_cost': unit_cost}],
         reference,
+        move_type=move_type,
+        source_object=source_object,
+        user=user,
+        notes=notes,
     )
-
-    return move
+    return moves[0] if moves else None
 
 
 def process_credit_note_returns(credit_note, items_with_return, user=None):
     """
     Traite les retours en stock pour un avoir client.
     """
-    moves = []
-    for item_data in items_with_return:
-        move = create_return_stock_move(
-            product=item_data['product'],
-            quantity=item_data['quantity'],
-            reference=f'AV-{credit_note.number}',
-            move_type='RETURN_IN',
-            source_object=credit_note,
-            unit_cost=item_data.get('unit_cost'),
-            user=user,
-            notes=f'Retour client — Avoir {credit_note.number} (Facture {credit_note.parent_invoice.number})',
-        )
-        if move:
-            moves.append(move)
-    return moves
+    return create_return_stock_moves(
+        items_with_return,
+        reference=f'AV-{credit_note.number}',
+        move_type='RETURN_IN',
+        source_object=credit_note,
+        user=user,
+        notes=f'Retour client — Avoir {credit_note.number} (Facture {credit_note.parent_invoice.number})',
+    )
 
 
 def process_supplier_credit_note_returns(credit_note, items_with_return, user=None):
     """
     Traite les retours en stock pour un avoir fournisseur.
     """
-    moves = []
-    for item_data in items_with_return:
-        move = create_return_stock_move(
-            product=item_data['product'],
-            quantity=item_data['quantity'],
-            reference=f'AV-FOURN-{credit_note.number}',
-            move_type='RETURN_OUT',
-            source_object=credit_note,
-            unit_cost=item_data.get('unit_cost'),
-            user=user,
-            notes=f'Retour fournisseur — Avoir {credit_note.number}',
-        )
-        if move:
-            moves.append(move)
-    return moves
+    return create_return_stock_moves(
+        items_with_return,
+        reference=f'AV-FOURN-{credit_note.number}',
+        move_type='RETURN_OUT',
+        source_object=credit_note,
+        user=user,
+        notes=f'Retour fournisseur — Avoir {credit_note.number}',
+    )
@@ -0,0 +1,159 @@
+"""
+Validation d'un inventaire physique en une opération par lots.
+
+Les écarts (quantité physique - théorique) sont calculés par une seule
+requête groupée par produit ; les mouvements d'ajustement sont insérés
+par post_stock_moves, qui applique les variations aux StockLevel en un
+bulk_update, dans la même transaction que le passage à l'état 'validated'.
+
+Au-delà de INVENTORY_VALIDATION_SYNC_LINES lignes, la validation est
+confiée à Celery et suivie par une tâche de fond (core.BackgroundJob).
+"""
+
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from core.services.background_jobs import JobReporter, create_job
+from inventory.models import StockInventory, StockInventoryLine, StockMove
+from inventory.services.stock_service import post_stock_moves
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = 'inventory_validation'
+
+# Nombre de lignes au-delà duquel la validation passe en tâche de fond
+DEFAULT_SYNC_LINES = 2000
+
+
+class InventoryValidationError(Exception):
+    """L'inventaire ne peut pas être validé (déjà validé, sans lignes)."""
+
+
+def runs_in_background(lines_count):
+    """Vrai si la validation d'un inventaire de cette taille est confiée à Celery."""
+    return lines_count > getattr(
+        settings, 'INVENTORY_VALIDATION_SYNC_LINES', DEFAULT_SYNC_LINES
+    )
+
+
+def inventory_differences(inventory):
+    """
+    Écart net de chaque produit de l'inventaire (une requête).
+
+    Returns:
+        list: [(product_id, écart)] des produits dont l'écart est non nul
+    """
+    return list(
+        StockInventoryLine.objects.filter(inventory=inventory)
+        .values('product_id')
+        .annotate(diff=Sum('difference'))
+        .exclude(diff=0)
+        .order_by('product_id')
+        .values_list('product_id', 'diff')
+    )
+
+
+def validate_inventory(inventory_id, user=None):
+    """
+    Génère les ajustements de l'inventaire et le marque validé.
+
+    Args:
+        inventory_id: inventaire à valider
+        user: utilisateur à l'origine de la validation
+
+    Returns:
+        dict: {'lines': lignes, 'moves_created': mouvements créés}
+
+    Raises:
+        InventoryValidationError: inventaire déjà validé ou sans lignes
+    """
+    with transaction.atomic():
+        # Verrou : deux validations concurrentes ne s'appliquent pas deux fois
+        inventory = StockInventory.objects.select_for_update().get(pk=inventory_id)
+        if inventory.state == 'validated':
+            raise InventoryValidationError(_('Cet inventaire est déjà validé.'))
+
+        lines_count = inventory.lines.count()
+        if not lines_count:
+            raise InventoryValidationError(_("Aucune ligne d'inventaire à valider."))
+
+        differences = inventory_differences(inventory)
+        content_type = ContentType.objects.get_for_model(StockInventory)
+        now = timezone.now()
+        reference = f'INV-{inventory.reference}'
+        moves = post_stock_moves(
+            (
+                StockMove(
+                    product_id=product_id,
+                    warehouse_id=inventory.warehouse_id,
+                    move_type='ADJUST',
+                    quantity=abs(diff),
+                    reference=reference,
+                    content_type=content_type,
+                    object_id=inventory.pk,
+                    date=now,
+                    notes=_('Ajustement inventaire %(ref)s : %(diff)s')
+                    % {'ref': inventory.reference, 'diff': diff},
+                    created_by=user,
+                )
+                for product_id, diff in differences
+            ),
+            deltas=[diff for _product_id, diff in differences],
+        )
+
+        inventory.state = 'validated'
+        inventory.validated_by = user
+        inventory.validated_at = now
+        inventory.save(update_fields=['state', 'validated_by', 'validated_at'])
+
+    logger.info(
+        f'Inventaire {inventory.reference} validé : {len(moves)} ajustements '
+        f'pour {lines_count} lignes'
+    )
+    return {'lines': lines_count, 'moves_created': len(moves)}
+
+
+def start_validation_job(inventory, user=None):
+    """
+    Crée la tâche de fond et planifie la validation.
+
+    Returns:
+        BackgroundJob
+    """
+    from inventory.tasks import validate_inventory_job
+
+    with transaction.atomic():
+        job = create_job(
+            JOB_TYPE,
+            user=user,
+            message=_("Validation de l'inventaire %(ref)s")
+            % {'ref': inventory.reference},
+        )
+        # Les workers ne doivent voir la tâche qu'une fois enregistrée
+        transaction.on_commit(
+            lambda: validate_inventory_job.delay(job.pk, inventory.pk)
+        )
+    return job
+
+
+def run_validation_job(job, inventory_id):
+    """
+    Exécute une validation planifiée par start_validation_job.
+
+    La validation est atomique : l'avancement est écrit avant (nombre de
+    lignes) et après (résultat) la transaction.
+    """
+    reporter = JobReporter(job)
+    reporter.start(
+        StockInventoryLine.objects.filter(inventory_id=inventory_id).count(),
+        message=_('Validation en cours'),
+    )
+    result = validate_inventory(inventory_id, user=job.created_by)
+    reporter.finish(result={'inventory': inventory_id, **result})
+    return result
@@ -8,75 +8,93 @@ import logging
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 
-from inventory.models import StockMove, Warehouse
+from inventory.models import StockMove
+from inventory.services.stock_service import get_default_warehouse, post_stock_moves
 
 logger = logging.getLogger(__name__)
 
 
-def create_stock_move_for_invoice_item(invoice_item):
+def create_stock_moves_for_invoice_items(invoice, invoice_items):
     """
-    Crée un StockMove OUT pour une ligne de facture
-    si le produit est de type 'stockable'.
+    Crée en lot les StockMove OUT des lignes d'une facture dont le produit
+    est de type 'stockable'.
     Ne traite que les factures standard (pas les avoirs ni les acomptes).
-    """
-    invoice = invoice_item.invoice
 
+    L'entrepôt, le type de contenu et les doublons sont résolus une fois
+    pour toutes les lignes ; les mouvements sont enregistrés par
+    post_stock_moves.
+
+    Returns:
+        list: les mouvements créés
+    """
     # Ne pas traiter les avoirs ni les factures d'acompte
     if invoice.type in ('credit_note', 'deposit'):
-        return None
-
-    product = invoice_item.product
-    if not product:
-        return None
-
-    # Ne traiter que les produits stockables
-    if getattr(product, 'product_type', 'stockable') != 'stockable':
-        return None
-
-    # Éviter les quantités nulles ou négatives
-    if invoice_item.quantity <= 0:
-        return None
+        return []
+
+    # Ne traiter que les produits stockables, en quantité positive
+    invoice_items = [
+        item
+        for item in invoice_items
+        if item.product
+        and getattr(item.product, 'product_type', 'stockable') == 'stockable'
+        and item.quantity > 0
+    ]
+    if not invoice_items:
+        return []
 
     # Récupérer l'entrepôt par défaut
-    default_warehouse = Warehouse.objects.filter(is_default=True).first()
-    if not default_warehouse:
-        default_warehouse = Warehouse.objects.filter(is_active=True).first()
-
+    default_warehouse = get_default_warehouse()
     if not default_warehouse:
         logger.warning(
             'Aucun entrepôt trouvé — mouvement stock non généré pour facture %s',
             invoice.number,
         )
-        return None
+        return []
 
     # Éviter les doublons (si le signal se déclenche plusieurs fois)
-    ct = ContentType.objects.get_for_model(invoice_item)
-    existing = StockMove.objects.filter(
-        content_type=ct,
-        object_id=invoice_item.pk,
-    ).exists()
-    if existing:
-        return None
-
-    move = StockMove.objects.create(
-        product=product,
-        warehouse=default_warehouse,
-        move_type='OUT',
-        quantity=invoice_item.quantity,
-        unit_cost=invoice_item.unit_price,
-        reference=f'FACT-{invoice.number}',
-        content_type=ct,
-        object_id=invoice_item.pk,
-        date=timezone.now(),
-        notes=f'Sortie automatique — Facture {invoice.number}',
+    ct = ContentType.objects.get_for_model(invoice_items[0])
+    existing = set(
+        StockMove.objects.filter(
+            content_type=ct,
+            object_id__in=[item.pk for item in invoice_items],
+        ).values_list('object_id', flat=True)
     )
 
-    logger.info(
-        'Facture %s, ligne %s : StockMove OUT créé (produit=%s, qté=%s)',
-        invoice.number,
-        invoice_item.pk,
-        product.reference,
-        invoice_item.quantity,
+    now = timezone.now()
+    moves = post_stock_moves(
+        StockMove(
+            product=item.product,
+            warehouse=default_warehouse,
+            move_type='OUT',
+            quantity=item.quantity,
+            unit_cost=item.unit_price,
+            reference=f'FACT-{invoice.number}',
+            content_type=ct,
+            object_id=item.pk,
+            date=now,
+            notes=f'Sortie automatique — Facture {invoice.number}',
+        )
+        for item in invoice_items
+        if item.pk not in existing
     )
 
-    return move
+    for move in moves:
+        logger.info(
+            'Facture %s, ligne %s : StockMove OUT créé (produit=%s, qté=%s)',
+            invoice.number,
+            move.object_id,
+            move.product.reference,
+            move.quantity,
+        )
+
+    return moves
+
+
+def create_stock_move_for_invoice_item(invoice_item):
+    """
+    Crée un StockMove OUT pour une ligne de facture
+    si le produit est de type 'stockable'.
+    Ne traite que les factures standard (pas les avoirs ni les acomptes).
+    """
+    moves = create_stock_moves_for_invoice_items(invoice_item.invoice, [invoice_item])
+    return moves[0] if moves else None
@@ -0,0 +1,75 @@
+"""
+Détection des produits sous leur seuil d'alerte de stock.
+
+Deux niveaux d'alerte :
+- par entrepôt : StockLevel dont la quantité disponible est sous le seuil
+  du produit ;
+- global : produits dont la quantité disponible cumulée sur tous les
+  entrepôts est sous le seuil. Le cumul est calculé par une seule requête
+  groupée par produit (HAVING sur le seuil) ; un produit sans aucun
+  StockLevel a un disponible nul.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from inventory.models import StockLevel
+
+
+def warehouse_stock_alerts(queryset=None):
+    """StockLevel dont la quantité disponible est sous le seuil du produit."""
+    if queryset is None:
+        queryset = StockLevel.objects.all()
+    return queryset.filter(
+        product__product_type='stockable',
+        product__stock_alert_threshold__gt=0,
+        quantity_available__lt=F('product__stock_alert_threshold'),
+    )
+
+
+def product_stock_alerts():
+    """
+    Produits dont le disponible tous entrepôts confondus est sous le seuil.
+
+    Returns:
+        QuerySet de dict : id, reference, name, stock_alert_threshold,
+        total_available
+    """
+    from catalog.models import Product
+
+    return (
+        Product.objects.filter(product_type='stockable', stock_alert_threshold__gt=0)
+        .values('id', 'reference', 'name', 'stock_alert_threshold')
+        .annotate(
+            total_available=Coalesce(
+                Sum('stock_levels__quantity_available'),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=15, decimal_places=3),
+            )
+        )
+        .filter(total_available__lt=F('stock_alert_threshold'))
+        .order_by('reference')
+    )
+
+
+def stock_alert_notifications(today=None):
+    """Alertes globales au format de NotificationFanoutService.fan_out."""
+    today = today or date.today()
+    return [
+        {
+            'level': 'critical',
+            'title': f'Stock bas : {product["name"]}',
+            'message': (
+                f'{product["reference"]} — {product["name"]} : '
+                f'{product["total_available"]} disponible(s), '
+                f'seuil = {product["stock_alert_threshold"]}.'
+            ),
+            'module': 'inventory',
+            'link': '/inventory/stock-levels',
+            'dedup_key': f'stock_alert_{product["id"]}_{today.isoformat()}',
+        }
+        for product in product_stock_alerts()
+    ]
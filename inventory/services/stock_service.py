@@ -1,8 +1,11 @@
+from collections import defaultdict
 from decimal import Decimal
 
 from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
 
-from inventory.models import StockLevel
+from inventory.models import StockLevel, StockMove, Warehouse
 
 # Types de mouvements qui AUGMENTENT le stock
 MOVE_TYPES_IN = {'IN', 'RETURN_IN'}
@@ -16,49 +19,181 @@ MOVE_TYPES_ADJUST = {'ADJUST'}
 # Transfert : sort d'un entrepôt, entre dans un autre (géré séparément)
 MOVE_TYPES_TRANSFER = {'TRANSFER'}
 
+# Taille des lots d'insertion des mouvements
+STOCK_MOVE_BATCH_SIZE = 1000
 
-@transaction.atomic
-def update_stock_level(stock_move):
+
+def get_default_warehouse():
+    """Entrepôt par défaut, sinon le premier entrepôt actif (None si aucun)."""
+    warehouse = Warehouse.objects.filter(is_default=True).first()
+    if not warehouse:
+        warehouse = Warehouse.objects.filter(is_active=True).first()
+    return warehouse
+
+
+def _is_inventory_adjustment(stock_move):
+    return (
+        stock_move.move_type in MOVE_TYPES_ADJUST
+        and stock_move.content_type
+        and stock_move.content_type.model == 'stockinventory'
+        and stock_move.object_id
+    )
+
+
+def stock_deltas(stock_moves):
     """
-    Met à jour le StockLevel après création d'un StockMove.
-    Crée le StockLevel s'il n'existe pas encore.
+    Variation signée du stock de chaque mouvement (même ordre que stock_moves).
+
+    Pour un ajustement d'inventaire, la quantité du move est la valeur absolue
+    de la différence : le sens est lu sur les lignes de l'inventaire (une
+    seule requête pour tous les ajustements). Un ajustement manuel est traité
+    comme une entrée ; un transfert ne modifie pas le stock ici.
     """
-    level, _created = StockLevel.objects.select_for_update().get_or_create(
-        product=stock_move.product,
-        warehouse=stock_move.warehouse,
-        defaults={'quantity_on_hand': Decimal('0'), 'quantity_reserved': Decimal('0')},
-    )
+    inventory_diffs = {}
+    adjustments = [move for move in stock_moves if _is_inventory_adjustment(move)]
+    if adjustments:
+        from inventory.models import StockInventoryLine
 
-    move_type = stock_move.move_type
-    qty = stock_move.quantity
-
-    if move_type in MOVE_TYPES_IN:
-        level.quantity_on_hand += qty
-    elif move_type in MOVE_TYPES_OUT:
-        level.quantity_on_hand -= qty
-    elif move_type in MOVE_TYPES_ADJUST:
-        # Pour un ajustement d'inventaire, la quantité du move est la valeur absolue
-        # de la différence. On détermine le sens via les notes ou le signe.
-        # Convention : si source_document_type == 'inventory', on lit la différence
-        # directement depuis la ligne d'inventaire. Sinon, on traite comme une entrée.
-        if (
-            stock_move.content_type
-            and stock_move.content_type.model == 'stockinventory'
-            and stock_move.object_id
-        ):
-            from inventory.models import StockInventoryLine
-
-            # Recalculer à partir des lignes d'inventaire validées
-            lines = StockInventoryLine.objects.filter(
-                inventory_id=stock_move.object_id,
-                product=stock_move.product,
+        rows = (
+            StockInventoryLine.objects.filter(
+                inventory_id__in={move.object_id for move in adjustments},
+                product_id__in={move.product_id for move in adjustments},
             )
-            for line in lines:
-                diff = line.physical_qty - line.theoretical_qty
-                level.quantity_on_hand += diff
+            .values('inventory_id', 'product_id')
+            .annotate(diff=Sum('difference'))
+        )
+        inventory_diffs = {
+            (row['inventory_id'], row['product_id']): row['diff'] for row in rows
+        }
+
+    deltas = []
+    for move in stock_moves:
+        if move.move_type in MOVE_TYPES_IN:
+            deltas.append(move.quantity)
+        elif move.move_type in MOVE_TYPES_OUT:
+            deltas.append(-move.quantity)
+        elif _is_inventory_adjustment(move):
+            deltas.append(
+                inventory_diffs.get((move.object_id, move.product_id), Decimal('0'))
+            )
+        elif move.move_type in MOVE_TYPES_ADJUST:
+            deltas.append(move.quantity)
         else:
-            # Ajustement manuel positif (entrée)
-            level.quantity_on_hand += qty
+            deltas.append(Decimal('0'))
+    return deltas
+
+
+@transaction.atomic
+def apply_stock_deltas(deltas):
+    """
+    Applique des variations nettes aux StockLevel et les retourne.
+
+    Les StockLevel manquants sont créés, puis toutes les lignes concernées
+    sont verrouillées en une requête, triées par (produit, entrepôt) : deux
+    transactions concurrentes les verrouillent dans le même ordre et ne
+    peuvent pas s'interbloquer. Les quantités sont écrites en un bulk_update.
+
+    Args:
+        deltas: {(product_id, warehouse_id): variation}
+
+    Returns:
+        dict: {(product_id, warehouse_id): StockLevel} ; quantity_available
+        (colonne générée) y est celle lue avant la mise à jour
+    """
+    if not deltas:
+        return {}
+    keys = sorted(deltas)
+
+    products_by_warehouse = defaultdict(list)
+    for product_id, warehouse_id in keys:
+        products_by_warehouse[warehouse_id].append(product_id)
+    condition = Q()
+    for warehouse_id, product_ids in products_by_warehouse.items():
+        condition |= Q(warehouse_id=warehouse_id, product_id__in=product_ids)
 
-    level.save()
+    existing = set(
+        StockLevel.objects.filter(condition).values_list('product_id', 'warehouse_id')
+    )
+    missing = [key for key in keys if key not in existing]
+    if missing:
+        # ignore_conflicts : une transaction concurrente a pu les créer
+        StockLevel.objects.bulk_create(
+            [
+                StockLevel(
+                    product_id=product_id,
+                    warehouse_id=warehouse_id,
+                    quantity_on_hand=Decimal('0'),
+                    quantity_reserved=Decimal('0'),
+                )
+                for product_id, warehouse_id in missing
+            ],
+            ignore_conflicts=True,
+        )
+
+    levels = {
+        (level.product_id, level.warehouse_id): level
+        for level in StockLevel.objects.select_for_update()
+        .filter(condition)
+        .order_by('product_id', 'warehouse_id')
+    }
+
+    now = timezone.now()
+    changed = []
+    for key in keys:
+        if deltas[key]:
+            level = levels[key]
+            level.quantity_on_hand += deltas[key]
+            level.last_updated = now
+            changed.append(level)
+    if changed:
+        StockLevel.objects.bulk_update(changed, ['quantity_on_hand', 'last_updated'])
+    return levels
+
+
+@transaction.atomic
+def post_stock_moves(stock_moves, deltas=None):
+    """
+    Enregistre des mouvements de stock en lot et met à jour les StockLevel.
+
+    Les mouvements sont insérés par bulk_create : le signal post_save de
+    StockMove (mise à jour ligne par ligne) n'est pas émis. Leurs variations,
+    regroupées par (produit, entrepôt), sont appliquées par
+    apply_stock_deltas dans la même transaction.
+
+    Args:
+        stock_moves: StockMove non enregistrés
+        deltas: variations signées, dans l'ordre des mouvements (par défaut,
+            calculées par stock_deltas)
+
+    Returns:
+        list: les mouvements créés
+    """
+    stock_moves = list(stock_moves)
+    if not stock_moves:
+        return []
+    if deltas is None:
+        deltas = stock_deltas(stock_moves)
+
+    net = defaultdict(Decimal)
+    for stock_move, delta in zip(stock_moves, deltas, strict=True):
+        net[(stock_move.product_id, stock_move.warehouse_id)] += delta
+
+    stock_moves = StockMove.objects.bulk_create(
+        stock_moves, batch_size=STOCK_MOVE_BATCH_SIZE
+    )
+    apply_stock_deltas(net)
+    return stock_moves
+
+
+def update_stock_level(stock_move):
+    """
+    Met à jour le StockLevel après création d'un StockMove.
+    Crée le StockLevel s'il n'existe pas encore.
+
+    Returns:
+        StockLevel: relu après la mise à jour (quantity_available à jour)
+    """
+    key = (stock_move.product_id, stock_move.warehouse_id)
+    level = apply_stock_deltas({key: stock_deltas([stock_move])[0]})[key]
+    level.refresh_from_db(fields=['quantity_available'])
     return level
@@ -24,15 +24,28 @@ def _on_invoice_item_created(sender, instance, created, **kwargs):
         create_stock_move_for_invoice_item(instance)
 
 
+def _on_invoice_items_created(sender, document, items, **kwargs):
+    """Génère en lot les StockMove OUT des lignes insérées par save_with_items."""
+    from .services.sales_integration import create_stock_moves_for_invoice_items
+
+    create_stock_moves_for_invoice_items(document, items)
+
+
 def connect_sales_signals():
     """
-    Connecte les signaux Sales → Stocks via post_save.connect().
+    Connecte les signaux Sales → Stocks via post_save.connect() (ligne par
+    ligne) et document_items_created (lignes insérées en lot).
     """
-    from sales.models import InvoiceItem
+    from sales.models import InvoiceItem, document_items_created
 
     post_save.connect(
         _on_invoice_item_created,
         sender=InvoiceItem,
         dispatch_uid='inventory_invoice_item_stock_move',
     )
+    document_items_created.connect(
+        _on_invoice_items_created,
+        sender=InvoiceItem,
+        dispatch_uid='inventory_invoice_items_stock_moves',
+    )
     logger.info('Signal Sales → Stocks connecté (InvoiceItem)')
@@ -0,0 +1,26 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='inventory.tasks.validate_inventory_job')
+def validate_inventory_job(job_id, inventory_id):
+    """
+    Validation d'un inventaire en tâche de fond
+    (voir inventory/services/inventory_validation.py).
+    """
+    from core.models import BackgroundJob
+    from core.services.background_jobs import JobReporter
+
+    from .services.inventory_validation import run_validation_job
+
+    job = BackgroundJob.objects.select_related('created_by').get(pk=job_id)
+    try:
+        result = run_validation_job(job, inventory_id)
+    except Exception as e:
+        logger.exception(f'[INVENTAIRE] Validation {inventory_id} échouée : {e}')
+        JobReporter(job).fail(e)
+        return {'status': 'error', 'error': str(e)}
+    return {'status': 'success', **result}
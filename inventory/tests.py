@@ -1 +1,388 @@
-# Create your tests here.
+import random
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from catalog.models import Product
+from core.models import BackgroundJob, Currency
+from inventory.models import (
+    StockInventory,
+    StockInventoryLine,
+    StockLevel,
+    StockMove,
+    Warehouse,
+)
+from inventory.services.inventory_validation import (
+    InventoryValidationError,
+    validate_inventory,
+)
+from inventory.services.stock_alerts import (
+    product_stock_alerts,
+    stock_alert_notifications,
+    warehouse_stock_alerts,
+)
+from inventory.services.stock_service import post_stock_moves, update_stock_level
+from inventory.tasks import validate_inventory_job
+from sales.models import Invoice
+
+NB_PRODUCTS = 8
+
+
+@pytest.fixture
+def products():
+    currency = Currency.objects.create(
+        code='XOF', name='Franc CFA', symbol='F', is_default=True
+    )
+    return [
+        Product.objects.create(
+            name=f'Produit {i}',
+            reference=f'PRD{i:03d}',
+            unit_price=Decimal('100'),
+            currency=currency,
+            product_type='stockable',
+        )
+        for i in range(NB_PRODUCTS)
+    ]
+
+
+def seed_warehouse(code, products, rng):
+    """
+    Entrepôt avec stock initial (quantités réservées comprises) pour une
+    partie des produits, et inventaire dont les écarts sont positifs,
+    négatifs ou nuls.
+    """
+    warehouse = Warehouse.objects.create(name=code, code=code)
+    for product in products[::2]:
+        StockLevel.objects.create(
+            product=product,
+            warehouse=warehouse,
+            quantity_on_hand=Decimal(rng.randint(0, 50)),
+            quantity_reserved=Decimal(rng.randint(0, 5)),
+        )
+    inventory = StockInventory.objects.create(
+        reference=f'INV-{code}', warehouse=warehouse, date=date.today()
+    )
+    for product in products:
+        StockInventoryLine.objects.create(
+            inventory=inventory,
+            product=product,
+            theoretical_qty=Decimal('20'),
+            physical_qty=Decimal(rng.choice([12, 20, 20, 27])),
+        )
+    return warehouse, inventory
+
+
+def random_moves(warehouse, inventory, products, rng):
+    """
+    Mouvements de tous les types : entrées, sorties, retours d'avoirs
+    client (RETURN_IN) et fournisseur (RETURN_OUT), transferts, ajustements
+    manuels et un ajustement d'inventaire par produit en écart.
+    """
+    now = timezone.now()
+    credit_note_type = ContentType.objects.get_for_model(Invoice)
+    inventory_type = ContentType.objects.get_for_model(StockInventory)
+
+    moves = []
+    for _ in range(60):
+        move_type = rng.choice(
+            ['IN', 'OUT', 'RETURN_IN', 'RETURN_OUT', 'TRANSFER', 'ADJUST']
+        )
+        is_return = move_type.startswith('RETURN')
+        moves.append(
+            StockMove(
+                product=rng.choice(products),
+                warehouse=warehouse,
+                move_type=move_type,
+                quantity=Decimal(rng.randint(1, 4000)) / 1000,
+                content_type=credit_note_type if is_return else None,
+                object_id=rng.randint(1, 99) if is_return else None,
+                date=now,
+            )
+        )
+    for line in inventory.lines.exclude(difference=0):
+        moves.append(
+            StockMove(
+                product_id=line.product_id,
+                warehouse=warehouse,
+                move_type='ADJUST',
+                quantity=abs(line.difference),
+                content_type=inventory_type,
+                object_id=inventory.pk,
+                date=now,
+            )
+        )
+    rng.shuffle(moves)
+    return moves
+
+
+def stock_levels(warehouse):
+    return {
+        level.product_id: (
+            level.quantity_on_hand,
+            level.quantity_reserved,
+            level.quantity_available,
+        )
+        for level in StockLevel.objects.filter(warehouse=warehouse)
+    }
+
+
+@pytest.mark.django_db
+def test_post_stock_moves_matches_posting_one_by_one(products):
+    unit_warehouse, unit_inventory = seed_warehouse('UNIT', products, random.Random(3))
+    batch_warehouse, batch_inventory = seed_warehouse(
+        'BATCH', products, random.Random(3)
+    )
+
+    # Un mouvement enregistré seul met son StockLevel à jour (post_save)
+    for move in random_moves(
+        unit_warehouse, unit_inventory, products, random.Random(5)
+    ):
+        move.save()
+    post_stock_moves(
+        random_moves(batch_warehouse, batch_inventory, products, random.Random(5))
+    )
+
+    assert StockMove.objects.filter(warehouse=batch_warehouse).count() == (
+        StockMove.objects.filter(warehouse=unit_warehouse).count()
+    )
+    assert stock_levels(batch_warehouse) == stock_levels(unit_warehouse)
+
+
+@pytest.mark.django_db
+def test_update_stock_level_returns_current_available_quantity(products):
+    warehouse = Warehouse.objects.create(name='Principal', code='WH')
+    StockLevel.objects.create(
+        product=products[0],
+        warehouse=warehouse,
+        quantity_on_hand=Decimal('10'),
+        quantity_reserved=Decimal('4'),
+    )
+    move = StockMove(
+        product=products[0],
+        warehouse=warehouse,
+        move_type='IN',
+        quantity=Decimal('5'),
+        date=timezone.now(),
+    )
+
+    level = update_stock_level(move)
+
+    assert level.quantity_on_hand == Decimal('15')
+    assert level.quantity_available == Decimal('11')
+
+
+@pytest.fixture
+def alert_stock(products):
+    """
+    Seuils aléatoires, deux entrepôts, un produit sans aucun niveau de stock,
+    un produit sans seuil et un service avec seuil (jamais en alerte).
+    """
+    rng = random.Random(7)
+    for product in products:
+        product.stock_alert_threshold = Decimal(rng.randint(5, 40))
+    products[0].stock_alert_threshold = Decimal('0')
+    products[1].product_type = 'service'
+    Product.objects.bulk_update(products, ['stock_alert_threshold', 'product_type'])
+    warehouses = [Warehouse.objects.create(name=code, code=code) for code in ('A', 'B')]
+    for product in products[:-1]:
+        for warehouse in warehouses:
+            StockLevel.objects.create(
+                product=product,
+                warehouse=warehouse,
+                quantity_on_hand=Decimal(rng.randint(0, 30)),
+                quantity_reserved=Decimal(rng.randint(0, 5)),
+            )
+    return products, warehouses
+
+
+def expected_product_alerts(products):
+    """Disponible cumulé produit par produit, comme l'ancienne boucle."""
+    alerts = []
+    for product in products:
+        if product.product_type != 'stockable' or product.stock_alert_threshold <= 0:
+            continue
+        total = sum(
+            level.quantity_available
+            for level in StockLevel.objects.filter(product=product)
+        )
+        if total < product.stock_alert_threshold:
+            alerts.append((product.reference, total))
+    return alerts
+
+
+@pytest.mark.django_db
+def test_product_stock_alerts_match_per_product_sums(
+    alert_stock, django_assert_num_queries
+):
+    products, _warehouses = alert_stock
+    expected = expected_product_alerts(products)
+
+    with django_assert_num_queries(1):
+        alerts = list(product_stock_alerts())
+
+    assert [
+        (alert['reference'], alert['total_available']) for alert in alerts
+    ] == expected
+    # Produit sans niveau de stock : disponible nul, donc en alerte
+    assert expected[-1] == (products[-1].reference, 0)
+    assert 1 < len(expected) < len(products) - 2
+
+    with django_assert_num_queries(1):
+        notifications = stock_alert_notifications(today=date(2025, 3, 1))
+    assert [notification['dedup_key'] for notification in notifications] == [
+        f'stock_alert_{alert["id"]}_2025-03-01' for alert in alerts
+    ]
+
+
+@pytest.mark.django_db
+def test_warehouse_stock_alerts_compare_each_level_to_its_threshold(alert_stock):
+    products, warehouses = alert_stock
+    levels = StockLevel.objects.filter(warehouse=warehouses[0])
+
+    alerts = warehouse_stock_alerts(levels)
+
+    assert alerts
+    assert set(alerts) == {
+        level
+        for level in levels.select_related('product')
+        if level.product.product_type == 'stockable'
+        and level.quantity_available < level.product.stock_alert_threshold
+    }
+    assert all(
+        level.product_id not in (products[0].pk, products[1].pk) for level in alerts
+    )
+
+
+def net_differences(inventory):
+    differences = {}
+    for line in inventory.lines.all():
+        differences[line.product_id] = (
+            differences.get(line.product_id, 0) + line.difference
+        )
+    return differences
+
+
+def expected_levels_after(warehouse, inventory):
+    """
+    Stock attendu après validation : écart net de chaque produit appliqué,
+    niveau créé seulement pour un produit sans stock dont l'écart est non nul.
+    """
+    levels = {
+        product_id: (on_hand, reserved)
+        for product_id, (on_hand, reserved, _available) in stock_levels(
+            warehouse
+        ).items()
+    }
+    for product_id, diff in net_differences(inventory).items():
+        if diff:
+            on_hand, reserved = levels.get(product_id, (Decimal('0'), Decimal('0')))
+            levels[product_id] = (on_hand + diff, reserved)
+    return {
+        product_id: (on_hand, reserved, on_hand - reserved)
+        for product_id, (on_hand, reserved) in levels.items()
+    }
+
+
+@pytest.mark.django_db
+def test_validate_inventory_applies_net_differences(products):
+    warehouse, inventory = seed_warehouse('WH', products, random.Random(2))
+    # Deux lignes supplémentaires dont les écarts s'annulent : mouvement net
+    for physical_qty in ('15', '25'):
+        StockInventoryLine.objects.create(
+            inventory=inventory,
+            product=products[1],
+            theoretical_qty=Decimal('20'),
+            physical_qty=Decimal(physical_qty),
+        )
+    expected = expected_levels_after(warehouse, inventory)
+    user = User.objects.create_user('magasinier')
+
+    result = validate_inventory(inventory.pk, user=user)
+
+    assert stock_levels(warehouse) == expected
+    moves = StockMove.objects.filter(warehouse=warehouse)
+    assert {move.product_id: move.quantity for move in moves} == {
+        product_id: abs(diff)
+        for product_id, diff in net_differences(inventory).items()
+        if diff
+    }
+    assert {(move.move_type, move.object_id, move.created_by) for move in moves} == {
+        ('ADJUST', inventory.pk, user)
+    }
+    assert result == {
+        'lines': NB_PRODUCTS + 2,
+        'moves_created': len(moves),
+    }
+    inventory.refresh_from_db()
+    assert (inventory.state, inventory.validated_by) == ('validated', user)
+
+    # Une seconde validation n'applique rien
+    with pytest.raises(InventoryValidationError):
+        validate_inventory(inventory.pk, user=user)
+    assert stock_levels(warehouse) == expected
+
+
+@pytest.mark.django_db
+def test_validate_inventory_query_count_does_not_grow_with_lines(products):
+    def queries(code, inventory_products):
+        _warehouse, inventory = seed_warehouse(
+            code, inventory_products, random.Random(4)
+        )
+        with CaptureQueriesContext(connection) as context:
+            validate_inventory(inventory.pk)
+        return len(context.captured_queries)
+
+    assert queries('BIG', products) == queries('SMALL', products[:3])
+
+
+@pytest.mark.django_db
+def test_large_inventory_is_validated_in_background(
+    client, products, settings, monkeypatch, django_capture_on_commit_callbacks
+):
+    settings.INVENTORY_VALIDATION_SYNC_LINES = NB_PRODUCTS - 1
+    warehouse, inventory = seed_warehouse('WH', products, random.Random(2))
+    expected = expected_levels_after(warehouse, inventory)
+    queued = []
+    monkeypatch.setattr(
+        validate_inventory_job, 'delay', lambda *args: queued.append(args)
+    )
+    client.force_login(User.objects.create_superuser('responsable'))
+    url = f'/api/inventory/inventories/{inventory.pk}/validate/'
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(url)
+
+    assert response.status_code == 202
+    job = BackgroundJob.objects.get(pk=response.json()['id'])
+    assert queued == [(job.pk, inventory.pk)]
+    # Rien n'est appliqué avant le passage du worker
+    assert StockMove.objects.count() == 0
+
+    assert validate_inventory_job(*queued[0])['status'] == 'success'
+
+    job.refresh_from_db()
+    assert job.status == 'done'
+    assert job.progress_current == job.progress_total == NB_PRODUCTS
+    assert job.result['inventory'] == inventory.pk
+    assert stock_levels(warehouse) == expected
+    assert client.post(url).status_code == 400
+
+
+@pytest.mark.django_db
+def test_small_inventory_is_validated_synchronously(client, products):
+    warehouse, inventory = seed_warehouse('WH', products, random.Random(2))
+    expected = expected_levels_after(warehouse, inventory)
+    client.force_login(User.objects.create_superuser('responsable'))
+
+    response = client.post(f'/api/inventory/inventories/{inventory.pk}/validate/')
+
+    assert response.status_code == 200
+    assert response.json()['moves_created'] == StockMove.objects.count()
+    assert stock_levels(warehouse) == expected
+    assert not BackgroundJob.objects.exists()
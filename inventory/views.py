@@ -1,6 +1,6 @@
 from decimal import Decimal
 
-from django.db.models import F, Sum
+from django.db.models import Count, F, Sum
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import permissions, status, viewsets
@@ -19,6 +19,7 @@ from .models import (
 )
 from .serializers import (
     ProductCategorySerializer,
+    ProductStockAlertSerializer,
     StockInventoryDetailSerializer,
     StockInventoryLineSerializer,
     StockInventorySerializer,
@@ -26,6 +27,13 @@ from .serializers import (
     StockMoveSerializer,
     WarehouseSerializer,
 )
+from .services.inventory_validation import (
+    InventoryValidationError,
+    runs_in_background,
+    start_validation_job,
+    validate_inventory,
+)
+from .services.stock_alerts import product_stock_alerts, warehouse_stock_alerts
 
 
 class WarehouseViewSet(viewsets.ModelViewSet):
@@ -80,15 +88,17 @@ class StockLevelViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['get'])
     def alerts(self, request):
-        """Produits dont le stock disponible est sous le seuil d'alerte."""
-        levels = self.get_queryset().filter(
-            product__stock_alert_threshold__gt=0,
-            quantity_available__lt=F('product__stock_alert_threshold'),
-            product__product_type='stockable',
-        )
+        """Niveaux de stock dont le disponible est sous le seuil (par entrepôt)."""
+        levels = warehouse_stock_alerts(self.filter_queryset(self.get_queryset()))
         serializer = self.get_serializer(levels, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='alerts/global')
+    def global_alerts(self, request):
+        """Produits dont le disponible tous entrepôts confondus est sous le seuil."""
+        serializer = ProductStockAlertSerializer(product_stock_alerts(), many=True)
+        return Response(serializer.data)
+
 
 class StockInventoryViewSet(viewsets.ModelViewSet):
     """CRUD inventaires physiques."""
@@ -105,9 +115,23 @@ class StockInventoryViewSet(viewsets.ModelViewSet):
             return StockInventoryDetailSerializer
         return StockInventorySerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.annotate(lines_count=Count('lines'))
+        return queryset
+
     @action(detail=True, methods=['post'])
     def validate(self, request, pk=None):
-        """Valider un inventaire : génère les StockMove d'ajustement."""
+        """
+        Valider un inventaire : génère les StockMove d'ajustement en lot.
+
+        Au-delà de INVENTORY_VALIDATION_SYNC_LINES lignes, la validation
+        est faite en tâche de fond : réponse 202 avec la tâche à suivre sur
+        /api/core/jobs/<id>/.
+        """
+        from core.serializers import BackgroundJobSerializer
+
         inventory = self.get_object()
 
         if inventory.state == 'validated':
@@ -116,43 +140,29 @@ class StockInventoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        lines = inventory.lines.select_related('product').all()
-        if not lines.exists():
+        lines_count = inventory.lines.count()
+        if not lines_count:
             return Response(
                 {'detail': _("Aucune ligne d'inventaire à valider.")},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        now = timezone.now()
-        moves_created = 0
-
-        for line in lines:
-            diff = line.physical_qty - line.theoretical_qty
-            if diff != 0:
-                StockMove.objects.create(
-                    product=line.product,
-                    warehouse=inventory.warehouse,
-                    move_type='ADJUST',
-                    quantity=abs(diff),
-                    reference=f'INV-{inventory.reference}',
-                    source_document_type='inventory',
-                    source_document_id=inventory.pk,
-                    date=now,
-                    notes=_('Ajustement inventaire %(ref)s : %(diff)s')
-                    % {'ref': inventory.reference, 'diff': diff},
-                    created_by=request.user,
-                )
-                moves_created += 1
-
-        inventory.state = 'validated'
-        inventory.validated_by = request.user
-        inventory.validated_at = now
-        inventory.save()
+        if runs_in_background(lines_count):
+            job = start_validation_job(inventory, user=request.user)
+            return Response(
+                BackgroundJobSerializer(job, context={'request': request}).data,
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        try:
+            result = validate_inventory(inventory.pk, user=request.user)
+        except InventoryValidationError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(
             {
                 'detail': _('Inventaire validé avec succès.'),
-                'moves_created': moves_created,
+                'moves_created': result['moves_created'],
             }
         )
 
@@ -189,11 +199,7 @@ def dashboard_view(request):
     ) or Decimal('0')
 
     # Nombre de produits sous seuil d'alerte
-    alerts_count = StockLevel.objects.filter(
-        product__stock_alert_threshold__gt=0,
-        quantity_available__lt=F('product__stock_alert_threshold'),
-        product__product_type='stockable',
-    ).count()
+    alerts_count = warehouse_stock_alerts().count()
 
     # Nombre d'entrepôts actifs
     warehouses_count = Warehouse.objects.filter(is_active=True).count()
@@ -0,0 +1,122 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from core.models import Currency
+from crm.models import Company
+from notifications.models import NotificationPreference
+from notifications.tasks import check_overdue_invoices
+from sales.models import Invoice
+
+
+class _Rollback(Exception):
+    """Annule la transaction de benchmark."""
+
+
+class _QueryCounter:
+    """Compte les requetes sans les conserver (volumes importants)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure la detection des factures echues (notifications et emails) '
+        'sur des donnees synthetiques (transaction annulee en fin de mesure)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--invoices',
+            type=int,
+            default=10000,
+            help='Nombre de factures echues',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help="Nombre d'utilisateurs du staff",
+        )
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"Passage":>8} {"Notifications":>14} {"Emails":>7} '
+            f'{"Lots email":>11} {"Requêtes":>9} {"Durée (s)":>10}'
+        )
+        try:
+            with transaction.atomic():
+                self._seed(options['invoices'], options['users'])
+                # 2e passage : tout est deja notifie, seul le dedoublonnage travaille
+                for label in ('1er', '2e'):
+                    mail.outbox = []
+                    counter = _QueryCounter()
+                    # Lots confies a la file apres commit : comptes, pas envoyes
+                    with (
+                        TestCase.captureOnCommitCallbacks() as email_batches,
+                        connection.execute_wrapper(counter),
+                    ):
+                        start = time.perf_counter()
+                        result = check_overdue_invoices()
+                        elapsed = time.perf_counter() - start
+
+                    self.stdout.write(
+                        f'{label:>8} {result["notifications_created"]:>14} '
+                        f'{len(mail.outbox):>7} {len(email_batches):>11} '
+                        f'{counter.count:>9} {elapsed:>10.2f}'
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, nb_invoices, nb_users):
+        """Cree des utilisateurs du staff et des factures echues synthetiques."""
+        today = date.today()
+        currency, _created = Currency.objects.get_or_create(
+            code='XBM', defaults={'name': 'Benchmark'}
+        )
+        company = Company.objects.create(name='__benchmark_notifications__')
+
+        users = User.objects.bulk_create(
+            User(
+                username=f'__benchmark_staff_{i}',
+                email=f'staff{i}@benchmark.invalid',
+                is_staff=True,
+            )
+            for i in range(nb_users)
+        )
+        # Un utilisateur sur deux recoit les emails
+        NotificationPreference.objects.bulk_create(
+            NotificationPreference(user=user, email_overdue_invoices=i % 2 == 0)
+            for i, user in enumerate(users)
+        )
+
+        Invoice.objects.bulk_create(
+            (
+                Invoice(
+                    number=f'BENCH-{i:07d}',
+                    date=today - timedelta(days=60),
+                    due_date=today - timedelta(days=30),
+                    company=company,
+                    currency=currency,
+                    total=Decimal('1200.00'),
+                    amount_due=Decimal('1200.00'),
+                    payment_status='unpaid',
+                )
+                for i in range(nb_invoices)
+            ),
+            batch_size=1000,
+        )
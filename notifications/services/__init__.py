@@ -0,0 +1,3 @@
+from .fanout_service import NotificationFanoutService
+
+__all__ = ['NotificationFanoutService']
@@ -0,0 +1,154 @@
+# notifications/services/fanout_service.py
+"""
+Diffusion groupee des alertes aux utilisateurs du staff.
+
+Utilisee par les controles quotidiens (factures echues, stock, achats) :
+la matrice (utilisateur, dedup_key) est dedoublonnee contre les
+notifications non lues en une requete, les notifications sont inserees
+par paquets et les emails confies a la file d'envoi Celery, par lots
+partageant une meme connexion SMTP.
+"""
+
+import logging
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from ..models import Notification, NotificationPreference
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationFanoutService:
+    """Creation en masse des notifications d'alerte et des emails associes."""
+
+    NOTIFICATION_BATCH_SIZE = 1000
+    EMAIL_BATCH_SIZE = 100
+
+    @staticmethod
+    def get_recipients():
+        """Utilisateurs actifs du staff, avec leurs preferences de notification."""
+        return list(
+            User.objects.filter(is_active=True, is_staff=True).select_related(
+                'notification_preferences'
+            )
+        )
+
+    @staticmethod
+    def fan_out(alerts, email_preference=None):
+        """
+        Notifie chaque alerte a chaque utilisateur du staff.
+
+        Une alerte deja notifiee (meme dedup_key, non lue) n'est pas recreee
+        pour cet utilisateur. L'email n'est envoye que pour les notifications
+        creees, aux utilisateurs dont la preference est activee.
+
+        Args:
+            alerts (list[dict]): Alertes (level, title, message, module,
+                link, dedup_key)
+            email_preference (str, optional): Champ de NotificationPreference
+                activant l'email (ex: 'email_overdue_invoices')
+
+        Returns:
+            int: Nombre de notifications creees
+        """
+        if not alerts:
+            return 0
+        recipients = NotificationFanoutService.get_recipients()
+        if not recipients:
+            return 0
+
+        existing = NotificationFanoutService._existing_pairs(alerts)
+        email_recipients = [
+            user
+            for user in recipients
+            if user.email
+            and email_preference
+            and NotificationFanoutService._wants_email(user, email_preference)
+        ]
+
+        notifications = []
+        emails = []
+        count = 0
+        for alert in alerts:
+            dedup_key = alert.get('dedup_key', '')
+            notified = set()
+            for user in recipients:
+                if dedup_key:
+                    if (user.id, dedup_key) in existing:
+                        continue
+                    existing.add((user.id, dedup_key))
+                notified.add(user.id)
+                notifications.append(
+                    Notification(
+                        user=user,
+                        level=alert['level'],
+                        title=alert['title'],
+                        message=alert['message'],
+                        module=alert['module'],
+                        link=alert.get('link', ''),
+                        dedup_key=dedup_key,
+                    )
+                )
+            emails.extend(
+                (user.email, alert['title'], alert['message'])
+                for user in email_recipients
+                if user.id in notified
+            )
+
+            if len(notifications) >= NotificationFanoutService.NOTIFICATION_BATCH_SIZE:
+                count += NotificationFanoutService._flush(notifications)
+        count += NotificationFanoutService._flush(notifications)
+
+        NotificationFanoutService.queue_emails(emails)
+        return count
+
+    @staticmethod
+    def queue_emails(emails):
+        """
+        Confie les emails d'alerte a la file Celery, par lots.
+
+        Les lots ne partent qu'apres validation de la transaction courante :
+        pas d'email pour des notifications annulees.
+
+        Args:
+            emails (list[tuple]): (destinataire, sujet, message)
+        """
+        from ..tasks import send_alert_emails
+
+        size = NotificationFanoutService.EMAIL_BATCH_SIZE
+        for i in range(0, len(emails), size):
+            batch = emails[i : i + size]
+            transaction.on_commit(lambda batch=batch: send_alert_emails.delay(batch))
+
+    @staticmethod
+    def _existing_pairs(alerts):
+        """Couples (user_id, dedup_key) deja notifies et non lus."""
+        dedup_keys = {alert['dedup_key'] for alert in alerts if alert.get('dedup_key')}
+        if not dedup_keys:
+            return set()
+        return set(
+            Notification.objects.filter(
+                dedup_key__in=dedup_keys, is_read=False
+            ).values_list('user_id', 'dedup_key')
+        )
+
+    @staticmethod
+    def _wants_email(user, email_preference):
+        try:
+            prefs = user.notification_preferences
+        except NotificationPreference.DoesNotExist:
+            return False  # Pas de préférences = pas d'email
+        return getattr(prefs, email_preference)
+
+    @staticmethod
+    def _flush(notifications):
+        """Insere les notifications en attente et vide la liste."""
+        if not notifications:
+            return 0
+        Notification.objects.bulk_create(
+            notifications, batch_size=NotificationFanoutService.NOTIFICATION_BATCH_SIZE
+        )
+        count = len(notifications)
+        notifications.clear()
+        return count
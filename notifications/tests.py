@@ -1 +1,103 @@
-# Create your tests here.
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from notifications.models import Notification, NotificationPreference
+from notifications.services import NotificationFanoutService
+from notifications.tasks import send_alert_emails
+
+
+def alert(dedup_key, title='Alerte'):
+    return {
+        'level': 'warning',
+        'title': title,
+        'message': f'{title} à traiter',
+        'module': 'sales',
+        'link': '/sales/invoices/1',
+        'dedup_key': dedup_key,
+    }
+
+
+@pytest.fixture
+def staff():
+    """Deux membres du staff actifs (un seul veut les emails), et deux exclus."""
+    alice = User.objects.create_user('alice', email='alice@example.com', is_staff=True)
+    bruno = User.objects.create_user('bruno', email='bruno@example.com', is_staff=True)
+    NotificationPreference.objects.create(user=alice, email_overdue_invoices=True)
+    NotificationPreference.objects.create(user=bruno, email_overdue_invoices=False)
+    User.objects.create_user('ancien', is_staff=True, is_active=False)
+    User.objects.create_user('client')
+    return alice, bruno
+
+
+@pytest.fixture
+def sent_emails(monkeypatch):
+    batches = []
+    monkeypatch.setattr(send_alert_emails, 'delay', batches.append)
+    return batches
+
+
+@pytest.mark.django_db
+def test_fan_out_skips_unread_duplicates(
+    staff, sent_emails, django_capture_on_commit_callbacks
+):
+    alice, bruno = staff
+    # Alice a déjà l'alerte A non lue ; celle de Bruno est lue
+    Notification.objects.create(
+        user=alice, title='A', message='A', module='sales', dedup_key='A'
+    )
+    Notification.objects.create(
+        user=bruno,
+        title='A',
+        message='A',
+        module='sales',
+        dedup_key='A',
+        is_read=True,
+    )
+    alerts = [alert('A', 'A'), alert('B', 'B'), alert('B', 'B'), alert('', 'C')]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        created = NotificationFanoutService.fan_out(
+            alerts, email_preference='email_overdue_invoices'
+        )
+
+    # A : Bruno seulement ; B : une fois chacun ; C (sans clé) : chacun
+    assert created == 5
+    assert sorted(
+        Notification.objects.filter(is_read=False).values_list(
+            'user__username', 'dedup_key'
+        )
+    ) == [
+        ('alice', ''),
+        ('alice', 'A'),
+        ('alice', 'B'),
+        ('bruno', ''),
+        ('bruno', 'A'),
+        ('bruno', 'B'),
+    ]
+    # Emails : Alice seule, pour les notifications créées
+    assert sent_emails == [
+        [
+            ('alice@example.com', 'B', 'B à traiter'),
+            ('alice@example.com', 'C', 'C à traiter'),
+        ]
+    ]
+
+    # Relance : seules les alertes sans clé sont recréées
+    assert NotificationFanoutService.fan_out(alerts) == 2
+
+
+@pytest.mark.django_db
+def test_fan_out_query_count_does_not_grow_with_alerts(staff, sent_emails):
+    def queries(alerts):
+        with CaptureQueriesContext(connection) as context:
+            NotificationFanoutService.fan_out(
+                alerts, email_preference='email_overdue_invoices'
+            )
+        return len(context.captured_queries)
+
+    few = queries([alert(f'few_{i}') for i in range(2)])
+    many = queries([alert(f'many_{i}') for i in range(40)])
+    assert many == few
+    assert Notification.objects.count() == 2 * 42
@@ -17,8 +17,9 @@ from .models import (
     SalaryComponent,
     TaxBracket,
 )
+from .services.payroll_run_calculator import PayrollRunCalculator
+from .services.payslip_generator import PayslipGenerator
 from .services.pdf_generator import PayrollPDFGenerator
-from .services.salary_calculator import SalaryCalculator
 
 
 class PayrollParameterAdmin(admin.ModelAdmin):
@@ -35,18 +36,6 @@ class PayrollParameterAdmin(admin.ModelAdmin):
         ('Statut', {'fields': ('is_active',)}),
     )
 
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        from .services.parameter_resolver import PayrollParameterResolver
-
-        PayrollParameterResolver.clear_cache()
-
-    def delete_model(self, request, obj):
-        super().delete_model(request, obj)
-        from .services.parameter_resolver import PayrollParameterResolver
-
-        PayrollParameterResolver.clear_cache()
-
 
 admin.site.register(PayrollParameter, PayrollParameterAdmin)
 
@@ -327,15 +316,16 @@ class PaySlipAdmin(admin.ModelAdmin):
         calculated = 0
         errors = []
 
-        for payslip in queryset:
-            if payslip.status in ['draft', 'calculated']:
-                try:
-                    SalaryCalculator.calculate_payslip(
-                        payslip, recalculate=(payslip.status == 'calculated')
-                    )
-                    calculated += 1
-                except Exception as e:
-                    errors.append(f'Erreur pour {payslip.number}: {str(e)}')
+        for payslip_status in ['draft', 'calculated']:
+            done, failures = PayrollRunCalculator.calculate_payslips(
+                queryset.filter(status=payslip_status),
+                recalculate=(payslip_status == 'calculated'),
+            )
+            calculated += len(done)
+            errors += [
+                f'Erreur pour {payslip.number}: {message}'
+                for payslip, message in failures
+            ]
 
         if errors:
             for error in errors:
@@ -495,8 +485,6 @@ class PayrollRunAdmin(admin.ModelAdmin):
 
     def generate_all_payslips(self, request, queryset):
         """Action pour générer tous les bulletins pour les lancements sélectionnés."""
-        from hr.models import Employee
-
         total_created = 0
         for payroll_run in queryset:
             if payroll_run.status != 'draft':
@@ -507,70 +495,7 @@ class PayrollRunAdmin(admin.ModelAdmin):
                 )
                 continue
 
-            # Récupérer les employés concernés
-            employees = Employee.objects.filter(is_active=True)
-            if payroll_run.department:
-                employees = employees.filter(department=payroll_run.department)
-
-            # Générer les bulletins
-            period = payroll_run.period
-            months = [
-                '',
-                'JAN',
-                'FEV',
-                'MAR',
-                'AVR',
-                'MAI',
-                'JUN',
-                'JUL',
-                'AOU',
-                'SEP',
-                'OCT',
-                'NOV',
-                'DEC',
-            ]
-            month_code = months[period.start_date.month]
-            year_code = str(period.start_date.year)[-2:]
-
-            created_count = 0
-            for employee in employees:
-                # Vérifier que l'employé a des infos de paie
-                try:
-                    payroll_info = employee.payroll_info
-                except Exception:
-                    continue
-
-                # Vérifier si un bulletin existe déjà
-                if PaySlip.objects.filter(
-                    payroll_run=payroll_run, employee=employee
-                ).exists():
-                    continue
-
-                # Générer un numéro unique
-                number = f'BUL-{month_code}{year_code}-{employee.employee_id}'
-
-                # Créer le bulletin
-                PaySlip.objects.create(
-                    payroll_run=payroll_run,
-                    employee=employee,
-                    number=number,
-                    basic_salary=payroll_info.base_salary,
-                    worked_days=26,  # Valeur par défaut
-                    gross_salary=0,  # Sera calculé
-                    taxable_salary=0,  # Sera calculé
-                    net_salary=0,  # Sera calculé
-                    cnss_employee=0,  # Sera calculé
-                    cnss_employer=0,  # Sera calculé
-                    amo_employee=0,  # Sera calculé
-                    amo_employer=0,  # Sera calculé
-                    income_tax=0,  # Sera calculé
-                    status='draft',
-                )
-                created_count += 1
-
-            # Mettre à jour le statut
-            payroll_run.status = 'in_progress'
-            payroll_run.save()
+            created_count = PayslipGenerator.generate_for_run(payroll_run)
 
             self.message_user(
                 request,
@@ -597,16 +522,13 @@ class PayrollRunAdmin(admin.ModelAdmin):
             # Récupérer les bulletins en brouillon
             payslips = PaySlip.objects.filter(payroll_run=payroll_run, status='draft')
 
-            # Calculer chaque bulletin
-            calculated_count = 0
-            errors = []
-
-            for payslip in payslips:
-                try:
-                    SalaryCalculator.calculate_payslip(payslip)
-                    calculated_count += 1
-                except Exception as e:
-                    errors.append(f'Erreur pour {payslip.number}: {str(e)}')
+            # Calculer les bulletins par lot
+            calculated, failures = PayrollRunCalculator.calculate_payslips(payslips)
+            calculated_count = len(calculated)
+            errors = [
+                f'Erreur pour {payslip.number}: {message}'
+                for payslip, message in failures
+            ]
 
             # Mettre à jour le statut du lancement
             if not PaySlip.objects.filter(
@@ -0,0 +1,119 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from hr.models import Department, Employee, JobTitle, LeaveRequest, LeaveType
+from payroll.models import ContractType, EmployeePayroll, PayrollPeriod, PayrollRun
+from payroll.services.payslip_generator import PayslipGenerator
+
+
+class _Rollback(Exception):
+    """Annule la transaction de benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesure le nombre de requêtes et la latence de la génération des '
+        'bulletins sur des données synthétiques (transaction annulée en fin de mesure)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            nargs='+',
+            default=[500, 5000],
+            help="Nombres d'employés à tester",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"Employés":>9} {"Bulletins":>10} {"Requêtes":>9} {"Durée (ms)":>11}'
+        )
+        for nb_employees in options['employees']:
+            try:
+                with transaction.atomic():
+                    payroll_run = self._seed(nb_employees)
+
+                    with CaptureQueriesContext(connection) as ctx:
+                        start = time.perf_counter()
+                        created = PayslipGenerator.generate_for_run(payroll_run)
+                        elapsed = (time.perf_counter() - start) * 1000
+
+                    self.stdout.write(
+                        f'{nb_employees:>9} {created:>10} '
+                        f'{len(ctx.captured_queries):>9} {elapsed:>11.1f}'
+                    )
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _seed(self, nb_employees):
+        """Crée des employés, fiches de paie et congés approuvés synthétiques."""
+        start_date = date(2099, 6, 1)
+        end_date = date(2099, 6, 30)
+
+        department = Department.objects.create(name='__benchmark_payslips__')
+        job_title = JobTitle.objects.create(name='Benchmark', department=department)
+        contract_type = ContractType.objects.create(code='__BENCH', name='Benchmark')
+        leave_types = [
+            LeaveType.objects.create(code='__BENCH_PAID', name='Payé', is_paid=True),
+            LeaveType.objects.create(
+                code='__BENCH_UNPAID', name='Sans solde', is_paid=False
+            ),
+        ]
+        period = PayrollPeriod.objects.create(
+            name='Benchmark', start_date=start_date, end_date=end_date
+        )
+        payroll_run = PayrollRun.objects.create(
+            period=period, name='Benchmark', department=department
+        )
+
+        # bulk_create : pas de signal post_save, les fiches de paie sont créées ici
+        employees = Employee.objects.bulk_create(
+            (
+                Employee(
+                    first_name=f'Employé {i}',
+                    last_name='Benchmark',
+                    email=f'benchmark{i}@benchmark.invalid',
+                    employee_id=f'BENCH{i:06d}',
+                    hire_date=date(2090, 1, 1),
+                    job_title=job_title,
+                    department=department,
+                )
+                for i in range(nb_employees)
+            ),
+            batch_size=1000,
+        )
+        EmployeePayroll.objects.bulk_create(
+            (
+                EmployeePayroll(
+                    employee=employee,
+                    contract_type=contract_type,
+                    base_salary=Decimal('5000.00'),
+                )
+                for employee in employees
+            ),
+            batch_size=1000,
+        )
+        LeaveRequest.objects.bulk_create(
+            (
+                LeaveRequest(
+                    employee=employee,
+                    leave_type=leave_types[i % 2],
+                    start_date=start_date + timedelta(days=i % 20),
+                    end_date=start_date + timedelta(days=i % 20 + 2),
+                    nb_days=Decimal('3.0'),
+                    status='approved_hr',
+                )
+                for i, employee in enumerate(employees)
+                if i % 3 == 0
+            ),
+            batch_size=1000,
+        )
+
+        return payroll_run
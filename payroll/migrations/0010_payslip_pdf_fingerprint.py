@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('payroll', '0009_add_country_specific_fields_employee_payroll'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payslip',
+            name='pdf_fingerprint',
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=64,
+                verbose_name='Empreinte du PDF',
+            ),
+        ),
+    ]
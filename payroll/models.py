@@ -479,6 +479,10 @@ class PaySlip(models.Model):
 
     # Documents générés
     pdf_file = models.CharField(_('Fichier PDF'), max_length=255, blank=True, null=True)
+    # Empreinte des données rendues dans pdf_file (voir payslip_export)
+    pdf_fingerprint = models.CharField(
+        _('Empreinte du PDF'), max_length=64, blank=True, editable=False
+    )
 
     # Notes
     notes = models.TextField(_('Notes'), blank=True)
@@ -1,4 +1,9 @@
 # payroll/serializers.py
+from collections import defaultdict
+from datetime import date
+
+from django.db import models
+from django.db.models import Count, Q, Sum
 from rest_framework import serializers
 
 from hr.models import Employee
@@ -256,6 +261,21 @@ class BasicEmployeeSerializer(serializers.ModelSerializer):
         return f'{obj.first_name} {obj.last_name}'
 
 
+class PaySlipListSerializer(serializers.ListSerializer):
+    """
+    Liste de bulletins : cumuls annuels et soldes de congés calculés pour
+    toute la page en deux requêtes, au lieu de deux par bulletin.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        payslips = list(data)
+        self.context['payslip_ytd_totals'] = payslip_ytd_totals(payslips)
+        self.context['payslip_leave_info'] = payslip_leave_info(payslips)
+        return super().to_representation(payslips)
+
+
 class PaySlipSerializer(serializers.ModelSerializer):
     """Serializer pour les bulletins de paie."""
 
@@ -268,6 +288,7 @@ class PaySlipSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = PaySlip
+        list_serializer_class = PaySlipListSerializer
         fields = [
             'id',
             'payroll_run',
@@ -317,58 +338,133 @@ class PaySlipSerializer(serializers.ModelSerializer):
 
     def get_ytd_totals(self, obj):
         """Cumuls depuis le début de l'exercice (year-to-date)."""
-        from datetime import date
-
-        from django.db.models import Sum
-
-        if not obj.payroll_run or not obj.payroll_run.period:
-            return None
-        year = obj.payroll_run.period.end_date.year
-        year_start = date(year, 1, 1)
-        ytd_slips = PaySlip.objects.filter(
-            employee=obj.employee,
-            status__in=['calculated', 'validated', 'paid'],
-            payroll_run__period__start_date__gte=year_start,
-            payroll_run__period__end_date__lte=obj.payroll_run.period.end_date,
-        )
-        agg = ytd_slips.aggregate(
-            ytd_gross=Sum('gross_salary'),
-            ytd_cnss=Sum('cnss_employee'),
-            ytd_amo=Sum('amo_employee'),
-            ytd_tax=Sum('income_tax'),
-            ytd_net=Sum('net_salary'),
-        )
-        return {k: float(v or 0) for k, v in agg.items()}
+        totals = self.context.get('payslip_ytd_totals')
+        if totals is None:
+            totals = payslip_ytd_totals([obj])
+        return totals.get(obj.id)
 
     def get_leave_info(self, obj):
         """Solde de conges pour l'employe (annee de la periode)."""
-        if not obj.payroll_run or not obj.payroll_run.period:
-            return None
-        year = obj.payroll_run.period.end_date.year
-        try:
-            from hr.models import LeaveAllocation
-
-            allocations = LeaveAllocation.objects.filter(
-                employee=obj.employee,
-                year=year,
-            ).select_related('leave_type')
-            if not allocations.exists():
-                return None
-            result = []
-            for alloc in allocations:
-                result.append(
-                    {
-                        'type': alloc.leave_type.name,
-                        'code': alloc.leave_type.code,
-                        'total': float(alloc.total_days + alloc.carried_days),
-                        'used': float(alloc.used_days),
-                        'pending': float(alloc.pending_days),
-                        'remaining': float(alloc.remaining_days),
-                    }
-                )
-            return result
-        except Exception:
-            return None
+        leave_info = self.context.get('payslip_leave_info')
+        if leave_info is None:
+            leave_info = payslip_leave_info([obj])
+        return leave_info.get(obj.id)
+
+
+YTD_STATUSES = ['calculated', 'validated', 'paid']
+YTD_FIELDS = {
+    'ytd_gross': 'gross_salary',
+    'ytd_cnss': 'cnss_employee',
+    'ytd_amo': 'amo_employee',
+    'ytd_tax': 'income_tax',
+    'ytd_net': 'net_salary',
+}
+
+
+def _with_period(payslips):
+    return [
+        payslip
+        for payslip in payslips
+        if payslip.payroll_run and payslip.payroll_run.period
+    ]
+
+
+def payslip_ytd_totals(payslips):
+    """
+    Cumuls year-to-date de chaque bulletin : bulletins calculés, validés
+    ou payés de l'employé, du 1er janvier à la fin de la période.
+
+    Returns:
+        dict: {payslip.id: {ytd_gross, ytd_cnss, ytd_amo, ytd_tax, ytd_net}}
+    """
+    payslips = _with_period(payslips)
+    if not payslips:
+        return {}
+
+    end_dates = [payslip.payroll_run.period.end_date for payslip in payslips]
+    rows = PaySlip.objects.filter(
+        employee_id__in={payslip.employee_id for payslip in payslips},
+        status__in=YTD_STATUSES,
+        payroll_run__period__start_date__gte=date(min(end_dates).year, 1, 1),
+        payroll_run__period__end_date__lte=max(end_dates),
+    ).values_list(
+        'employee_id',
+        'payroll_run__period__start_date',
+        'payroll_run__period__end_date',
+        *YTD_FIELDS.values(),
+    )
+    rows_by_employee = defaultdict(list)
+    for row in rows:
+        rows_by_employee[row[0]].append(row)
+
+    result = {}
+    for payslip in payslips:
+        end_date = payslip.payroll_run.period.end_date
+        year_start = date(end_date.year, 1, 1)
+        totals = [0] * len(YTD_FIELDS)
+        for row in rows_by_employee[payslip.employee_id]:
+            if row[1] >= year_start and row[2] <= end_date:
+                for index, value in enumerate(row[3:]):
+                    totals[index] += value or 0
+        result[payslip.id] = {
+            key: float(total) for key, total in zip(YTD_FIELDS, totals)
+        }
+    return result
+
+
+def payslip_leave_info(payslips):
+    """
+    Soldes de congés de l'employé pour l'année de la période de chaque
+    bulletin (None si aucune allocation).
+
+    Returns:
+        dict: {payslip.id: [{type, code, total, used, pending, remaining}]}
+    """
+    payslips = _with_period(payslips)
+    if not payslips:
+        return {}
+
+    keys = {
+        payslip.id: (payslip.employee_id, payslip.payroll_run.period.end_date.year)
+        for payslip in payslips
+    }
+    try:
+        from hr.models import LeaveAllocation
+
+        allocations = LeaveAllocation.objects.filter(
+            employee_id__in={employee_id for employee_id, year in keys.values()},
+            year__in={year for employee_id, year in keys.values()},
+        ).select_related('leave_type')
+
+        allocations_by_key = defaultdict(list)
+        for alloc in allocations:
+            allocations_by_key[(alloc.employee_id, alloc.year)].append(
+                {
+                    'type': alloc.leave_type.name,
+                    'code': alloc.leave_type.code,
+                    'total': float(alloc.total_days + alloc.carried_days),
+                    'used': float(alloc.used_days),
+                    'pending': float(alloc.pending_days),
+                    'remaining': float(alloc.remaining_days),
+                }
+            )
+    except Exception:
+        return {}
+    return {
+        payslip_id: allocations_by_key.get(key) or None
+        for payslip_id, key in keys.items()
+    }
+
+
+PAYSLIP_SUMMARY_FIELDS = {
+    'total_gross': 'gross_salary',
+    'total_net': 'net_salary',
+    'total_cnss_employee': 'cnss_employee',
+    'total_cnss_employer': 'cnss_employer',
+    'total_amo_employee': 'amo_employee',
+    'total_amo_employer': 'amo_employer',
+    'total_income_tax': 'income_tax',
+}
 
 
 class PayrollRunSerializer(serializers.ModelSerializer):
@@ -424,12 +520,36 @@ class PayrollRunSerializer(serializers.ModelSerializer):
     def get_validated_by_name(self, obj):
         return obj.validated_by.full_name if obj.validated_by else ''
 
+    @staticmethod
+    def annotate_summary(queryset):
+        """
+        Annote le nombre de bulletins, leurs totaux et leur répartition par
+        statut : payslips_count / payslips_summary sans requête par lancement.
+        """
+        return queryset.annotate(
+            payslips_count=Count('payslips'),
+            **{
+                f'summary_{key}': Sum(f'payslips__{field}')
+                for key, field in PAYSLIP_SUMMARY_FIELDS.items()
+            },
+            **{
+                f'payslips_{status}_count': Count(
+                    'payslips', filter=Q(payslips__status=status)
+                )
+                for status, _label in PaySlip.STATUS_CHOICES
+            },
+        )
+
     def get_payslips_count(self, obj):
-        return obj.payslips.count()
+        count = getattr(obj, 'payslips_count', None)
+        return obj.payslips.count() if count is None else count
 
     def get_payslips_summary(self, obj):
+        if hasattr(obj, 'summary_total_gross'):
+            return self._annotated_summary(obj)
+
         payslips = obj.payslips.all()
-        if not payslips:
+        if not payslips.exists():
             return {
                 'total_gross': 0,
                 'total_net': 0,
@@ -442,16 +562,8 @@ class PayrollRunSerializer(serializers.ModelSerializer):
             }
 
         # Calculer les totaux
-        from django.db.models import Count, Sum
-
         totals = payslips.aggregate(
-            total_gross=Sum('gross_salary'),
-            total_net=Sum('net_salary'),
-            total_cnss_employee=Sum('cnss_employee'),
-            total_cnss_employer=Sum('cnss_employer'),
-            total_amo_employee=Sum('amo_employee'),
-            total_amo_employer=Sum('amo_employer'),
-            total_income_tax=Sum('income_tax'),
+            **{key: Sum(field) for key, field in PAYSLIP_SUMMARY_FIELDS.items()}
         )
 
         # Compter par statut
@@ -461,6 +573,21 @@ class PayrollRunSerializer(serializers.ModelSerializer):
         totals['status_counts'] = status_dict
         return totals
 
+    @staticmethod
+    def _annotated_summary(obj):
+        if not obj.payslips_count:
+            return {
+                **dict.fromkeys(PAYSLIP_SUMMARY_FIELDS, 0),
+                'status_counts': {},
+            }
+        totals = {key: getattr(obj, f'summary_{key}') for key in PAYSLIP_SUMMARY_FIELDS}
+        totals['status_counts'] = {
+            status: count
+            for status, _label in PaySlip.STATUS_CHOICES
+            if (count := getattr(obj, f'payslips_{status}_count'))
+        }
+        return totals
+
 
 class AdvanceSalarySerializer(serializers.ModelSerializer):
     """Serializer pour les acomptes sur salaire."""
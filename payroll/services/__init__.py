@@ -1,5 +1,11 @@
-# payroll/services/__init__.py
 from .parameter_resolver import PayrollParameterResolver
+from .payroll_run_calculator import PayrollRunCalculator
+from .payslip_generator import PayslipGenerator
 from .salary_calculator import SalaryCalculator
 
-__all__ = ['PayrollParameterResolver', 'SalaryCalculator']
+__all__ = [
+    'PayrollParameterResolver',
+    'PayrollRunCalculator',
+    'PayslipGenerator',
+    'SalaryCalculator',
+]
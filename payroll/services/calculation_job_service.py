@@ -0,0 +1,261 @@
+# payroll/services/calculation_job_service.py
+"""
+Calcul asynchrone des bulletins d'un lancement de paie.
+
+Le calcul est une tache de fond (core.BackgroundJob, type
+'payroll_calculation') : les bulletins en brouillon sont repartis en lots
+traites en parallele par les workers Celery. Chaque lot met a jour son
+avancement dans job.result (ligne verrouillee) ; le lancement ne passe a
+« calculé » qu'une fois tous les lots termines.
+
+Un seul calcul peut etre actif par lancement : start() verrouille le
+PayrollRun avant de verifier l'absence de calcul en cours et de creer la
+tache, dans la meme transaction. Un calcul sans activite depuis
+settings.PAYROLL_CALCULATION_STALE_AFTER secondes (worker arrete en cours
+de lot) est cloture en echec au lancement suivant au lieu de le bloquer.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from celery import group
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import BackgroundJob
+from core.services.background_jobs import create_job
+
+from ..models import PayrollRun, PaySlip
+from .payroll_run_calculator import PayrollRunCalculator
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = 'payroll_calculation'
+
+DEFAULT_CHUNK_SIZE = 200
+
+DEFAULT_STALE_AFTER = 1800
+
+_FINISHED = ('completed', 'failed')
+
+
+class CalculationAlreadyRunning(Exception):
+    """Un calcul est deja en attente ou en cours pour ce lancement."""
+
+    def __init__(self, job):
+        super().__init__('Un calcul est déjà en cours pour ce lancement')
+        self.job = job
+
+
+class PayrollCalculationJobService:
+    """Orchestration du calcul d'un lancement par lots."""
+
+    @staticmethod
+    def jobs(payroll_run):
+        """Calculs de ce lancement, du plus recent au plus ancien."""
+        return BackgroundJob.objects.filter(
+            job_type=JOB_TYPE, result__payroll_run=payroll_run.pk
+        ).order_by('-created_at', '-pk')
+
+    @staticmethod
+    def get_active_job(payroll_run):
+        """Calcul en attente ou en cours pour ce lancement, s'il existe."""
+        return (
+            PayrollCalculationJobService.jobs(payroll_run)
+            .filter(status__in=['pending', 'running'])
+            .first()
+        )
+
+    @staticmethod
+    def start(payroll_run, user=None, chunk_size=None):
+        """
+        Cree la tache et planifie un traitement Celery par lot.
+
+        Args:
+            payroll_run (PayrollRun): Lancement a calculer
+            user (User, optional): Utilisateur a l'origine du calcul
+            chunk_size (int, optional): Taille des lots (defaut :
+                settings.PAYROLL_CALCULATION_CHUNK_SIZE)
+
+        Returns:
+            BackgroundJob
+
+        Raises:
+            CalculationAlreadyRunning: un calcul est deja actif pour ce lancement
+        """
+        from ..tasks import calculate_payslip_chunk
+
+        chunk_size = chunk_size or getattr(
+            settings, 'PAYROLL_CALCULATION_CHUNK_SIZE', DEFAULT_CHUNK_SIZE
+        )
+
+        with transaction.atomic():
+            # Verrou : deux demandes concurrentes ne creent pas deux calculs
+            payroll_run = PayrollRun.objects.select_for_update().get(pk=payroll_run.pk)
+            active_job = PayrollCalculationJobService.get_active_job(payroll_run)
+            if active_job and PayrollCalculationJobService.is_stale(active_job):
+                PayrollCalculationJobService._expire(active_job)
+            elif active_job:
+                raise CalculationAlreadyRunning(active_job)
+
+            payslip_ids = list(
+                PaySlip.objects.filter(payroll_run=payroll_run, status='draft')
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+            batches = [
+                payslip_ids[i : i + chunk_size]
+                for i in range(0, len(payslip_ids), chunk_size)
+            ]
+
+            job = create_job(
+                JOB_TYPE,
+                user=user,
+                message=f'Calcul des bulletins — {payroll_run.name}',
+            )
+            job.progress_total = len(payslip_ids)
+            job.result = {
+                'payroll_run': payroll_run.pk,
+                'calculated_count': 0,
+                'error_count': 0,
+                'last_activity': timezone.now().isoformat(),
+                # Avancement par lot : [{index, size, status, calculated, errors}]
+                'chunks': [
+                    {
+                        'index': index,
+                        'size': len(batch),
+                        'status': 'pending',
+                        'calculated': 0,
+                        'errors': [],
+                    }
+                    for index, batch in enumerate(batches)
+                ],
+            }
+
+            if not batches:
+                PayrollCalculationJobService._finish(job, payroll_run)
+            job.save()
+
+            if batches:
+                # Les workers ne doivent voir la tache qu'une fois enregistree
+                signatures = group(
+                    calculate_payslip_chunk.s(job.pk, index, batch)
+                    for index, batch in enumerate(batches)
+                )
+                transaction.on_commit(signatures.apply_async)
+
+        return job
+
+    @staticmethod
+    def is_stale(job):
+        """Vrai si un calcul actif n'a plus d'activite depuis le delai configure."""
+        stale_after = getattr(
+            settings, 'PAYROLL_CALCULATION_STALE_AFTER', DEFAULT_STALE_AFTER
+        )
+        last_activity = job.result.get('last_activity')
+        last_activity = (
+            datetime.fromisoformat(last_activity) if last_activity else job.created_at
+        )
+        return timezone.now() - last_activity > timedelta(seconds=stale_after)
+
+    @staticmethod
+    def _expire(job):
+        """Cloture en echec un calcul interrompu ; ses lots tardifs seront ignores."""
+        logger.warning('Calcul de paie : tache %s interrompue, cloturee', job.pk)
+        job.status = 'failed'
+        job.message = 'Calcul interrompu : aucune activité depuis trop longtemps'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'message', 'finished_at'])
+
+    @staticmethod
+    def run_chunk(job_id, index, payslip_ids):
+        """Calcule un lot de bulletins et enregistre son resultat dans la tache."""
+        if not PayrollCalculationJobService._update_chunk(
+            job_id, index, status='running'
+        ):
+            return
+
+        try:
+            calculated, failures = PayrollRunCalculator.calculate_payslips(
+                PaySlip.objects.filter(id__in=payslip_ids, status='draft').order_by(
+                    'id'
+                )
+            )
+        except Exception as e:
+            logger.exception(
+                'Calcul de paie : echec du lot %s de la tache %s', index, job_id
+            )
+            PayrollCalculationJobService._update_chunk(
+                job_id, index, status='failed', errors=[{'error': str(e)}]
+            )
+            return
+
+        PayrollCalculationJobService._update_chunk(
+            job_id,
+            index,
+            status='completed',
+            calculated=len(calculated),
+            errors=[
+                {
+                    'payslip_id': payslip.id,
+                    'employee': payslip.employee.full_name,
+                    'error': message,
+                }
+                for payslip, message in failures
+            ],
+        )
+
+    @staticmethod
+    def _update_chunk(job_id, index, **changes):
+        """
+        Met a jour un lot sous verrou et cloture la tache au dernier lot.
+
+        Returns:
+            bool: False si la tache etait deja cloturee (mise a jour ignoree)
+        """
+        with transaction.atomic():
+            job = BackgroundJob.objects.select_for_update().get(pk=job_id)
+            if job.status not in ('pending', 'running'):
+                # Tache deja cloturee (interrompue puis relancee)
+                return False
+            result = job.result
+            chunks = result['chunks']
+            chunks[index].update(changes)
+            result['last_activity'] = timezone.now().isoformat()
+            result['calculated_count'] = sum(chunk['calculated'] for chunk in chunks)
+            result['error_count'] = sum(len(chunk['errors']) for chunk in chunks)
+            job.progress_current = sum(
+                chunk['size'] for chunk in chunks if chunk['status'] in _FINISHED
+            )
+            if job.status == 'pending':
+                job.status = 'running'
+                job.started_at = timezone.now()
+            if all(chunk['status'] in _FINISHED for chunk in chunks):
+                PayrollCalculationJobService._finish(
+                    job, PayrollRun.objects.get(pk=result['payroll_run'])
+                )
+            job.save()
+        return True
+
+    @staticmethod
+    def _finish(job, payroll_run):
+        """Cloture la tache et passe le lancement a « calculé » si tout est calcule."""
+        result = job.result
+        failed = any(chunk['status'] == 'failed' for chunk in result['chunks'])
+        job.status = 'failed' if failed else 'done'
+        job.message = (
+            f'{result["calculated_count"]} bulletin(s) calculé(s), '
+            f'{result["error_count"]} en erreur'
+        )
+        job.finished_at = timezone.now()
+
+        if (
+            not failed
+            and not PaySlip.objects.filter(
+                payroll_run=payroll_run, status='draft'
+            ).exists()
+        ):
+            payroll_run.status = 'calculated'
+            payroll_run.calculated_date = timezone.now()
+            payroll_run.save(update_fields=['status', 'calculated_date'])
@@ -0,0 +1,143 @@
+# payroll/services/parameter_snapshot.py
+"""
+Instantane en memoire des parametres de paie, toutes versions confondues.
+
+Les versions actives sont chargees en une requete et indexees par code,
+triees par date d'effet : une recherche (code, date) se fait par
+bissection, sans requete, que la date soit courante ou historique.
+
+L'instantane est invalide par un numero de version stocke dans le cache
+partage (Redis) et incremente a chaque enregistrement ou suppression d'un
+PayrollParameter. Chaque processus (gunicorn, Celery) garde son instantane
+tant que la version ne change pas ; les lignes sont aussi publiees dans le
+cache partage, ce qui evite a chaque worker de recharger la table.
+
+Un calcul charge l'instantane une fois et le transmet comme resolver
+(voir SalaryCalculator.calculate_payslip, PayrollRunCalculator) : dans une
+transaction, ou current() recharge la table, elle n'est lue qu'une fois
+par calcul.
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.services.cache_version import bump_cache_version, get_cache_version
+
+from ..models import PayrollParameter
+
+VERSION_KEY = 'payroll_param_snapshot_version'
+ROWS_KEY = 'payroll_param_snapshot_rows_{version}'
+ROWS_TTL = 3600  # 1 heure
+
+
+def missing_parameter_message(code, today):
+    """Message d'erreur pour un parametre requis absent a une date."""
+    return (
+        f"Parametre de paie requis '{code}' absent ou inactif "
+        f'pour la date {today}. '
+        f'Verifiez le chargement du pack via '
+        f"'python manage.py init_payroll_data --locale <pack> --force'."
+    )
+
+
+class PayrollParameterSnapshot:
+    """
+    Index (code, date) -> valeur des parametres de paie actifs.
+
+    Expose get_required / get_optional avec la meme signature que
+    PayrollParameterResolver : un instantane peut etre passe tel quel
+    comme resolver aux calculs de paie.
+    """
+
+    # (version, instantane) du processus courant
+    _local = None
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows: iterable de (code, effective_date, end_date, value)
+        """
+        versions = defaultdict(list)
+        for code, effective_date, end_date, value in rows:
+            versions[code].append((effective_date, end_date, value))
+
+        self._dates = {}
+        self._versions = {}
+        for code, code_versions in versions.items():
+            code_versions.sort(key=lambda version: version[0])
+            self._dates[code] = [version[0] for version in code_versions]
+            self._versions[code] = code_versions
+
+    @classmethod
+    def current(cls):
+        """
+        Instantane a jour de la version partagee.
+
+        Dans une transaction, l'instantane reflete des ecritures non encore
+        validees : il est alors reconstruit a chaque appel, sans etre ni
+        memorise ni publie. L'appelant le conserve pour la duree du calcul.
+        """
+        if transaction.get_connection().in_atomic_block:
+            return cls(cls._load_rows())
+
+        version = get_cache_version(VERSION_KEY)
+        local = cls._local
+        if local is not None and local[0] == version:
+            return local[1]
+
+        rows_key = ROWS_KEY.format(version=version)
+        rows = cache.get(rows_key)
+        if rows is None:
+            rows = cls._load_rows()
+            cache.set(rows_key, rows, ROWS_TTL)
+
+        snapshot = cls(rows)
+        cls._local = (version, snapshot)
+        return snapshot
+
+    @staticmethod
+    def _load_rows():
+        return list(
+            PayrollParameter.objects.filter(is_active=True).values_list(
+                'code', 'effective_date', 'end_date', 'value'
+            )
+        )
+
+    @staticmethod
+    def invalidate():
+        """Incremente la version partagee (voir bump_cache_version)."""
+        bump_cache_version(VERSION_KEY)
+
+    def value_at(self, code, reference_date):
+        """
+        Valeur en vigueur a reference_date : version de date d'effet la
+        plus recente, non terminee a cette date. None si aucune.
+        """
+        dates = self._dates.get(code)
+        if dates is None:
+            return None
+
+        versions = self._versions[code]
+        for index in range(bisect_right(dates, reference_date) - 1, -1, -1):
+            _effective_date, end_date, value = versions[index]
+            if end_date is None or end_date >= reference_date:
+                return value
+        return None
+
+    def get_required(self, code, reference_date=None):
+        """Valeur d'un parametre requis. Leve ValueError si absent."""
+        today = reference_date or date.today()
+        value = self.value_at(code, today)
+        if value is None:
+            raise ValueError(missing_parameter_message(code, today))
+        return value
+
+    def get_optional(self, code, fallback=Decimal('0'), reference_date=None):
+        """Valeur d'un parametre optionnel, fallback si absent."""
+        value = self.value_at(code, reference_date or date.today())
+        return fallback if value is None else value
@@ -0,0 +1,368 @@
+# payroll/services/payroll_run_calculator.py
+"""
+Calcul par lot des bulletins d'un lancement de paie.
+
+Reproduit a l'identique SalaryCalculator.calculate_payslip, mais charge une
+seule fois par lot les composants, baremes, parametres et fiches de paie,
+calcule les bulletins en memoire puis les enregistre en masse dans une
+seule transaction. Les PDF des bulletins sont generes ensuite par une
+tache Celery (render_payslip_pdfs), par lot.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from ..models import (
+    AdvanceSalary,
+    EmployeeAllowance,
+    EmployeePayroll,
+    PaySlip,
+    PaySlipLine,
+    SalaryComponent,
+    TaxBracket,
+)
+from .parameter_resolver import PayrollParameterResolver
+from .parameter_snapshot import PayrollParameterSnapshot
+from .salary_calculator import (
+    _COTISATION_CATEGORIES,
+    _EMPLOYER_CATEGORIES,
+    SalaryCalculator,
+    round_amount,
+)
+
+# Champs du bulletin renseignes par le calcul
+_PAYSLIP_FIELDS = [
+    'basic_salary',
+    'gross_salary',
+    'taxable_salary',
+    'cnss_employee',
+    'cnss_employer',
+    'amo_employee',
+    'amo_employer',
+    'income_tax',
+    'net_salary',
+    'status',
+    'updated_at',
+]
+
+
+class _RunContext:
+    """Donnees de reference chargees une fois pour un lot de bulletins."""
+
+    def __init__(self, payslips):
+        # Un seul instantane pour tout le lot : parametres coherents entre bulletins
+        self.parameters = PayrollParameterSnapshot.current()
+        self.pack_check = PayrollParameterResolver.validate_pack(self.parameters)
+
+        self.components = {
+            component.code: component for component in SalaryComponent.objects.all()
+        }
+        self.cotisation_components = list(
+            SalaryComponent.objects.filter(
+                category__in=_COTISATION_CATEGORIES,
+                is_active=True,
+            )
+            .exclude(rate_parameter_code='')
+            .order_by('default_display_order', 'code')
+        )
+
+        employee_ids = {payslip.employee_id for payslip in payslips}
+        self.payroll_infos = {
+            info.employee_id: info
+            for info in EmployeePayroll.objects.filter(employee_id__in=employee_ids)
+        }
+        self.allowances = defaultdict(list)
+        for allowance in EmployeeAllowance.objects.filter(
+            employee_payroll__in=self.payroll_infos.values(), is_active=True
+        ).select_related('component'):
+            self.allowances[allowance.employee_payroll_id].append(allowance)
+
+        # Acomptes payes des employes, libres ou deja rattaches a ces
+        # bulletins (recalcul), par employe
+        self.advances = defaultdict(list)
+        for advance in (
+            AdvanceSalary.objects.filter(
+                models.Q(payslip__isnull=True) | models.Q(payslip__in=payslips),
+                employee_id__in=employee_ids,
+                is_paid=True,
+            )
+            .select_related('period')
+            .order_by('id')
+        ):
+            self.advances[advance.employee_id].append(advance)
+
+        self._brackets = {}
+
+    def component(self, code):
+        try:
+            return self.components[code]
+        except KeyError:
+            raise SalaryComponent.DoesNotExist(
+                'SalaryComponent matching query does not exist.'
+            ) from None
+
+    def payroll_info(self, employee_id):
+        try:
+            return self.payroll_infos[employee_id]
+        except KeyError:
+            raise EmployeePayroll.DoesNotExist(
+                'EmployeePayroll matching query does not exist.'
+            ) from None
+
+    def tax_brackets(self, reference_date):
+        if reference_date not in self._brackets:
+            self._brackets[reference_date] = list(
+                TaxBracket.objects.filter(effective_date__lte=reference_date)
+                .filter(
+                    models.Q(end_date__isnull=True)
+                    | models.Q(end_date__gte=reference_date)
+                )
+                .order_by('min_amount')
+            )
+        return self._brackets[reference_date]
+
+
+class PayrollRunCalculator:
+    """Calcul par lot des bulletins de paie."""
+
+    @staticmethod
+    def calculate_payslips(payslips, recalculate=False):
+        """
+        Calcule un lot de bulletins de paie.
+
+        Args:
+            payslips: QuerySet ou liste de PaySlip
+            recalculate (bool): Autoriser le recalcul de bulletins deja calcules
+
+        Returns:
+            tuple: (bulletins calcules, liste de (bulletin, message d'erreur))
+        """
+        from ..tasks import render_payslip_pdfs
+
+        if isinstance(payslips, models.QuerySet):
+            payslips = payslips.select_related('employee', 'payroll_run__period')
+        payslips = list(payslips)
+        if not payslips:
+            return [], []
+
+        context = _RunContext(payslips)
+
+        calculated = []
+        errors = []
+        lines = []
+        advances = []
+        for payslip in payslips:
+            try:
+                payslip_lines, payslip_advances = PayrollRunCalculator._compute(
+                    payslip, context, recalculate
+                )
+            except Exception as e:
+                errors.append((payslip, str(e)))
+                continue
+            calculated.append(payslip)
+            lines.extend(payslip_lines)
+            advances.extend(payslip_advances)
+
+        if calculated:
+            now = timezone.now()
+            for payslip in calculated:
+                payslip.updated_at = now
+
+            with transaction.atomic():
+                if recalculate:
+                    PaySlipLine.objects.filter(payslip__in=calculated).delete()
+                PaySlipLine.objects.bulk_create(lines, batch_size=1000)
+                if advances:
+                    AdvanceSalary.objects.bulk_update(advances, ['payslip'])
+                PaySlip.objects.bulk_update(calculated, _PAYSLIP_FIELDS, batch_size=500)
+
+                # bulk_update n'emet pas post_save : les PDF (generes par le
+                # receiver generate_payslip_pdf lors d'un save()) sont rendus
+                # par lot en tache de fond, hors du calcul
+                payslip_ids = [payslip.id for payslip in calculated]
+                transaction.on_commit(lambda: render_payslip_pdfs.delay(payslip_ids))
+
+        return calculated, errors
+
+    @staticmethod
+    def _compute(payslip, context, recalculate):
+        """
+        Calcule un bulletin en memoire (memes etapes que calculate_payslip).
+
+        Returns:
+            tuple: (lignes PaySlipLine non enregistrees, acomptes a rattacher)
+        """
+        if payslip.status != 'draft' and not recalculate:
+            raise ValueError(
+                "Impossible de calculer un bulletin qui n'est pas en brouillon"
+            )
+
+        pack_check = context.pack_check
+        if not pack_check['valid']:
+            raise ValueError(
+                f'Pack de paie incomplet — {len(pack_check["missing"])} parametre(s) manquant(s) : '
+                f'{pack_check["missing"]}. '
+                f"Lancez 'python manage.py init_payroll_data --locale <pack> --force'."
+            )
+
+        params = context.parameters
+        payroll_info = context.payroll_info(payslip.employee_id)
+
+        ref_date = None
+        if payslip.payroll_run and payslip.payroll_run.period:
+            ref_date = payslip.payroll_run.period.end_date
+
+        lines = []
+
+        def add_line(component, amount, default_order, **kwargs):
+            lines.append(
+                PaySlipLine(
+                    payslip=payslip,
+                    component=component,
+                    amount=round_amount(amount),
+                    display_order=component.default_display_order or default_order,
+                    **kwargs,
+                )
+            )
+
+        def total(categories):
+            return sum(
+                abs(line.amount)
+                for line in lines
+                if line.component.category in categories
+            )
+
+        # ── 1. Salaire de base ──
+        base_salary = SalaryCalculator._calculate_base_salary(
+            payslip, payroll_info, params
+        )
+        payslip.basic_salary = base_salary
+        add_line(context.component('SALBASE'), base_salary, 10)
+
+        # ── 2. Heures supplementaires ──
+        for rate_val, code, hours_field, order in [
+            (Decimal('0.25'), 'HS25', 'overtime_25_hours', 20),
+            (Decimal('0.50'), 'HS50', 'overtime_50_hours', 21),
+            (Decimal('1.00'), 'HS100', 'overtime_100_hours', 22),
+        ]:
+            hours = getattr(payslip, hours_field, Decimal('0'))
+            if hours > 0:
+                amount = SalaryCalculator._calculate_overtime(
+                    payslip, rate_val, payroll_info, params
+                )
+                add_line(context.component(code), amount, order, quantity=hours)
+
+        # ── 3. Prime d'anciennete ──
+        seniority_amount = SalaryCalculator._calculate_seniority_bonus(
+            payslip, base_salary, params
+        )
+        if seniority_amount > 0:
+            add_line(context.component('ANCIENNETE'), seniority_amount, 30)
+
+        # ── 4. Indemnites fixes ──
+        if payroll_info.transport_allowance > 0:
+            add_line(
+                context.component('TRANSPORT'), payroll_info.transport_allowance, 40
+            )
+        if payroll_info.meal_allowance > 0:
+            add_line(context.component('REPAS'), payroll_info.meal_allowance, 41)
+
+        # ── 5. Primes dynamiques (EmployeeAllowance) ──
+        for allowance in context.allowances[payroll_info.id]:
+            add_line(allowance.component, allowance.amount, 45)
+
+        # ── 6. Salaire brut ──
+        gross_salary = sum(line.amount for line in lines if line.amount > 0)
+        payslip.gross_salary = gross_salary
+
+        # ── 7. Bases de cotisation ──
+        cnss_base = sum(
+            line.amount
+            for line in lines
+            if line.component.is_cnss_eligible and line.amount > 0
+        )
+
+        # ── 8. Cotisations generiques ──
+        for comp in context.cotisation_components:
+            rate = params.get_optional(
+                comp.rate_parameter_code, reference_date=ref_date
+            )
+            if rate is None or rate <= 0:
+                continue
+
+            if comp.base_rule == 'capped':
+                if comp.cap_parameter_code:
+                    cap = params.get_required(
+                        comp.cap_parameter_code, reference_date=ref_date
+                    )
+                    base = min(cnss_base, cap)
+                else:
+                    base = cnss_base
+            else:
+                base = gross_salary
+
+            amount = base * rate / Decimal('100')
+            is_employer = comp.category in _EMPLOYER_CATEGORIES
+            add_line(
+                comp,
+                -amount if not is_employer else amount,
+                50,
+                base_amount=base,
+                rate=rate,
+                is_employer_contribution=is_employer,
+            )
+
+        # ── 9. Champs agreges ──
+        payslip.cnss_employee = total(('social_employee',))
+        payslip.amo_employee = total(('health_employee',))
+        payslip.cnss_employer = total(('social_employer',))
+        payslip.amo_employer = total(('health_employer',))
+        other_deductions = total(('other_deduction',))
+
+        # ── 10. Salaire imposable ──
+        taxable_salary = gross_salary - (
+            payslip.cnss_employee + payslip.amo_employee + other_deductions
+        )
+        payslip.taxable_salary = taxable_salary
+
+        # ── 11. Impot sur le revenu ──
+        income_tax = SalaryCalculator._calculate_income_tax(
+            payslip,
+            taxable_salary,
+            params,
+            context.tax_brackets(payslip.payroll_run.period.end_date),
+        )
+        payslip.income_tax = income_tax
+        add_line(context.component('IR'), -income_tax, 60, base_amount=taxable_salary)
+
+        # ── 12. Acomptes ──
+        # Acomptes non deduits d'un autre bulletin, de periodes echues
+        advances = [
+            advance
+            for advance in context.advances[payslip.employee_id]
+            if advance.payslip_id in (None, payslip.id)
+            and (ref_date is None or advance.period.end_date <= ref_date)
+        ]
+        advance_total = sum(a.amount for a in advances)
+        if advance_total > 0:
+            add_line(context.component('ACOMPTE'), -advance_total, 70)
+            for advance in advances:
+                advance.payslip = payslip
+
+        # ── 13. Salaire net ──
+        payslip.net_salary = (
+            gross_salary
+            - payslip.cnss_employee
+            - payslip.amo_employee
+            - other_deductions
+            - income_tax
+            - advance_total
+        )
+
+        # ── 14. Statut ──
+        payslip.status = 'calculated'
+
+        return lines, advances if advance_total > 0 else []
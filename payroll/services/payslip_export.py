@@ -0,0 +1,353 @@
+# payroll/services/payslip_export.py
+"""
+Export des bulletins d'un lancement de paie : une archive ZIP des PDF ou
+un PDF unique regroupant tous les bulletins.
+
+L'export est une tâche de fond (core.BackgroundJob) découpée en lots : un
+traitement Celery par lot rend les PDF (payroll.tasks.render_payslip_export_chunk),
+le dernier lot terminé planifie l'assemblage du fichier final
+(payroll.tasks.assemble_payslip_export).
+
+Un bulletin dont les données n'ont pas changé depuis son dernier rendu
+n'est pas rendu à nouveau : l'empreinte de ses données (montants, lignes,
+fiche employé et données de paie, paramétrage de l'entreprise) est
+comparée à PaySlip.pdf_fingerprint.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import zipfile
+from collections import defaultdict
+
+from celery import group
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from core.models import BackgroundJob
+from core.services import get_company_context
+from core.services.background_jobs import (
+    JobReporter,
+    cleanup_job_files,
+    create_job,
+    job_file_path,
+)
+
+from ..models import PaySlip, PaySlipLine
+from .pdf_generator import PayrollPDFGenerator
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = 'payslip_export'
+EXPORT_DIR = 'payroll_exports'
+EXPORT_FORMATS = ('zip', 'pdf')
+
+# Conservation des exports (jours)
+EXPORT_RETENTION_DAYS = 7
+
+# Bulletins rendus par traitement Celery
+DEFAULT_CHUNK_SIZE = 100
+
+# Bulletins exportables (ceux qui ont un PDF)
+EXPORTABLE_STATUSES = ['calculated', 'validated', 'paid']
+
+# Champs du bulletin entrant dans l'empreinte
+FINGERPRINT_FIELDS = [
+    'number',
+    'status',
+    'worked_days',
+    'absence_days',
+    'paid_leave_days',
+    'unpaid_leave_days',
+    'overtime_25_hours',
+    'overtime_50_hours',
+    'overtime_100_hours',
+    'basic_salary',
+    'gross_salary',
+    'taxable_salary',
+    'net_salary',
+    'cnss_employee',
+    'cnss_employer',
+    'amo_employee',
+    'amo_employer',
+    'income_tax',
+    'is_paid',
+    'payment_date',
+]
+
+
+def _digest(payload):
+    data = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def payslip_fingerprints(payslips, company=None):
+    """
+    Empreinte des données rendues de chaque bulletin.
+
+    Args:
+        payslips: bulletins (employee et employee.payroll_info chargés)
+        company: contexte entreprise (get_company_context)
+
+    Returns:
+        dict: {payslip_id: empreinte hexadécimale}
+    """
+    if company is None:
+        company = get_company_context()
+    company_digest = _digest(company)
+
+    lines = defaultdict(list)
+    for row in (
+        PaySlipLine.objects.filter(payslip__in=[p.pk for p in payslips])
+        .order_by('payslip_id', 'display_order', 'component__code')
+        .values_list(
+            'payslip_id',
+            'component__code',
+            'amount',
+            'base_amount',
+            'rate',
+            'quantity',
+            'is_employer_contribution',
+        )
+    ):
+        lines[row[0]].append(row[1:])
+
+    fingerprints = {}
+    for payslip in payslips:
+        employee = payslip.employee
+        fingerprints[payslip.pk] = _digest(
+            [
+                [getattr(payslip, name) for name in FINGERPRINT_FIELDS],
+                lines[payslip.pk],
+                employee.updated_at,
+                employee.payroll_info.updated_at,
+                company_digest,
+            ]
+        )
+    return fingerprints
+
+
+def _pdf_exists(payslip):
+    return bool(payslip.pdf_file) and os.path.exists(
+        os.path.join(settings.MEDIA_ROOT, payslip.pdf_file)
+    )
+
+
+class PayslipExportService:
+    """Orchestration de l'export des bulletins d'un lancement."""
+
+    @staticmethod
+    def exportable_payslips(payroll_run):
+        return PaySlip.objects.filter(
+            payroll_run=payroll_run, status__in=EXPORTABLE_STATUSES
+        )
+
+    @staticmethod
+    def start(payroll_run, user=None, output_format='zip', force=False):
+        """
+        Crée la tâche et planifie un rendu Celery par lot.
+
+        Args:
+            payroll_run (PayrollRun): Lancement à exporter
+            user (User, optional): Utilisateur à l'origine de l'export
+            output_format (str): 'zip' (un PDF par bulletin) ou 'pdf' (PDF unique)
+            force (bool): Rendre tous les bulletins, même inchangés
+
+        Returns:
+            BackgroundJob
+        """
+        from ..tasks import assemble_payslip_export, render_payslip_export_chunk
+
+        chunk_size = getattr(settings, 'PAYROLL_EXPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        payslip_ids = list(
+            PayslipExportService.exportable_payslips(payroll_run)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        batches = [
+            payslip_ids[i : i + chunk_size]
+            for i in range(0, len(payslip_ids), chunk_size)
+        ]
+
+        with transaction.atomic():
+            job = create_job(
+                JOB_TYPE,
+                user=user,
+                message=f'Export des bulletins — {payroll_run.name}',
+            )
+            job.progress_total = len(payslip_ids)
+            job.result = {
+                'payroll_run': payroll_run.pk,
+                'format': output_format,
+                'force': force,
+                # Lots comptabilises, par index : un lot redelivre
+                # (acks_late) n'est compte qu'une fois
+                'chunk_count': len(batches),
+                'done_chunks': [],
+                'rendered': 0,
+                'reused': 0,
+                'errors': [],
+            }
+            job.save(update_fields=['progress_total', 'result'])
+
+            # Les workers ne doivent voir la tâche qu'une fois enregistrée
+            if batches:
+                signatures = group(
+                    render_payslip_export_chunk.s(job.pk, index, batch)
+                    for index, batch in enumerate(batches)
+                )
+                transaction.on_commit(signatures.apply_async)
+            else:
+                transaction.on_commit(lambda: assemble_payslip_export.delay(job.pk))
+
+        return job
+
+    @staticmethod
+    def run_chunk(job_id, index, payslip_ids):
+        """Rend les PDF d'un lot de bulletins (bulletins inchangés repris)."""
+        BackgroundJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', started_at=timezone.now()
+        )
+        job = BackgroundJob.objects.get(pk=job_id)
+        if index in job.result['done_chunks']:
+            return
+
+        rendered = reused = 0
+        errors = []
+        try:
+            payslips = list(
+                PaySlip.objects.filter(id__in=payslip_ids)
+                .select_related('employee__payroll_info', 'payroll_run__period')
+                .order_by('id')
+            )
+            fingerprints = payslip_fingerprints(payslips)
+            stale = [
+                payslip
+                for payslip in payslips
+                if job.result['force']
+                or payslip.pdf_fingerprint != fingerprints[payslip.pk]
+                or not _pdf_exists(payslip)
+            ]
+
+            PayrollPDFGenerator.generate_payslip_pdfs(stale)
+            for payslip in stale:
+                payslip.pdf_fingerprint = fingerprints[payslip.pk]
+            PaySlip.objects.bulk_update(stale, ['pdf_fingerprint'])
+
+            rendered = len(stale)
+            reused = len(payslips) - rendered
+        except Exception as e:
+            logger.exception(
+                "Export des bulletins : échec d'un lot de la tâche %s", job_id
+            )
+            errors.append({'payslip_ids': payslip_ids, 'error': str(e)})
+
+        PayslipExportService._chunk_done(
+            job_id, index, len(payslip_ids), rendered, reused, errors
+        )
+
+    @staticmethod
+    def _chunk_done(job_id, index, count, rendered, reused, errors):
+        """
+        Comptabilise un lot sous verrou et planifie l'assemblage au dernier lot.
+        Sans effet pour un lot déjà comptabilisé.
+        """
+        from ..tasks import assemble_payslip_export
+
+        with transaction.atomic():
+            job = BackgroundJob.objects.select_for_update().get(pk=job_id)
+            result = job.result
+            if index in result['done_chunks']:
+                return
+            result['done_chunks'].append(index)
+            result['rendered'] += rendered
+            result['reused'] += reused
+            result['errors'].extend(errors)
+            job.progress_current += count
+            job.save(update_fields=['result', 'progress_current'])
+
+            if len(result['done_chunks']) == result['chunk_count']:
+                transaction.on_commit(lambda: assemble_payslip_export.delay(job_id))
+
+    @staticmethod
+    def assemble(job_id):
+        """Écrit l'archive ZIP ou le PDF unique de la tâche."""
+        job = BackgroundJob.objects.select_related('created_by').get(pk=job_id)
+        reporter = JobReporter(job)
+        result = job.result
+
+        if result['errors']:
+            reporter.fail(
+                f'{len(result["errors"])} lot(s) en erreur : {result["errors"][0]["error"]}'
+            )
+            return
+
+        from ..models import PayrollRun
+
+        payroll_run = PayrollRun.objects.select_related('period').get(
+            pk=result['payroll_run']
+        )
+        pdf_files = list(
+            PayslipExportService.exportable_payslips(payroll_run)
+            .exclude(pdf_file__isnull=True)
+            .exclude(pdf_file='')
+            .order_by('employee__last_name', 'employee__first_name', 'id')
+            .values_list('pdf_file', flat=True)
+        )
+
+        cleanup_job_files(JOB_TYPE, EXPORT_RETENTION_DAYS)
+        output_format = result['format']
+        filename = (
+            f'bulletins_{slugify(payroll_run.period.name) or payroll_run.pk}'
+            f'_{job.pk}.{output_format}'
+        )
+        absolute_path, relative_path = job_file_path(EXPORT_DIR, filename)
+        reporter.advance(0, message="Assemblage de l'export")
+
+        try:
+            if output_format == 'pdf':
+                PayslipExportService._write_merged_pdf(absolute_path, pdf_files)
+            else:
+                PayslipExportService._write_zip(absolute_path, pdf_files)
+        except Exception:
+            if os.path.exists(absolute_path):
+                os.remove(absolute_path)
+            raise
+
+        result.pop('done_chunks', None)
+        result['files'] = len(pdf_files)
+        reporter.finish(result=result, file_path=relative_path)
+        logger.info(
+            'Export des bulletins %s : %s rendus, %s repris',
+            job_id,
+            result['rendered'],
+            result['reused'],
+        )
+
+    @staticmethod
+    def _write_zip(path, pdf_files):
+        # PDF déjà compressés : stockés tels quels
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as zf:
+            for pdf_file in pdf_files:
+                zf.write(
+                    os.path.join(settings.MEDIA_ROOT, pdf_file),
+                    arcname=os.path.basename(pdf_file),
+                )
+
+    @staticmethod
+    def _write_merged_pdf(path, pdf_files):
+        try:
+            from pypdf import PdfWriter
+        except ImportError:
+            raise ValueError("Le module pypdf n'est pas installé")
+
+        writer = PdfWriter()
+        for pdf_file in pdf_files:
+            writer.append(os.path.join(settings.MEDIA_ROOT, pdf_file))
+        with open(path, 'wb') as fh:
+            writer.write(fh)
+        writer.close()
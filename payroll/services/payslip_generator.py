@@ -0,0 +1,135 @@
+# payroll/services/payslip_generator.py
+"""
+Generation ensembliste des bulletins d'un lancement de paie.
+
+Un nombre constant de requetes quel que soit l'effectif : une pour les
+employes eligibles (anti-jointure sur les bulletins deja generes pour la
+periode), une pour les conges approuves agreges par employe, puis des
+insertions par paquets.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+
+from hr.models import Employee, LeaveRequest
+
+from ..models import PaySlip
+
+MONTH_CODES = [
+    '',
+    'JAN',
+    'FEV',
+    'MAR',
+    'AVR',
+    'MAI',
+    'JUN',
+    'JUL',
+    'AOU',
+    'SEP',
+    'OCT',
+    'NOV',
+    'DEC',
+]
+
+
+class PayslipGenerator:
+    """Generation des bulletins en brouillon d'un lancement."""
+
+    @staticmethod
+    def get_eligible_employees(payroll_run):
+        """
+        Employes actifs avec fiche de paie et sans bulletin sur la periode.
+
+        Returns:
+            QuerySet: valeurs (id, employee_id, base_salary)
+        """
+        already_generated = PaySlip.objects.filter(
+            payroll_run__period=payroll_run.period, employee=OuterRef('pk')
+        )
+        employees = Employee.objects.filter(
+            is_active=True, payroll_info__isnull=False
+        ).exclude(Exists(already_generated))
+        if payroll_run.department:
+            employees = employees.filter(department=payroll_run.department)
+
+        return employees.values('id', 'employee_id', 'payroll_info__base_salary')
+
+    @staticmethod
+    def get_leave_days(period):
+        """
+        Jours de conges approuves chevauchant la periode, par employe.
+
+        Returns:
+            dict: {employee_id: (jours payes, jours non payes)}
+        """
+        rows = (
+            LeaveRequest.objects.filter(
+                status='approved_hr',
+                start_date__lte=period.end_date,
+                end_date__gte=period.start_date,
+            )
+            .values('employee_id')
+            .annotate(
+                paid_days=Sum('nb_days', filter=Q(leave_type__is_paid=True)),
+                unpaid_days=Sum('nb_days', filter=Q(leave_type__is_paid=False)),
+            )
+            .order_by()
+        )
+        return {
+            row['employee_id']: (
+                row['paid_days'] or Decimal('0'),
+                row['unpaid_days'] or Decimal('0'),
+            )
+            for row in rows
+        }
+
+    @staticmethod
+    def generate_for_run(payroll_run, batch_size=1000):
+        """
+        Cree les bulletins en brouillon manquants du lancement.
+
+        Returns:
+            int: Nombre de bulletins crees
+        """
+        period = payroll_run.period
+        month_code = MONTH_CODES[period.start_date.month]
+        year_code = str(period.start_date.year)[-2:]
+
+        leave_days = PayslipGenerator.get_leave_days(period)
+        no_leave = (Decimal('0'), Decimal('0'))
+
+        payslips = []
+        for employee in PayslipGenerator.get_eligible_employees(payroll_run):
+            paid_leave_days, unpaid_leave_days = leave_days.get(
+                employee['id'], no_leave
+            )
+            payslips.append(
+                PaySlip(
+                    payroll_run=payroll_run,
+                    employee_id=employee['id'],
+                    number=f'BUL-{month_code}{year_code}-{employee["employee_id"]}',
+                    basic_salary=employee['payroll_info__base_salary'],
+                    worked_days=26,
+                    gross_salary=0,
+                    taxable_salary=0,
+                    net_salary=0,
+                    cnss_employee=0,
+                    cnss_employer=0,
+                    amo_employee=0,
+                    amo_employer=0,
+                    income_tax=0,
+                    paid_leave_days=paid_leave_days,
+                    unpaid_leave_days=unpaid_leave_days,
+                    status='draft',
+                )
+            )
+
+        if payslips:
+            with transaction.atomic():
+                PaySlip.objects.bulk_create(payslips, batch_size=batch_size)
+                payroll_run.status = 'in_progress'
+                payroll_run.save(update_fields=['status'])
+
+        return len(payslips)
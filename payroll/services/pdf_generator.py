@@ -1,14 +1,11 @@
 # payroll/services/pdf_generator.py
-import base64
 import os
 from decimal import Decimal
 
 from django.conf import settings
-from django.template.loader import render_to_string
 from django.utils import timezone
-from weasyprint import HTML
 
-from core.services import get_company_context
+from core.services import PDFDocument, PDFRenderer, get_company_context
 
 MARITAL_STATUS_MAP = {
     'single': 'Celibataire',
@@ -24,12 +21,16 @@ PAYSLIP_TEMPLATE_MAP = {
 }
 PAYSLIP_TEMPLATE_DEFAULT = 'payroll/pdf/payslip_generic.html'
 
+# Date de génération : exclue de l'empreinte du cache PDF. Un bulletin
+# inchangé repris du cache garde la date de son premier rendu.
+VOLATILE_CONTEXT = ('generation_date',)
+
 
 class PayrollPDFGenerator:
     """Classe de service pour générer les PDF de paie."""
 
     @staticmethod
-    def _get_payroll_labels():
+    def _get_payroll_labels(country_code=None):
         """Résout les labels de paie depuis COUNTRY_PACKS via CompanySetup.country_code."""
         defaults = {
             'social': 'Cotisations sociales',
@@ -42,31 +43,32 @@ class PayrollPDFGenerator:
             'tax_short': 'Impôt',
         }
         try:
-            from core.models import CompanySetup
             from core.views import COUNTRY_PACKS
 
-            setup = CompanySetup.objects.first()
-            if setup and setup.country_code:
-                country_info = COUNTRY_PACKS.get(setup.country_code, {})
+            if country_code is None:
+                country_code = get_company_context()['country_code']
+            if country_code:
+                country_info = COUNTRY_PACKS.get(country_code, {})
                 return country_info.get('payroll_labels', defaults)
         except Exception:
             pass
         return defaults
 
     @staticmethod
-    def generate_payslip_pdf(payslip):
-        """Génère le PDF d'un bulletin de paie."""
+    def payslip_document(payslip, company=None):
+        """
+        Document PDF (gabarit et contexte) d'un bulletin de paie.
+
+        Args:
+            company: contexte entreprise, lu une fois pour une série
+        """
         employee = payslip.employee
         payroll_info = employee.payroll_info
+        if company is None:
+            company = get_company_context()
 
-        # Récupérer la devise active
-        from core.models import Currency
-
-        try:
-            currency = Currency.objects.filter(is_default=True).first()
-            currency_code = currency.code if currency else 'XOF'
-        except Exception:
-            currency_code = 'XOF'
+        # Devise active
+        currency_code = company['currency_code'] or 'XOF'
 
         # Récupérer les taux depuis les paramètres
 
@@ -101,7 +103,9 @@ class PayrollPDFGenerator:
             period_name = payslip.period.name
 
         # Labels dynamiques depuis COUNTRY_PACKS
-        payroll_labels = PayrollPDFGenerator._get_payroll_labels()
+        payroll_labels = PayrollPDFGenerator._get_payroll_labels(
+            company['country_code']
+        )
 
         # Charger les lignes triees
         from payroll.models import PaySlipLine
@@ -157,28 +161,8 @@ class PayrollPDFGenerator:
         except Exception:
             pass
 
-        # -- PAIE-12 : Logo entreprise --
-        logo_base64 = None
-        try:
-            from core.models import CompanySetup
-
-            setup = CompanySetup.objects.first()
-            if setup and setup.logo:
-                logo_path = setup.logo.path
-                if os.path.exists(logo_path):
-                    with open(logo_path, 'rb') as lf:
-                        logo_data = base64.b64encode(lf.read()).decode('utf-8')
-                    ext = os.path.splitext(logo_path)[1].lower().lstrip('.')
-                    mime = {
-                        'png': 'image/png',
-                        'jpg': 'image/jpeg',
-                        'jpeg': 'image/jpeg',
-                        'gif': 'image/gif',
-                        'svg': 'image/svg+xml',
-                    }.get(ext, 'image/png')
-                    logo_base64 = f'data:{mime};base64,{logo_data}'
-        except Exception:
-            pass
+        # -- PAIE-12 : Logo entreprise (encodé une fois par processus) --
+        logo_base64 = company['logo_data_uri']
 
         # -- PAIE-07 : Solde de conges --
         leave_allocations = []
@@ -239,7 +223,7 @@ class PayrollPDFGenerator:
             'payslip': payslip,
             'employee': employee,
             'payroll_info': payroll_info,
-            'company': get_company_context(),
+            'company': company,
             'generation_date': timezone.now(),
             'currency_code': currency_code,
             'period_name': period_name,
@@ -278,18 +262,15 @@ class PayrollPDFGenerator:
         }
 
         # Selection du template selon le pays (v3.29.0)
-        country_code = ''
-        try:
-            from core.models import CompanySetup as _CS
-
-            _setup = _CS.objects.first()
-            if _setup:
-                country_code = _setup.country_code or ''
-        except Exception:
-            pass
-        template_name = PAYSLIP_TEMPLATE_MAP.get(country_code, PAYSLIP_TEMPLATE_DEFAULT)
-        html_string = render_to_string(template_name, context)
+        template_name = PAYSLIP_TEMPLATE_MAP.get(
+            company['country_code'], PAYSLIP_TEMPLATE_DEFAULT
+        )
+        return PDFDocument(template_name, context, 'default', VOLATILE_CONTEXT)
 
+    @staticmethod
+    def _write_payslip_pdf(payslip, pdf):
+        """Écrit le PDF du bulletin et enregistre son chemin (pdf_file)."""
+        employee = payslip.employee
         output_dir = os.path.join(
             settings.MEDIA_ROOT,
             'payslips',
@@ -300,7 +281,8 @@ class PayrollPDFGenerator:
         filename = f'bulletin_{payslip.number}_{employee.employee_id}.pdf'
         output_path = os.path.join(output_dir, filename)
 
-        HTML(string=html_string).write_pdf(output_path)
+        with open(output_path, 'wb') as fh:
+            fh.write(pdf)
 
         period_id = (
             str(payslip.payroll_run.period.id) if payslip.payroll_run else 'standalone'
@@ -311,6 +293,32 @@ class PayrollPDFGenerator:
 
         return relative_path
 
+    @staticmethod
+    def generate_payslip_pdf(payslip):
+        """Génère le PDF d'un bulletin de paie."""
+        pdf = PDFRenderer.render(*PayrollPDFGenerator.payslip_document(payslip))
+        return PayrollPDFGenerator._write_payslip_pdf(payslip, pdf)
+
+    @staticmethod
+    def generate_payslip_pdfs(payslips):
+        """
+        Génère les PDF d'une série de bulletins (bulletins inchangés repris
+        du cache).
+
+        Returns:
+            list: chemins relatifs des PDF, dans l'ordre des bulletins
+        """
+        payslips = list(payslips)
+        company = get_company_context()
+        documents = [
+            PayrollPDFGenerator.payslip_document(payslip, company)
+            for payslip in payslips
+        ]
+        return [
+            PayrollPDFGenerator._write_payslip_pdf(payslip, pdf)
+            for payslip, pdf in zip(payslips, PDFRenderer.render_batch(documents))
+        ]
+
     @staticmethod
     def generate_payroll_run_summary(payroll_run):
         """Génère un récapitulatif PDF du lancement de paie."""
@@ -378,7 +386,11 @@ class PayrollPDFGenerator:
             'currency_code': currency_code,
         }
 
-        html_string = render_to_string('payroll/pdf/payroll_summary.html', context)
+        pdf = PDFRenderer.render(
+            'payroll/pdf/payroll_summary.html',
+            context,
+            volatile=VOLATILE_CONTEXT,
+        )
 
         output_dir = os.path.join(
             settings.MEDIA_ROOT, 'payroll_reports', str(payroll_run.period.id)
@@ -388,6 +400,7 @@ class PayrollPDFGenerator:
         filename = f'recapitulatif_paie_{payroll_run.id}_{payroll_run.period.name}.pdf'
         output_path = os.path.join(output_dir, filename)
 
-        HTML(string=html_string).write_pdf(output_path)
+        with open(output_path, 'wb') as fh:
+            fh.write(pdf)
 
         return os.path.join('payroll_reports', str(payroll_run.period.id), filename)
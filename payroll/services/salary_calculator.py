@@ -5,17 +5,19 @@ Les cotisations sont resolues dynamiquement depuis SalaryComponent.category
 et SalaryComponent.rate_parameter_code, sans aucun hardcoding pays.
 """
 
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 
 from django.db import models
 
 from ..models import (
+    AdvanceSalary,
     EmployeePayroll,
     PaySlipLine,
     SalaryComponent,
     TaxBracket,
 )
 from .parameter_resolver import PayrollParameterResolver
+from .parameter_snapshot import PayrollParameterSnapshot
 
 # Categories de cotisations gerees par le moteur generique
 _COTISATION_CATEGORIES = (
@@ -29,6 +31,17 @@ _COTISATION_CATEGORIES = (
 
 _EMPLOYER_CATEGORIES = ('social_employer', 'health_employer', 'other_employer')
 
+_CENT = Decimal('0.01')
+
+
+def round_amount(amount):
+    """
+    Montant d'une ligne de bulletin arrondi au centime, demi-centime
+    eloigne de zero : les lignes sont enregistrees deja arrondies, quelle
+    que soit la base de donnees.
+    """
+    return Decimal(amount).quantize(_CENT, rounding=ROUND_HALF_UP)
+
 
 class SalaryCalculator:
     """Classe de service pour calculer les salaires."""
@@ -41,8 +54,11 @@ class SalaryCalculator:
                 "Impossible de calculer un bulletin qui n'est pas en brouillon"
             )
 
+        # Un seul instantane des parametres pour tout le calcul
+        parameters = PayrollParameterSnapshot.current()
+
         # Validation de completude du pack de paie
-        pack_check = PayrollParameterResolver.validate_pack()
+        pack_check = PayrollParameterResolver.validate_pack(parameters)
         if not pack_check['valid']:
             raise ValueError(
                 f'Pack de paie incomplet — {len(pack_check["missing"])} parametre(s) manquant(s) : '
@@ -63,14 +79,16 @@ class SalaryCalculator:
             PaySlipLine.objects.filter(payslip=payslip).delete()
 
         # ── 1. Salaire de base ──
-        base_salary = SalaryCalculator._calculate_base_salary(payslip, payroll_info)
+        base_salary = SalaryCalculator._calculate_base_salary(
+            payslip, payroll_info, parameters
+        )
         payslip.basic_salary = base_salary
 
         base_component = SalaryComponent.objects.get(code='SALBASE')
         PaySlipLine.objects.create(
             payslip=payslip,
             component=base_component,
-            amount=base_salary,
+            amount=round_amount(base_salary),
             display_order=base_component.default_display_order or 10,
         )
 
@@ -82,26 +100,28 @@ class SalaryCalculator:
         ]:
             hours = getattr(payslip, hours_field, Decimal('0'))
             if hours > 0:
-                amount = SalaryCalculator._calculate_overtime(payslip, rate_val)
+                amount = SalaryCalculator._calculate_overtime(
+                    payslip, rate_val, payroll_info, parameters
+                )
                 comp = SalaryComponent.objects.get(code=code)
                 PaySlipLine.objects.create(
                     payslip=payslip,
                     component=comp,
-                    amount=amount,
+                    amount=round_amount(amount),
                     quantity=hours,
                     display_order=comp.default_display_order or order,
                 )
 
         # ── 3. Prime d'anciennete ──
         seniority_amount = SalaryCalculator._calculate_seniority_bonus(
-            payslip, base_salary
+            payslip, base_salary, parameters
         )
         if seniority_amount > 0:
             seniority_comp = SalaryComponent.objects.get(code='ANCIENNETE')
             PaySlipLine.objects.create(
                 payslip=payslip,
                 component=seniority_comp,
-                amount=seniority_amount,
+                amount=round_amount(seniority_amount),
                 display_order=seniority_comp.default_display_order or 30,
             )
 
@@ -153,7 +173,7 @@ class SalaryCalculator:
         )
 
         for comp in cotisation_components:
-            rate = PayrollParameterResolver.get_optional(
+            rate = parameters.get_optional(
                 comp.rate_parameter_code, reference_date=ref_date
             )
             if rate is None or rate <= 0:
@@ -163,7 +183,7 @@ class SalaryCalculator:
             if comp.base_rule == 'capped':
                 cap_code = comp.cap_parameter_code
                 if cap_code:
-                    cap = PayrollParameterResolver.get_required(
+                    cap = parameters.get_required(
                         comp.cap_parameter_code, reference_date=ref_date
                     )
                     base = min(cnss_base, cap)
@@ -183,7 +203,7 @@ class SalaryCalculator:
             PaySlipLine.objects.create(
                 payslip=payslip,
                 component=comp,
-                amount=-amount if not is_employer else amount,
+                amount=round_amount(-amount if not is_employer else amount),
                 base_amount=base,
                 rate=rate,
                 is_employer_contribution=is_employer,
@@ -226,20 +246,29 @@ class SalaryCalculator:
         payslip.taxable_salary = taxable_salary
 
         # ── 11. Impot sur le revenu (moteur fiscal specialise) ──
-        income_tax = SalaryCalculator._calculate_income_tax(payslip, taxable_salary)
+        income_tax = SalaryCalculator._calculate_income_tax(
+            payslip, taxable_salary, parameters
+        )
         payslip.income_tax = income_tax
 
         ir_component = SalaryComponent.objects.get(code='IR')
         PaySlipLine.objects.create(
             payslip=payslip,
             component=ir_component,
-            amount=-income_tax,
+            amount=round_amount(-income_tax),
             base_amount=taxable_salary,
             display_order=ir_component.default_display_order or 60,
         )
 
         # ── 12. Acomptes ──
-        advances = payslip.advances.filter(is_paid=True, payslip__isnull=True)
+        # Acomptes payes de l'employe, pas encore deduits d'un autre bulletin
+        advances = AdvanceSalary.objects.filter(
+            models.Q(payslip__isnull=True) | models.Q(payslip=payslip),
+            employee=employee,
+            is_paid=True,
+        )
+        if ref_date is not None:
+            advances = advances.filter(period__end_date__lte=ref_date)
         advance_total = sum(a.amount for a in advances)
 
         if advance_total > 0:
@@ -278,17 +307,21 @@ class SalaryCalculator:
     # ── Methodes de calcul inchangees ──
 
     @staticmethod
-    def _calculate_base_salary(payslip, payroll_info):
+    def _calculate_base_salary(
+        payslip, payroll_info, resolver=PayrollParameterResolver
+    ):
         full_salary = payroll_info.base_salary
-        base_days = PayrollParameterResolver.get_required('WORKING_DAYS_MONTH')
+        base_days = resolver.get_required('WORKING_DAYS_MONTH')
         actual_days = base_days - payslip.absence_days - payslip.unpaid_leave_days
         return (full_salary / base_days) * actual_days
 
     @staticmethod
-    def _calculate_overtime(payslip, rate):
-        employee = payslip.employee
-        payroll_info = EmployeePayroll.objects.get(employee=employee)
-        monthly_hours = PayrollParameterResolver.get_required('WORKING_HOURS_MONTH')
+    def _calculate_overtime(
+        payslip, rate, payroll_info=None, resolver=PayrollParameterResolver
+    ):
+        if payroll_info is None:
+            payroll_info = EmployeePayroll.objects.get(employee=payslip.employee)
+        monthly_hours = resolver.get_required('WORKING_HOURS_MONTH')
         hourly_rate = payroll_info.base_salary / monthly_hours
         if rate == Decimal('0.25'):
             hours = payslip.overtime_25_hours
@@ -301,7 +334,9 @@ class SalaryCalculator:
         return hourly_rate * hours * (1 + rate)
 
     @staticmethod
-    def _calculate_seniority_bonus(payslip, base_salary):
+    def _calculate_seniority_bonus(
+        payslip, base_salary, resolver=PayrollParameterResolver
+    ):
         employee = payslip.employee
         today = payslip.payroll_run.period.end_date
         hire_date = employee.hire_date
@@ -310,15 +345,15 @@ class SalaryCalculator:
             years -= 1
         rate = Decimal('0.0')
         if years >= 25:
-            rate = PayrollParameterResolver.get_optional('SENIORITY_25Y_RATE') / 100
+            rate = resolver.get_optional('SENIORITY_25Y_RATE') / 100
         elif years >= 20:
-            rate = PayrollParameterResolver.get_optional('SENIORITY_20Y_RATE') / 100
+            rate = resolver.get_optional('SENIORITY_20Y_RATE') / 100
         elif years >= 12:
-            rate = PayrollParameterResolver.get_optional('SENIORITY_12Y_RATE') / 100
+            rate = resolver.get_optional('SENIORITY_12Y_RATE') / 100
         elif years >= 5:
-            rate = PayrollParameterResolver.get_optional('SENIORITY_5Y_RATE') / 100
+            rate = resolver.get_optional('SENIORITY_5Y_RATE') / 100
         elif years >= 2:
-            rate = PayrollParameterResolver.get_optional('SENIORITY_2Y_RATE') / 100
+            rate = resolver.get_optional('SENIORITY_2Y_RATE') / 100
         return base_salary * rate
 
     @staticmethod
@@ -340,19 +375,21 @@ class SalaryCalculator:
     TAX_METHOD_ABATEMENT = 2
 
     @staticmethod
-    def _calculate_income_tax(payslip, taxable_salary):
-        method = int(PayrollParameterResolver.get_optional('TAX_CALCULATION_METHOD'))
+    def _calculate_income_tax(
+        payslip, taxable_salary, resolver=PayrollParameterResolver, brackets=None
+    ):
+        method = int(resolver.get_optional('TAX_CALCULATION_METHOD'))
         if method == SalaryCalculator.TAX_METHOD_QUOTIENT_FAMILIAL:
             return SalaryCalculator._calculate_tax_quotient_familial(
-                payslip, taxable_salary
+                payslip, taxable_salary, resolver, brackets
             )
         elif method == SalaryCalculator.TAX_METHOD_ABATEMENT:
             return SalaryCalculator._calculate_tax_with_abatement(
-                payslip, taxable_salary
+                payslip, taxable_salary, resolver, brackets
             )
         else:
             return SalaryCalculator._calculate_tax_progressive_deduction(
-                payslip, taxable_salary
+                payslip, taxable_salary, resolver, brackets
             )
 
     @staticmethod
@@ -396,16 +433,17 @@ class SalaryCalculator:
         return max(tax, Decimal('0.0'))
 
     @staticmethod
-    def _calculate_tax_progressive_deduction(payslip, taxable_salary):
-        brackets = SalaryCalculator._get_tax_brackets(payslip)
+    def _calculate_tax_progressive_deduction(
+        payslip, taxable_salary, resolver=PayrollParameterResolver, brackets=None
+    ):
+        if brackets is None:
+            brackets = SalaryCalculator._get_tax_brackets(payslip)
         employee = payslip.employee
         annual_salary = taxable_salary * 12
         family_deduction = Decimal('0')
-        spouse_deduction = PayrollParameterResolver.get_optional('SPOUSE_DEDUCTION')
-        child_deduction_unit = PayrollParameterResolver.get_optional('CHILD_DEDUCTION')
-        max_children = int(
-            PayrollParameterResolver.get_optional('MAX_DEPENDENT_CHILDREN')
-        )
+        spouse_deduction = resolver.get_optional('SPOUSE_DEDUCTION')
+        child_deduction_unit = resolver.get_optional('CHILD_DEDUCTION')
+        max_children = int(resolver.get_optional('MAX_DEPENDENT_CHILDREN'))
         if employee.marital_status == 'married':
             family_deduction += spouse_deduction
         child_count = (
@@ -418,23 +456,24 @@ class SalaryCalculator:
         return monthly_tax if monthly_tax > 0 else Decimal('0.0')
 
     @staticmethod
-    def _calculate_tax_quotient_familial(payslip, taxable_salary):
-        brackets = SalaryCalculator._get_tax_brackets(payslip)
+    def _calculate_tax_quotient_familial(
+        payslip, taxable_salary, resolver=PayrollParameterResolver, brackets=None
+    ):
+        if brackets is None:
+            brackets = SalaryCalculator._get_tax_brackets(payslip)
         employee = payslip.employee
         annual_salary = taxable_salary * 12
-        abatement_rate = PayrollParameterResolver.get_optional(
-            'TAX_GROSS_ABATEMENT_RATE'
-        )
+        abatement_rate = resolver.get_optional('TAX_GROSS_ABATEMENT_RATE')
         if abatement_rate > 0:
             abatement = annual_salary * abatement_rate / Decimal('100')
-            abatement_cap = PayrollParameterResolver.get_optional('TAX_ABATEMENT_CAP')
+            abatement_cap = resolver.get_optional('TAX_ABATEMENT_CAP')
             if abatement_cap > 0 and abatement > abatement_cap:
                 abatement = abatement_cap
             annual_salary = max(annual_salary - abatement, Decimal('0'))
-        parts_single = PayrollParameterResolver.get_optional('TAX_PARTS_SINGLE')
-        parts_married = PayrollParameterResolver.get_optional('TAX_PARTS_MARRIED')
-        parts_per_child = PayrollParameterResolver.get_optional('TAX_PARTS_PER_CHILD')
-        max_parts = PayrollParameterResolver.get_optional('TAX_MAX_PARTS')
+        parts_single = resolver.get_optional('TAX_PARTS_SINGLE')
+        parts_married = resolver.get_optional('TAX_PARTS_MARRIED')
+        parts_per_child = resolver.get_optional('TAX_PARTS_PER_CHILD')
+        max_parts = resolver.get_optional('TAX_MAX_PARTS')
         if parts_single <= 0:
             parts_single = Decimal('1.0')
         if employee.marital_status == 'married':
@@ -449,15 +488,11 @@ class SalaryCalculator:
             revenue_per_part, brackets
         )
         tax_brut = tax_per_part * parts
-        reduction_rate = PayrollParameterResolver.get_optional(
-            'TAX_FAMILY_REDUCTION_RATE'
-        )
+        reduction_rate = resolver.get_optional('TAX_FAMILY_REDUCTION_RATE')
         if reduction_rate > 0 and parts > Decimal('1.0'):
             extra_half_parts = (parts - Decimal('1.0')) * 2
             reduction_pct = extra_half_parts * reduction_rate
-            reduction_cap = PayrollParameterResolver.get_optional(
-                'TAX_FAMILY_REDUCTION_CAP'
-            )
+            reduction_cap = resolver.get_optional('TAX_FAMILY_REDUCTION_CAP')
             reduction = tax_brut * reduction_pct / Decimal('100')
             if reduction_cap > 0 and reduction > reduction_cap:
                 reduction = reduction_cap
@@ -466,29 +501,26 @@ class SalaryCalculator:
         return monthly_tax if monthly_tax > 0 else Decimal('0.0')
 
     @staticmethod
-    def _calculate_tax_with_abatement(payslip, taxable_salary):
-        brackets = SalaryCalculator._get_tax_brackets(payslip)
+    def _calculate_tax_with_abatement(
+        payslip, taxable_salary, resolver=PayrollParameterResolver, brackets=None
+    ):
+        if brackets is None:
+            brackets = SalaryCalculator._get_tax_brackets(payslip)
         employee = payslip.employee
         annual_salary = taxable_salary * 12
-        abatement_rate = PayrollParameterResolver.get_optional(
-            'TAX_GROSS_ABATEMENT_RATE'
-        )
+        abatement_rate = resolver.get_optional('TAX_GROSS_ABATEMENT_RATE')
         if abatement_rate > 0:
             abatement = annual_salary * abatement_rate / Decimal('100')
             annual_salary = max(annual_salary - abatement, Decimal('0'))
         tax_brut = SalaryCalculator._apply_progressive_tax(annual_salary, brackets)
-        reduction_rate = PayrollParameterResolver.get_optional(
-            'TAX_FAMILY_REDUCTION_RATE'
-        )
+        reduction_rate = resolver.get_optional('TAX_FAMILY_REDUCTION_RATE')
         if reduction_rate > 0:
             reduction_pct = Decimal('0')
             if employee.marital_status == 'married':
                 reduction_pct += reduction_rate
-            child_rate = PayrollParameterResolver.get_optional('TAX_FAMILY_CHILD_RATE')
+            child_rate = resolver.get_optional('TAX_FAMILY_CHILD_RATE')
             reduction_pct += min(employee.dependent_children, 6) * child_rate
-            reduction_cap = PayrollParameterResolver.get_optional(
-                'TAX_FAMILY_REDUCTION_CAP'
-            )
+            reduction_cap = resolver.get_optional('TAX_FAMILY_REDUCTION_CAP')
             if reduction_cap > 0:
                 reduction_pct = min(reduction_pct, reduction_cap)
             tax_brut = tax_brut * (Decimal('100') - reduction_pct) / Decimal('100')
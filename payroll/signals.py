@@ -1,7 +1,7 @@
 # payroll/signals.py
 import logging
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
@@ -9,6 +9,7 @@ from .models import (
     ContractType,
     Employee,
     EmployeePayroll,
+    PayrollParameter,
     PayrollRun,
     PaySlip,
 )
@@ -65,6 +66,15 @@ def create_employee_payroll(sender, instance, created, **kwargs):
         logger.exception(f'Échec création EmployeePayroll pour {instance}')
 
 
+@receiver(post_save, sender=PayrollParameter)
+@receiver(post_delete, sender=PayrollParameter)
+def invalidate_payroll_parameter_snapshot(sender, **kwargs):
+    """Invalide l'instantané des paramètres de paie dans tous les processus."""
+    from .services.parameter_snapshot import PayrollParameterSnapshot
+
+    PayrollParameterSnapshot.invalidate()
+
+
 @receiver(pre_save, sender=PayrollRun)
 def update_payroll_run_status_dates(sender, instance, **kwargs):
     """Met à jour les dates de statut du lancement de paie."""
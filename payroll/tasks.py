@@ -0,0 +1,79 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='payroll.tasks.calculate_payslip_chunk', acks_late=True)
+def calculate_payslip_chunk(job_id, chunk_index, payslip_ids):
+    """
+    Calcule un lot de bulletins d'un lancement de paie.
+    L'avancement et les erreurs sont enregistrés dans la tâche de fond
+    (core.BackgroundJob) du calcul.
+    """
+    from .services.calculation_job_service import PayrollCalculationJobService
+
+    PayrollCalculationJobService.run_chunk(job_id, chunk_index, payslip_ids)
+    logger.info(
+        'Calcul de paie : lot %s du job %s traité (%d bulletins)',
+        chunk_index,
+        job_id,
+        len(payslip_ids),
+    )
+
+
+@shared_task(name='payroll.tasks.render_payslip_pdfs')
+def render_payslip_pdfs(payslip_ids):
+    """
+    Génère, par lot, les PDF des bulletins calculés qui n'en ont pas encore
+    (bulletins enregistrés en masse par PayrollRunCalculator).
+    """
+    from django.db.models import Q
+
+    from .models import PaySlip
+    from .services.pdf_generator import PayrollPDFGenerator
+
+    payslips = (
+        PaySlip.objects.filter(
+            Q(pdf_file__isnull=True) | Q(pdf_file=''),
+            id__in=payslip_ids,
+            status__in=['calculated', 'validated'],
+        )
+        .select_related('employee__payroll_info', 'payroll_run__period')
+        .order_by('id')
+    )
+    paths = PayrollPDFGenerator.generate_payslip_pdfs(payslips)
+    logger.info('Bulletins de paie : %d PDF générés', len(paths))
+
+
+@shared_task(name='payroll.tasks.render_payslip_export_chunk', acks_late=True)
+def render_payslip_export_chunk(job_id, chunk_index, payslip_ids):
+    """
+    Rend les PDF d'un lot de bulletins pour un export de lancement.
+    L'avancement est enregistré dans le BackgroundJob de l'export.
+    """
+    from .services.payslip_export import PayslipExportService
+
+    PayslipExportService.run_chunk(job_id, chunk_index, payslip_ids)
+    logger.info(
+        'Export des bulletins : lot %s de la tâche %s traité (%d bulletins)',
+        chunk_index,
+        job_id,
+        len(payslip_ids),
+    )
+
+
+@shared_task(name='payroll.tasks.assemble_payslip_export')
+def assemble_payslip_export(job_id):
+    """Assemble l'archive ZIP ou le PDF unique d'un export de bulletins."""
+    from core.models import BackgroundJob
+    from core.services.background_jobs import JobReporter
+
+    from .services.payslip_export import PayslipExportService
+
+    try:
+        PayslipExportService.assemble(job_id)
+    except Exception as e:
+        logger.exception("Export des bulletins %s : échec de l'assemblage", job_id)
+        JobReporter(BackgroundJob.objects.get(pk=job_id)).fail(e)
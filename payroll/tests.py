@@ -0,0 +1,541 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from core.services.cache_version import get_cache_version
+from hr.models import Department, Employee, JobTitle, LeaveRequest, LeaveType
+from payroll.models import (
+    AdvanceSalary,
+    ContractType,
+    EmployeeAllowance,
+    EmployeePayroll,
+    PayrollParameter,
+    PayrollPeriod,
+    PayrollRun,
+    PaySlip,
+    PaySlipLine,
+    SalaryComponent,
+)
+from payroll.services.calculation_job_service import (
+    CalculationAlreadyRunning,
+    PayrollCalculationJobService,
+)
+from payroll.services.parameter_snapshot import VERSION_KEY as PARAMETER_VERSION_KEY
+from payroll.services.parameter_snapshot import PayrollParameterSnapshot
+from payroll.services.payroll_run_calculator import PayrollRunCalculator
+from payroll.services.payslip_export import PayslipExportService
+from payroll.services.payslip_generator import PayslipGenerator
+from payroll.services.pdf_generator import PayrollPDFGenerator
+from payroll.services.salary_calculator import SalaryCalculator, round_amount
+from payroll.signals import generate_payslip_pdf
+
+LOCALES = ['MA', 'FR', 'SN', 'CI', 'BF']
+
+PAYSLIP_FIELDS = [
+    'basic_salary',
+    'gross_salary',
+    'taxable_salary',
+    'cnss_employee',
+    'cnss_employer',
+    'amo_employee',
+    'amo_employer',
+    'income_tax',
+    'net_salary',
+    'status',
+]
+
+LINE_FIELDS = [
+    'component__code',
+    'amount',
+    'base_amount',
+    'rate',
+    'quantity',
+    'is_employer_contribution',
+    'display_order',
+]
+
+ALLOWANCE_CODES = ['PRIME_RESP', 'PRIME_REND', 'GRATIFICATION']
+
+
+@pytest.fixture
+def no_payslip_pdf():
+    """La génération PDF (receiver post_save) n'entre pas dans la comparaison."""
+    post_save.disconnect(generate_payslip_pdf, sender=PaySlip)
+    yield
+    post_save.connect(generate_payslip_pdf, sender=PaySlip)
+
+
+def seed_twin_runs(locale, nb_employees, rng):
+    """
+    Charge le pack et crée deux lancements identiques : chaque employé
+    synthétique a un jumeau (mêmes données, acomptes compris) dans l'autre
+    lancement.
+
+    Returns:
+        tuple: (lancement calculé bulletin par bulletin, lancement calculé par lot)
+    """
+    call_command('init_payroll_data', locale=locale, force=True, stdout=StringIO())
+
+    today = date.today()
+    department = Department.objects.create(name='Parité')
+    job_title = JobTitle.objects.create(name='Parité', department=department)
+    period = PayrollPeriod.objects.create(
+        name='Parité',
+        start_date=today.replace(day=1),
+        end_date=(today.replace(day=28) + timedelta(days=4)).replace(day=1)
+        - timedelta(days=1),
+    )
+    runs = [
+        PayrollRun.objects.create(period=period, name=name, status='in_progress')
+        for name in ('unit', 'batch')
+    ]
+    allowance_components = list(
+        SalaryComponent.objects.filter(code__in=ALLOWANCE_CODES)
+    )
+
+    for i in range(nb_employees):
+        profile = {
+            'hire_date': today - timedelta(days=rng.randint(0, 30 * 365)),
+            'marital_status': rng.choice(['single', 'married', 'divorced']),
+            'dependent_children': rng.randint(0, 7),
+        }
+        payroll = {
+            'base_salary': Decimal(rng.randint(150000, 9000000)) / 100,
+            'transport_allowance': rng.choice(
+                [Decimal('0'), Decimal('250.00'), Decimal('500.50')]
+            ),
+            'meal_allowance': rng.choice([Decimal('0'), Decimal('333.33')]),
+        }
+        allowances = [
+            (component, Decimal(rng.randint(1000, 200000)) / 100)
+            for component in allowance_components
+            if rng.random() < 0.3
+        ]
+        advances = [
+            Decimal(rng.randint(10000, 300000)) / 100
+            for _ in range(rng.choice([0, 0, 1, 2]))
+        ]
+        payslip_values = {
+            field: Decimal(rng.choice([0, 0, 3, 7.5, 12]))
+            for field in (
+                'overtime_25_hours',
+                'overtime_50_hours',
+                'overtime_100_hours',
+            )
+        }
+        payslip_values['absence_days'] = Decimal(rng.choice([0, 0, 0, 1, 2.5]))
+        payslip_values['unpaid_leave_days'] = Decimal(rng.choice([0, 0, 0, 1, 3]))
+
+        for run in runs:
+            employee = Employee.objects.create(
+                first_name=f'Parite{i}',
+                last_name=run.name,
+                email=f'{run.name}{i}@example.com',
+                employee_id=f'{run.name[0].upper()}{i:05d}',
+                job_title=job_title,
+                department=department,
+                **profile,
+            )
+            EmployeePayroll.objects.filter(employee=employee).update(**payroll)
+            payroll_info = EmployeePayroll.objects.get(employee=employee)
+            for component, amount in allowances:
+                EmployeeAllowance.objects.create(
+                    employee_payroll=payroll_info, component=component, amount=amount
+                )
+            for amount in advances:
+                AdvanceSalary.objects.create(
+                    employee=employee,
+                    period=period,
+                    amount=amount,
+                    payment_date=period.start_date,
+                    is_paid=True,
+                )
+            PaySlip.objects.create(
+                payroll_run=run,
+                employee=employee,
+                number=f'{run.name}-{i:05d}',
+                basic_salary=payroll_info.base_salary,
+                gross_salary=0,
+                taxable_salary=0,
+                net_salary=0,
+                cnss_employee=0,
+                cnss_employer=0,
+                amo_employee=0,
+                amo_employer=0,
+                income_tax=0,
+                status='draft',
+                **payslip_values,
+            )
+
+    return runs
+
+
+def payslip_results(payroll_run):
+    """Champs calculés, lignes et acomptes des bulletins, par rang d'employé."""
+    results = {
+        row.pop('number').rsplit('-', 1)[1]: {'fields': row, 'lines': []}
+        for row in PaySlip.objects.filter(payroll_run=payroll_run).values(
+            'number', *PAYSLIP_FIELDS
+        )
+    }
+    lines = (
+        PaySlipLine.objects.filter(payslip__payroll_run=payroll_run)
+        .order_by('payslip__number', 'display_order', 'component__code', 'id')
+        .values_list('payslip__number', *LINE_FIELDS)
+    )
+    for number, *values in lines:
+        results[number.rsplit('-', 1)[1]]['lines'].append(tuple(values))
+    return results
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('locale', LOCALES)
+def test_batch_calculation_matches_unit_calculation(
+    locale, no_payslip_pdf, django_capture_on_commit_callbacks
+):
+    unit_run, batch_run = seed_twin_runs(locale, 30, random.Random(42))
+
+    unit_errors = {}
+    for payslip in PaySlip.objects.filter(payroll_run=unit_run).order_by('number'):
+        try:
+            SalaryCalculator.calculate_payslip(payslip)
+        except Exception as e:
+            unit_errors[payslip.number.rsplit('-', 1)[1]] = str(e)
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        calculated, failures = PayrollRunCalculator.calculate_payslips(
+            PaySlip.objects.filter(payroll_run=batch_run)
+        )
+    batch_errors = {
+        payslip.number.rsplit('-', 1)[1]: message for payslip, message in failures
+    }
+
+    assert calculated
+    assert batch_errors == unit_errors
+    assert payslip_results(batch_run) == payslip_results(unit_run)
+
+    # Acomptes rattachés aux bulletins de chaque lancement
+    for run in (unit_run, batch_run):
+        assert not AdvanceSalary.objects.filter(
+            employee__last_name=run.name, payslip__isnull=True
+        ).exists()
+    assert AdvanceSalary.objects.filter(payslip__payroll_run=batch_run).exists()
+
+    # PDF rendus après validation, par une seule tâche pour le lot
+    assert len(callbacks) == 1
+
+
+def test_round_amount_rounds_half_cents_away_from_zero():
+    assert round_amount(Decimal('10.025')) == Decimal('10.03')
+    assert round_amount(Decimal('-10.025')) == Decimal('-10.03')
+    assert round_amount(Decimal('10.024')) == Decimal('10.02')
+    assert round_amount(12) == Decimal('12.00')
+
+
+@pytest.mark.django_db
+def test_paid_advances_are_deducted_once(no_payslip_pdf):
+    unit_run, batch_run = seed_twin_runs('MA', 1, random.Random(1))
+    AdvanceSalary.objects.all().delete()
+    future_period = PayrollPeriod.objects.create(
+        name='Suivante',
+        start_date=unit_run.period.end_date + timedelta(days=1),
+        end_date=unit_run.period.end_date + timedelta(days=30),
+    )
+
+    for run in (unit_run, batch_run):
+        payslip = PaySlip.objects.get(payroll_run=run)
+        for amount, period in (
+            (Decimal('1000.00'), run.period),
+            (Decimal('250.50'), run.period),
+            (Decimal('400.00'), future_period),
+        ):
+            AdvanceSalary.objects.create(
+                employee=payslip.employee,
+                period=period,
+                amount=amount,
+                payment_date=period.start_date,
+                is_paid=True,
+            )
+
+    unit_payslip = PaySlip.objects.get(payroll_run=unit_run)
+    SalaryCalculator.calculate_payslip(unit_payslip)
+    # Un recalcul reprend les acomptes deja rattaches, sans les doubler
+    SalaryCalculator.calculate_payslip(unit_payslip, recalculate=True)
+    PayrollRunCalculator.calculate_payslips(
+        PaySlip.objects.filter(payroll_run=batch_run)
+    )
+
+    for run in (unit_run, batch_run):
+        payslip = PaySlip.objects.get(payroll_run=run)
+        advance_lines = payslip.lines.filter(component__code='ACOMPTE')
+        assert [line.amount for line in advance_lines] == [Decimal('-1250.50')]
+        assert sorted(a.amount for a in payslip.advances.all()) == [
+            Decimal('250.50'),
+            Decimal('1000.00'),
+        ]
+        # L'acompte de la periode suivante reste a deduire
+        assert (
+            AdvanceSalary.objects.get(
+                employee=payslip.employee, period=future_period
+            ).payslip
+            is None
+        )
+        assert all(
+            line.amount == round_amount(line.amount) for line in payslip.lines.all()
+        )
+
+
+@pytest.mark.django_db
+def test_calculation_job_tracks_chunks_and_refuses_concurrent_start(
+    no_payslip_pdf, django_capture_on_commit_callbacks
+):
+    _unit_run, run = seed_twin_runs('MA', 5, random.Random(7))
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        job = PayrollCalculationJobService.start(run, chunk_size=2)
+    assert len(callbacks) == 1
+    assert job.job_type == 'payroll_calculation'
+    assert job.progress_total == 5
+    assert [chunk['size'] for chunk in job.result['chunks']] == [2, 2, 1]
+
+    # Un second calcul est refusé tant que le premier est actif
+    with pytest.raises(CalculationAlreadyRunning) as excinfo:
+        PayrollCalculationJobService.start(run)
+    assert excinfo.value.job == job
+
+    payslip_ids = list(
+        PaySlip.objects.filter(payroll_run=run)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    with django_capture_on_commit_callbacks():
+        for index, start in enumerate(range(0, len(payslip_ids), 2)):
+            PayrollCalculationJobService.run_chunk(
+                job.pk, index, payslip_ids[start : start + 2]
+            )
+
+    job.refresh_from_db()
+    run.refresh_from_db()
+    assert job.status == 'done'
+    assert job.progress_current == 5
+    assert job.result['calculated_count'] + job.result['error_count'] == 5
+    assert PayrollCalculationJobService.get_active_job(run) is None
+    if not job.result['error_count']:
+        assert run.status == 'calculated'
+
+
+@pytest.mark.django_db
+def test_stale_calculation_job_does_not_block_a_new_one(
+    no_payslip_pdf, django_capture_on_commit_callbacks, settings
+):
+    settings.PAYROLL_CALCULATION_STALE_AFTER = 60
+    _unit_run, run = seed_twin_runs('MA', 2, random.Random(7))
+    with django_capture_on_commit_callbacks():
+        stuck_job = PayrollCalculationJobService.start(run)
+
+    # Worker arrêté au milieu du lot : plus aucune activité
+    stuck_job.result['last_activity'] = (
+        timezone.now() - timedelta(minutes=5)
+    ).isoformat()
+    stuck_job.save()
+
+    with django_capture_on_commit_callbacks():
+        job = PayrollCalculationJobService.start(run)
+
+    stuck_job.refresh_from_db()
+    assert stuck_job.status == 'failed'
+    assert PayrollCalculationJobService.get_active_job(run) == job
+
+    # Le lot redélivré de l'ancienne tâche est ignoré
+    payslip_ids = list(
+        PaySlip.objects.filter(payroll_run=run).values_list('id', flat=True)
+    )
+    PayrollCalculationJobService.run_chunk(stuck_job.pk, 0, payslip_ids)
+    stuck_job.refresh_from_db()
+    assert stuck_job.result['chunks'][0]['status'] == 'pending'
+    assert not PaySlip.objects.filter(payroll_run=run).exclude(status='draft').exists()
+
+
+@pytest.mark.django_db
+def test_redelivered_export_chunk_is_counted_once(
+    no_payslip_pdf, django_capture_on_commit_callbacks, settings, monkeypatch
+):
+    settings.PAYROLL_EXPORT_CHUNK_SIZE = 2
+    monkeypatch.setattr(
+        PayrollPDFGenerator, 'generate_payslip_pdfs', lambda payslips: None
+    )
+    _unit_run, run = seed_twin_runs('MA', 3, random.Random(7))
+    PaySlip.objects.filter(payroll_run=run).update(status='calculated')
+
+    with django_capture_on_commit_callbacks():
+        job = PayslipExportService.start(run)
+    payslip_ids = list(
+        PaySlip.objects.filter(payroll_run=run)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        PayslipExportService.run_chunk(job.pk, 0, payslip_ids[:2])
+        # Lot redélivré après un arrêt du worker avant l'acquittement
+        PayslipExportService.run_chunk(job.pk, 0, payslip_ids[:2])
+        PayslipExportService._chunk_done(job.pk, 0, 2, 2, 0, [])
+    job.refresh_from_db()
+    assert not callbacks
+    assert job.progress_current == 2
+    assert job.result['rendered'] + job.result['reused'] == 2
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        PayslipExportService.run_chunk(job.pk, 1, payslip_ids[2:])
+    job.refresh_from_db()
+    assert len(callbacks) == 1
+    assert job.progress_current == 3
+    assert sorted(job.result['done_chunks']) == [0, 1]
+
+
+def create_employees(department, job_title, prefix, count, base_salary):
+    employees = []
+    for i in range(count):
+        employee = Employee.objects.create(
+            first_name=f'{prefix}{i}',
+            last_name='Generation',
+            email=f'{prefix.lower()}{i}@example.com',
+            employee_id=f'{prefix}{i:03d}',
+            job_title=job_title,
+            department=department,
+            hire_date=date(2020, 1, 1),
+        )
+        EmployeePayroll.objects.filter(employee=employee).update(
+            base_salary=base_salary
+        )
+        employees.append(employee)
+    return employees
+
+
+@pytest.mark.django_db
+def test_generate_payslips_for_run(django_assert_num_queries):
+    # Type de contrat : fiche de paie créée avec l'employé (payroll.signals)
+    ContractType.objects.create(code='CDI', name='CDI')
+    department = Department.objects.create(name='Ventes')
+    other_department = Department.objects.create(name='Usine')
+    job_title = JobTitle.objects.create(name='Commercial', department=department)
+    period = PayrollPeriod.objects.create(
+        name='Mars 2025', start_date=date(2025, 3, 1), end_date=date(2025, 3, 31)
+    )
+    employees = create_employees(department, job_title, 'V', 3, Decimal('8000.00'))
+    create_employees(other_department, job_title, 'U', 2, Decimal('5000.00'))
+    inactive = create_employees(department, job_title, 'X', 1, Decimal('1.00'))[0]
+    Employee.objects.filter(pk=inactive.pk).update(is_active=False)
+
+    paid = LeaveType.objects.create(name='Congé payé', code='CP', is_paid=True)
+    unpaid = LeaveType.objects.create(name='Sans solde', code='CSS', is_paid=False)
+    for leave_type, start, end, days, status in (
+        (paid, date(2025, 2, 24), date(2025, 3, 4), '6.0', 'approved_hr'),
+        (unpaid, date(2025, 3, 10), date(2025, 3, 11), '2.0', 'approved_hr'),
+        (paid, date(2025, 3, 17), date(2025, 3, 17), '1.0', 'pending'),
+        (paid, date(2025, 4, 1), date(2025, 4, 2), '2.0', 'approved_hr'),
+    ):
+        LeaveRequest.objects.create(
+            employee=employees[0],
+            leave_type=leave_type,
+            start_date=start,
+            end_date=end,
+            nb_days=Decimal(days),
+            status=status,
+        )
+
+    run = PayrollRun.objects.create(
+        period=period, name='Ventes mars', department=department
+    )
+    # Congés, employés, puis insertion et statut du lancement dans une
+    # transaction : nombre de requêtes indépendant de l'effectif
+    with django_assert_num_queries(7):
+        assert PayslipGenerator.generate_for_run(run) == 3
+
+    payslips = {
+        payslip.employee_id: payslip
+        for payslip in PaySlip.objects.filter(payroll_run=run)
+    }
+    assert set(payslips) == {employee.pk for employee in employees}
+    first = payslips[employees[0].pk]
+    assert first.number == 'BUL-MAR25-V000'
+    assert first.basic_salary == Decimal('8000.00')
+    assert (first.paid_leave_days, first.unpaid_leave_days) == (
+        Decimal('6.0'),
+        Decimal('2.0'),
+    )
+    assert payslips[employees[1].pk].paid_leave_days == 0
+    run.refresh_from_db()
+    assert run.status == 'in_progress'
+
+    # Un second lancement sur la période ne reprend que les employés restants
+    assert PayslipGenerator.generate_for_run(run) == 0
+    factory_run = PayrollRun.objects.create(period=period, name='Tout le monde')
+    with django_assert_num_queries(7):
+        assert PayslipGenerator.generate_for_run(factory_run) == 2
+
+
+def test_parameter_snapshot_matches_a_linear_scan():
+    rng = random.Random(9)
+    start = date(2020, 1, 1)
+    rows = []
+    for code in ('SMIG', 'CNSS_PLAFOND', 'IR_TAUX'):
+        for day in rng.sample(range(0, 2000, 7), 12):
+            effective_date = start + timedelta(days=day)
+            end_date = rng.choice(
+                [None, effective_date + timedelta(days=rng.randint(0, 400))]
+            )
+            rows.append((code, effective_date, end_date, Decimal(rng.randint(1, 9999))))
+    rng.shuffle(rows)
+    snapshot = PayrollParameterSnapshot(rows)
+
+    def linear_scan(code, reference_date):
+        candidates = [
+            (effective_date, value)
+            for row_code, effective_date, end_date, value in rows
+            if row_code == code
+            and effective_date <= reference_date
+            and (end_date is None or end_date >= reference_date)
+        ]
+        return max(candidates)[1] if candidates else None
+
+    for offset in range(-30, 2500, 5):
+        reference_date = start + timedelta(days=offset)
+        for code in ('SMIG', 'CNSS_PLAFOND', 'IR_TAUX', 'ABSENT'):
+            assert snapshot.value_at(code, reference_date) == linear_scan(
+                code, reference_date
+            )
+
+    with pytest.raises(ValueError):
+        snapshot.get_required('ABSENT', start)
+    assert snapshot.get_optional('ABSENT', Decimal('7'), start) == Decimal('7')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parameter_change_bumps_the_snapshot_version(django_assert_num_queries):
+    parameter = PayrollParameter.objects.create(
+        code='SMIG',
+        name='SMIG',
+        value=Decimal('3000.00'),
+        effective_date=date(2020, 1, 1),
+    )
+    snapshot = PayrollParameterSnapshot.current()
+    assert snapshot.get_required('SMIG') == Decimal('3000.00')
+    # Même version : instantané du processus, sans requête
+    with django_assert_num_queries(0):
+        assert PayrollParameterSnapshot.current() is snapshot
+
+    version = get_cache_version(PARAMETER_VERSION_KEY)
+    parameter.value = Decimal('3200.00')
+    parameter.save()
+    assert get_cache_version(PARAMETER_VERSION_KEY) != version
+    assert PayrollParameterSnapshot.current().get_required('SMIG') == Decimal('3200.00')
+
+    parameter.delete()
+    assert PayrollParameterSnapshot.current().value_at('SMIG', date.today()) is None
@@ -1,6 +1,6 @@
 import os
 
-from django.db.models import Count, Sum
+from django.db.models import Count, Prefetch, Sum
 from django.http import FileResponse
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
@@ -37,6 +37,11 @@ from .serializers import (
     SalaryComponentSerializer,
     TaxBracketSerializer,
 )
+from .services.calculation_job_service import (
+    CalculationAlreadyRunning,
+    PayrollCalculationJobService,
+)
+from .services.payslip_generator import PayslipGenerator
 from .services.pdf_generator import PayrollPDFGenerator
 from .services.salary_calculator import SalaryCalculator
 
@@ -154,7 +159,14 @@ class TaxBracketViewSet(viewsets.ModelViewSet):
 class EmployeePayrollViewSet(viewsets.ModelViewSet):
     """API pour les données de paie des employés."""
 
-    queryset = EmployeePayroll.objects.all()
+    queryset = EmployeePayroll.objects.select_related(
+        'employee', 'contract_type'
+    ).prefetch_related(
+        Prefetch(
+            'allowances',
+            queryset=EmployeeAllowance.objects.select_related('component'),
+        )
+    )
     serializer_class = EmployeePayrollSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'payroll'
@@ -290,7 +302,7 @@ class EmployeePayrollViewSet(viewsets.ModelViewSet):
 class EmployeeAllowanceViewSet(viewsets.ModelViewSet):
     """API pour les primes et indemnités dynamiques."""
 
-    queryset = EmployeeAllowance.objects.all()
+    queryset = EmployeeAllowance.objects.select_related('component').all()
     serializer_class = EmployeeAllowanceSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'payroll'
@@ -306,7 +318,9 @@ class EmployeeAllowanceViewSet(viewsets.ModelViewSet):
 class PayrollRunViewSet(viewsets.ModelViewSet):
     """API pour les lancements de paie."""
 
-    queryset = PayrollRun.objects.all()
+    queryset = PayrollRun.objects.select_related(
+        'period', 'department', 'created_by', 'validated_by'
+    ).all()
     serializer_class = PayrollRunSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'payroll'
@@ -320,6 +334,12 @@ class PayrollRunViewSet(viewsets.ModelViewSet):
     ordering_fields = ['period__start_date', 'run_date', 'status']
     ordering = ['-period__start_date', '-run_date']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = PayrollRunSerializer.annotate_summary(queryset)
+        return queryset
+
     def perform_create(self, serializer):
         """Crée le run puis auto-génère les bulletins."""
         import logging
@@ -351,89 +371,7 @@ class PayrollRunViewSet(viewsets.ModelViewSet):
 
     def _generate_payslips_for_run(self, payroll_run):
         """Logique de génération extraite — réutilisée par perform_create et generate_payslips."""
-        from decimal import Decimal as D
-
-        from hr.models import Employee, LeaveRequest
-
-        employees = Employee.objects.filter(is_active=True)
-
-        if payroll_run.department:
-            employees = employees.filter(department=payroll_run.department)
-
-        period = payroll_run.period
-        months = [
-            '',
-            'JAN',
-            'FEV',
-            'MAR',
-            'AVR',
-            'MAI',
-            'JUN',
-            'JUL',
-            'AOU',
-            'SEP',
-            'OCT',
-            'NOV',
-            'DEC',
-        ]
-        month_code = months[period.start_date.month]
-        year_code = str(period.start_date.year)[-2:]
-
-        created_count = 0
-        for employee in employees:
-            try:
-                payroll_info = employee.payroll_info
-            except EmployeePayroll.DoesNotExist:
-                continue
-
-            if PaySlip.objects.filter(
-                payroll_run__period=period, employee=employee
-            ).exists():
-                continue
-
-            number = f'BUL-{month_code}{year_code}-{employee.employee_id}'
-
-            approved_leaves = LeaveRequest.objects.filter(
-                employee=employee,
-                status='approved_hr',
-                start_date__lte=period.end_date,
-                end_date__gte=period.start_date,
-            ).select_related('leave_type')
-
-            paid_leave_days = sum(
-                (req.nb_days for req in approved_leaves if req.leave_type.is_paid),
-                D('0'),
-            )
-            unpaid_leave_days = sum(
-                (req.nb_days for req in approved_leaves if not req.leave_type.is_paid),
-                D('0'),
-            )
-
-            PaySlip.objects.create(
-                payroll_run=payroll_run,
-                employee=employee,
-                number=number,
-                basic_salary=payroll_info.base_salary,
-                worked_days=26,
-                gross_salary=0,
-                taxable_salary=0,
-                net_salary=0,
-                cnss_employee=0,
-                cnss_employer=0,
-                amo_employee=0,
-                amo_employer=0,
-                income_tax=0,
-                paid_leave_days=paid_leave_days,
-                unpaid_leave_days=unpaid_leave_days,
-                status='draft',
-            )
-            created_count += 1
-
-        if created_count > 0:
-            payroll_run.status = 'in_progress'
-            payroll_run.save(update_fields=['status'])
-
-        return created_count
+        return PayslipGenerator.generate_for_run(payroll_run)
 
     @action(detail=True, methods=['post'])
     def generate_payslips(self, request, pk=None):
@@ -460,7 +398,12 @@ class PayrollRunViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def calculate_payslips(self, request, pk=None):
-        """Calcule tous les bulletins de ce lancement."""
+        """
+        Lance le calcul asynchrone des bulletins de ce lancement.
+        Retourne l'identifiant de la tâche à suivre via calculation_status.
+        """
+        from core.serializers import BackgroundJobSerializer
+
         payroll_run = self.get_object()
 
         if payroll_run.status not in ['in_progress', 'calculated']:
@@ -471,37 +414,45 @@ class PayrollRunViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        payslips = PaySlip.objects.filter(payroll_run=payroll_run, status='draft')
-
-        calculated_count = 0
-        errors = []
-
-        for payslip in payslips:
-            try:
-                SalaryCalculator.calculate_payslip(payslip)
-                calculated_count += 1
-            except Exception as e:
-                errors.append(
-                    {
-                        'payslip_id': payslip.id,
-                        'employee': payslip.employee.full_name,
-                        'error': str(e),
-                    }
-                )
-
-        if not PaySlip.objects.filter(payroll_run=payroll_run, status='draft').exists():
-            payroll_run.status = 'calculated'
-            payroll_run.calculated_date = timezone.now()
-            payroll_run.save(update_fields=['status', 'calculated_date'])
+        try:
+            job = PayrollCalculationJobService.start(payroll_run, user=request.user)
+        except CalculationAlreadyRunning as e:
+            return Response(
+                {'error': str(e), 'job_id': e.job.id},
+                status=status.HTTP_409_CONFLICT,
+            )
 
         return Response(
             {
                 'success': True,
-                'message': f'{calculated_count} bulletins calculés avec succès',
-                'errors': errors,
-            }
+                'message': f'Calcul de {job.progress_total} bulletins lancé',
+                'job_id': job.id,
+                'job': BackgroundJobSerializer(job, context={'request': request}).data,
+            },
+            status=status.HTTP_202_ACCEPTED,
         )
 
+    @action(detail=True, methods=['get'])
+    def calculation_status(self, request, pk=None):
+        """Avancement du calcul (dernière tâche, ou ?job_id=<id>)."""
+        from core.serializers import BackgroundJobSerializer
+
+        payroll_run = self.get_object()
+
+        jobs = PayrollCalculationJobService.jobs(payroll_run)
+        job_id = request.query_params.get('job_id')
+        if job_id:
+            jobs = jobs.filter(pk=job_id)
+        job = jobs.first()
+
+        if job is None:
+            return Response(
+                {'error': 'Aucun calcul trouvé pour ce lancement'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        return Response(BackgroundJobSerializer(job, context={'request': request}).data)
+
     @action(detail=True, methods=['post'])
     def validate_payroll(self, request, pk=None):
         """Valide le lancement de paie."""
@@ -606,6 +557,42 @@ class PayrollRunViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    @action(detail=True, methods=['post'])
+    def export_payslips(self, request, pk=None):
+        """
+        Lance l'export de tous les bulletins du lancement en tâche de fond :
+        archive ZIP (un PDF par bulletin, format='zip') ou PDF unique
+        (format='pdf'). Les bulletins inchangés depuis leur dernier rendu
+        sont repris, sauf si force=true.
+        Réponse 202 avec la tâche à suivre sur /api/core/jobs/<id>/.
+        """
+        from core.serializers import BackgroundJobSerializer
+
+        from .services.payslip_export import EXPORT_FORMATS, PayslipExportService
+
+        payroll_run = self.get_object()
+
+        output_format = request.data.get('format', 'zip')
+        if output_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'Format inconnu : {output_format} (zip ou pdf)'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not PayslipExportService.exportable_payslips(payroll_run).exists():
+            return Response(
+                {'error': 'Aucun bulletin calculé à exporter pour ce lancement'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        force = str(request.data.get('force', '')).lower() in ('1', 'true')
+        job = PayslipExportService.start(
+            payroll_run, user=request.user, output_format=output_format, force=force
+        )
+        return Response(
+            BackgroundJobSerializer(job, context={'request': request}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
     @action(detail=True, methods=['get'])
     def export_xlsx(self, request, pk=None):
         """Exporte le recapitulatif de paie en XLSX (PAIE-14)."""
@@ -747,6 +734,8 @@ class PaySlipViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
         user = self.request.user
         qs = PaySlip.objects.select_related(
             'payroll_run', 'payroll_run__period', 'employee'
+        ).prefetch_related(
+            Prefetch('lines', queryset=PaySlipLine.objects.select_related('component'))
         )
         if user.is_superuser:
             return qs
@@ -826,7 +815,7 @@ class PaySlipViewSet(SelfServicePermissionMixin, viewsets.ModelViewSet):
 class PaySlipLineViewSet(viewsets.ModelViewSet):
     """API pour les lignes de bulletin de paie."""
 
-    queryset = PaySlipLine.objects.all()
+    queryset = PaySlipLine.objects.select_related('component').all()
     serializer_class = PaySlipLineSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'payroll'
@@ -839,7 +828,9 @@ class PaySlipLineViewSet(viewsets.ModelViewSet):
 class AdvanceSalaryViewSet(viewsets.ModelViewSet):
     """API pour les acomptes sur salaire."""
 
-    queryset = AdvanceSalary.objects.all()
+    queryset = AdvanceSalary.objects.select_related(
+        'employee', 'period', 'payslip'
+    ).all()
     serializer_class = AdvanceSalarySerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'payroll'
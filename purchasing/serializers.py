@@ -13,6 +13,17 @@ from .models import (
 )
 
 
+def _related_count(obj, related_name):
+    """
+    Nombre d'objets liés : annotation <related_name>_count posée par la vue
+    en liste, sinon COUNT unitaire.
+    """
+    count = getattr(obj, f'{related_name}_count', None)
+    if count is None:
+        count = getattr(obj, related_name).count()
+    return count
+
+
 class SupplierSerializer(serializers.ModelSerializer):
     company_name = serializers.CharField(
         source='company.name', read_only=True, default=None
@@ -47,13 +58,16 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
     supplier_name = serializers.CharField(source='supplier.name', read_only=True)
     currency_code = serializers.CharField(source='currency.code', read_only=True)
     state_display = serializers.CharField(source='get_state_display', read_only=True)
-    items_count = serializers.IntegerField(source='items.count', read_only=True)
+    items_count = serializers.SerializerMethodField()
 
     class Meta:
         model = PurchaseOrder
         fields = '__all__'
         read_only_fields = ['number', 'created_by', 'created_at', 'updated_at']
 
+    def get_items_count(self, obj):
+        return _related_count(obj, 'items')
+
 
 class PurchaseOrderDetailSerializer(PurchaseOrderSerializer):
     items = PurchaseOrderItemSerializer(many=True, read_only=True)
@@ -79,7 +93,7 @@ class ReceptionSerializer(serializers.ModelSerializer):
     )
     warehouse_name = serializers.CharField(source='warehouse.name', read_only=True)
     state_display = serializers.CharField(source='get_state_display', read_only=True)
-    items_count = serializers.IntegerField(source='items.count', read_only=True)
+    items_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Reception
@@ -92,6 +106,9 @@ class ReceptionSerializer(serializers.ModelSerializer):
             'created_at',
         ]
 
+    def get_items_count(self, obj):
+        return _related_count(obj, 'items')
+
 
 class ReceptionDetailSerializer(ReceptionSerializer):
     items = ReceptionItemSerializer(many=True, read_only=True)
@@ -120,8 +137,8 @@ class SupplierInvoiceSerializer(serializers.ModelSerializer):
     currency_code = serializers.CharField(source='currency.code', read_only=True)
     state_display = serializers.CharField(source='get_state_display', read_only=True)
     type_display = serializers.CharField(source='get_type_display', read_only=True)
-    items_count = serializers.IntegerField(source='items.count', read_only=True)
-    documents_count = serializers.IntegerField(source='documents.count', read_only=True)
+    items_count = serializers.SerializerMethodField()
+    documents_count = serializers.SerializerMethodField()
     parent_invoice_number = serializers.SerializerMethodField()
 
     class Meta:
@@ -137,6 +154,12 @@ class SupplierInvoiceSerializer(serializers.ModelSerializer):
             'updated_at',
         ]
 
+    def get_items_count(self, obj):
+        return _related_count(obj, 'items')
+
+    def get_documents_count(self, obj):
+        return _related_count(obj, 'documents')
+
     def get_parent_invoice_number(self, obj):
         return obj.parent_invoice.number if obj.parent_invoice else None
 
@@ -148,7 +171,7 @@ class SupplierInvoiceDetailSerializer(SupplierInvoiceSerializer):
     credit_notes_list = serializers.SerializerMethodField()
 
     def get_documents(self, obj):
-        docs = obj.documents.all().order_by('-uploaded_at')
+        docs = obj.documents.select_related('uploaded_by').order_by('-uploaded_at')
         return SupplierInvoiceDocumentSerializer(docs, many=True).data
 
     def get_parent_invoice_details(self, obj):
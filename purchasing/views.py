@@ -1,7 +1,8 @@
 import mimetypes
 from decimal import Decimal
 
-from django.db.models import Count, F, Sum
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, Sum
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import permissions, status, viewsets
@@ -62,6 +63,19 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
             return PurchaseOrderDetailSerializer
         return PurchaseOrderSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.annotate(items_count=Count('items'))
+        elif self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'items',
+                    queryset=PurchaseOrderItem.objects.select_related('product'),
+                )
+            )
+        return queryset
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -143,6 +157,18 @@ class ReceptionViewSet(viewsets.ModelViewSet):
             return ReceptionDetailSerializer
         return ReceptionSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.annotate(items_count=Count('items'))
+        elif self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'items', queryset=ReceptionItem.objects.select_related('product')
+                )
+            )
+        return queryset
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -164,44 +190,55 @@ class ReceptionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        from django.contrib.contenttypes.models import ContentType
+
         from inventory.models import StockMove
+        from inventory.services.stock_service import post_stock_moves
 
         now = timezone.now()
-        moves_created = 0
+        reception_ct = ContentType.objects.get_for_model(Reception)
+        moves = []
+        po_items = {}
 
         for item in items:
             if item.quantity_received <= 0:
                 continue
 
-            # Créer le mouvement stock IN
-            from django.contrib.contenttypes.models import ContentType
-
-            reception_ct = ContentType.objects.get_for_model(Reception)
-            StockMove.objects.create(
-                product=item.product,
-                warehouse=reception.warehouse,
-                move_type='IN',
-                quantity=item.quantity_received,
-                unit_cost=item.purchase_order_item.unit_price,
-                reference=f'REC-{reception.number}',
-                content_type=reception_ct,
-                object_id=reception.pk,
-                date=now,
-                notes=f'Reception {reception.number} -- BC {reception.purchase_order.number}',
-                created_by=request.user,
+            # Mouvement stock IN (enregistré en lot ci-dessous)
+            moves.append(
+                StockMove(
+                    product=item.product,
+                    warehouse=reception.warehouse,
+                    move_type='IN',
+                    quantity=item.quantity_received,
+                    unit_cost=item.purchase_order_item.unit_price,
+                    reference=f'REC-{reception.number}',
+                    content_type=reception_ct,
+                    object_id=reception.pk,
+                    date=now,
+                    notes=f'Reception {reception.number} -- BC {reception.purchase_order.number}',
+                    created_by=request.user,
+                )
             )
-            moves_created += 1
 
-            # Mettre à jour la quantité reçue sur la ligne de BC
-            po_item = item.purchase_order_item
+            # Quantité reçue à reporter sur la ligne de BC
+            po_item = po_items.setdefault(
+                item.purchase_order_item_id, item.purchase_order_item
+            )
             po_item.quantity_received += item.quantity_received
-            po_item.save(update_fields=['quantity_received'])
 
-        # Mettre à jour le statut de la réception
-        reception.state = 'validated'
-        reception.validated_by = request.user
-        reception.validated_at = now
-        reception.save(update_fields=['state', 'validated_by', 'validated_at'])
+        with transaction.atomic():
+            post_stock_moves(moves)
+            PurchaseOrderItem.objects.bulk_update(
+                po_items.values(), ['quantity_received']
+            )
+
+            # Mettre à jour le statut de la réception
+            reception.state = 'validated'
+            reception.validated_by = request.user
+            reception.validated_at = now
+            reception.save(update_fields=['state', 'validated_by', 'validated_at'])
+        moves_created = len(moves)
 
         # Vérifier si toutes les lignes du BC sont réceptionnées
         po = reception.purchase_order
@@ -230,7 +267,7 @@ class ReceptionItemViewSet(viewsets.ModelViewSet):
 
 class SupplierInvoiceViewSet(viewsets.ModelViewSet):
     queryset = SupplierInvoice.objects.select_related(
-        'supplier', 'currency', 'purchase_order', 'created_by'
+        'supplier', 'currency', 'purchase_order', 'parent_invoice', 'created_by'
     ).all()
     serializer_class = SupplierInvoiceSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
@@ -243,6 +280,24 @@ class SupplierInvoiceViewSet(viewsets.ModelViewSet):
             return SupplierInvoiceDetailSerializer
         return SupplierInvoiceSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # Deux relations multiples jointes : COUNT DISTINCT pour que
+            # chaque jointure ne multiplie pas le compte de l'autre
+            queryset = queryset.annotate(
+                items_count=Count('items', distinct=True),
+                documents_count=Count('documents', distinct=True),
+            )
+        elif self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'items',
+                    queryset=SupplierInvoiceItem.objects.select_related('product'),
+                )
+            )
+        return queryset
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
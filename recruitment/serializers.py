@@ -99,7 +99,8 @@ class JobOpeningSerializer(serializers.ModelSerializer):
         return obj.job_title.name if obj.job_title else None
 
     def get_applications_count(self, obj):
-        return obj.applications.count()
+        count = getattr(obj, 'applications_count', None)
+        return obj.applications.count() if count is None else count
 
 
 class JobOpeningDetailSerializer(JobOpeningSerializer):
@@ -138,7 +139,8 @@ class CandidateSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
     def get_applications_count(self, obj):
-        return obj.applications.count()
+        count = getattr(obj, 'applications_count', None)
+        return obj.applications.count() if count is None else count
 
 
 class ApplicationSerializer(serializers.ModelSerializer):
@@ -191,7 +193,8 @@ class ApplicationSerializer(serializers.ModelSerializer):
         return obj.job_opening.id if obj.job_opening else None
 
     def get_evaluations_count(self, obj):
-        return obj.evaluations.count()
+        count = getattr(obj, 'evaluations_count', None)
+        return obj.evaluations.count() if count is None else count
 
 
 class ApplicationCreateSerializer(serializers.ModelSerializer):
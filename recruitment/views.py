@@ -1,6 +1,6 @@
 from django.conf import settings
 from django.core.mail import send_mail
-from django.db.models import Avg, Count, F
+from django.db.models import Avg, Count, F, Prefetch
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
@@ -16,6 +16,7 @@ from .models import (
     Application,
     Candidate,
     CandidateEvaluation,
+    CriterionScore,
     EvaluationCriterion,
     Interviewer,
     InterviewPanel,
@@ -36,8 +37,19 @@ from .serializers import (
 )
 
 
+def application_list_queryset(queryset=None):
+    """Candidatures avec les données lues par ApplicationSerializer."""
+    if queryset is None:
+        queryset = Application.objects.all()
+    return queryset.select_related('candidate', 'job_opening').annotate(
+        evaluations_count=Count('evaluations')
+    )
+
+
 class JobOpeningViewSet(viewsets.ModelViewSet):
-    queryset = JobOpening.objects.all()
+    queryset = JobOpening.objects.select_related(
+        'department', 'job_title', 'created_by'
+    ).annotate(applications_count=Count('applications'))
     serializer_class = JobOpeningSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'recruitment'
@@ -132,7 +144,7 @@ class JobOpeningViewSet(viewsets.ModelViewSet):
 
 
 class CandidateViewSet(viewsets.ModelViewSet):
-    queryset = Candidate.objects.all()
+    queryset = Candidate.objects.annotate(applications_count=Count('applications'))
     serializer_class = CandidateSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'recruitment'
@@ -151,7 +163,9 @@ class CandidateViewSet(viewsets.ModelViewSet):
     def applications(self, request, pk=None):
         """Liste des candidatures d'un candidat."""
         candidate = self.get_object()
-        applications = candidate.applications.all().order_by('-application_date')
+        applications = application_list_queryset(candidate.applications.all()).order_by(
+            '-application_date'
+        )
 
         page = self.paginate_queryset(applications)
         if page is not None:
@@ -163,7 +177,7 @@ class CandidateViewSet(viewsets.ModelViewSet):
 
 
 class ApplicationViewSet(viewsets.ModelViewSet):
-    queryset = Application.objects.all()
+    queryset = application_list_queryset()
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'recruitment'
     filter_backends = [
@@ -329,7 +343,13 @@ class ApplicationViewSet(viewsets.ModelViewSet):
 
 
 class InterviewPanelViewSet(viewsets.ModelViewSet):
-    queryset = InterviewPanel.objects.all()
+    queryset = InterviewPanel.objects.select_related(
+        'job_opening', 'created_by'
+    ).prefetch_related(
+        Prefetch(
+            'interviewers', queryset=Interviewer.objects.select_related('employee')
+        )
+    )
     serializer_class = InterviewPanelSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'recruitment'
@@ -398,7 +418,7 @@ class InterviewPanelViewSet(viewsets.ModelViewSet):
 
 
 class InterviewerViewSet(viewsets.ModelViewSet):
-    queryset = Interviewer.objects.all()
+    queryset = Interviewer.objects.select_related('employee').all()
     serializer_class = InterviewerSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'recruitment'
@@ -418,7 +438,14 @@ class EvaluationCriterionViewSet(viewsets.ModelViewSet):
 
 
 class CandidateEvaluationViewSet(viewsets.ModelViewSet):
-    queryset = CandidateEvaluation.objects.all()
+    queryset = CandidateEvaluation.objects.select_related(
+        'interviewer__employee', 'application__candidate', 'application__job_opening'
+    ).prefetch_related(
+        Prefetch(
+            'criterion_scores',
+            queryset=CriterionScore.objects.select_related('criterion'),
+        )
+    )
     serializer_class = CandidateEvaluationSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'recruitment'
@@ -445,9 +472,11 @@ class CandidateEvaluationViewSet(viewsets.ModelViewSet):
         )
 
         # Filtrer les évaluations
-        evaluations = CandidateEvaluation.objects.filter(
-            interviewer_id__in=interviewer_ids
-        ).order_by('-evaluation_date')
+        evaluations = (
+            self.get_queryset()
+            .filter(interviewer_id__in=interviewer_ids)
+            .order_by('-evaluation_date')
+        )
 
         page = self.paginate_queryset(evaluations)
         if page is not None:
@@ -677,7 +677,7 @@ class OrderAdmin(admin.ModelAdmin):
                 # Créer une nouvelle facture finale avec le numéro unique
                 from django.utils import timezone
 
-                invoice = Invoice.objects.create(
+                invoice = Invoice(
                     number=invoice_number,  # Utiliser le numéro unique généré
                     type='standard',
                     company=order.company,
@@ -701,20 +701,18 @@ class OrderAdmin(admin.ModelAdmin):
                     tax_exemption_reason=order.tax_exemption_reason,
                 )
 
-                # Copier les lignes de produits avec des quantités ajustées
-                order_items = order.get_items()
-
-                # Pour chaque ligne, créer une ligne de facture avec quantité ajustée selon la proportion
-                for order_item in order_items:
-                    InvoiceItem.objects.create(
-                        invoice=invoice,
+                # Copier les lignes de produits, prix unitaire ajusté selon la
+                # proportion restante (quantités identiques pour référence)
+                invoice.save_with_items(
+                    InvoiceItem(
                         product=order_item.product,
                         description=order_item.description,
-                        quantity=order_item.quantity,  # Garder la quantité identique pour référence
-                        unit_price=order_item.unit_price
-                        * proportion,  # Ajuster le prix unitaire selon proportion restante
+                        quantity=order_item.quantity,
+                        unit_price=order_item.unit_price * proportion,
                         tax_rate=order_item.tax_rate,
                     )
+                    for order_item in order.get_items().select_related('product')
+                )
 
                 # Marquer l'ordre comme ayant une facture finale
                 order.has_final_invoice = True
@@ -1052,7 +1050,7 @@ class InvoiceAdmin(admin.ModelAdmin):
                 credit_note_number = f'AV-{suffix}'
 
             # Créer l'avoir
-            credit_note = Invoice.objects.create(
+            credit_note = Invoice(
                 number=credit_note_number,
                 type='credit_note',
                 company=invoice.company,
@@ -1079,17 +1077,17 @@ class InvoiceAdmin(admin.ModelAdmin):
             )
 
             # Copier les lignes de produits avec des montants ajustés
-            for item in invoice.get_items():
-                InvoiceItem.objects.create(
-                    invoice=credit_note,
+            # (montants négatifs pour les avoirs)
+            credit_note.save_with_items(
+                InvoiceItem(
                     product=item.product,
                     description=f'Avoir: {item.description}',
                     quantity=item.quantity * proportion,
-                    unit_price=-abs(
-                        item.unit_price
-                    ),  # Montants négatifs pour les avoirs
+                    unit_price=-abs(item.unit_price),
                     tax_rate=item.tax_rate,
                 )
+                for item in invoice.get_items().select_related('product')
+            )
 
             # Si l'avoir est total et que la facture est marquée comme payée,
             # mettre à jour le statut de paiement de la facture
@@ -11,3 +11,4 @@ class SalesConfig(AppConfig):
         Méthode exécutée lors du chargement de l'application.
         Utile pour enregistrer les signaux ou effectuer d'autres initialisations.
         """
+        import sales.defaults_signals  # noqa: F401
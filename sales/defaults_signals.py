@@ -0,0 +1,23 @@
+"""
+Invalidation des valeurs par défaut des documents de vente.
+
+Connecté dans SalesConfig.ready() : toute modification d'une devise ou
+d'un compte bancaire invalide les valeurs mémorisées (SalesDefaults).
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Currency
+
+from .models import BankAccount
+from .services.sales_defaults import SalesDefaults
+
+
+@receiver(post_save, sender=Currency)
+@receiver(post_delete, sender=Currency)
+@receiver(post_save, sender=BankAccount)
+@receiver(post_delete, sender=BankAccount)
+def invalidate_sales_defaults(sender, **kwargs):
+    """Devise ou compte bancaire modifié."""
+    SalesDefaults.invalidate()
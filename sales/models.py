@@ -1,18 +1,25 @@
 import logging
 import os
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
-from django.db import models
-from django.db.models import F, Sum
+from django.db import models, transaction
+from django.db.models import Sum
+from django.dispatch import Signal
 from django.utils.translation import gettext_lazy as _
 
 from core.models import Currency
 from core.services import get_company_context
 
+from .services.document_totals import compute_document_totals
+
 logger = logging.getLogger(__name__)
 
+# Émis par SalesDocument.save_with_items après l'insertion en lot des lignes
+# (bulk_create n'émet pas post_save) : sender=classe de ligne, document, items
+document_items_created = Signal()
+
 
 class SalesDocument(models.Model):
     """
@@ -85,61 +92,28 @@ class SalesDocument(models.Model):
     class Meta:
         abstract = True
 
-    def calculate_amounts(self):
+    def calculate_amounts(self, lines=None):
         """
         Calcule le sous-total, la remise, la TVA et le total du document à partir des lignes.
         La remise est appliquée sur le sous-total, puis la TVA est calculée sur le montant après remise.
+
+        Args:
+            lines: (quantity, unit_price, tax_rate) des lignes ; par défaut,
+                lues en une requête (aucune pour un document non enregistré)
         """
-        # Initialisation des montants à zéro
-        self.subtotal = Decimal('0.00')
-        self.tax_amount = Decimal('0.00')
-        self.total = Decimal('0.00')
-
-        # Si le document est déjà sauvegardé et a des lignes
-        if self.pk:
-            # Récupérer les items associés à ce document
-            items = self.get_items()
-
-            if items.exists():
-                # Calculer le sous-total HT (avant remise)
-                self.subtotal = items.aggregate(
-                    total=Sum(F('quantity') * F('unit_price'))
-                )['total'] or Decimal('0.00')
-
-                # Calculer le montant de la remise
-                discount_amount = Decimal('0.00')
-                if self.discount_percentage > 0:
-                    discount_amount = (
-                        self.subtotal * self.discount_percentage
-                    ) / Decimal('100')
-
-                # Montant après remise
-                subtotal_after_discount = self.subtotal - discount_amount
-
-                # Calculer la TVA sur le montant après remise (sauf si exonéré)
-                if not getattr(self, 'is_tax_exempt', False):
-                    for item in items:
-                        # Calculer la part de cet item dans le total pour appliquer la remise proportionnellement
-                        item_proportion = (
-                            (item.quantity * item.unit_price) / self.subtotal
-                            if self.subtotal > 0
-                            else 0
-                        )
-
-                        # Appliquer la remise proportionnellement à cet item
-                        item_after_discount = (item.quantity * item.unit_price) - (
-                            discount_amount * item_proportion
-                        )
-
-                        # Calculer la TVA sur le montant après remise
-                        item_tax = item_after_discount * (
-                            item.tax_rate / Decimal('100')
-                        )
-                        self.tax_amount += item_tax
-
-                # Calculer le total TTC (montant après remise + TVA)
-                self.total = subtotal_after_discount + self.tax_amount
+        if lines is None:
+            lines = (
+                self.get_items().values_list('quantity', 'unit_price', 'tax_rate')
+                if self.pk
+                else ()
+            )
 
+        totals = compute_document_totals(
+            lines, self.discount_percentage, getattr(self, 'is_tax_exempt', False)
+        )
+        self.subtotal = totals.subtotal
+        self.tax_amount = totals.tax_amount
+        self.total = totals.total
         return self.subtotal, self.tax_amount, self.total
 
     # Propriété pour obtenir le montant de la remise
@@ -162,38 +136,123 @@ class SalesDocument(models.Model):
         """
         raise NotImplementedError('Les sous-classes doivent implémenter get_items()')
 
-    def save(self, *args, **kwargs):
+    def apply_currency_exemption(self):
+        """
+        Exonère de TVA un document dans une devise étrangère (différente de la
+        devise par défaut).
+        """
+        if not self.currency_id:
+            return
+        from .services.sales_defaults import SalesDefaults
+
+        default_currency_id = SalesDefaults.current().default_currency_id
+
+        # Si la devise du document n'est pas la devise par défaut, exonérer de TVA
+        if default_currency_id and self.currency_id != default_currency_id:
+            self.is_tax_exempt = True
+
+            # Définir une raison d'exonération par défaut si elle n'est pas déjà définie
+            if not self.tax_exemption_reason:
+                self.tax_exemption_reason = (
+                    'Exonération de TVA pour facturation en devise étrangère'
+                )
+
+    def apply_default_bank_account(self):
+        """
+        Compte bancaire par défaut de la devise si aucun n'est défini (à
+        défaut, le premier compte de la devise).
+        """
+        if not self.bank_account_id and self.currency_id:
+            from .services.sales_defaults import SalesDefaults
+
+            self.bank_account_id = SalesDefaults.current().bank_account_id(
+                self.currency_id
+            )
+
+    def save(self, *args, recalculate=None, **kwargs):
         """
         Surcharge de la méthode save pour vérifier automatiquement si l'exonération
         de TVA doit être appliquée en fonction de la devise.
+
+        Les totaux sont recalculés à partir des lignes lors d'un
+        enregistrement complet. Avec update_fields, l'appelant enregistre
+        des champs précis (et a calculé les totaux qu'il écrit) : pas de
+        recalcul, sauf recalculate=True.
         """
-        # Vérifier si c'est une devise étrangère (différente de la devise par défaut)
-        # et appliquer automatiquement l'exonération si c'est le cas
-        if hasattr(self, 'currency') and self.currency:
-            from core.models import Currency
+        self.apply_currency_exemption()
 
-            default_currency = Currency.objects.filter(is_default=True).first()
+        if recalculate is None:
+            recalculate = kwargs.get('update_fields') is None
 
-            # Si la devise du document n'est pas la devise par défaut, exonérer de TVA
-            if default_currency and self.currency != default_currency:
-                self.is_tax_exempt = True
+        # Calculer les montants (cette méthode tient maintenant compte de l'exonération)
+        if recalculate:
+            if self.pk:
+                self.calculate_amounts()
+            else:
+                # Pour les nouveaux documents, initialiser les montants à zéro
+                self.subtotal = Decimal('0.00')
+                self.tax_amount = Decimal('0.00')
+                self.total = Decimal('0.00')
+
+        super().save(*args, **kwargs)
 
-                # Définir une raison d'exonération par défaut si elle n'est pas déjà définie
-                if not self.tax_exemption_reason:
-                    self.tax_exemption_reason = (
-                        'Exonération de TVA pour facturation en devise étrangère'
+    def save_with_items(self, items, replace=False):
+        """
+        Enregistre le document et ses lignes avec un seul calcul des totaux.
+
+        Les lignes (instances non enregistrées de la classe de ligne du
+        document) sont rattachées au document et complétées depuis leur
+        produit. Elles sont insérées en une requête (bulk_create) : post_save
+        n'est pas émis pour elles, mais document_items_created l'est une
+        fois pour le lot (mouvements de stock des lignes de facture).
+
+        Args:
+            items: lignes à ajouter
+            replace: supprimer d'abord les lignes existantes
+
+        Returns:
+            list: les lignes enregistrées
+        """
+        items = list(items)
+        with transaction.atomic():
+            is_new = self.pk is None
+            if is_new:
+                self.save()
+            manager = getattr(self, self.items_related_name)
+            if replace and not is_new:
+                manager.all().delete()
+
+            for item in items:
+                setattr(item, manager.field.name, self)
+                item.apply_product_defaults()
+                # Valeurs arrondies comme en base : les totaux sont ceux
+                # qu'un recalcul depuis les lignes enregistrées donnerait
+                for name in ('quantity', 'unit_price', 'tax_rate'):
+                    field = item._meta.get_field(name)
+                    value = field.to_python(getattr(item, name))
+                    setattr(
+                        item,
+                        name,
+                        value.quantize(
+                            Decimal(1).scaleb(-field.decimal_places), ROUND_HALF_UP
+                        ),
                     )
 
-        # Calculer les montants (cette méthode tient maintenant compte de l'exonération)
-        if self.pk:
-            self.calculate_amounts()
-        else:
-            # Pour les nouveaux documents, initialiser les montants à zéro
-            self.subtotal = Decimal('0.00')
-            self.tax_amount = Decimal('0.00')
-            self.total = Decimal('0.00')
+            item_model = manager.model
+            item_model.objects.bulk_create(items)
+            document_items_created.send(sender=item_model, document=self, items=items)
 
-        super().save(*args, **kwargs)
+            if is_new or replace:
+                lines = [
+                    (item.quantity, item.unit_price, item.tax_rate) for item in items
+                ]
+            else:
+                # Lignes existantes comprises
+                lines = manager.values_list('quantity', 'unit_price', 'tax_rate')
+            self.apply_currency_exemption()
+            self.calculate_amounts(lines)
+            self.save(recalculate=False)
+        return items
 
     def get_template_name(self):
         """
@@ -409,6 +468,9 @@ class Quote(SalesDocument):
     def __str__(self):
         return f'{self.number} - {self.company.name}'
 
+    # Relation inverse des lignes (voir SalesDocument.save_with_items)
+    items_related_name = 'quoteitem_set'
+
     def get_items(self):
         """
         Récupère les lignes de devis associées.
@@ -432,20 +494,7 @@ class Quote(SalesDocument):
             self.expiration_date = self.date + timedelta(days=self.validity_period)
 
         # Sélectionner un compte bancaire par défaut si non défini
-        if not self.bank_account and self.currency:
-            # Chercher un compte par défaut avec la même devise
-            default_account = BankAccount.objects.filter(
-                currency=self.currency, is_default=True
-            ).first()
-
-            # Si aucun compte par défaut, prendre le premier avec la même devise
-            if not default_account:
-                default_account = BankAccount.objects.filter(
-                    currency=self.currency
-                ).first()
-
-            if default_account:
-                self.bank_account = default_account
+        self.apply_default_bank_account()
 
         # Appel à la méthode save du parent pour calculer les montants
         super().save(*args, **kwargs)
@@ -583,7 +632,7 @@ class Quote(SalesDocument):
         logger.info(f'Numéro de commande généré: {order_number}')
 
         # Créer la commande - S'assurer que l'opportunité est transmise
-        order = Order.objects.create(
+        order = Order(
             number=order_number,
             date=timezone.now().date(),
             company=self.company,
@@ -605,20 +654,21 @@ class Quote(SalesDocument):
             quote=self,
         )
 
-        logger.info(f'Commande {order_number} créée, copie des lignes de devis')
-
-        # Copier les lignes de devis vers la commande
-        for quote_item in self.quoteitem_set.all():
-            OrderItem.objects.create(
-                order=order,
+        # Copier les lignes de devis vers la commande (totaux calculés une fois)
+        order.save_with_items(
+            OrderItem(
                 product=quote_item.product,
                 description=quote_item.description,
                 quantity=quote_item.quantity,
                 unit_price=quote_item.unit_price,
                 tax_rate=quote_item.tax_rate,
             )
+            for quote_item in self.quoteitem_set.select_related('product')
+        )
 
-        logger.info('Lignes copiées, marquage du devis comme converti')
+        logger.info(
+            f'Commande {order_number} créée avec ses lignes, marquage du devis comme converti'
+        )
 
         # Marquer le devis comme converti
         self.converted_to_order = True
@@ -643,7 +693,7 @@ class Quote(SalesDocument):
             raise ValueError('Ce devis a déjà été converti en facture')
 
         # Créer la facture
-        invoice = Invoice.objects.create(
+        invoice = Invoice(
             date=self.date,
             company=self.company,
             contact=self.contact,
@@ -665,16 +715,17 @@ class Quote(SalesDocument):
         # Générer un numéro de facture
         # (le numéro est généré automatiquement dans la méthode save() de Invoice)
 
-        # Copier les lignes de devis vers la facture
-        for quote_item in self.get_items():
-            InvoiceItem.objects.create(
-                invoice=invoice,
+        # Copier les lignes de devis vers la facture (totaux calculés une fois)
+        invoice.save_with_items(
+            InvoiceItem(
                 product=quote_item.product,
                 description=quote_item.description,
                 quantity=quote_item.quantity,
                 unit_price=quote_item.unit_price,
                 tax_rate=quote_item.tax_rate,
             )
+            for quote_item in self.get_items().select_related('product')
+        )
 
         # Marquer le devis comme converti
         self.converted_to_invoice = True
@@ -727,7 +778,7 @@ class SalesDocumentItem(models.Model):
     def total(self):
         return self.subtotal + self.tax_amount
 
-    def save(self, *args, **kwargs):
+    def apply_product_defaults(self):
         """Initialise prix, description et TVA depuis le produit si non définis."""
         if self.unit_price is None or self.unit_price == 0:
             self.unit_price = self.product.unit_price
@@ -735,6 +786,9 @@ class SalesDocumentItem(models.Model):
             self.description = self.product.description
         if self.tax_rate is None:
             self.tax_rate = self.product.tax_rate
+
+    def save(self, *args, **kwargs):
+        self.apply_product_defaults()
         super().save(*args, **kwargs)
 
 
@@ -841,6 +895,9 @@ class Order(SalesDocument):
     def __str__(self):
         return f'{self.number} - {self.company.name}'
 
+    # Relation inverse des lignes (voir SalesDocument.save_with_items)
+    items_related_name = 'orderitem_set'
+
     def get_items(self):
         """
         Récupère les lignes de commande associées.
@@ -849,17 +906,33 @@ class Order(SalesDocument):
 
     def get_deposit_invoices(self):
         """Retourne les factures d'acompte liées à cette commande."""
+        # Préchargées par les vues de liste (voir deposit_invoices_prefetch)
+        if hasattr(self, 'prefetched_deposit_invoices'):
+            return self.prefetched_deposit_invoices
         return Invoice.objects.filter(order=self, type='deposit')
 
     def get_deposit_total(self):
         """Retourne le montant total des factures d'acompte pour cette commande."""
-        from decimal import Decimal
-
-        from django.db.models import Sum
-
+        if hasattr(self, 'prefetched_deposit_invoices'):
+            return sum(
+                (invoice.total for invoice in self.prefetched_deposit_invoices),
+                Decimal('0.00'),
+            )
         result = self.get_deposit_invoices().aggregate(Sum('total'))
         return result['total__sum'] or Decimal('0.00')
 
+    @staticmethod
+    def deposit_invoices_prefetch(lookup='invoice_set'):
+        """
+        Prefetch des factures d'acompte vers prefetched_deposit_invoices :
+        get_deposit_invoices / get_deposit_total sans requête par commande.
+        """
+        return models.Prefetch(
+            lookup,
+            queryset=Invoice.objects.filter(type='deposit').order_by('date', 'id'),
+            to_attr='prefetched_deposit_invoices',
+        )
+
     def get_remaining_amount(self):
         """Retourne le montant restant à facturer après les acomptes."""
         return self.total - self.get_deposit_total()
@@ -890,20 +963,7 @@ class Order(SalesDocument):
             self.number = generate_document_number('order')
 
         # Sélectionner un compte bancaire par défaut si non défini
-        if not self.bank_account and self.currency:
-            # Chercher un compte par défaut avec la même devise
-            default_account = BankAccount.objects.filter(
-                currency=self.currency, is_default=True
-            ).first()
-
-            # Si aucun compte par défaut, prendre le premier avec la même devise
-            if not default_account:
-                default_account = BankAccount.objects.filter(
-                    currency=self.currency
-                ).first()
-
-            if default_account:
-                self.bank_account = default_account
+        self.apply_default_bank_account()
 
         # Appel à la méthode save du parent
         super().save(*args, **kwargs)
@@ -1201,6 +1261,9 @@ class Invoice(SalesDocument):
     def __str__(self):
         return f'{self.number} - {self.company.name}'
 
+    # Relation inverse des lignes (voir SalesDocument.save_with_items)
+    items_related_name = 'invoiceitem_set'
+
     def get_items(self):
         """
         Récupère les lignes de facture associées.
@@ -1249,20 +1312,7 @@ class Invoice(SalesDocument):
             self._update_payment_status()
 
         # Sélectionner un compte bancaire par défaut si non défini
-        if not self.bank_account and self.currency:
-            # Chercher un compte par défaut avec la même devise
-            default_account = BankAccount.objects.filter(
-                currency=self.currency, is_default=True
-            ).first()
-
-            # Si aucun compte par défaut, prendre le premier avec la même devise
-            if not default_account:
-                default_account = BankAccount.objects.filter(
-                    currency=self.currency
-                ).first()
-
-            if default_account:
-                self.bank_account = default_account
+        self.apply_default_bank_account()
 
         # Gestion des factures d'avoir (montants négatifs)
         if hasattr(self, 'type') and self.type == 'credit_note':
@@ -1457,7 +1507,7 @@ class Invoice(SalesDocument):
         deposit_amount = (order.total * Decimal(deposit_percentage)) / Decimal('100')
 
         # Créer la facture d'acompte
-        deposit_invoice = cls.objects.create(
+        deposit_invoice = cls(
             type='deposit',
             company=order.company,
             contact=order.contact,
@@ -1482,36 +1532,21 @@ class Invoice(SalesDocument):
             tax_exemption_reason=order.tax_exemption_reason,
         )
 
-        # NOUVELLE SECTION: Copier les lignes de produits de la commande avec des quantités ajustées
+        # Copier les lignes de la commande avec un prix unitaire ajusté au
+        # pourcentage d'acompte (quantités identiques pour référence)
         from .models import InvoiceItem
 
-        # Obtenir les lignes de commande
-        order_items = order.get_items()
-
-        # Pour chaque ligne, créer une ligne de facture d'acompte avec quantité ajustée
-        for order_item in order_items:
-            # Calculer la proportion d'acompte pour cette ligne
-            item_subtotal = (
-                order_item.quantity
-                * order_item.unit_price
-                * Decimal(deposit_percentage)
-            ) / Decimal('100')
-            _item_tax = (
-                item_subtotal * (order_item.tax_rate / Decimal('100'))
-                if not order.is_tax_exempt
-                else Decimal('0')
-            )
-
-            # Créer la ligne de facture d'acompte
-            InvoiceItem.objects.create(
-                invoice=deposit_invoice,
+        deposit_invoice.save_with_items(
+            InvoiceItem(
                 product=order_item.product,
                 description=f'Acompte ({deposit_percentage}%) : {order_item.description}',
-                quantity=order_item.quantity,  # Garder la quantité identique pour référence
+                quantity=order_item.quantity,
                 unit_price=(order_item.unit_price * Decimal(deposit_percentage))
-                / Decimal('100'),  # Ajuster le prix unitaire
+                / Decimal('100'),
                 tax_rate=order_item.tax_rate,
             )
+            for order_item in order.get_items().select_related('product')
+        )
 
         # Marquer l'ordre comme ayant une facture d'acompte
         order.has_deposit_invoice = True
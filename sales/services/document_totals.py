@@ -0,0 +1,66 @@
+# sales/services/document_totals.py
+"""
+Calcul des totaux d'un document de vente (devis, commande, facture).
+
+Les montants sont calculés en mémoire, en un seul passage sur les lignes
+(quantité, prix unitaire, taux de TVA), sans requête. La remise globale
+est répartie au prorata des lignes : la TVA de chaque taux porte donc sur
+sa base après remise.
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+
+ZERO = Decimal('0.00')
+HUNDRED = Decimal('100')
+
+DocumentTotals = namedtuple(
+    'DocumentTotals',
+    ['subtotal', 'discount_amount', 'tax_by_rate', 'tax_amount', 'total'],
+)
+
+
+def compute_document_totals(lines, discount_percentage=0, is_tax_exempt=False):
+    """
+    Totaux d'un document à partir de ses lignes.
+
+    Args:
+        lines: iterable de (quantity, unit_price, tax_rate)
+        discount_percentage: remise globale en %
+        is_tax_exempt: document exonéré de TVA
+
+    Returns:
+        DocumentTotals: subtotal (HT avant remise), discount_amount,
+            tax_by_rate {taux: TVA}, tax_amount et total TTC
+    """
+    subtotal = ZERO
+    base_by_rate = {}
+    for quantity, unit_price, tax_rate in lines:
+        amount = quantity * unit_price
+        subtotal += amount
+        base_by_rate[tax_rate] = base_by_rate.get(tax_rate, ZERO) + amount
+
+    discount_percentage = Decimal(discount_percentage or 0)
+    discount_amount = ZERO
+    if discount_percentage > 0:
+        discount_amount = subtotal * discount_percentage / HUNDRED
+
+    tax_by_rate = {}
+    if not is_tax_exempt:
+        # Part de la remise supportée par chaque ligne : proportion de la
+        # ligne dans le sous-total, uniquement si celui-ci est positif
+        # (les avoirs, à prix négatifs, gardent leur base pleine)
+        ratio = Decimal('1')
+        if subtotal > 0:
+            ratio -= discount_percentage / HUNDRED
+        for tax_rate, base in base_by_rate.items():
+            tax_by_rate[tax_rate] = base * ratio * (tax_rate / HUNDRED)
+
+    tax_amount = sum(tax_by_rate.values(), ZERO)
+    return DocumentTotals(
+        subtotal=subtotal,
+        discount_amount=discount_amount,
+        tax_by_rate=tax_by_rate,
+        tax_amount=tax_amount,
+        total=subtotal - discount_amount + tax_amount,
+    )
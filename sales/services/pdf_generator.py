@@ -2,11 +2,12 @@ import os
 from datetime import datetime
 
 from django.conf import settings
-from django.template.loader import render_to_string
 from django.utils import timezone
-from weasyprint import CSS, HTML
 
-from core.services import get_company_context
+from core.services import PDFDocument, PDFRenderer, get_company_context
+
+# Date de génération : exclue de l'empreinte du cache PDF
+VOLATILE_CONTEXT = ('generated_at',)
 
 
 class PDFGenerator:
@@ -28,8 +29,21 @@ class PDFGenerator:
         return f'{doc_type}_{sanitized_number}_{timestamp}.pdf'
 
     @staticmethod
-    def generate_quote_pdf(quote):
-        """Génère un PDF pour un devis"""
+    def _write_document_pdf(document, pdf):
+        """Écrit le PDF du document et enregistre son chemin (pdf_file)."""
+        pdf_dir = PDFGenerator.get_pdf_directory()
+        pdf_filename = PDFGenerator.get_pdf_filename(document)
+        pdf_path = os.path.join(pdf_dir, pdf_filename)
+        with open(pdf_path, 'wb') as fh:
+            fh.write(pdf)
+
+        document.pdf_file = os.path.join('sales', 'pdf', pdf_filename)
+        document.save(update_fields=['pdf_file'])
+        return pdf_path
+
+    @staticmethod
+    def quote_document(quote):
+        """Document PDF (gabarit et contexte) d'un devis"""
 
         items = quote.quoteitem_set.all()
 
@@ -42,32 +56,17 @@ class PDFGenerator:
             'company_info': get_company_context(),
         }
 
-        html_string = render_to_string('sales/quote_pdf.html', context)
+        return PDFDocument('sales/quote_pdf.html', context, 'sales', VOLATILE_CONTEXT)
 
-        pdf_dir = PDFGenerator.get_pdf_directory()
-        pdf_filename = PDFGenerator.get_pdf_filename(quote)
-        pdf_path = os.path.join(pdf_dir, pdf_filename)
-
-        HTML(string=html_string).write_pdf(
-            pdf_path,
-            stylesheets=[
-                CSS(string='@page { size: A4; margin: 1cm }'),
-                CSS(
-                    filename=os.path.join(
-                        settings.STATIC_ROOT, 'sales/css/pdf_styles.css'
-                    )
-                ),
-            ],
-        )
-
-        quote.pdf_file = os.path.join('sales', 'pdf', pdf_filename)
-        quote.save(update_fields=['pdf_file'])
-
-        return pdf_path
+    @staticmethod
+    def generate_quote_pdf(quote):
+        """Génère un PDF pour un devis"""
+        pdf = PDFRenderer.render(*PDFGenerator.quote_document(quote))
+        return PDFGenerator._write_document_pdf(quote, pdf)
 
     @staticmethod
-    def generate_order_pdf(order):
-        """Génère un PDF pour une commande"""
+    def order_document(order):
+        """Document PDF (gabarit et contexte) d'une commande"""
 
         items = order.orderitem_set.all()
 
@@ -80,28 +79,13 @@ class PDFGenerator:
             'company_info': get_company_context(),
         }
 
-        html_string = render_to_string('sales/order_pdf.html', context)
+        return PDFDocument('sales/order_pdf.html', context, 'sales', VOLATILE_CONTEXT)
 
-        pdf_dir = PDFGenerator.get_pdf_directory()
-        pdf_filename = PDFGenerator.get_pdf_filename(order)
-        pdf_path = os.path.join(pdf_dir, pdf_filename)
-
-        HTML(string=html_string).write_pdf(
-            pdf_path,
-            stylesheets=[
-                CSS(string='@page { size: A4; margin: 1cm }'),
-                CSS(
-                    filename=os.path.join(
-                        settings.STATIC_ROOT, 'sales/css/pdf_styles.css'
-                    )
-                ),
-            ],
-        )
-
-        order.pdf_file = os.path.join('sales', 'pdf', pdf_filename)
-        order.save(update_fields=['pdf_file'])
-
-        return pdf_path
+    @staticmethod
+    def generate_order_pdf(order):
+        """Génère un PDF pour une commande"""
+        pdf = PDFRenderer.render(*PDFGenerator.order_document(order))
+        return PDFGenerator._write_document_pdf(order, pdf)
 
     @staticmethod
     def _get_einvoice_context(invoice):
@@ -141,8 +125,8 @@ class PDFGenerator:
             return {}
 
     @staticmethod
-    def generate_invoice_pdf(invoice):
-        """Génère un PDF pour une facture"""
+    def invoice_document(invoice):
+        """Document PDF (gabarit et contexte) d'une facture"""
 
         items = invoice.invoiceitem_set.all()
         payments = invoice.payment_set.all() if hasattr(invoice, 'payment_set') else []
@@ -183,25 +167,10 @@ class PDFGenerator:
         # Contexte e-invoicing (QR code + filigrane simulation)
         context.update(PDFGenerator._get_einvoice_context(invoice))
 
-        html_string = render_to_string('sales/invoice_pdf.html', context)
-
-        pdf_dir = PDFGenerator.get_pdf_directory()
-        pdf_filename = PDFGenerator.get_pdf_filename(invoice)
-        pdf_path = os.path.join(pdf_dir, pdf_filename)
-
-        HTML(string=html_string).write_pdf(
-            pdf_path,
-            stylesheets=[
-                CSS(string='@page { size: A4; margin: 1cm }'),
-                CSS(
-                    filename=os.path.join(
-                        settings.STATIC_ROOT, 'sales/css/pdf_styles.css'
-                    )
-                ),
-            ],
-        )
-
-        invoice.pdf_file = os.path.join('sales', 'pdf', pdf_filename)
-        invoice.save(update_fields=['pdf_file'])
+        return PDFDocument('sales/invoice_pdf.html', context, 'sales', VOLATILE_CONTEXT)
 
-        return pdf_path
+    @staticmethod
+    def generate_invoice_pdf(invoice):
+        """Génère un PDF pour une facture"""
+        pdf = PDFRenderer.render(*PDFGenerator.invoice_document(invoice))
+        return PDFGenerator._write_document_pdf(invoice, pdf)
@@ -0,0 +1,83 @@
+# sales/services/sales_defaults.py
+"""
+Valeurs par défaut des documents de vente : devise par défaut et compte
+bancaire par défaut de chaque devise.
+
+Elles sont lues à chaque enregistrement d'un devis, d'une commande ou
+d'une facture. Chaque processus (gunicorn, Celery) les garde en mémoire
+tant que le numéro de version stocké dans le cache partagé (Redis) ne
+change pas ; il est incrémenté à chaque enregistrement ou suppression
+d'une devise ou d'un compte bancaire (voir sales/defaults_signals.py).
+"""
+
+from django.db import transaction
+
+from core.models import Currency
+from core.services.cache_version import bump_cache_version, get_cache_version
+
+VERSION_KEY = 'sales_defaults_version'
+
+
+class SalesDefaults:
+    """Identifiants de la devise et des comptes bancaires par défaut."""
+
+    # (version, valeurs) du processus courant
+    _local = None
+
+    def __init__(self, default_currency_id, bank_accounts):
+        """
+        Args:
+            default_currency_id: devise par défaut (None si aucune)
+            bank_accounts: {currency_id: bank_account_id}
+        """
+        self.default_currency_id = default_currency_id
+        self._bank_accounts = bank_accounts
+
+    @classmethod
+    def current(cls):
+        """
+        Valeurs à jour de la version partagée.
+
+        Dans une transaction, des valeurs rechargées peuvent refléter des
+        écritures non validées : elles servent à l'appel mais ne sont pas
+        mémorisées.
+        """
+        version = get_cache_version(VERSION_KEY)
+        local = cls._local
+        if local is not None and local[0] == version:
+            return local[1]
+
+        defaults = cls._load()
+        if not transaction.get_connection().in_atomic_block:
+            cls._local = (version, defaults)
+        return defaults
+
+    @classmethod
+    def _load(cls):
+        from ..models import BankAccount
+
+        default_currency_id = (
+            Currency.objects.filter(is_default=True)
+            .values_list('pk', flat=True)
+            .first()
+        )
+
+        # Par devise : le compte par défaut, sinon le premier compte
+        first_accounts = {}
+        default_accounts = {}
+        for account_id, currency_id, is_default in BankAccount.objects.order_by(
+            'pk'
+        ).values_list('pk', 'currency_id', 'is_default'):
+            first_accounts.setdefault(currency_id, account_id)
+            if is_default:
+                default_accounts.setdefault(currency_id, account_id)
+        return cls(default_currency_id, {**first_accounts, **default_accounts})
+
+    @staticmethod
+    def invalidate():
+        """Incrémente la version partagée (voir bump_cache_version)."""
+        bump_cache_version(VERSION_KEY)
+
+    def bank_account_id(self, currency_id):
+        """Compte bancaire par défaut de la devise, None si aucun compte."""
+        return self._bank_accounts.get(currency_id)
@@ -0,0 +1,111 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from sales.services.document_totals import compute_document_totals
+
+CENT = Decimal('0.01')
+
+
+def legacy_totals(lines, discount_percentage=0, is_tax_exempt=False):
+    """
+    Ancien calcul de SalesDocument.calculate_amounts (ligne par ligne).
+
+    Returns:
+        tuple: (subtotal, tax_amount, total)
+    """
+    discount_percentage = Decimal(discount_percentage)
+    subtotal = sum(
+        (quantity * price for quantity, price, _rate in lines), Decimal('0.00')
+    )
+    discount_amount = Decimal('0.00')
+    if discount_percentage > 0:
+        discount_amount = (subtotal * discount_percentage) / Decimal('100')
+    subtotal_after_discount = subtotal - discount_amount
+
+    tax_amount = Decimal('0.00')
+    if not is_tax_exempt:
+        for quantity, price, rate in lines:
+            proportion = (quantity * price) / subtotal if subtotal > 0 else 0
+            after_discount = (quantity * price) - (discount_amount * proportion)
+            tax_amount += after_discount * (rate / Decimal('100'))
+    return subtotal, tax_amount, subtotal_after_discount + tax_amount
+
+
+def assert_same_totals(lines, discount_percentage=0, is_tax_exempt=False):
+    totals = compute_document_totals(lines, discount_percentage, is_tax_exempt)
+    expected = legacy_totals(lines, discount_percentage, is_tax_exempt)
+    # Les montants sont enregistrés au centime (DecimalField, 2 décimales)
+    assert [
+        amount.quantize(CENT)
+        for amount in (totals.subtotal, totals.tax_amount, totals.total)
+    ] == [amount.quantize(CENT) for amount in expected]
+
+
+@pytest.mark.parametrize(
+    'lines, discount_percentage, is_tax_exempt',
+    [
+        ([], 0, False),
+        ([(Decimal('3'), Decimal('19.99'), Decimal('20'))], 0, False),
+        # Remise répartie sur plusieurs taux
+        (
+            [
+                (Decimal('2'), Decimal('150.00'), Decimal('20')),
+                (Decimal('1.5'), Decimal('33.33'), Decimal('5.5')),
+                (Decimal('7'), Decimal('12.10'), Decimal('0')),
+            ],
+            Decimal('12.5'),
+            False,
+        ),
+        # Exonération : ni TVA ni répartition
+        (
+            [
+                (Decimal('4'), Decimal('250.00'), Decimal('20')),
+                (Decimal('1'), Decimal('99.99'), Decimal('10')),
+            ],
+            Decimal('10'),
+            True,
+        ),
+        # Avoir : lignes négatives, la TVA porte sur la base pleine
+        (
+            [
+                (Decimal('1'), Decimal('-500.00'), Decimal('20')),
+                (Decimal('2'), Decimal('-45.50'), Decimal('10')),
+            ],
+            Decimal('5'),
+            False,
+        ),
+        # Avoir partiel : lignes positives et négatives, sous-total négatif
+        (
+            [
+                (Decimal('1'), Decimal('100.00'), Decimal('20')),
+                (Decimal('1'), Decimal('-300.00'), Decimal('20')),
+            ],
+            Decimal('15'),
+            False,
+        ),
+    ],
+)
+def test_totals_match_legacy_algorithm(lines, discount_percentage, is_tax_exempt):
+    assert_same_totals(lines, discount_percentage, is_tax_exempt)
+
+
+def test_totals_match_legacy_algorithm_on_random_documents():
+    rng = random.Random(42)
+    rates = [Decimal('0'), Decimal('5.5'), Decimal('10'), Decimal('18'), Decimal('20')]
+    for _ in range(500):
+        sign = rng.choice([1, 1, -1])
+        lines = [
+            (
+                Decimal(rng.randint(1, 5000)) / 100,
+                sign * Decimal(rng.randint(1, 10**7)) / 100,
+                rng.choice(rates),
+            )
+            for _ in range(rng.randint(1, 12))
+        ]
+        assert_same_totals(
+            lines,
+            discount_percentage=rng.choice([0, 0, Decimal(rng.randint(1, 5000)) / 100]),
+            is_tax_exempt=rng.random() < 0.2,
+        )
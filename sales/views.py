@@ -131,7 +131,7 @@ class QuoteFilter(django_filters.FilterSet):
 class BankAccountViewSet(viewsets.ModelViewSet):
     """API pour les comptes bancaires."""
 
-    queryset = BankAccount.objects.all()
+    queryset = BankAccount.objects.select_related('currency').all()
     serializer_class = BankAccountSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'sales'
@@ -146,9 +146,9 @@ class BankAccountViewSet(viewsets.ModelViewSet):
         currency_id = request.query_params.get('currency_id')
 
         if currency_id:
-            accounts = BankAccount.objects.filter(currency_id=currency_id)
+            accounts = self.get_queryset().filter(currency_id=currency_id)
         else:
-            accounts = BankAccount.objects.all()
+            accounts = self.get_queryset()
 
         serializer = self.get_serializer(accounts, many=True)
         return Response(serializer.data)
@@ -188,7 +188,7 @@ from catalog.views import ProductViewSet  # noqa: E402, F401 — rétrocompatibi
 class QuoteViewSet(viewsets.ModelViewSet):
     """API pour les devis."""
 
-    queryset = Quote.objects.all()
+    queryset = Quote.objects.select_related('company', 'contact', 'currency').all()
     serializer_class = QuoteSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'sales'
@@ -435,23 +435,14 @@ class QuoteViewSet(viewsets.ModelViewSet):
 class QuoteItemViewSet(viewsets.ModelViewSet):
     """API pour les lignes de devis."""
 
-    queryset = QuoteItem.objects.all()
+    queryset = QuoteItem.objects.select_related('product', 'currency').all()
     serializer_class = QuoteItemSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'sales'
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['quote']
 
-    def perform_create(self, serializer):
-        instance = serializer.save()
-        instance.quote.calculate_amounts()
-        instance.quote.save(update_fields=['subtotal', 'tax_amount', 'total'])
-
-    def perform_update(self, serializer):
-        instance = serializer.save()
-        instance.quote.calculate_amounts()
-        instance.quote.save(update_fields=['subtotal', 'tax_amount', 'total'])
-
+    # Pas de perform_create / perform_update : QuoteItem.save() recalcule le devis
     def perform_destroy(self, instance):
         quote = instance.quote
         instance.delete()
@@ -462,7 +453,9 @@ class QuoteItemViewSet(viewsets.ModelViewSet):
 class OrderViewSet(viewsets.ModelViewSet):
     """API pour les bons de commande."""
 
-    queryset = Order.objects.all()
+    queryset = Order.objects.select_related(
+        'company', 'contact', 'currency', 'quote'
+    ).all()
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'sales'
@@ -481,6 +474,14 @@ class OrderViewSet(viewsets.ModelViewSet):
     ordering_fields = ['number', 'date', 'delivery_date', 'total']
     ordering = ['-date', 'number']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            # Acomptes préchargés en lecture seule : les actions qui en créent
+            # relisent la base
+            queryset = queryset.prefetch_related(Order.deposit_invoices_prefetch())
+        return queryset
+
     def get_serializer_class(self):
         if self.action in ['retrieve', 'create', 'update', 'partial_update']:
             return OrderDetailSerializer
@@ -650,7 +651,7 @@ class OrderViewSet(viewsets.ModelViewSet):
             proportion = remaining_amount / order.total if order.total > 0 else 0
 
             # Créer une nouvelle facture finale (standard)
-            invoice = Invoice.objects.create(
+            invoice = Invoice(
                 type='standard',
                 company=order.company,
                 contact=order.contact,
@@ -674,20 +675,18 @@ class OrderViewSet(viewsets.ModelViewSet):
                 quote=order.quote,
             )
 
-            # Copier les lignes de produits avec des quantités ajustées
-            order_items = order.get_items()
-
-            # Pour chaque ligne, créer une ligne de facture avec quantité ajustée selon la proportion
-            for order_item in order_items:
-                InvoiceItem.objects.create(
-                    invoice=invoice,
+            # Copier les lignes de produits, prix unitaire ajusté selon la
+            # proportion restante (quantités identiques pour référence)
+            invoice.save_with_items(
+                InvoiceItem(
                     product=order_item.product,
                     description=order_item.description,
-                    quantity=order_item.quantity,  # Garder la quantité identique pour référence
-                    unit_price=order_item.unit_price
-                    * proportion,  # Ajuster le prix unitaire selon proportion restante
+                    quantity=order_item.quantity,
+                    unit_price=order_item.unit_price * proportion,
                     tax_rate=order_item.tax_rate,
                 )
+                for order_item in order.get_items().select_related('product')
+            )
 
             # Marquer l'ordre comme ayant une facture finale
             order.has_final_invoice = True
@@ -753,23 +752,14 @@ class OrderViewSet(viewsets.ModelViewSet):
 class OrderItemViewSet(viewsets.ModelViewSet):
     """API pour les lignes de bon de commande."""
 
-    queryset = OrderItem.objects.all()
+    queryset = OrderItem.objects.select_related('product', 'currency').all()
     serializer_class = OrderItemSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'sales'
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['order']
 
-    def perform_create(self, serializer):
-        instance = serializer.save()
-        instance.order.calculate_amounts()
-        instance.order.save(update_fields=['subtotal', 'tax_amount', 'total'])
-
-    def perform_update(self, serializer):
-        instance = serializer.save()
-        instance.order.calculate_amounts()
-        instance.order.save(update_fields=['subtotal', 'tax_amount', 'total'])
-
+    # Pas de perform_create / perform_update : OrderItem.save() recalcule la commande
     def perform_destroy(self, instance):
         order = instance.order
         instance.delete()
@@ -780,7 +770,9 @@ class OrderItemViewSet(viewsets.ModelViewSet):
 class InvoiceViewSet(viewsets.ModelViewSet):
     """API pour les factures."""
 
-    queryset = Invoice.objects.all()
+    queryset = Invoice.objects.select_related(
+        'company', 'contact', 'currency', 'quote', 'order', 'parent_invoice'
+    ).all()
     serializer_class = InvoiceSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'sales'
@@ -799,6 +791,14 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     ordering_fields = ['number', 'date', 'due_date', 'total', 'amount_paid']
     ordering = ['-date', 'number']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.prefetch_related(
+                Order.deposit_invoices_prefetch('order__invoice_set')
+            )
+        return queryset
+
     def get_serializer_class(self):
         if self.action in ['retrieve', 'create', 'update', 'partial_update']:
             return InvoiceDetailSerializer
@@ -1016,7 +1016,7 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             proportion = Decimal('1.0')
 
         # Créer l'avoir
-        credit_note = Invoice.objects.create(
+        credit_note = Invoice(
             type='credit_note',
             company=invoice.company,
             contact=invoice.contact,
@@ -1042,15 +1042,17 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         )
 
         # Copier les lignes de produits avec des montants ajustés
+        credit_items = []
         return_items = []
-        for item in invoice.get_items():
-            InvoiceItem.objects.create(
-                invoice=credit_note,
-                product=item.product,
-                description=f'Avoir: {item.description}',
-                quantity=item.quantity * proportion,
-                unit_price=-abs(item.unit_price),
-                tax_rate=item.tax_rate,
+        for item in invoice.get_items().select_related('product'):
+            credit_items.append(
+                InvoiceItem(
+                    product=item.product,
+                    description=f'Avoir: {item.description}',
+                    quantity=item.quantity * proportion,
+                    unit_price=-abs(item.unit_price),
+                    tax_rate=item.tax_rate,
+                )
             )
             # Collecter pour retour stock
             if return_to_stock and item.product:
@@ -1062,6 +1064,7 @@ class InvoiceViewSet(viewsets.ModelViewSet):
                         'invoice_item_id': item.pk,
                     }
                 )
+        credit_note.save_with_items(credit_items)
 
         # Retour en stock si demandé
         if return_to_stock and return_items:
@@ -1084,7 +1087,9 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     def _create_credit_note_by_items(self, invoice, items_data, reason, user):
         """Crée un avoir en sélectionnant des lignes spécifiques."""
         # Valider les lignes
-        invoice_items = {item.pk: item for item in invoice.get_items()}
+        invoice_items = {
+            item.pk: item for item in invoice.get_items().select_related('product')
+        }
         validated_items = []
 
         for item_req in items_data:
@@ -1128,7 +1133,7 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         credit_total = credit_subtotal + credit_tax
 
         # Créer l'avoir
-        credit_note = Invoice.objects.create(
+        credit_note = Invoice(
             type='credit_note',
             company=invoice.company,
             contact=invoice.contact,
@@ -1154,16 +1159,18 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         )
 
         # Créer les lignes d'avoir et collecter les retours stock
+        credit_items = []
         return_items = []
         for vi in validated_items:
             item = vi['original_item']
-            InvoiceItem.objects.create(
-                invoice=credit_note,
-                product=item.product,
-                description=f'Avoir: {item.description}',
-                quantity=vi['quantity'],
-                unit_price=-abs(item.unit_price),
-                tax_rate=item.tax_rate,
+            credit_items.append(
+                InvoiceItem(
+                    product=item.product,
+                    description=f'Avoir: {item.description}',
+                    quantity=vi['quantity'],
+                    unit_price=-abs(item.unit_price),
+                    tax_rate=item.tax_rate,
+                )
             )
             if vi['return_to_stock'] and item.product:
                 return_items.append(
@@ -1174,6 +1181,7 @@ class InvoiceViewSet(viewsets.ModelViewSet):
                         'invoice_item_id': item.pk,
                     }
                 )
+        credit_note.save_with_items(credit_items)
 
         # Retour en stock
         if return_items:
@@ -1367,27 +1375,14 @@ class InvoiceViewSet(viewsets.ModelViewSet):
 class InvoiceItemViewSet(viewsets.ModelViewSet):
     """API pour les lignes de facture."""
 
-    queryset = InvoiceItem.objects.all()
+    queryset = InvoiceItem.objects.select_related('product', 'currency').all()
     serializer_class = InvoiceItemSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     module_name = 'sales'
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['invoice']
 
-    def perform_create(self, serializer):
-        instance = serializer.save()
-        instance.invoice.calculate_amounts()
-        instance.invoice.save(
-            update_fields=['subtotal', 'tax_amount', 'total', 'amount_due']
-        )
-
-    def perform_update(self, serializer):
-        instance = serializer.save()
-        instance.invoice.calculate_amounts()
-        instance.invoice.save(
-            update_fields=['subtotal', 'tax_amount', 'total', 'amount_due']
-        )
-
+    # Pas de perform_create / perform_update : InvoiceItem.save() recalcule la facture
     def perform_destroy(self, instance):
         invoice = instance.invoice
         instance.delete()
@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from users.middleware import ActivityLogMiddleware
+from users.models import ActivityLog
+from users.services.activity_log_buffer import ActivityLogBuffer
+
+BENCHMARK_MODULE = '__benchmark__'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit de journalisation des requêtes d'écriture, avec "
+        'écriture immédiate (sync) puis avec la file différée (buffered). '
+        'Les entrées créées sont supprimées en fin de mesure.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=5000,
+            help="Nombre de requêtes d'écriture simulées par mode",
+        )
+
+    def handle(self, *args, **options):
+        nb_requests = options['requests']
+        user, created = User.objects.get_or_create(
+            username='__benchmark_activity_log__'
+        )
+        middleware = ActivityLogMiddleware(lambda request: HttpResponse(status=201))
+        factory = RequestFactory()
+
+        self.stdout.write(
+            f'{"Mode":>9} {"Requêtes/s":>11} {"Latence (µs)":>13} '
+            f'{"Total écrit (s)":>16} {"Entrées":>8}'
+        )
+        try:
+            for mode in ('sync', 'buffered'):
+                with override_settings(ACTIVITY_LOG_MODE=mode):
+                    start = time.perf_counter()
+                    for i in range(nb_requests):
+                        request = factory.post(
+                            f'/api/{BENCHMARK_MODULE}/items/{i}/',
+                            content_type='application/json',
+                        )
+                        request.user = user
+                        middleware.process_view(request, None, (), {'pk': i})
+                        middleware.process_response(request, HttpResponse(status=201))
+                    requests_elapsed = time.perf_counter() - start
+                    # Vidage de ce qui reste en file : toutes les entrées en base
+                    ActivityLogBuffer.flush()
+                    total_elapsed = time.perf_counter() - start
+
+                written = ActivityLog.objects.filter(module=BENCHMARK_MODULE).count()
+                self.stdout.write(
+                    f'{mode:>9} {nb_requests / requests_elapsed:>11.0f} '
+                    f'{requests_elapsed / nb_requests * 1e6:>13.0f} '
+                    f'{total_elapsed:>16.2f} {written:>8}'
+                )
+                ActivityLog.objects.filter(module=BENCHMARK_MODULE).delete()
+        finally:
+            ActivityLog.objects.filter(module=BENCHMARK_MODULE).delete()
+            if created:
+                user.delete()
+
+        self.stdout.write(f'File : {ActivityLogBuffer.stats()}')
@@ -1,9 +1,8 @@
-import json
 import re
 
 from django.utils.deprecation import MiddlewareMixin
 
-from .models import ActivityLog
+from .services.activity_log_buffer import ActivityLogBuffer
 
 
 class ActivityLogMiddleware(MiddlewareMixin):
@@ -44,6 +43,7 @@ class ActivityLogMiddleware(MiddlewareMixin):
         request._activity_tracking = {
             'module': url_match.group(1) if url_match.groups() else 'unknown',
             'ip_address': self._get_client_ip(request),
+            'entity_id': view_kwargs.get('pk'),
         }
 
         return None
@@ -56,20 +56,12 @@ class ActivityLogMiddleware(MiddlewareMixin):
 
         # Ne journaliser que les réponses réussies (2xx)
         if 200 <= response.status_code < 300:
-            # Essayer d'extraire les informations sur l'entité
-            entity_type = None
-            entity_id = None
-
-            # Essayer d'extraire des données du corps de la requête
-            try:
-                if request.content_type == 'application/json':
-                    data = json.loads(request.body.decode('utf-8'))
-                    entity_id = data.get('id')
-                else:
-                    data = request.POST
-                    entity_id = data.get('id')
-            except Exception:
-                data = {}
+            # Identifiant de l'entité : URL de détail, sinon réponse de création
+            # (le corps de la requête n'est pas relu)
+            entity_id = request._activity_tracking['entity_id']
+            if entity_id is None and isinstance(getattr(response, 'data', None), dict):
+                entity_id = response.data.get('id')
+            entity_id = self._as_entity_id(entity_id)
 
             # Construire l'action en fonction de la méthode HTTP
             action_map = {
@@ -81,16 +73,17 @@ class ActivityLogMiddleware(MiddlewareMixin):
             action = action_map.get(request.method, 'other')
 
             # Trouver le type d'entité à partir de l'URL
+            entity_type = ''
             path_parts = request.path.strip('/').split('/')
             if len(path_parts) > 1:
-                entity_type = path_parts[-1]
+                entity_type = path_parts[-1][:100]
 
-            # Créer l'entrée de journal
+            # Créer l'entrée de journal (voir ActivityLogBuffer et ACTIVITY_LOG_MODE)
             if request.user.is_authenticated:
-                ActivityLog.objects.create(
-                    user=request.user,
+                ActivityLogBuffer.log(
+                    user_id=request.user.pk,
                     action=action,
-                    module=request._activity_tracking['module'],
+                    module=request._activity_tracking['module'][:20],
                     entity_type=entity_type,
                     entity_id=entity_id,
                     details=f'{request.method} {request.path}',
@@ -99,6 +92,15 @@ class ActivityLogMiddleware(MiddlewareMixin):
 
         return response
 
+    @staticmethod
+    def _as_entity_id(value):
+        """Identifiant numérique de l'entité, None sinon."""
+        try:
+            entity_id = int(value)
+        except (TypeError, ValueError):
+            return None
+        return entity_id if entity_id >= 0 else None
+
     def _get_client_ip(self, request):
         """Récupère l'adresse IP du client."""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
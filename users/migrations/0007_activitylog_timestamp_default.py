@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 09:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0006_add_employee_module_permissions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='timestamp',
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name='Horodatage',
+            ),
+        ),
+    ]
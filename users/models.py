@@ -1,6 +1,7 @@
 from django.contrib.auth.models import Group, Permission, User
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -184,7 +185,10 @@ class ActivityLog(models.Model):
     entity_id = models.PositiveIntegerField(_("ID de l'entité"), null=True, blank=True)
     details = models.TextField(_('Détails'), blank=True)
     ip_address = models.GenericIPAddressField(_('Adresse IP'), null=True, blank=True)
-    timestamp = models.DateTimeField(_('Horodatage'), auto_now_add=True)
+    # Heure de l'action, y compris pour les entrées écrites en différé
+    timestamp = models.DateTimeField(
+        _('Horodatage'), default=timezone.now, editable=False
+    )
 
     class Meta:
         verbose_name = _("Journal d'activité")
@@ -0,0 +1,30 @@
+"""
+Invalidation de la matrice des permissions par module.
+
+Connecté dans UsersConfig.ready() : toute modification d'un rôle, d'une
+permission de module ou des groupes d'un utilisateur invalide les
+matrices en cache (ModulePermissionMatrix).
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ModulePermission, UserRole
+from .permissions import ModulePermissionMatrix
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+@receiver(post_save, sender=ModulePermission)
+@receiver(post_delete, sender=ModulePermission)
+def invalidate_module_permission_matrix(sender, **kwargs):
+    """Rôle ou permission de module modifié."""
+    ModulePermissionMatrix.invalidate()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_on_group_membership_change(sender, action, **kwargs):
+    """Ajout ou retrait de groupes (user.groups ou group.user_set)."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        ModulePermissionMatrix.invalidate()
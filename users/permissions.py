@@ -1,10 +1,119 @@
+import logging
+import time
 from functools import wraps
 
+from django.core.cache import cache
+from django.db import transaction
 from rest_framework import permissions
 from rest_framework.response import Response
 
+from core.services.cache_version import bump_cache_version, get_cache_version
+
 from .models import ModulePermission
 
+logger = logging.getLogger(__name__)
+
+ACCESS_HIERARCHY = {
+    'no_access': 0,
+    'read': 1,
+    'create': 2,
+    'update': 3,
+    'delete': 4,
+    'admin': 5,
+}
+
+
+class ModulePermissionMatrix:
+    """
+    Permissions effectives par utilisateur : module -> niveau d'accès max
+    sur l'ensemble de ses groupes/rôles.
+
+    Calculée en une requête, mémorisée dans le processus et dans le cache
+    partagé (Redis) sous un numéro de version. Toute modification de
+    UserRole, de ModulePermission ou des groupes d'un utilisateur incrémente
+    la version (voir users.permission_signals).
+
+    Les deux niveaux de cache expirent aussi au bout de LOCAL_TTL et
+    CACHE_TTL : une modification qui n'aurait pas incrémenté la version
+    (update() en masse, SQL direct) n'est pas conservée plus longtemps.
+
+    Si le cache partagé est indisponible, la matrice est lue en base à
+    chaque appel, sans être mémorisée.
+    """
+
+    VERSION_KEY = 'module_permission_matrix_version'
+    CACHE_KEY = 'module_permission_matrix_{version}_{user_id}'
+    CACHE_TTL = 300  # 5 minutes
+    LOCAL_TTL = 60  # 1 minute
+
+    # Matrices du processus courant, valables pour _local_version jusqu'à
+    # _local_expires (time.monotonic())
+    _local_version = None
+    _local_expires = 0
+    _local = {}
+
+    @classmethod
+    def for_user(cls, user_obj):
+        """
+        Retourne {module: niveau} pour l'utilisateur.
+
+        Dans une transaction, la matrice peut refléter des écritures non
+        validées : elle est alors recalculée sans être mémorisée.
+        """
+        if not user_obj.is_authenticated:
+            return {}
+        if transaction.get_connection().in_atomic_block:
+            return cls._build(user_obj.pk)
+
+        try:
+            return cls._cached(user_obj.pk)
+        except Exception as e:
+            logger.warning(f'Cache des permissions indisponible : {e}')
+            return cls._build(user_obj.pk)
+
+    @classmethod
+    def _cached(cls, user_id):
+        version = get_cache_version(cls.VERSION_KEY)
+        now = time.monotonic()
+        if cls._local_version != version or now >= cls._local_expires:
+            cls._local = {}
+            cls._local_version = version
+            cls._local_expires = now + cls.LOCAL_TTL
+
+        matrix = cls._local.get(user_id)
+        if matrix is None:
+            cache_key = cls.CACHE_KEY.format(version=version, user_id=user_id)
+            matrix = cache.get(cache_key)
+            if matrix is None:
+                matrix = cls._build(user_id)
+                cache.set(cache_key, matrix, cls.CACHE_TTL)
+            cls._local[user_id] = matrix
+        return matrix
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Invalide les matrices de tous les utilisateurs, dans tous les processus.
+
+        Cache indisponible : la matrice mémorisée par ce processus est
+        vidée, celles des autres expirent au plus tard après LOCAL_TTL.
+        """
+        cls._local = {}
+        try:
+            bump_cache_version(cls.VERSION_KEY)
+        except Exception as e:
+            logger.warning(f'Cache des permissions indisponible : {e}')
+
+    @staticmethod
+    def _build(user_id):
+        matrix = {}
+        for module, access_level in ModulePermission.objects.filter(
+            role__group__user__id=user_id
+        ).values_list('module', 'access_level'):
+            level = ACCESS_HIERARCHY.get(access_level, 0)
+            matrix[module] = max(matrix.get(module, 0), level)
+        return matrix
+
 
 class ModulePermissionBackend:
     """
@@ -12,14 +121,7 @@ class ModulePermissionBackend:
     Hiérarchie : no_access(0) < read(1) < create(2) < update(3) < delete(4) < admin(5)
     """
 
-    ACCESS_HIERARCHY = {
-        'no_access': 0,
-        'read': 1,
-        'create': 2,
-        'update': 3,
-        'delete': 4,
-        'admin': 5,
-    }
+    ACCESS_HIERARCHY = ACCESS_HIERARCHY
 
     def has_module_permission(self, user_obj, module, level):
         """
@@ -30,20 +132,7 @@ class ModulePermissionBackend:
             return True
 
         required_level = self.ACCESS_HIERARCHY.get(level, 0)
-        user_max_level = 0
-
-        # Vérifier les permissions via les groupes et rôles
-        for group in user_obj.groups.all():
-            try:
-                role = group.role
-                module_perm = ModulePermission.objects.filter(
-                    role=role, module=module
-                ).first()
-                if module_perm:
-                    user_level = self.ACCESS_HIERARCHY.get(module_perm.access_level, 0)
-                    user_max_level = max(user_max_level, user_level)
-            except Exception:
-                continue
+        user_max_level = ModulePermissionMatrix.for_user(user_obj).get(module, 0)
 
         return user_max_level >= required_level
 
@@ -0,0 +1,3 @@
+from .activity_log_buffer import ActivityLogBuffer
+
+__all__ = ['ActivityLogBuffer']
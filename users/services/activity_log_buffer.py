@@ -0,0 +1,194 @@
+"""
+Écriture du journal d'activité, immédiate ou différée.
+
+En mode 'sync' (par défaut), chaque entrée est écrite immédiatement.
+Les modes 'buffered' et 'celery' sont à activer explicitement
+(ACTIVITY_LOG_MODE) : les entrées sont placées dans une file en mémoire
+du processus et écrites par lots (bulk_create) par un thread
+d'arrière-plan, dès que la file atteint ACTIVITY_LOG_BUFFER_SIZE ou au
+plus tard toutes les ACTIVITY_LOG_FLUSH_INTERVAL secondes ; en mode
+'celery', les lots sont confiés à un worker. La file est vidée à l'arrêt
+normal du processus (atexit) ; un processus tué perd les entrées en
+attente.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from ..models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+MODES = ('buffered', 'celery', 'sync')
+
+_FIELDS = (
+    'user_id',
+    'action',
+    'module',
+    'entity_type',
+    'entity_id',
+    'details',
+    'ip_address',
+    'timestamp',
+)
+
+
+class ActivityLogBuffer:
+    """File d'écriture du journal d'activité, propre à chaque processus."""
+
+    _lock = threading.Lock()
+    # Une écriture à la fois : flush() rend la main une fois tout écrit
+    _flush_lock = threading.Lock()
+    _wakeup = threading.Event()
+    _queue = deque()
+    _thread = None
+    _pid = None
+    _stats = {
+        'queued': 0,
+        'written': 0,
+        'dropped': 0,
+        'sync_writes': 0,
+        'flushes': 0,
+    }
+
+    @staticmethod
+    def get_mode():
+        mode = getattr(settings, 'ACTIVITY_LOG_MODE', 'sync')
+        return mode if mode in MODES else 'sync'
+
+    @classmethod
+    def log(cls, **fields):
+        """
+        Enregistre une entrée du journal.
+
+        Args:
+            **fields: Champs d'ActivityLog (user_id, action, module,
+                entity_type, entity_id, details, ip_address, timestamp)
+        """
+        fields.setdefault('timestamp', timezone.now())
+        if cls.get_mode() == 'sync':
+            cls._write_now(fields)
+            return
+
+        cls._ensure_flusher()
+        with cls._lock:
+            accepted = len(cls._queue) < settings.ACTIVITY_LOG_MAX_QUEUE
+            if accepted:
+                cls._queue.append(fields)
+                cls._stats['queued'] += 1
+                full = len(cls._queue) >= settings.ACTIVITY_LOG_BUFFER_SIZE
+
+        if not accepted:
+            # File saturée : écriture immédiate plutôt que perte
+            cls._write_now(fields)
+        elif full:
+            cls._wakeup.set()
+
+    @classmethod
+    def flush(cls):
+        """
+        Écrit les entrées en attente.
+
+        Returns:
+            int: Nombre d'entrées écrites (ou confiées au worker)
+        """
+        with cls._flush_lock:
+            with cls._lock:
+                records = list(cls._queue)
+                cls._queue.clear()
+            if not records:
+                return 0
+
+            try:
+                if cls.get_mode() == 'celery':
+                    from ..tasks import write_activity_logs
+
+                    write_activity_logs.delay(
+                        [
+                            {**record, 'timestamp': record['timestamp'].isoformat()}
+                            for record in records
+                        ]
+                    )
+                else:
+                    write_records(records)
+            except Exception:
+                logger.exception(
+                    "Journal d'activité : échec d'écriture de %s entrées",
+                    len(records),
+                )
+                with cls._lock:
+                    cls._stats['dropped'] += len(records)
+                return 0
+
+        with cls._lock:
+            cls._stats['written'] += len(records)
+            cls._stats['flushes'] += 1
+        return len(records)
+
+    @classmethod
+    def stats(cls):
+        """Compteurs du processus courant et taille actuelle de la file."""
+        with cls._lock:
+            return {
+                **cls._stats,
+                'pending': len(cls._queue),
+                'mode': cls.get_mode(),
+                'pid': os.getpid(),
+            }
+
+    @classmethod
+    def _write_now(cls, fields):
+        ActivityLog.objects.create(**fields)
+        with cls._lock:
+            cls._stats['sync_writes'] += 1
+
+    @classmethod
+    def _ensure_flusher(cls):
+        """Démarre le thread d'écriture (une fois par processus, après fork)."""
+        pid = os.getpid()
+        if cls._pid == pid:
+            return
+        if cls._pid is not None:
+            # Processus issu d'un fork : file, verrou et thread du parent abandonnés
+            cls._lock = threading.Lock()
+            cls._flush_lock = threading.Lock()
+            cls._wakeup = threading.Event()
+            cls._queue = deque()
+        with cls._lock:
+            if cls._pid == pid:
+                return
+            cls._pid = pid
+            cls._thread = threading.Thread(
+                target=cls._run, name='activity-log-flusher', daemon=True
+            )
+            cls._thread.start()
+        atexit.register(cls.flush)
+
+    @classmethod
+    def _run(cls):
+        while True:
+            cls._wakeup.wait(settings.ACTIVITY_LOG_FLUSH_INTERVAL)
+            cls._wakeup.clear()
+            try:
+                cls.flush()
+            finally:
+                # Connexion propre à ce thread : ne pas la garder ouverte
+                connection.close()
+
+
+def write_records(records):
+    """Insère un lot d'entrées du journal."""
+    ActivityLog.objects.bulk_create(
+        [
+            ActivityLog(**{field: record.get(field) for field in _FIELDS})
+            for record in records
+        ],
+        batch_size=settings.ACTIVITY_LOG_BUFFER_SIZE,
+    )
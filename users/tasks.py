@@ -0,0 +1,21 @@
+import logging
+
+from celery import shared_task
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='users.tasks.write_activity_logs')
+def write_activity_logs(records):
+    """Écrit un lot d'entrées du journal d'activité (mode 'celery')."""
+    from .services.activity_log_buffer import write_records
+
+    write_records(
+        [
+            {**record, 'timestamp': parse_datetime(record['timestamp'])}
+            for record in records
+        ]
+    )
+    logger.info("Journal d'activité : %d entrées écrites", len(records))
+    return {'written': len(records)}
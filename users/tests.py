@@ -0,0 +1,138 @@
+import pytest
+from django.contrib.auth.models import Group, User
+
+from core.services.cache_version import get_cache_version
+from users.models import ActivityLog, ModulePermission, UserRole
+from users.permissions import ModulePermissionMatrix
+from users.services.activity_log_buffer import ActivityLogBuffer
+
+VERSION_KEY = ModulePermissionMatrix.VERSION_KEY
+
+
+class UnavailableCache:
+    """Cache partagé injoignable (Redis arrêté)."""
+
+    def __getattr__(self, name):
+        def unavailable(*args, **kwargs):
+            raise ConnectionError('Redis injoignable')
+
+        return unavailable
+
+
+@pytest.fixture
+def sales_user():
+    """Utilisateur dont le rôle donne la lecture sur les ventes."""
+    group = Group.objects.create(name='Commerciaux')
+    role = UserRole.objects.create(name='Commercial', group=group)
+    permission = ModulePermission.objects.create(
+        role=role, module='sales', access_level='read'
+    )
+    user = User.objects.create_user('commercial', password='x')
+    user.groups.add(group)
+    return user, role, permission
+
+
+@pytest.mark.django_db(transaction=True)
+def test_permission_matrix_is_memoized(sales_user, django_assert_num_queries):
+    user, _role, _permission = sales_user
+
+    assert ModulePermissionMatrix.for_user(user) == {'sales': 1}
+    with django_assert_num_queries(0):
+        assert ModulePermissionMatrix.for_user(user) == {'sales': 1}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_permission_changes_invalidate_the_matrix(sales_user):
+    user, role, permission = sales_user
+    ModulePermissionMatrix.for_user(user)
+
+    version = get_cache_version(VERSION_KEY)
+    permission.access_level = 'update'
+    permission.save()
+    assert get_cache_version(VERSION_KEY) != version
+    assert ModulePermissionMatrix.for_user(user) == {'sales': 3}
+
+    hr_permission = ModulePermission.objects.create(
+        role=role, module='hr', access_level='admin'
+    )
+    assert ModulePermissionMatrix.for_user(user) == {'sales': 3, 'hr': 5}
+
+    version = get_cache_version(VERSION_KEY)
+    hr_permission.delete()
+    assert get_cache_version(VERSION_KEY) != version
+    assert ModulePermissionMatrix.for_user(user) == {'sales': 3}
+
+    version = get_cache_version(VERSION_KEY)
+    role.description = 'Équipe commerciale'
+    role.save()
+    assert get_cache_version(VERSION_KEY) != version
+
+    version = get_cache_version(VERSION_KEY)
+    role.delete()
+    assert get_cache_version(VERSION_KEY) != version
+    assert ModulePermissionMatrix.for_user(user) == {}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_group_membership_invalidates_the_matrix(sales_user):
+    user, role, _permission = sales_user
+    ModulePermissionMatrix.for_user(user)
+
+    user.groups.remove(role.group)
+    assert ModulePermissionMatrix.for_user(user) == {}
+    user.groups.add(role.group)
+    assert ModulePermissionMatrix.for_user(user) == {'sales': 1}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_permission_matrix_reads_the_database_without_cache(sales_user, monkeypatch):
+    user, _role, permission = sales_user
+    monkeypatch.setattr('core.services.cache_version.cache', UnavailableCache())
+    monkeypatch.setattr('users.permissions.cache', UnavailableCache())
+
+    assert ModulePermissionMatrix.for_user(user) == {'sales': 1}
+
+    # L'invalidation ne fait pas échouer l'enregistrement
+    permission.access_level = 'delete'
+    permission.save()
+    assert ModulePermissionMatrix.for_user(user) == {'sales': 4}
+
+
+@pytest.fixture
+def activity_buffer(monkeypatch):
+    """File du journal sans thread d'écriture : vidée par flush() seulement."""
+    monkeypatch.setattr(ActivityLogBuffer, '_ensure_flusher', lambda: None)
+    yield ActivityLogBuffer
+    ActivityLogBuffer._queue.clear()
+
+
+def log_action(buffer, action):
+    buffer.log(user_id=None, action=action, module='core', entity_type='', details='')
+
+
+@pytest.mark.django_db
+def test_activity_log_is_written_immediately_by_default(activity_buffer):
+    assert activity_buffer.get_mode() == 'sync'
+
+    log_action(activity_buffer, 'login')
+
+    assert ActivityLog.objects.filter(action='login').exists()
+    assert activity_buffer.stats()['pending'] == 0
+
+
+@pytest.mark.django_db
+def test_buffered_activity_log_is_written_on_flush(activity_buffer, settings):
+    settings.ACTIVITY_LOG_MODE = 'buffered'
+    settings.ACTIVITY_LOG_MAX_QUEUE = 2
+
+    for action in ('create', 'update'):
+        log_action(activity_buffer, action)
+    assert not ActivityLog.objects.exists()
+
+    # File saturée : écriture immédiate plutôt que perte
+    log_action(activity_buffer, 'delete')
+    assert list(ActivityLog.objects.values_list('action', flat=True)) == ['delete']
+
+    assert activity_buffer.flush() == 2
+    assert ActivityLog.objects.count() == 3
+    assert activity_buffer.stats()['pending'] == 0
@@ -14,12 +14,15 @@ from .serializers import (
     UserRoleSerializer,
     UserSerializer,
 )
+from .services.activity_log_buffer import ActivityLogBuffer
 
 
 class UserViewSet(viewsets.ModelViewSet):
     """API pour gérer les utilisateurs."""
 
-    queryset = User.objects.all()
+    queryset = User.objects.select_related(
+        'profile__employee__department', 'profile__employee__job_title'
+    ).prefetch_related('groups')
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     filter_backends = [
@@ -198,7 +201,7 @@ DEFAULT_ROLE_NAMES = [
 class UserRoleViewSet(viewsets.ModelViewSet):
     """API pour gérer les rôles utilisateur."""
 
-    queryset = UserRole.objects.all()
+    queryset = UserRole.objects.prefetch_related('module_permissions')
     serializer_class = UserRoleSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -276,7 +279,7 @@ class UserRoleViewSet(viewsets.ModelViewSet):
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     """API pour consulter les journaux d'activité."""
 
-    queryset = ActivityLog.objects.all()
+    queryset = ActivityLog.objects.select_related('user').all()
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated, HasModulePermission]
     filter_backends = [
@@ -308,6 +311,16 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         # Les autres utilisateurs ne voient que leurs propres logs
         return queryset.filter(user=self.request.user)
 
+    @action(detail=False, methods=['get'], url_path='buffer-stats')
+    def buffer_stats(self, request):
+        """Compteurs de la file d'écriture du journal (processus courant)."""
+        if not request.user.is_superuser:
+            return Response(
+                {'error': 'Permissions insuffisantes'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return Response(ActivityLogBuffer.stats())
+
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])